@@ -0,0 +1,99 @@
+"""
+ジョブ出力の書き込みスループットのベンチマーク
+
+子プロセスが標準出力に書き出した大量の行を、パイプ経由でジョブログに書き込む速度 (MB/s) を比較する。
+
+* legacy: テキストモードで 1 行ずつ読み、行ごとに flush・アプリケーションログへ出力する (従来の方式)
+* pump: ShellJobExecutor (LogPump) でまとめて読み書きし、アプリケーションログへは転写しない
+* pump+mirror: LogPump で全行を INFO でアプリケーションログへ転写する
+
+アプリケーションログは os.devnull に出力する (フォーマット・書き込みのコストは含まれる)。
+
+使い方:
+    python benchmarks/bench_job_output.py --mb 50 --line-length 120
+"""
+import argparse
+import logging
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+# プロジェクトルートをパスに追加
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from src.core.config import JobOutputConfig  # noqa: E402
+from src.core.job_executor import ShellJobExecutor  # noqa: E402
+
+legacy_logger = logging.getLogger("bench.legacy")
+
+
+def producer_script(total_bytes: int, line_length: int) -> str:
+    """total_bytes バイトの行を出力する子プロセスのコマンド。"""
+    code = (
+        "import sys\n"
+        f"line = ('x' * {line_length - 1} + '\\n').encode()\n"
+        f"block = line * max(1, 65536 // len(line))\n"
+        f"n = {total_bytes} // len(block)\n"
+        "w = sys.stdout.buffer.write\n"
+        "for _ in range(n): w(block)\n"
+    )
+    return f'"{sys.executable}" -c "{code}"'
+
+
+def run_legacy(script: str, log_dir: str) -> None:
+    process = subprocess.Popen(
+        script, shell=True, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True, bufsize=1
+    )
+    with open(os.path.join(log_dir, "legacy.log"), "w", encoding="utf-8") as log_file:
+        for line in process.stdout:
+            log_file.write(line)
+            log_file.flush()
+            legacy_logger.info(f"[bench] {line.rstrip()}")
+    process.wait()
+
+
+def run_pump(script: str, log_dir: str, mirror: bool) -> None:
+    config = JobOutputConfig(app_log_level="INFO" if mirror else None)
+    ShellJobExecutor(job_log_dir=log_dir, output_config=config).execute(script, log_dir, job_name="bench")
+
+
+def measure(func, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mb", type=int, default=50, help="子プロセスが出力するデータ量 (MB)")
+    parser.add_argument("--line-length", type=int, default=120)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    devnull = open(os.devnull, "w", encoding="utf-8")
+    handler = logging.StreamHandler(devnull)
+    handler.setFormatter(logging.Formatter("[%(asctime)s] %(levelname)s in %(module)s: %(message)s"))
+    logging.basicConfig(level=logging.INFO, handlers=[handler])
+
+    total_bytes = args.mb * 1024 * 1024
+    script = producer_script(total_bytes, args.line_length)
+    with tempfile.TemporaryDirectory() as log_dir:
+        cases = [
+            ("legacy", lambda: run_legacy(script, log_dir)),
+            ("pump", lambda: run_pump(script, log_dir, mirror=False)),
+            ("pump+mirror", lambda: run_pump(script, log_dir, mirror=True)),
+        ]
+        print(f"{'方式':<14}{'秒':>10}{'MB/s':>10}")
+        for name, func in cases:
+            elapsed = measure(func, args.repeat)
+            print(f"{name:<14}{elapsed:>10.2f}{args.mb / elapsed:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
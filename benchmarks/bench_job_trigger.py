@@ -0,0 +1,102 @@
+"""
+ジョブトリガー判定のベンチマーク
+
+合成したジョブ設定 (モノレポの各サービスを監視するジョブ) に対して、
+従来の「全ジョブを model_dump してジョブごとに fnmatch で判定する」方式と、
+JobTriggerService が使用するリテラル接頭辞索引 (CompiledJobSet) の判定時間を比較する。
+
+使い方:
+    python benchmarks/bench_job_trigger.py --jobs 1000 5000 10000 --files 2000
+"""
+import argparse
+import fnmatch
+import os
+import random
+import statistics
+import sys
+import time
+
+# プロジェクトルートをパスに追加
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from src.core.config import JobConfig  # noqa: E402
+from src.core.job_matcher import CompiledJobSet  # noqa: E402
+
+
+def build_jobs(count: int) -> list:
+    """サービスごとに異なるディレクトリを監視するジョブを生成する。"""
+    jobs = []
+    for i in range(count):
+        jobs.append(
+            JobConfig(
+                name=f"job-{i}",
+                repo_url="https://github.com/example/monorepo.git",
+                target_branch="main",
+                script="make",
+                watch_files=[f"services/svc{i}/**/*.py", f"services/svc{i}/Dockerfile", "shared/proto/*.proto"][: 2 + (i % 2)],
+            )
+        )
+    return jobs
+
+
+def build_changed_files(job_count: int, files: int) -> set:
+    """一部のサービスに変更が集中するプッシュを生成する。"""
+    rng = random.Random(0)
+    touched = rng.sample(range(job_count), k=min(job_count, 20))
+    return {
+        f"services/svc{rng.choice(touched)}/pkg{n % 7}/mod{n}.py" for n in range(files)
+    } | {"README.md", "docs/index.md"}
+
+
+def legacy_match(jobs: list, changed_files: set) -> list:
+    matched = []
+    for job in jobs:
+        job_dict = job.model_dump()
+        if any(fnmatch.fnmatch(f, p) for f in changed_files for p in job_dict["watch_files"]):
+            matched.append(job.name)
+    return matched
+
+
+def indexed_match(job_set: CompiledJobSet, jobs: list, changed_files: set) -> list:
+    return [jobs[i].name for i in job_set.match(changed_files)]
+
+
+def measure(func, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--jobs", type=int, nargs="+", default=[100, 1000, 10000])
+    parser.add_argument("--files", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--skip-legacy-above", type=int, default=2000,
+                        help="このジョブ数を超える場合は従来方式の計測を省略する")
+    args = parser.parse_args()
+
+    print(f"{'jobs':>7} {'build[s]':>10} {'indexed[s]':>11} {'legacy[s]':>10} {'matched':>8}")
+    for count in args.jobs:
+        jobs = build_jobs(count)
+        changed_files = build_changed_files(count, args.files)
+
+        start = time.perf_counter()
+        job_set = CompiledJobSet([job.watch_files for job in jobs])
+        build = time.perf_counter() - start
+
+        matched = indexed_match(job_set, jobs, changed_files)
+        indexed = measure(lambda: indexed_match(job_set, jobs, changed_files), args.repeat)
+
+        legacy = "-"
+        if count <= args.skip_legacy_above:
+            assert legacy_match(jobs, changed_files) == matched
+            legacy = f"{measure(lambda: legacy_match(jobs, changed_files), 1):.3f}"
+        print(f"{count:>7} {build:>10.3f} {indexed:>11.4f} {legacy:>10} {len(matched):>8}")
+
+
+if __name__ == "__main__":
+    main()
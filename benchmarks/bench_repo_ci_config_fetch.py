@@ -0,0 +1,99 @@
+"""
+.toyci.yaml 取得戦略のベンチマーク
+
+大きめのローカル bare リポジトリを生成し、従来の GitHandler.prepare_repository による
+フルクローン (clone) と、対象コミットのツリーのみを取得する partial 戦略の所要時間を比較する。
+
+使い方:
+    python benchmarks/bench_repo_ci_config_fetch.py --files 2000 --file-size 50000 --commits 20
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+# プロジェクトルートをパスに追加
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from src.core.repo_ci_config_fetcher import build_config_fetcher  # noqa: E402
+from src.core.repo_ci_config_loader import REPO_CI_CONFIG_FILE  # noqa: E402
+
+
+def _git(*args: str, cwd: str) -> str:
+    return subprocess.run(
+        ["git", *args], cwd=cwd, check=True, capture_output=True, text=True
+    ).stdout.strip()
+
+
+def build_large_repo(base_dir: str, files: int, file_size: int, commits: int) -> str:
+    """ランダムなバイナリファイルを多数含む bare リポジトリを生成し、file:// URL を返す。"""
+    work = os.path.join(base_dir, "work")
+    os.makedirs(work)
+    _git("init", "-q", "-b", "main", cwd=work)
+    _git("config", "user.email", "bench@example.com", cwd=work)
+    _git("config", "user.name", "bench", cwd=work)
+
+    with open(os.path.join(work, REPO_CI_CONFIG_FILE), "w", encoding="utf-8") as f:
+        f.write("jobs:\n  - name: build\n    script: make\n    watch_files: ['src/**']\n")
+
+    per_commit = max(1, files // commits)
+    for c in range(commits):
+        for i in range(per_commit):
+            sub = os.path.join(work, "assets", f"d{(c * per_commit + i) % 50:02d}")
+            os.makedirs(sub, exist_ok=True)
+            with open(os.path.join(sub, f"f{c}_{i}.bin"), "wb") as f:
+                f.write(os.urandom(file_size))
+        _git("add", "-A", cwd=work)
+        _git("commit", "-q", "-m", f"commit {c}", cwd=work)
+
+    bare = os.path.join(base_dir, "remote.git")
+    _git("clone", "-q", "--bare", work, bare, cwd=base_dir)
+    _git("config", "uploadpack.allowFilter", "true", cwd=bare)
+    _git("config", "uploadpack.allowAnySHA1InWant", "true", cwd=bare)
+    return "file://" + bare.replace(os.sep, "/")
+
+
+def run(strategy: str, url: str, commit: str, repeat: int) -> list:
+    fetcher = build_config_fetcher(strategy)
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fetched = fetcher.fetch_file(url, "main", REPO_CI_CONFIG_FILE, commit=commit)
+        timings.append(time.perf_counter() - start)
+        assert fetched.content and "build" in fetched.content
+    return timings
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--files", type=int, default=1000)
+    parser.add_argument("--file-size", type=int, default=50_000)
+    parser.add_argument("--commits", type=int, default=10)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as base_dir:
+        print(f"リポジトリを生成中: files={args.files} file_size={args.file_size} commits={args.commits}")
+        url = build_large_repo(base_dir, args.files, args.file_size, args.commits)
+        commit = _git("rev-parse", "HEAD", cwd=os.path.join(base_dir, "remote.git"))
+        size_mb = sum(
+            os.path.getsize(os.path.join(root, name))
+            for root, _, names in os.walk(os.path.join(base_dir, "remote.git"))
+            for name in names
+        ) / 1e6
+        print(f"bare リポジトリのサイズ: {size_mb:.1f} MB\n")
+
+        print(f"{'strategy':<10} {'median[s]':>10} {'min[s]':>10} {'max[s]':>10}")
+        for strategy in ("clone", "partial"):
+            timings = run(strategy, url, commit, args.repeat)
+            print(
+                f"{strategy:<10} {statistics.median(timings):>10.3f}"
+                f" {min(timings):>10.3f} {max(timings):>10.3f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
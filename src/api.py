@@ -1,13 +1,17 @@
 import json
 import logging
+import time
 from contextlib import asynccontextmanager
+from typing import Optional
 
 from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
 
 from .core.logging_config import setup_logging
 from .core.container import get_container
 from .core.webhook_factory import WebhookProviderFactory
-from .core.exceptions import ToyCIError
+from .core.exceptions import ToyCIError, IngestionQueueFullError
+from .core.job_log import iter_log_bytes, log_size, resolve_job_log
 
 logger = logging.getLogger(__name__)
 
@@ -18,11 +22,16 @@ async def lifespan(app: FastAPI):
 
     container = get_container()
     app.state.container = container
+    if container.settings.ingestion.mode == "async":
+        # ワーカーを起動時に立ち上げ、最初のリクエストで生成コストを払わないようにする
+        _ = container.webhook_ingestion_service
+    # ジョブログの保持が有効な場合は削除用のスレッドを起動する
+    _ = container.log_retention_service
 
     logger.info("Application started with configuration loaded.")
     yield
 
-    container.job_service.shutdown(wait=True)
+    container.shutdown()
     logger.info("Application shutdown.")
 
 app = FastAPI(lifespan=lifespan)
@@ -30,6 +39,7 @@ app = FastAPI(lifespan=lifespan)
 @app.post("/webhook")
 async def webhook(request: Request):
     """Webhookを受け取り、ジョブをキューに追加する"""
+    started = time.perf_counter()
     try:
         payload = await request.json()
     except (json.JSONDecodeError, ValueError) as e:
@@ -40,6 +50,10 @@ async def webhook(request: Request):
     logger.info(f"プロバイダーを使用: {provider.get_provider_id()}")
 
     container = request.app.state.container
+
+    if container.settings.ingestion.mode == "async":
+        return _enqueue_webhook(container, provider, payload, started)
+
     service = container.job_trigger_service
 
     try:
@@ -51,3 +65,207 @@ async def webhook(request: Request):
     except Exception as e:
         logger.exception(f"Webhook処理で予期しないエラー: {e}")
         return {"status": "error", "message": "Internal Server Error"}
+
+
+def _enqueue_webhook(container, provider, payload, started: float) -> JSONResponse:
+    """イベントを受付キューに積み、202 Accepted を返す。"""
+    ingestion = container.webhook_ingestion_service
+    try:
+        event_id = ingestion.submit(provider, payload)
+    except IngestionQueueFullError as e:
+        logger.error(f"Webhookの受付を拒否しました: {e}")
+        return JSONResponse(
+            status_code=503,
+            content={"status": "error", "message": str(e)},
+        )
+    finally:
+        container.metrics.histogram("webhook_ack_seconds").observe(
+            time.perf_counter() - started
+        )
+    return JSONResponse(
+        status_code=202,
+        content={
+            "status": "accepted",
+            "event_id": event_id,
+            "backlog": ingestion.backlog(),
+        },
+    )
+
+
+@app.get("/webhook/events/{event_id}")
+async def webhook_event(event_id: str, request: Request):
+    """受付済み Webhook イベントの処理状態を返す (ingestion.mode が async の場合のみ)"""
+    container = request.app.state.container
+    # sync モードでは受付サービス (とワーカースレッド) を生成しない
+    event = None
+    if container.settings.ingestion.mode == "async":
+        event = container.webhook_ingestion_service.get_event(event_id)
+    if event is None:
+        return JSONResponse(
+            status_code=404,
+            content={"status": "error", "message": "Event not found"},
+        )
+    return event
+
+
+@app.get("/metrics")
+async def metrics(request: Request):
+    """内部メトリクスのスナップショットを返す"""
+    return request.app.state.container.metrics.snapshot()
+
+
+@app.get("/queue")
+async def queue(request: Request):
+    """実行中・待機中のジョブと、待機中のジョブの順番・推定待ち時間を返す"""
+    return request.app.state.container.job_service.queue_status()
+
+
+@app.get("/resources")
+async def resources(request: Request):
+    """ホストのリソース容量と実行中のジョブへの割り当てを返す"""
+    status = request.app.state.container.job_service.resource_status()
+    if status is None:
+        return {"enabled": False}
+    return {"enabled": True, **status}
+
+
+@app.get("/history")
+def history(
+    request: Request,
+    job: Optional[str] = None,
+    branch: Optional[str] = None,
+    commit: Optional[str] = None,
+    status: Optional[str] = None,
+    since: Optional[float] = None,
+    until: Optional[float] = None,
+    limit: int = 50,
+    cursor: Optional[str] = None,
+):
+    """ジョブの実行履歴を開始時刻の新しい順に返す。続きは next_cursor を cursor に指定して取得する"""
+    store = request.app.state.container.job_history
+    if store is None:
+        return {"enabled": False}
+    try:
+        runs, next_cursor = store.query(
+            job_name=job, branch=branch, commit=commit, status=status,
+            since=since, until=until, limit=limit, cursor=cursor,
+        )
+    except ValueError as e:
+        return JSONResponse(status_code=400, content={"status": "error", "message": str(e)})
+    return {"enabled": True, "runs": runs, "next_cursor": next_cursor}
+
+
+@app.get("/history/{run_id}")
+def history_run(run_id: str, request: Request):
+    """実行履歴の 1 件を返す"""
+    store = request.app.state.container.job_history
+    run = store.get(run_id) if store is not None else None
+    if run is None:
+        return JSONResponse(
+            status_code=404,
+            content={"status": "error", "message": "Run not found"},
+        )
+    return run
+
+
+# ログのサイズの取得 (圧縮したログは索引の読み込み) はファイル I/O のため、イベントループ外で実行する
+@app.get("/logs/{log_name}")
+def job_log(log_name: str, request: Request):
+    """ジョブログを返す。Range ヘッダー (bytes=) で範囲を指定できる (圧縮したログは展開後の位置)"""
+    container = request.app.state.container
+    path = resolve_job_log(container.settings.job_log_dir, log_name)
+    if path is None:
+        return _log_not_found()
+    size = log_size(path)
+    byte_range = _parse_range(request.headers.get("range"), size)
+    if byte_range is None:
+        return JSONResponse(
+            status_code=416,
+            content={"status": "error", "message": "Range Not Satisfiable"},
+            headers={"Content-Range": f"bytes */{size}"},
+        )
+    start, end, partial = byte_range
+    headers = {"Accept-Ranges": "bytes", "Content-Length": str(end - start)}
+    status_code = 200
+    if partial:
+        status_code = 206
+        headers["Content-Range"] = f"bytes {start}-{end - 1}/{size}"
+    return StreamingResponse(
+        iter_log_bytes(path, start, end),
+        status_code=status_code,
+        media_type="text/plain",
+        headers=headers,
+    )
+
+
+@app.get("/logs/{log_name}/stream")
+async def job_log_stream(log_name: str, request: Request, offset: int = 0):
+    """ジョブログを Server-Sent Events で配信する。実行中の場合は出力の終わりまで配信を続ける"""
+    container = request.app.state.container
+    path = resolve_job_log(container.settings.job_log_dir, log_name)
+    if path is None:
+        return _log_not_found()
+    return _stream_response(container, log_name, path, _resume_offset(request, offset))
+
+
+@app.get("/jobs/{job_name}/log/stream")
+async def job_live_log_stream(job_name: str, request: Request, offset: int = 0):
+    """実行中のジョブの出力を Server-Sent Events で配信する"""
+    container = request.app.state.container
+    broadcast = container.log_streams.find_job(job_name)
+    if broadcast is None:
+        return JSONResponse(
+            status_code=404,
+            content={"status": "error", "message": "Job is not running"},
+        )
+    return _stream_response(container, broadcast.name, broadcast.log_path, _resume_offset(request, offset))
+
+
+def _stream_response(container, log_name: str, path: str, offset: int) -> StreamingResponse:
+    return StreamingResponse(
+        container.log_streams.stream(log_name, path, offset=offset),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+def _resume_offset(request: Request, offset: int) -> int:
+    """再接続時は Last-Event-ID (送信済みの位置) から再開する。"""
+    last_event_id = request.headers.get("last-event-id")
+    if last_event_id and last_event_id.isdigit():
+        return int(last_event_id)
+    return max(0, offset)
+
+
+def _parse_range(header, size: int):
+    """Range ヘッダーを (start, end, 部分的か) に変換する。満たせない範囲の場合は None。
+
+    対応するのは bytes の単一範囲のみで、それ以外の指定は無視して全体を返す。
+    """
+    full = (0, size, False)
+    if not header:
+        return full
+    unit, _, spec = header.partition("=")
+    if unit.strip() != "bytes" or "," in spec:
+        return full
+    first, _, last = spec.strip().partition("-")
+    try:
+        if first:
+            start = int(first)
+            end = int(last) + 1 if last else size
+        else:
+            start = max(0, size - int(last))
+            end = size
+    except ValueError:
+        return full
+    end = min(end, size)
+    if start >= end:
+        return None
+    return start, end, True
+
+
+def _log_not_found() -> JSONResponse:
+    return JSONResponse(
+        status_code=404,
+        content={"status": "error", "message": "Log not found"},
+    )
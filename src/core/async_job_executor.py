@@ -0,0 +1,181 @@
+"""asyncio のイベントループ上でジョブのスクリプトを実行する。
+
+`ShellJobExecutor` はジョブごとに出力を読むスレッドとタイムアウト用の `threading.Timer` を使う。
+`AsyncShellJobExecutor` は `asyncio.create_subprocess_shell` でスクリプトを起動し、出力の読み取り・
+タイムアウト・取り消しをすべてイベントループ上で待つため、1 本のスレッドで多数のジョブを監視できる。
+
+Python 3.12 以降の Linux では子プロセスの終了を pidfd で待つため、プロセスごとの監視スレッドも作られない。
+"""
+import asyncio
+import concurrent.futures
+import logging
+import threading
+from typing import Any, Coroutine, Dict, Optional
+
+from .cancellation import CancellationToken
+from .exceptions import ScriptExecutionError
+from .job_executor import ShellJobExecutor
+from .job_output import LogPump, OutputTail
+
+logger = logging.getLogger(__name__)
+
+_TERMINATE_GRACE_SECONDS = 5.0
+"""終了要求からプロセスツリーを強制終了するまでの猶予 (秒)。"""
+
+
+class EventLoopThread:
+    """専用スレッドで asyncio のイベントループを動かし、他のスレッドからコルーチンを投入する。"""
+
+    def __init__(self, name: str = "EventLoop") -> None:
+        self.name = name
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def loop(self) -> asyncio.AbstractEventLoop:
+        if self._loop is None:
+            raise RuntimeError(f"イベントループ {self.name} は起動していません")
+        return self._loop
+
+    def start(self) -> None:
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+        self._thread.start()
+
+    def submit(self, coro: Coroutine[Any, Any, Any]) -> "concurrent.futures.Future[Any]":
+        """コルーチンをループで実行する。完了は返り値の Future で待つ。"""
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def stop(self) -> None:
+        """ループを停止してスレッドの終了を待つ。実行中のタスクは呼び出し元で完了させておくこと。"""
+        if self._loop is None:
+            return
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        if self._thread is not None:
+            self._thread.join()
+        self._loop.close()
+        self._loop = None
+        self._thread = None
+
+    def _run(self) -> None:
+        asyncio.set_event_loop(self._loop)
+        self._loop.run_forever()
+
+
+class AsyncShellJobExecutor(ShellJobExecutor):
+    """スクリプトをイベントループ上で実行するジョブ実行器。
+
+    `run` はイベントループ上で await するコルーチン。`execute` (IJobExecutor) は
+    呼び出し元のスレッドで新しいイベントループを作って `run` を実行する。
+    """
+
+    def execute(self, script: str, cwd: str, job_name: str = "unknown", env: Optional[Dict[str, str]] = None, timeout_seconds: Optional[int] = None, venv: Optional[str] = None, cancel_token: Optional[CancellationToken] = None) -> None:
+        asyncio.run(self.run(script, cwd, job_name=job_name, env=env, timeout_seconds=timeout_seconds, venv=venv, cancel_token=cancel_token))
+
+    async def run(self, script: str, cwd: str, job_name: str = "unknown", env: Optional[Dict[str, str]] = None, timeout_seconds: Optional[int] = None, venv: Optional[str] = None, cancel_token: Optional[CancellationToken] = None) -> None:
+        """シェルスクリプトをリアルタイムログ出力付きで実行する (例外は `ShellJobExecutor.execute` と同じ)。"""
+        if cancel_token is not None:
+            cancel_token.raise_if_cancelled(job_name)
+        log_file_path = self._start_log(job_name, script, timeout_seconds, venv)
+
+        loop = asyncio.get_running_loop()
+        tail: Optional[OutputTail] = None
+        cancel_requested = asyncio.Event()
+        timed_out = False
+        cancelled = False
+        on_cancel = None
+
+        try:
+            with self._open_stream(log_file_path, job_name) as broadcast, self._open_log(log_file_path) as log_file:
+                pump = self._new_pump(log_file, job_name, broadcast)
+                tail = pump.tail
+                process = await asyncio.create_subprocess_shell(
+                    script,
+                    cwd=cwd,
+                    env=self._build_env(env, venv),
+                    stdout=asyncio.subprocess.PIPE,
+                    stderr=asyncio.subprocess.STDOUT,
+                    **self._popen_group_kwargs(),
+                )
+
+                if cancel_token is not None:
+                    def on_cancel(reason: str) -> None:
+                        # 取り消しは Webhook の受付スレッドから要求されるため、ループ側で処理する
+                        loop.call_soon_threadsafe(cancel_requested.set)
+
+                    cancel_token.add_callback(on_cancel)
+
+                reader = asyncio.ensure_future(self._read_output(process.stdout, pump))
+                waiter = asyncio.ensure_future(cancel_requested.wait())
+                try:
+                    done, _ = await asyncio.wait(
+                        {reader, waiter}, timeout=timeout_seconds, return_when=asyncio.FIRST_COMPLETED
+                    )
+                    if reader not in done:
+                        if waiter in done:
+                            cancelled = True
+                            pump.write_note(f"[{job_name}] ジョブが取り消されました: {cancel_token.reason}\n")
+                            logger.warning(f"[{job_name}] ジョブを取り消します: {cancel_token.reason}")
+                        else:
+                            timed_out = True
+                            pump.write_note(f"[{job_name}] タイムアウトにより強制終了 ({timeout_seconds}秒)\n")
+                            logger.error(f"[{job_name}] タイムアウトにより強制終了 ({timeout_seconds}秒)")
+                        await self._terminate_process_async(process, job_name)
+                    await reader
+                    await process.wait()
+                finally:
+                    waiter.cancel()
+                    if on_cancel is not None:
+                        cancel_token.remove_callback(on_cancel)
+                    if process.returncode is None:
+                        self._signal_process_tree(process, force=True)
+                        await process.wait()
+
+        except OSError as e:
+            error_msg = f"[{job_name}] スクリプトの起動に失敗しました: {e}"
+            logger.error(error_msg)
+            raise ScriptExecutionError(
+                error_msg,
+                stdout=tail.text() if tail is not None else "",
+                stderr="",
+                return_code=-1,
+                log_path=log_file_path,
+            )
+
+        self._check_result(
+            job_name,
+            tail,
+            process.returncode,
+            log_file_path,
+            timed_out=timed_out,
+            timeout_seconds=timeout_seconds,
+            cancel_token=cancel_token if cancelled else None,
+        )
+
+    # --- プライベートメソッド ---
+
+    async def _read_output(self, stream: asyncio.StreamReader, pump: LogPump) -> None:
+        """出力を終端まで読み込んでジョブログに書き込む。"""
+        while True:
+            chunk = await stream.read(pump.chunk_size)
+            if not chunk:
+                break
+            pump.feed(chunk)
+        pump.finish()
+
+    async def _terminate_process_async(self, process: Any, job_name: str) -> None:
+        """プロセスツリーを段階的に終了する（terminate → 待機 → kill）"""
+        if process.returncode is not None:
+            return
+
+        logger.warning(f"[{job_name}] プロセスを終了中...")
+        try:
+            self._signal_process_tree(process, force=False)
+            try:
+                await asyncio.wait_for(process.wait(), _TERMINATE_GRACE_SECONDS)
+            except asyncio.TimeoutError:
+                logger.warning(f"[{job_name}] terminate後もプロセスが生存。killで強制終了します。")
+                self._signal_process_tree(process, force=True)
+                await process.wait()
+        except OSError:
+            pass
@@ -0,0 +1,261 @@
+"""asyncio のイベントループでジョブを並行実行する JobService。
+
+`JobService` はワーカースレッド 1 つで 1 ジョブを実行するため、同時実行数と同じ数のスレッドが必要になる。
+`AsyncJobService` はスクリプトの実行・監視を専用スレッドのイベントループ上のタスクとして行い、
+ワークスペースの準備・クローン・プッシュ・通知といったブロッキング処理だけを少数のスレッドプールに任せる。
+待ち時間の長いジョブ (ネットワーク越しのテスト等) を数百件並行させてもスレッド数は増えない。
+
+同時実行数の上限は max_concurrent_jobs (autoscale 有効時は自動調整の目標値) で、
+キューから取り出すディスパッチ用スレッドが空きを待ってからジョブを取り出す。
+"""
+import asyncio
+import functools
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Callable, Dict, Optional, Type
+
+from .async_job_executor import AsyncShellJobExecutor, EventLoopThread
+from .cancellation import CancellationToken
+from .exceptions import ScriptExecutionError
+from .config import Settings
+from .interfaces import IJobExecutor, IVcsHandler
+from .job_history import JobHistoryStore, RunRecord
+from .job_timing import (
+    PHASE_CHECKOUT,
+    PHASE_CLEANUP_WORKSPACE,
+    PHASE_EXECUTE_SCRIPT,
+    PHASE_HANDLE_RESULT,
+    PHASE_LOCK_WAIT,
+    PHASE_PREPARE_WORKSPACE,
+)
+from .job_queue import JobQueue, QueuedJob
+from .job_service import JobService
+from .log_stream import LogStreamRegistry
+from .metrics import MetricsRegistry
+from .mirror_store import MirrorStore
+from .vcs_handler import GitHandler
+from .workspace_manager import WorkspaceManager
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncJobService(JobService):
+    def __init__(
+        self,
+        settings: Settings,
+        workspace_manager: Optional[WorkspaceManager] = None,
+        vcs_handler_cls: Type[IVcsHandler] = GitHandler,
+        job_executor_cls: Type[IJobExecutor] = AsyncShellJobExecutor,
+        mirror_store: Optional[MirrorStore] = None,
+        job_queue: Optional[JobQueue] = None,
+        metrics: Optional[MetricsRegistry] = None,
+        log_streams: Optional[LogStreamRegistry] = None,
+        history: Optional[JobHistoryStore] = None,
+    ):
+        self._event_loop = EventLoopThread(name="JobEventLoop")
+        self._blocking_pool = ThreadPoolExecutor(
+            max_workers=settings.runner.blocking_threads, thread_name_prefix="JobBlocking"
+        )
+        # 同時実行数の上限と実行中のジョブ数
+        self._slots = threading.Condition()
+        self._limit = 0
+        self._inflight = 0
+        self._dispatcher: Optional[threading.Thread] = None
+        super().__init__(
+            settings,
+            workspace_manager=workspace_manager,
+            vcs_handler_cls=vcs_handler_cls,
+            job_executor_cls=job_executor_cls,
+            mirror_store=mirror_store,
+            job_queue=job_queue,
+            metrics=metrics,
+            log_streams=log_streams,
+            history=history,
+        )
+
+    # ------------------------------------------------------------------
+    # Worker management
+    # ------------------------------------------------------------------
+
+    def _start_workers(self) -> None:
+        if self._autoscaler is None:
+            self._limit = self.settings.max_concurrent_jobs
+            logger.info(f"ジョブを最大 {self._limit} 件並行して実行します。(asyncio)")
+        else:
+            self._limit = self._autoscaler.min_workers
+            logger.info(
+                f"ジョブを最大 {self._limit} 件並行して実行します。(asyncio)"
+                f" (自動調整: {self._limit}〜{self.settings.autoscale.max_workers} 件)"
+            )
+        self._event_loop.start()
+        self._dispatcher = threading.Thread(target=self._dispatch_loop, name="JobDispatcher", daemon=True)
+        self._dispatcher.start()
+        if self._autoscaler is not None:
+            self._autoscaler.start(self._scaling_sample, self._resize_workers)
+
+    def _worker_count(self) -> int:
+        with self._slots:
+            return self._limit
+
+    def _resize_workers(self, target: int) -> None:
+        """同時実行数の上限を target に変更する。減らす場合、実行中のジョブはそのまま完了させる。"""
+        with self._slots:
+            self._limit = target
+            self._slots.notify_all()
+
+    def _dispatch_loop(self) -> None:
+        while True:
+            with self._slots:
+                while self._inflight >= self._limit:
+                    self._slots.wait()
+                self._inflight += 1
+            job = self._job_queue.get()
+            if job is None:
+                self._release_slot()
+                break
+            self._event_loop.submit(self._run_queued(job))
+
+    def _release_slot(self) -> None:
+        with self._slots:
+            self._inflight -= 1
+            self._slots.notify_all()
+
+    async def _run_queued(self, job: QueuedJob) -> None:
+        if job.coalesced:
+            logger.info(f"[{job.job_name}] {job.coalesced} 件の実行を集約して最新のコミットで実行します。")
+        started = time.monotonic()
+        with self._stats_lock:
+            self._running[job.job_id] = (job, started)
+        try:
+            await self.run_job_async(job.job_config, job.commit_info, queued=job)
+        except Exception as e:
+            logger.exception(f"[{job.job_name}] ジョブを実行できませんでした: {e}")
+        finally:
+            self._record_duration(job, time.monotonic() - started)
+            await self._blocking(self._job_queue.task_done, job)
+            self._release_slot()
+
+    def shutdown(self, wait: bool = True) -> None:
+        """ディスパッチを停止する。
+
+        メモリ上のキューでは待機中のジョブを実行し終えてから停止する。
+        永続キューでは実行中のジョブの完了のみを待ち、待機中のジョブは次回起動時に復元される。
+        """
+        logger.info("ジョブサービスをシャットダウンしています...")
+        if self._autoscaler is not None:
+            self._autoscaler.stop()
+        self._job_queue.close(drain=not self._job_queue.durable)
+        if wait:
+            if self._dispatcher is not None:
+                self._dispatcher.join()
+            with self._slots:
+                while self._inflight > 0:
+                    self._slots.wait()
+            self._job_queue.release()
+            self._event_loop.stop()
+            self._blocking_pool.shutdown(wait=True)
+        logger.info("ジョブサービスのシャットダウンが完了しました。")
+
+    # ------------------------------------------------------------------
+    # Job execution
+    # ------------------------------------------------------------------
+
+    def run_job(self, job_config: Dict[str, Any], commit_info: Dict[str, Any], queued: Optional[QueuedJob] = None) -> None:
+        """ジョブをイベントループで実行し、完了まで待つ。"""
+        self._event_loop.submit(self.run_job_async(job_config, commit_info, queued=queued)).result()
+
+    async def run_job_async(self, job_config: Dict[str, Any], commit_info: Dict[str, Any], queued: Optional[QueuedJob] = None) -> None:
+        """`JobService.run_job` と同じ流れを、ブロッキング処理をスレッドプールに任せて実行する。"""
+        plan = self._plan_job(job_config)
+        job_name = plan.job_name
+        run_key, run_entry = self._begin_run(job_config, commit_info)
+        cancel_token = run_entry[1] if run_entry is not None else None
+        record = self._new_record(plan, commit_info, queued)
+
+        error_message: Optional[str] = None
+        log_path: Optional[str] = None
+        output_tail: Optional[str] = None
+        success = False
+        cancelled = False
+        try:
+            async with self._workspace_lock(job_name, record):
+                if cancel_token is not None:
+                    cancel_token.raise_if_cancelled(job_name)
+                with record.phase(PHASE_PREPARE_WORKSPACE):
+                    work_dir = await self._blocking(self._prepare_workspace, job_name, persistent=plan.persistent)
+                try:
+                    env = self._build_job_env(plan, commit_info, work_dir)
+                    with record.phase(PHASE_CHECKOUT):
+                        checkout_options = await self._blocking(
+                            self._build_checkout_options, job_name, job_config, plan.repo_url, commit_info
+                        )
+                        vcs_handler = await self._blocking(
+                            self._checkout_code, job_name, work_dir, plan.repo_url, plan.target_branch,
+                            checkout_options, reuse=plan.persistent,
+                        )
+                    try:
+                        with record.phase(PHASE_EXECUTE_SCRIPT):
+                            record.log_path = await self._execute_script_async(job_name, work_dir, plan.script, env, timeout_seconds=plan.timeout, venv=plan.venv, cancel_token=cancel_token)
+                        if cancel_token is not None:
+                            cancel_token.raise_if_cancelled(job_name)
+                        with record.phase(PHASE_HANDLE_RESULT):
+                            await self._blocking(self._handle_result, job_name, vcs_handler, commit_info, plan.target_branch)
+                    finally:
+                        await self._blocking(vcs_handler.close)
+                finally:
+                    if not plan.persistent:
+                        with record.phase(PHASE_CLEANUP_WORKSPACE):
+                            await self._blocking(self._cleanup_workspace, job_name)
+
+            success = True
+
+        except Exception as e:
+            error_message, cancelled, log_path = self._describe_failure(job_name, e)
+            output_tail = self._failure_output(e)
+            if isinstance(e, ScriptExecutionError):
+                record.exit_code = e.return_code
+        finally:
+            await self._blocking(
+                self._finish_run, plan, commit_info, run_key, run_entry, success, error_message, cancelled, log_path, record,
+                output_tail,
+            )
+
+    async def _execute_script_async(self, job_name: str, work_dir: str, script: str, env: Optional[Dict[str, str]] = None, timeout_seconds: Optional[int] = None, venv: Optional[str] = None, cancel_token: Optional[CancellationToken] = None) -> Optional[str]:
+        """スクリプトを実行し、ジョブログのパスを返す (`JobService._execute_script` と同じ)。"""
+        logger.info(f"[{job_name}] スクリプトを実行中: {script}")
+        executor = self._create_executor()
+        if isinstance(executor, AsyncShellJobExecutor):
+            await executor.run(script, work_dir, job_name=job_name, env=env, timeout_seconds=timeout_seconds, venv=venv, cancel_token=cancel_token)
+        else:
+            # 同期の IJobExecutor はスレッドプールで実行する
+            await self._blocking(executor.execute, script, work_dir, job_name=job_name, env=env, timeout_seconds=timeout_seconds, venv=venv, cancel_token=cancel_token)
+        log_path = getattr(executor, "log_path", None)
+        return log_path if isinstance(log_path, str) else None
+
+    # --- プライベートメソッド ---
+
+    async def _blocking(self, func: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        """ブロッキング処理をスレッドプールで実行して結果を待つ。"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._blocking_pool, functools.partial(func, *args, **kwargs))
+
+    @asynccontextmanager
+    async def _workspace_lock(self, job_name: str, record: Optional[RunRecord] = None) -> AsyncIterator[None]:
+        """ワークスペースの排他ロックをループを止めずに取得する。
+
+        ロックの待機だけをスレッドプールで行う (threading.Lock は取得したスレッド以外からも解放できる)。
+        record を指定した場合は取得までの待ち時間を lock_wait として記録する。
+        """
+        lock = self.workspace_manager.workspace_lock(job_name)
+        if record is None:
+            await self._blocking(lock.__enter__)
+        else:
+            with record.phase(PHASE_LOCK_WAIT):
+                await self._blocking(lock.__enter__)
+        try:
+            yield
+        finally:
+            lock.__exit__(None, None, None)
@@ -0,0 +1,203 @@
+"""キューの状況とホストの負荷に応じたワーカー数の自動調整。
+
+`JobService` は autoscale が有効な場合、`WorkerAutoscaler` が一定間隔で求める目標ワーカー数に
+合わせてワーカースレッドを増減する。
+
+* 拡大: 全ワーカーが実行中で、待機中のジョブの平均待ち時間が target_wait_seconds 以上
+* 縮小: ホストの負荷 (1 分間のロードアベレージ / CPU 数) または空きメモリが閾値を超えた場合、
+  および待機中のジョブがなく空きワーカーが idle_seconds 続いた場合
+
+ロードアベレージ・空きメモリは Linux では /proc から読み込む。取得できない環境では負荷を考慮しない。
+"""
+import logging
+import os
+import threading
+import time
+from typing import Any, Callable, Optional, Tuple
+
+from .metrics import MetricsRegistry
+
+logger = logging.getLogger(__name__)
+
+
+def read_load_per_cpu() -> Optional[float]:
+    """1 分間のロードアベレージを CPU 数で割った値。取得できない場合は None。"""
+    try:
+        with open("/proc/loadavg", "r", encoding="ascii") as f:
+            load = float(f.read().split()[0])
+    except (OSError, ValueError, IndexError):
+        try:
+            load = os.getloadavg()[0]
+        except (AttributeError, OSError):
+            return None
+    return load / (os.cpu_count() or 1)
+
+
+def read_available_memory_mb() -> Optional[float]:
+    """/proc/meminfo の MemAvailable (MB)。取得できない場合は None。"""
+    try:
+        with open("/proc/meminfo", "r", encoding="ascii") as f:
+            for line in f:
+                if line.startswith("MemAvailable:"):
+                    return int(line.split()[1]) / 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    return None
+
+
+class ScalingSample:
+    """ワーカー数の判断に使う観測値。"""
+
+    def __init__(
+        self,
+        workers: int,
+        busy: int,
+        queue_depth: int,
+        average_wait: float,
+        load_per_cpu: Optional[float] = None,
+        available_memory_mb: Optional[float] = None,
+    ) -> None:
+        self.workers = workers
+        self.busy = busy
+        self.queue_depth = queue_depth
+        self.average_wait = average_wait
+        self.load_per_cpu = load_per_cpu
+        self.available_memory_mb = available_memory_mb
+
+
+class WorkerAutoscaler:
+    """観測値から目標ワーカー数を求め、定期的にワーカー数を調整する。"""
+
+    def __init__(self, config: Any, metrics: Optional[MetricsRegistry] = None) -> None:
+        """
+        Args:
+            config: AutoscaleConfig
+            metrics: 判断結果を記録するメトリクス
+        """
+        if config.min_workers > config.max_workers:
+            raise ValueError(
+                f"min_workers ({config.min_workers}) は max_workers ({config.max_workers}) 以下を指定してください"
+            )
+        self.config = config
+        self._idle_since: Optional[float] = None
+        self._last_change: Optional[float] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+        metrics = metrics or MetricsRegistry()
+        self._workers_gauge = metrics.gauge("job_workers")
+        self._busy_gauge = metrics.gauge("job_workers_busy")
+        self._load_gauge = metrics.gauge("host_load_per_cpu")
+        self._memory_gauge = metrics.gauge("host_memory_available_mb")
+        self._scale_ups = metrics.counter("job_workers_scale_up_total")
+        self._scale_downs = metrics.counter("job_workers_scale_down_total")
+
+    @property
+    def min_workers(self) -> int:
+        return self.config.min_workers
+
+    def decide(self, sample: ScalingSample, now: Optional[float] = None) -> Tuple[int, Optional[str]]:
+        """目標ワーカー数と、変更する場合はその理由を返す。"""
+        now = time.monotonic() if now is None else now
+        target, reason = self._decide(sample, now)
+        if target != sample.workers:
+            self._last_change = now
+        return target, reason
+
+    def start(self, sample: Callable[[], ScalingSample], resize: Callable[[int], None]) -> None:
+        """調整用のスレッドを起動する。
+
+        Args:
+            sample: 現在の観測値を返す関数
+            resize: 目標ワーカー数を受け取り、ワーカー数を変更する関数
+        """
+        self._thread = threading.Thread(
+            target=self._run, args=(sample, resize), name="WorkerAutoscaler", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def tick(self, sample: ScalingSample, resize: Callable[[int], None]) -> None:
+        """観測値を記録し、必要であればワーカー数を変更する。"""
+        self._workers_gauge.set(sample.workers)
+        self._busy_gauge.set(sample.busy)
+        if sample.load_per_cpu is not None:
+            self._load_gauge.set(sample.load_per_cpu)
+        if sample.available_memory_mb is not None:
+            self._memory_gauge.set(sample.available_memory_mb)
+
+        target, reason = self.decide(sample)
+        if target == sample.workers:
+            return
+        if target > sample.workers:
+            self._scale_ups.inc()
+            logger.info(f"ワーカーを {sample.workers} → {target} 個に増やします: {reason}")
+        else:
+            self._scale_downs.inc()
+            logger.info(f"ワーカーを {sample.workers} → {target} 個に減らします: {reason}")
+        resize(target)
+        self._workers_gauge.set(target)
+
+    # --- プライベートメソッド ---
+
+    def _decide(self, sample: ScalingSample, now: float) -> Tuple[int, Optional[str]]:
+        config = self.config
+        workers = sample.workers
+
+        if workers < config.min_workers:
+            return config.min_workers, "最小ワーカー数に満たないため"
+        if workers > config.max_workers:
+            return config.max_workers, "最大ワーカー数を超えているため"
+
+        pressure = self._host_pressure(sample)
+        if pressure is not None:
+            self._idle_since = None
+            # ロードアベレージは遅れて下がるため、前回の変更から cooldown_seconds 経つまでは減らさない
+            cooling = self._last_change is not None and now - self._last_change < config.cooldown_seconds
+            if workers > config.min_workers and not cooling:
+                return workers - 1, pressure
+            return workers, None
+
+        idle = workers - sample.busy
+        if sample.queue_depth > 0:
+            self._idle_since = None
+            if idle <= 0 and sample.average_wait >= config.target_wait_seconds and workers < config.max_workers:
+                # 一度に増やすのは待機中のジョブ数・現在のワーカー数 (倍増) まで
+                step = min(config.max_workers - workers, sample.queue_depth, max(1, workers))
+                return workers + step, (
+                    f"待機中のジョブ {sample.queue_depth} 件 (平均待ち時間 {sample.average_wait:.0f}秒)"
+                )
+            return workers, None
+
+        if idle > 0 and workers > config.min_workers:
+            if self._idle_since is None:
+                self._idle_since = now
+            elif now - self._idle_since >= config.idle_seconds:
+                self._idle_since = now
+                return workers - 1, f"空きワーカーが {config.idle_seconds:.0f}秒以上続いたため"
+            return workers, None
+
+        self._idle_since = None
+        return workers, None
+
+    def _run(self, sample: Callable[[], ScalingSample], resize: Callable[[int], None]) -> None:
+        while not self._stop.wait(self.config.interval):
+            try:
+                self.tick(sample(), resize)
+            except Exception as e:
+                logger.exception(f"ワーカー数の調整中にエラーが発生しました: {e}")
+
+    def _host_pressure(self, sample: ScalingSample) -> Optional[str]:
+        """ホストの負荷が閾値を超えている場合はその内容を返す。"""
+        if sample.load_per_cpu is not None and sample.load_per_cpu > self.config.max_load_per_cpu:
+            return f"ホストの負荷が高いため (CPU あたりのロードアベレージ {sample.load_per_cpu:.2f})"
+        if (
+            sample.available_memory_mb is not None
+            and sample.available_memory_mb < self.config.min_available_memory_mb
+        ):
+            return f"空きメモリが少ないため ({sample.available_memory_mb:.0f} MB)"
+        return None
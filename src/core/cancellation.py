@@ -0,0 +1,76 @@
+"""実行中ジョブの取り消し通知。
+
+ジョブの実行スレッドと取り消しを要求するスレッド (Webhook の受付側) の間で共有する。
+取り消しは一方向で、一度取り消されたトークンは元に戻らない。
+"""
+import logging
+import threading
+from typing import Callable, List, Optional
+
+from .exceptions import JobCancelledError
+
+logger = logging.getLogger(__name__)
+
+
+class CancellationToken:
+    """ジョブの取り消し要求を伝えるトークン。
+
+    実行中の処理は `add_callback` で取り消し時の処理 (プロセスの停止等) を登録するか、
+    区切りごとに `raise_if_cancelled` で確認する。
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._reason: Optional[str] = None
+        self._callbacks: List[Callable[[str], None]] = []
+
+    @property
+    def cancelled(self) -> bool:
+        return self._reason is not None
+
+    @property
+    def reason(self) -> Optional[str]:
+        return self._reason
+
+    def cancel(self, reason: str) -> bool:
+        """取り消しを要求し、登録済みのコールバックを呼び出す。
+
+        Returns:
+            今回の呼び出しで取り消された場合 True (既に取り消し済みなら False)
+        """
+        with self._lock:
+            if self._reason is not None:
+                return False
+            self._reason = reason
+            callbacks = list(self._callbacks)
+            self._callbacks.clear()
+        for callback in callbacks:
+            self._invoke(callback, reason)
+        return True
+
+    def add_callback(self, callback: Callable[[str], None]) -> None:
+        """取り消し時に呼び出す処理を登録する。既に取り消し済みの場合は即座に呼び出す。"""
+        with self._lock:
+            if self._reason is None:
+                self._callbacks.append(callback)
+                return
+            reason = self._reason
+        self._invoke(callback, reason)
+
+    def remove_callback(self, callback: Callable[[str], None]) -> None:
+        with self._lock:
+            if callback in self._callbacks:
+                self._callbacks.remove(callback)
+
+    def raise_if_cancelled(self, job_name: str = "unknown") -> None:
+        """取り消されていれば JobCancelledError を送出する。"""
+        reason = self._reason
+        if reason is not None:
+            raise JobCancelledError(f"[{job_name}] ジョブが取り消されました: {reason}", reason=reason)
+
+    @staticmethod
+    def _invoke(callback: Callable[[str], None], reason: str) -> None:
+        try:
+            callback(reason)
+        except Exception as e:
+            logger.warning(f"取り消し処理でエラーが発生しました: {e}")
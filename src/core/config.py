@@ -1,4 +1,4 @@
-from typing import List, Optional, Dict, Any
+from typing import Annotated, List, Literal, Optional, Dict, Any
 import os
 import yaml
 from pydantic import BaseModel, ConfigDict, Field
@@ -13,6 +13,7 @@ class DiscordNotificationConfig(BaseModel):
     webhook_url: str = ""
     on_success: bool = True
     on_failure: bool = True
+    on_cancelled: bool = True
 
 class NotificationsConfig(BaseModel):
     discord: Optional[DiscordNotificationConfig] = None
@@ -23,6 +24,169 @@ class GitConfig(BaseModel):
     repo_url: Optional[str] = None
     access_token: Optional[str] = Field(None, alias="accessToken")
 
+class IngestionConfig(BaseModel):
+    """Webhook 受付方式の設定。
+
+    mode が "async" の場合、/webhook はイベントをキューに積んで 202 を即座に返し、
+    トリガー判定は専用ワーカーで行う。"sync" は従来通りリクエスト内で判定する。
+    """
+    mode: Literal["sync", "async"] = "sync"
+    workers: int = 1
+    max_pending: int = 1000
+    history_size: int = 1000
+
+class QueueConfig(BaseModel):
+    """ジョブキューの設定。
+
+    backend が "sqlite" の場合、キューの内容をファイルに永続化し、再起動後に復元する。
+    """
+    backend: Literal["memory", "sqlite"] = "memory"
+    path: str = "./data/job_queue.db"
+    # 書き込みをまとめてコミットする間隔 (秒)。0 の場合は投入ごとにコミットを待つ
+    commit_interval: float = Field(0.05, ge=0)
+    # 前回の終了時に実行中だったジョブの扱い ("requeue": 再投入 / "fail": 失敗として通知)
+    recovery: Literal["requeue", "fail"] = "requeue"
+    # requeue 時の最大実行回数 (超えたものは失敗として扱う)
+    max_attempts: int = Field(3, ge=1)
+    # 待ち時間がこの秒数を超えるごとに優先度を 1 上げる (0 の場合はエイジングしない)
+    aging_interval: float = Field(300, ge=0)
+    # リポジトリURLごとのフェアシェアの重み (省略したリポジトリは 1)
+    repo_weights: Dict[str, Annotated[float, Field(gt=0)]] = Field(default_factory=dict)
+
+class ResourcesConfig(BaseModel):
+    """ホストのリソース容量。
+
+    設定した場合、ジョブは resources の要求が空き容量に収まるときだけキューから取り出される。
+    max_concurrent_jobs (ワーカー数) は同時に実行できるジョブ数の上限として引き続き適用される。
+    """
+    # CPU スロットの総数 (省略時は CPU コア数)
+    cpu_slots: Optional[int] = Field(None, ge=1)
+    # メモリの総量 (MB、省略時は制限しない)
+    memory_mb: Optional[int] = Field(None, ge=1)
+    # 排他タグごとの同時実行数 (省略したタグは 1)
+    tag_limits: Dict[str, Annotated[int, Field(ge=1)]] = Field(default_factory=dict)
+
+class JobResources(BaseModel):
+    """ジョブが実行中に占有するリソース。"""
+    cpu: int = Field(1, ge=1)
+    memory_mb: int = Field(0, ge=0)
+    # 同じタグを持つジョブとは同時に実行しない (tag_limits で上限を変更できる)
+    tags: List[str] = Field(default_factory=list)
+
+class AutoscaleConfig(BaseModel):
+    """ワーカー数の自動調整。
+
+    enabled の場合、ワーカー数は max_concurrent_jobs の代わりに min_workers〜max_workers の間で
+    待機中のジョブの待ち時間とホストの負荷に応じて増減する。
+    """
+    enabled: bool = False
+    min_workers: int = Field(1, ge=1)
+    max_workers: int = Field(8, ge=1)
+    # 判断の間隔 (秒)
+    interval: float = Field(5.0, gt=0)
+    # 全ワーカーが実行中で、待機中のジョブの平均待ち時間がこの秒数以上なら増やす
+    target_wait_seconds: float = Field(10.0, ge=0)
+    # 1 分間のロードアベレージ / CPU 数がこの値を超えたら減らす (増やさない)
+    max_load_per_cpu: float = Field(1.0, gt=0)
+    # 空きメモリ (MB) がこの値を下回ったら減らす (増やさない)
+    min_available_memory_mb: int = Field(512, ge=0)
+    # 待機中のジョブがなく空きワーカーがこの秒数続いたら 1 つ減らす
+    idle_seconds: float = Field(60.0, ge=0)
+    # 負荷による縮小は前回の変更からこの秒数が経ってから行う
+    cooldown_seconds: float = Field(30.0, ge=0)
+
+class RunnerConfig(BaseModel):
+    """ジョブの実行方式。
+
+    mode が "thread" の場合、ワーカースレッド 1 つが 1 ジョブを実行する。
+    "asyncio" の場合、スクリプトの実行・監視を専用スレッドのイベントループ上で行い、
+    max_concurrent_jobs はスレッド数ではなく同時に実行するジョブ数の上限になる。
+    """
+    mode: Literal["thread", "asyncio"] = "thread"
+    # asyncio 時にクローン・プッシュ・通知などのブロッキング処理を実行するスレッド数
+    blocking_threads: int = Field(4, ge=1)
+
+class JobOutputConfig(BaseModel):
+    """ジョブの出力の扱い。
+
+    出力は全てジョブログ (job_log_dir) にそのまま書き込み、メモリには末尾だけを保持する。
+    失敗時の例外には保持した末尾とジョブログのパスだけを含め、通知には末尾の notify_tail_lines 行とジョブログのパスを載せる。
+    """
+    # 保持する出力の末尾の行数
+    tail_lines: int = Field(200, ge=1)
+    # 失敗時の通知に載せる出力の末尾の行数 (0 の場合は載せない)
+    notify_tail_lines: int = Field(20, ge=0)
+    # 保持する出力の末尾のバイト数 (1 ジョブあたりのメモリ使用量の上限)
+    tail_bytes: int = Field(64 * 1024, ge=1)
+    # 出力が続いている間にジョブログを flush する間隔 (秒) とバイト数
+    # (パイプを読み切った時点でも flush する。ただし圧縮時はこの間隔・バイト数でのみ flush する)
+    flush_interval: float = Field(1.0, ge=0)
+    flush_bytes: int = Field(1024 * 1024, ge=1)
+    # 出力をアプリケーションログへ転写するレベル (None の場合は転写しない)
+    app_log_level: Optional[Literal["DEBUG", "INFO"]] = "DEBUG"
+    # アプリケーションログへ転写する行の割合
+    app_log_sample_rate: float = Field(1.0, ge=0, le=1)
+    # ジョブログの圧縮 ("gzip" の場合は *.log.gz とフレームの索引 *.log.gz.idx に書き込む)
+    compression: Literal["none", "gzip"] = "none"
+    compression_level: int = Field(6, ge=1, le=9)
+    # 1 フレームに含める出力のバイト数 (部分的な読み出しで展開する単位)
+    frame_bytes: int = Field(256 * 1024, ge=1024)
+    # 実行中の出力の配信 (/logs/{name}/stream) 用に、実行ごとにメモリ上に保持する出力のバイト数
+    stream_buffer_bytes: int = Field(1024 * 1024, ge=1024)
+
+class LogRetentionConfig(BaseModel):
+    """ジョブログ (job_log_dir) の保持期間・容量の設定。
+
+    有効時はサーバープロセス内のスレッドが interval 秒ごとにディレクトリを少しずつ走査し、
+    条件を超えたジョブログを古いものから削除する。条件を指定しない項目は制限しない。
+    """
+    enabled: bool = False
+    # ジョブごとに残す直近の実行数
+    keep_last: Optional[int] = Field(None, ge=1)
+    # ジョブログ全体の容量の上限 (MB)
+    max_total_mb: Optional[float] = Field(None, gt=0)
+    # ジョブログを残す最大日数
+    max_age_days: Optional[float] = Field(None, gt=0)
+    # 削除を行う間隔 (秒)
+    interval: float = Field(60.0, gt=0)
+    # 1 回の間隔で走査するディレクトリのエントリ数
+    scan_batch: int = Field(1000, ge=1)
+
+class HistoryConfig(BaseModel):
+    """ジョブの実行履歴の設定。
+
+    有効時は実行ごとの結果・待ち時間・フェーズごとの所要時間を SQLite に保存し、/history で検索できる。
+    書き込みは専用スレッドが commit_interval 秒ごとにまとめて行う。
+    """
+    enabled: bool = False
+    path: str = "./data/job_history.db"
+    # 書き込みをまとめてコミットする間隔 (秒)
+    commit_interval: float = Field(1.0, ge=0)
+    # コミット待ちの記録の上限 (超えた分は古いものから捨てる)
+    max_pending: int = Field(10000, ge=1)
+
+class MirrorConfig(BaseModel):
+    """リポジトリURLごとのローカルミラー設定。
+
+    有効時はイベントごとにミラーを 1 回だけ fetch し、ジョブのワークスペースはミラーから
+    alternates 付きでクローンする。
+    """
+    enabled: bool = False
+    dir: str = "./mirrors"
+
+class RepoCILoaderConfig(BaseModel):
+    """リポジトリ内 CI 設定 (.toyci.yaml) の読み込みに関する設定。
+
+    fetch_strategy:
+        "partial": 対象コミットのツリーのみを取得し、設定ファイルの blob だけを読み出す
+        "clone": リポジトリ全体をクローンして読み込む (従来の方式)
+        "mirror": ローカルミラー (mirror セクション) から読み込む
+    """
+    fetch_strategy: Literal["partial", "clone", "mirror"] = "partial"
+    cache_size: int = 256
+    cache_ttl: int = 3600
+    negative_cache_ttl: int = 300
+
 class BaseJobConfig(BaseModel):
     """ジョブ設定の共通フィールド。"""
     name: str
@@ -31,10 +195,32 @@ class BaseJobConfig(BaseModel):
     env: Dict[str, str] = Field(default_factory=dict)
     timeout: Optional[int] = None
     venv: Optional[str] = None
+    # "clean": 実行ごとにワークスペースを削除してクローンし直す
+    # "persistent": ワークスペースを保持し、fetch + reset + clean で最新化する
+    workspace_mode: Literal["clean", "persistent"] = "clean"
+    # シャロークローンの深さ (None は全履歴)
+    clone_depth: Optional[int] = Field(None, ge=1)
+    # 対象ブランチのみをクローンする
+    single_branch: bool = False
+    # watch_files のディレクトリのみを展開するスパースチェックアウト
+    sparse_checkout: bool = False
+    # スパースチェックアウトで追加で展開するパス (ビルドツール等)
+    sparse_paths: List[str] = Field(default_factory=list)
+    # 同じジョブ・ブランチの実行が待機中なら、新しいコミットで置き換えて 1 回にまとめる
+    coalesce: bool = False
+    # 新しいコミットが投入されたら、別のコミットで実行中の同じジョブ・ブランチの実行を取り消す
+    cancel_superseded: bool = False
+    # 実行中に占有するリソース (resources セクションを設定した場合に適用)
+    resources: JobResources = Field(default_factory=JobResources)
 
 class JobConfig(BaseJobConfig):
     repo_url: Optional[str] = None
     target_branch: Optional[str] = None
+    # ジョブをトリガーするブランチ (glob 可)。省略時は全ブランチへのプッシュが対象
+    trigger_branches: Optional[List[str]] = None
+    # キューからの取り出しの優先度 (大きいほど先に実行する)。
+    # フェアシェアより先に比較されるため、リポジトリ側の .toyci.yaml では指定できない (指定しても無視される)
+    priority: int = 0
 
 class RepoJobConfig(BaseJobConfig):
     """リポジトリ内の .toyci.yaml から読み込まれるジョブ設定。
@@ -50,9 +236,19 @@ class Settings(BaseModel):
     git: GitConfig = Field(default_factory=GitConfig)
     jobs: List[JobConfig] = Field(default_factory=list)
     notifications: Optional[NotificationsConfig] = None
+    ingestion: IngestionConfig = Field(default_factory=IngestionConfig)
+    repo_ci_loader: RepoCILoaderConfig = Field(default_factory=RepoCILoaderConfig)
+    mirror: MirrorConfig = Field(default_factory=MirrorConfig)
+    queue: QueueConfig = Field(default_factory=QueueConfig)
+    resources: Optional[ResourcesConfig] = None
+    autoscale: AutoscaleConfig = Field(default_factory=AutoscaleConfig)
+    runner: RunnerConfig = Field(default_factory=RunnerConfig)
     default_timeout: int = 3600
     max_concurrent_jobs: int = 1
     job_log_dir: str = "log/jobs"
+    job_output: JobOutputConfig = Field(default_factory=JobOutputConfig)
+    log_retention: LogRetentionConfig = Field(default_factory=LogRetentionConfig)
+    history: HistoryConfig = Field(default_factory=HistoryConfig)
 
     @classmethod
     def load(cls, config_path: Optional[str] = None) -> "Settings":
@@ -2,10 +2,22 @@ from typing import Optional
 import logging
 from .config import Settings
 from .job_service import JobService
+from .async_job_service import AsyncJobService
 from .job_trigger import JobTriggerService
 from .job_matcher import JobMatcher
 from .webhook_factory import WebhookProviderFactory
 from .workspace_manager import WorkspaceManager
+from .webhook_ingestion import WebhookIngestionService
+from .repo_ci_config_cache import RepoCIConfigCache
+from .repo_ci_config_loader import RepoCIConfigLoader
+from .repo_ci_config_fetcher import build_config_fetcher
+from .metrics import MetricsRegistry
+from .mirror_store import MirrorStore
+from .log_retention import LogRetentionService
+from .log_stream import LogStreamRegistry
+from .job_history import JobHistoryStore, build_job_history
+from .job_queue import build_job_queue
+from .resource_pool import build_resource_pool
 from .interfaces import IJobService
 
 logger = logging.getLogger(__name__)
@@ -17,6 +29,12 @@ class Container:
         self._settings: Optional[Settings] = None
         self._job_service: Optional[IJobService] = None
         self._job_trigger_service: Optional[JobTriggerService] = None
+        self._webhook_ingestion_service: Optional[WebhookIngestionService] = None
+        self._metrics: Optional[MetricsRegistry] = None
+        self._mirror_store: Optional[MirrorStore] = None
+        self._log_retention_service: Optional[LogRetentionService] = None
+        self._log_streams: Optional[LogStreamRegistry] = None
+        self._job_history: Optional[JobHistoryStore] = None
 
     @classmethod
     def get_instance(cls) -> "Container":
@@ -33,12 +51,67 @@ class Container:
             # setup_logging_from_settings(self._settings)
         return self._settings
 
+    @property
+    def metrics(self) -> MetricsRegistry:
+        if self._metrics is None:
+            self._metrics = MetricsRegistry()
+        return self._metrics
+
+    @property
+    def mirror_store(self) -> Optional[MirrorStore]:
+        """ミラーが有効な場合のみ MirrorStore を返す。"""
+        use_mirror = (
+            self.settings.mirror.enabled
+            or self.settings.repo_ci_loader.fetch_strategy == "mirror"
+        )
+        if use_mirror and self._mirror_store is None:
+            self._mirror_store = MirrorStore(
+                self.settings.mirror.dir,
+                access_token=self.settings.git.access_token,
+                metrics=self.metrics,
+            )
+        return self._mirror_store
+
+    @property
+    def log_streams(self) -> LogStreamRegistry:
+        if self._log_streams is None:
+            self._log_streams = LogStreamRegistry(
+                buffer_bytes=self.settings.job_output.stream_buffer_bytes,
+                metrics=self.metrics,
+            )
+        return self._log_streams
+
+    @property
+    def job_history(self) -> Optional[JobHistoryStore]:
+        """実行履歴が有効な場合のみ JobHistoryStore を返す。"""
+        if self.settings.history.enabled and self._job_history is None:
+            self._job_history = build_job_history(self.settings.history, metrics=self.metrics)
+        return self._job_history
+
+    @property
+    def log_retention_service(self) -> Optional[LogRetentionService]:
+        """ジョブログの保持が有効な場合のみ、起動済みの LogRetentionService を返す。"""
+        if self.settings.log_retention.enabled and self._log_retention_service is None:
+            self._log_retention_service = LogRetentionService(
+                self.settings.job_log_dir,
+                self.settings.log_retention,
+                metrics=self.metrics,
+            )
+            self._log_retention_service.start()
+        return self._log_retention_service
+
     @property
     def job_service(self) -> IJobService:
         if self._job_service is None:
-            self._job_service = JobService(
+            service_cls = AsyncJobService if self.settings.runner.mode == "asyncio" else JobService
+            self._job_service = service_cls(
                 self.settings,
                 workspace_manager=WorkspaceManager(self.settings.server.workspace),
+                mirror_store=self.mirror_store if self.settings.mirror.enabled else None,
+                job_queue=build_job_queue(self.settings.queue, build_resource_pool(self.settings.resources)),
+                metrics=self.metrics,
+                log_streams=self.log_streams,
+                history=self.job_history,
             )
         return self._job_service
 
@@ -48,9 +121,49 @@ class Container:
             self._job_trigger_service = JobTriggerService(
                 settings=self.settings,
                 job_service=self.job_service,
-                job_matcher=JobMatcher()
+                job_matcher=JobMatcher(),
+                repo_config_loader=self._build_repo_config_loader(),
             )
         return self._job_trigger_service
+
+    def _build_repo_config_loader(self) -> RepoCIConfigLoader:
+        loader_config = self.settings.repo_ci_loader
+        cache = RepoCIConfigCache(
+            max_entries=loader_config.cache_size,
+            ttl_seconds=loader_config.cache_ttl,
+            negative_ttl_seconds=loader_config.negative_cache_ttl,
+            metrics=self.metrics,
+        )
+        return RepoCIConfigLoader(
+            access_token=self.settings.git.access_token,
+            cache=cache,
+            fetcher=build_config_fetcher(loader_config.fetch_strategy, self.mirror_store),
+        )
+
+    @property
+    def webhook_ingestion_service(self) -> WebhookIngestionService:
+        if self._webhook_ingestion_service is None:
+            ingestion = self.settings.ingestion
+            self._webhook_ingestion_service = WebhookIngestionService(
+                trigger_service=self.job_trigger_service,
+                workers=ingestion.workers,
+                max_pending=ingestion.max_pending,
+                history_size=ingestion.history_size,
+                metrics=self.metrics,
+            )
+        return self._webhook_ingestion_service
+
+    def shutdown(self) -> None:
+        """生成済みのサービスを停止する。"""
+        if self._webhook_ingestion_service is not None:
+            self._webhook_ingestion_service.shutdown(wait=True)
+        if self._job_service is not None:
+            self._job_service.shutdown(wait=True)
+        if self._job_history is not None:
+            # 停止したジョブの記録まで書き込んでから閉じる
+            self._job_history.close()
+        if self._log_retention_service is not None:
+            self._log_retention_service.stop()
     
     # WebhookProviderFactoryはクラスメソッドを使用しているため、ここでインスタンス化する必要はないかもしれないが、
     # 将来的にはここを通すように統一しても良い。今回は静的メソッドとして利用する。
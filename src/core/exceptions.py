@@ -3,6 +3,7 @@
 全てのカスタム例外はToyCIErrorを基底クラスとし、
 モジュールごとに適切な例外クラスを使い分ける。
 """
+from typing import Optional
 
 
 class ToyCIError(Exception):
@@ -14,9 +15,10 @@ class ScriptExecutionError(ToyCIError):
     """スクリプト実行時のエラー。
 
     Attributes:
-        stdout: 標準出力の内容
+        stdout: 標準出力の内容 (ジョブ実行時は末尾のみ。全体は log_path のジョブログを参照)
         stderr: 標準エラー出力の内容
         return_code: プロセスの終了コード
+        log_path: ジョブログのパス
     """
 
     def __init__(
@@ -25,11 +27,13 @@ class ScriptExecutionError(ToyCIError):
         stdout: str = "",
         stderr: str = "",
         return_code: int = -1,
+        log_path: Optional[str] = None,
     ) -> None:
         super().__init__(message)
         self.stdout = stdout
         self.stderr = stderr
         self.return_code = return_code
+        self.log_path = log_path
 
 
 class RepositoryError(ToyCIError):
@@ -71,11 +75,29 @@ class JobTimeoutError(ScriptExecutionError):
         stderr: str = "",
         return_code: int = -1,
         timeout_seconds: int = 0,
+        log_path: Optional[str] = None,
     ) -> None:
-        super().__init__(message, stdout=stdout, stderr=stderr, return_code=return_code)
+        super().__init__(message, stdout=stdout, stderr=stderr, return_code=return_code, log_path=log_path)
         self.timeout_seconds = timeout_seconds
 
 
+class JobCancelledError(ToyCIError):
+    """新しいコミットの到着などによりジョブが取り消された場合のエラー。
+
+    Attributes:
+        reason: 取り消しの理由
+    """
+
+    def __init__(self, message: str, reason: str = "") -> None:
+        super().__init__(message)
+        self.reason = reason
+
+
 class WebhookPayloadError(ToyCIError):
     """Webhookペイロードの解析エラー。"""
     pass
+
+
+class IngestionQueueFullError(ToyCIError):
+    """Webhook 受付キューが上限に達した場合のエラー。"""
+    pass
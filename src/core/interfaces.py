@@ -1,14 +1,53 @@
 from abc import ABC, abstractmethod
 from typing import Any, Dict, List, Optional, Set
 
+from .cancellation import CancellationToken
+
 class IJobExecutor(ABC):
     @abstractmethod
-    def execute(self, script: str, cwd: str, job_name: str = "unknown", env: Optional[Dict[str, str]] = None, timeout_seconds: Optional[int] = None, venv: Optional[str] = None) -> None:
+    def execute(self, script: str, cwd: str, job_name: str = "unknown", env: Optional[Dict[str, str]] = None, timeout_seconds: Optional[int] = None, venv: Optional[str] = None, cancel_token: Optional[CancellationToken] = None) -> None:
         pass
 
+class CheckoutOptions:
+    """リポジトリ準備時の追加オプション。
+
+    Attributes:
+        reference: オブジェクトを共有するローカルミラーのパス。
+            指定時はミラーからローカルにクローンし、origin を本来のURLに向け直す。
+        depth: シャロークローンの深さ。None の場合は全履歴を取得する。
+        single_branch: 対象ブランチのみを取得するか
+        commit: トリガーとなったコミット。ブランチの履歴に含まれ、ブランチがその後に進んでいる場合は
+            このコミットをデタッチ状態でチェックアウトする (取得していなければ追加で取得する)。
+        sparse_paths: スパースチェックアウトで展開するディレクトリ (cone モード)。
+            None の場合は作業ツリー全体を展開する。
+    """
+
+    def __init__(
+        self,
+        reference: Optional[str] = None,
+        depth: Optional[int] = None,
+        single_branch: bool = False,
+        commit: Optional[str] = None,
+        sparse_paths: Optional[List[str]] = None,
+    ) -> None:
+        self.reference = reference
+        self.depth = depth
+        self.single_branch = single_branch
+        self.commit = commit
+        self.sparse_paths = sparse_paths
+
+
 class IVcsHandler(ABC):
     @abstractmethod
-    def prepare_repository(self, url: str, branch: str, access_token: Optional[str] = None) -> None:
+    def prepare_repository(self, url: str, branch: str, access_token: Optional[str] = None, options: Optional[CheckoutOptions] = None) -> None:
+        pass
+
+    @abstractmethod
+    def update_repository(self, url: str, branch: str, access_token: Optional[str] = None, options: Optional[CheckoutOptions] = None) -> None:
+        """既存のワークスペースを再利用してリポジトリを最新化する。
+
+        再利用できない場合は RepositoryError を送出する。
+        """
         pass
 
     @abstractmethod
@@ -44,6 +83,16 @@ class IJobService(ABC):
         """ワーカースレッドを停止する。"""
         pass
 
+    @abstractmethod
+    def queue_status(self) -> Dict[str, Any]:
+        """実行中・待機中のジョブの状態を返す。"""
+        pass
+
+    @abstractmethod
+    def resource_status(self) -> Optional[Dict[str, Any]]:
+        """リソースの容量と割り当てを返す。"""
+        pass
+
 class IJobMatcher(ABC):
     @abstractmethod
     def match(self, job_config: Dict[str, Any], changed_files: Set[str]) -> bool:
@@ -80,6 +129,7 @@ class WebhookProvider(ABC):
         """ペイロードからリポジトリ情報を抽出する。
 
         Returns:
-            {"repo_url": str, "branch": str} または None（情報が取得できない場合）
+            {"repo_url": str, "branch": str} または None（情報が取得できない場合）。
+            先頭コミットの SHA が取得できる場合は "commit" キーも含む。
         """
         pass
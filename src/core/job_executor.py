@@ -1,13 +1,21 @@
 import subprocess
+import locale
 import logging
 import os
+import signal
 import sys
 import threading
 from datetime import datetime
-from typing import Optional, Dict
+from contextlib import contextmanager
+from typing import Any, BinaryIO, Dict, Iterator, Optional
 
+from .cancellation import CancellationToken
 from .interfaces import IJobExecutor
-from .exceptions import ScriptExecutionError, JobTimeoutError
+from .config import JobOutputConfig
+from .job_log import COMPRESSED_SUFFIX, CompressedLogWriter
+from .job_output import LogPump, OutputTail
+from .log_stream import LogBroadcast, LogStreamRegistry
+from .exceptions import ScriptExecutionError, JobTimeoutError, JobCancelledError
 
 logger = logging.getLogger(__name__)
 
@@ -15,16 +23,52 @@ _DEFAULT_JOB_LOG_DIR = "log/jobs"
 
 
 class ShellJobExecutor(IJobExecutor):
-    def __init__(self, job_log_dir: str = _DEFAULT_JOB_LOG_DIR):
+    def __init__(
+        self,
+        job_log_dir: str = _DEFAULT_JOB_LOG_DIR,
+        output_config: Optional[JobOutputConfig] = None,
+        log_streams: Optional[LogStreamRegistry] = None,
+    ):
+        """
+        Args:
+            job_log_dir: ジョブログの出力先
+            output_config: 出力の末尾の保持・ジョブログの flush・アプリケーションログへの転写の設定
+            log_streams: 実行中の出力を閲覧者に配信する場合の登録先
+        """
         self.job_log_dir = os.path.abspath(job_log_dir)
+        self.output_config = output_config or JobOutputConfig()
+        self.log_streams = log_streams
+        # 直近の実行のジョブログのパス
+        self.log_path: Optional[str] = None
 
     def _create_log_file_path(self, job_name: str) -> str:
         """ジョブ名とタイムスタンプからログファイルパスを生成する"""
         os.makedirs(self.job_log_dir, exist_ok=True)
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         filename = f"{job_name}_{timestamp}.log"
+        if self.output_config.compression == "gzip":
+            filename += COMPRESSED_SUFFIX
         return os.path.join(self.job_log_dir, filename)
 
+    def _open_log(self, log_file_path: str) -> BinaryIO:
+        """ジョブログを書き込み用に開く (compression が gzip の場合はフレーム単位で圧縮する)。"""
+        config = self.output_config
+        if config.compression == "gzip":
+            return CompressedLogWriter(log_file_path, frame_bytes=config.frame_bytes, level=config.compression_level)
+        return open(log_file_path, "wb")
+
+    @contextmanager
+    def _open_stream(self, log_file_path: str, job_name: str) -> Iterator[Optional[LogBroadcast]]:
+        """実行中の出力の配信を登録し、実行の終了時 (ジョブログを閉じた後) に終わりを通知する。"""
+        if self.log_streams is None:
+            yield None
+            return
+        broadcast = self.log_streams.open(log_file_path, job_name)
+        try:
+            yield broadcast
+        finally:
+            self.log_streams.close(broadcast)
+
     def _build_env(self, env: Optional[Dict[str, str]] = None, venv: Optional[str] = None) -> Dict[str, str]:
         """ホスト環境変数をベースに、venvおよび追加の環境変数をマージした辞書を返す"""
         merged = os.environ.copy()
@@ -39,40 +83,154 @@ class ShellJobExecutor(IJobExecutor):
             merged.update(env)
         return merged
 
+    def _popen_group_kwargs(self) -> Dict[str, Any]:
+        """スクリプトを独立したプロセスグループで起動するための Popen 引数。
+
+        shell=True ではシェルの子プロセスがパイプを保持し続けるため、停止時はグループごと終了させる。
+        """
+        if sys.platform == "win32":
+            return {"creationflags": subprocess.CREATE_NEW_PROCESS_GROUP}
+        return {"start_new_session": True}
+
+    def _signal_process_tree(self, process: subprocess.Popen, force: bool) -> None:
+        """プロセスとその子孫に終了を要求する (force=True で強制終了)。"""
+        if sys.platform == "win32":
+            if force:
+                subprocess.run(
+                    ["taskkill", "/T", "/F", "/PID", str(process.pid)],
+                    stdout=subprocess.DEVNULL,
+                    stderr=subprocess.DEVNULL,
+                )
+            else:
+                process.terminate()
+            return
+        try:
+            os.killpg(process.pid, signal.SIGKILL if force else signal.SIGTERM)
+        except ProcessLookupError:
+            pass
+
     def _terminate_process(self, process: subprocess.Popen, job_name: str) -> None:
-        """プロセスを段階的に終了する（terminate → 待機 → kill）"""
+        """プロセスツリーを段階的に終了する（terminate → 待機 → kill）"""
         if process.poll() is not None:
             return
 
         logger.warning(f"[{job_name}] プロセスを終了中...")
         try:
-            process.terminate()
+            self._signal_process_tree(process, force=False)
             try:
                 process.wait(timeout=5)
             except subprocess.TimeoutExpired:
                 logger.warning(f"[{job_name}] terminate後もプロセスが生存。killで強制終了します。")
-                process.kill()
+                self._signal_process_tree(process, force=True)
                 process.wait()
         except OSError:
             pass
 
-    def execute(self, script: str, cwd: str, job_name: str = "unknown", env: Optional[Dict[str, str]] = None, timeout_seconds: Optional[int] = None, venv: Optional[str] = None) -> None:
-        """シェルスクリプトをリアルタイムログ出力付きで実行する"""
+    def _start_log(self, job_name: str, script: str, timeout_seconds: Optional[int], venv: Optional[str]) -> str:
+        """ログファイルのパスを決め、実行内容をログに出力する。"""
         log_file_path = self._create_log_file_path(job_name)
+        self.log_path = log_file_path
         logger.info(f"[{job_name}] スクリプトを実行中: {script}")
         logger.info(f"[{job_name}] ジョブログ: {log_file_path}")
         if venv is not None:
             logger.info(f"[{job_name}] Python venv: {os.path.abspath(venv)}")
         if timeout_seconds is not None:
             logger.info(f"[{job_name}] タイムアウト: {timeout_seconds}秒")
+        return log_file_path
+
+    def _new_pump(self, log_file: BinaryIO, job_name: str, broadcast: Optional[LogBroadcast] = None) -> LogPump:
+        """ジョブログへの書き込みと末尾の保持を行う LogPump を生成する。
+
+        出力は text=True の Popen と同じくロケールのエンコーディングで解釈する (デコードは転写・例外の生成時のみ)。
+        """
+        config = self.output_config
+        tail = OutputTail(
+            max_lines=config.tail_lines,
+            max_bytes=config.tail_bytes,
+            encoding=locale.getpreferredencoding(False),
+        )
+        return LogPump(
+            log_file,
+            job_name,
+            tail,
+            mirror_level=logging.getLevelName(config.app_log_level) if config.app_log_level else None,
+            sample_rate=config.app_log_sample_rate,
+            flush_interval=config.flush_interval,
+            flush_bytes=config.flush_bytes,
+            broadcast=broadcast,
+            flush_on_idle=config.compression != "gzip",
+        )
+
+    def _check_result(
+        self,
+        job_name: str,
+        tail: OutputTail,
+        return_code: Optional[int],
+        log_file_path: str,
+        timed_out: bool = False,
+        timeout_seconds: Optional[int] = None,
+        cancel_token: Optional[CancellationToken] = None,
+    ) -> None:
+        """実行結果に応じて例外を送出する。cancel_token は取り消しによって停止した場合のみ渡す。
+
+        例外には出力の末尾とジョブログのパスだけを含める。
+        """
+        if cancel_token is not None:
+            raise JobCancelledError(
+                f"[{job_name}] ジョブが取り消されました: {cancel_token.reason}",
+                reason=cancel_token.reason or "",
+            )
+
+        if timed_out:
+            error_msg = (
+                f"[{job_name}] タイムアウトにより強制終了されました "
+                f"({timeout_seconds}秒) ログ: {log_file_path}"
+            )
+            raise JobTimeoutError(
+                error_msg,
+                stdout=tail.text(),
+                stderr="",
+                return_code=-1,
+                timeout_seconds=timeout_seconds,
+                log_path=log_file_path,
+            )
+
+        if return_code != 0:
+            error_msg = (
+                f"[{job_name}] スクリプトが失敗しました (終了コード: {return_code}) "
+                f"ログ: {log_file_path}"
+            )
+            logger.error(f"[{job_name}] スクリプトが終了コード {return_code} で失敗しました。")
+            raise ScriptExecutionError(
+                error_msg,
+                stdout=tail.text() if tail is not None else "",
+                stderr="",
+                return_code=return_code,
+                log_path=log_file_path,
+            )
+
+        logger.info(f"[{job_name}] スクリプトが正常に終了しました。")
+
+    def execute(self, script: str, cwd: str, job_name: str = "unknown", env: Optional[Dict[str, str]] = None, timeout_seconds: Optional[int] = None, venv: Optional[str] = None, cancel_token: Optional[CancellationToken] = None) -> None:
+        """シェルスクリプトをリアルタイムログ出力付きで実行する
+
+        cancel_token が取り消された場合はプロセスツリーを終了し、JobCancelledError を送出する。
+        """
+        if cancel_token is not None:
+            cancel_token.raise_if_cancelled(job_name)
+        log_file_path = self._start_log(job_name, script, timeout_seconds, venv)
 
         process_env = self._build_env(env, venv)
-        output_lines: list[str] = []
+        tail: Optional[OutputTail] = None
         timed_out = threading.Event()
+        cancelled = threading.Event()
         timer: Optional[threading.Timer] = None
+        on_cancel = None
 
         try:
-            with open(log_file_path, "w", encoding="utf-8") as log_file:
+            with self._open_stream(log_file_path, job_name) as broadcast, self._open_log(log_file_path) as log_file:
+                pump = self._new_pump(log_file, job_name, broadcast)
+                tail = pump.tail
                 process = subprocess.Popen(
                     script,
                     shell=True,
@@ -80,16 +238,13 @@ class ShellJobExecutor(IJobExecutor):
                     env=process_env,
                     stdout=subprocess.PIPE,
                     stderr=subprocess.STDOUT,
-                    text=True,
-                    bufsize=1,
+                    **self._popen_group_kwargs(),
                 )
 
                 if timeout_seconds is not None:
                     def _on_timeout():
                         timed_out.set()
-                        timeout_msg = f"[{job_name}] タイムアウトにより強制終了 ({timeout_seconds}秒)\n"
-                        log_file.write(timeout_msg)
-                        log_file.flush()
+                        pump.write_note(f"[{job_name}] タイムアウトにより強制終了 ({timeout_seconds}秒)\n")
                         logger.error(f"[{job_name}] タイムアウトにより強制終了 ({timeout_seconds}秒)")
                         self._terminate_process(process, job_name)
 
@@ -97,19 +252,31 @@ class ShellJobExecutor(IJobExecutor):
                     timer.daemon = True
                     timer.start()
 
-                try:
-                    for line in process.stdout:
-                        log_file.write(line)
-                        log_file.flush()
-                        logger.info(f"[{job_name}] {line.rstrip()}")
-                        output_lines.append(line)
+                if cancel_token is not None:
+                    def on_cancel(reason: str) -> None:
+                        cancelled.set()
+                        pump.write_note(f"[{job_name}] ジョブが取り消されました: {reason}\n")
+                        logger.warning(f"[{job_name}] ジョブを取り消します: {reason}")
+                        # 取り消しを要求したスレッド (Webhook の受付) を待たせないよう別スレッドで停止する
+                        threading.Thread(
+                            target=self._terminate_process,
+                            args=(process, job_name),
+                            name=f"JobCancel-{job_name}",
+                            daemon=True,
+                        ).start()
 
+                    cancel_token.add_callback(on_cancel)
+
+                try:
+                    pump.pump(process.stdout)
                     process.wait()
                 finally:
                     if timer is not None:
                         timer.cancel()
+                    if on_cancel is not None:
+                        cancel_token.remove_callback(on_cancel)
                     if process.poll() is None:
-                        process.kill()
+                        self._signal_process_tree(process, force=True)
                         process.wait()
 
         except OSError as e:
@@ -117,39 +284,18 @@ class ShellJobExecutor(IJobExecutor):
             logger.error(error_msg)
             raise ScriptExecutionError(
                 error_msg,
-                stdout="".join(output_lines),
-                stderr="",
-                return_code=-1,
-            )
-
-        if timed_out.is_set():
-            full_output = "".join(output_lines)
-            error_msg = (
-                f"[{job_name}] タイムアウトにより強制終了されました "
-                f"({timeout_seconds}秒)"
-            )
-            raise JobTimeoutError(
-                error_msg,
-                stdout=full_output,
+                stdout=tail.text() if tail is not None else "",
                 stderr="",
                 return_code=-1,
-                timeout_seconds=timeout_seconds,
-            )
-
-        return_code = process.returncode
-        full_output = "".join(output_lines)
-
-        if return_code != 0:
-            error_msg = (
-                f"[{job_name}] スクリプトが失敗しました (終了コード: {return_code}):\n"
-                f"STDOUT: {full_output}"
-            )
-            logger.error(f"[{job_name}] スクリプトが終了コード {return_code} で失敗しました。")
-            raise ScriptExecutionError(
-                error_msg,
-                stdout=full_output,
-                stderr="",
-                return_code=return_code,
+                log_path=log_file_path,
             )
 
-        logger.info(f"[{job_name}] スクリプトが正常に終了しました。")
+        self._check_result(
+            job_name,
+            tail,
+            process.returncode,
+            log_file_path,
+            timed_out=timed_out.is_set(),
+            timeout_seconds=timeout_seconds,
+            cancel_token=cancel_token if cancelled.is_set() else None,
+        )
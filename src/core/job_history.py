@@ -0,0 +1,382 @@
+"""ジョブの実行履歴。
+
+`JobService.run_job` は実行ごとに `RunRecord` を作り、終了時に `JobHistoryStore.record` に渡す。
+record はメモリ上の待ち行列に追加するだけで、書き込みは専用スレッドが commit_interval ごとに
+まとめて 1 トランザクションでコミットする (ジョブの実行時間に SQLite の書き込みを含めない)。
+
+履歴は SQLite (WAL モード) に保存し、ジョブ名・ブランチ・コミット・結果・開始時刻で絞り込める。
+一覧は開始時刻の新しい順で、カーソル (最後の行の開始時刻と run_id) による続きの取得に対応する。
+"""
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from .config import HistoryConfig
+from .job_timing import PHASE_QUEUE_WAIT, JobTimings
+from .metrics import MetricsRegistry
+
+logger = logging.getLogger(__name__)
+
+RUN_STATUS_SUCCESS = "success"
+RUN_STATUS_FAILED = "failed"
+RUN_STATUS_CANCELLED = "cancelled"
+
+_MAX_ERROR_LENGTH = 2000
+"""履歴に保存するエラーメッセージの最大文字数。"""
+
+_MAX_PAGE_SIZE = 500
+"""一覧で 1 回に返す最大件数。"""
+
+
+class RunRecord:
+    """1 回の実行の記録。
+
+    Attributes:
+        run_id: 実行の ID
+        job_id: キューのジョブ ID (キューを経由しない実行では None)
+        queued_at: キューに投入された時刻 (UNIX 時間)
+        started_at: 実行を開始した時刻 (UNIX 時間)
+        queue_seconds: キューで待った秒数
+        duration_seconds: 実行にかかった秒数
+        phases: フェーズ名ごとの所要秒数 (キューの待ち時間は queue_seconds)
+        exit_code: スクリプトの終了コード (スクリプトを実行していない場合は None)
+        log_path: ジョブログのパス
+    """
+
+    def __init__(
+        self,
+        job_name: str,
+        repo: str,
+        branch: str,
+        commit_id: str,
+        job_id: Optional[str] = None,
+        queued_at: Optional[float] = None,
+        started_at: Optional[float] = None,
+        run_id: Optional[str] = None,
+        queue_seconds: Optional[float] = None,
+        timings: Optional[JobTimings] = None,
+    ) -> None:
+        """
+        Args:
+            queue_seconds: キューで待った秒数 (省略時は queued_at と started_at の差)
+            timings: フェーズごとの所要時間の集計先
+        """
+        self.run_id = run_id or uuid.uuid4().hex
+        self.job_id = job_id
+        self.job_name = job_name
+        self.repo = repo
+        self.branch = branch
+        self.commit_id = commit_id
+        self.status: Optional[str] = None
+        self.queued_at = queued_at
+        self.started_at = started_at if started_at is not None else time.time()
+        self.finished_at: Optional[float] = None
+        if queue_seconds is None and queued_at is not None:
+            queue_seconds = max(0.0, self.started_at - queued_at)
+        self.queue_seconds = queue_seconds
+        self.duration_seconds: Optional[float] = None
+        self.phases: Dict[str, float] = {}
+        self.exit_code: Optional[int] = None
+        self.log_path: Optional[str] = None
+        self.error: Optional[str] = None
+        self._timings = timings
+        self._started = time.monotonic()
+        if timings is not None and queue_seconds is not None:
+            timings.observe(job_name, self.run_id, PHASE_QUEUE_WAIT, queue_seconds)
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        """with ブロックの所要秒数をフェーズ name の時間として記録する (失敗した場合も記録する)。"""
+        started = time.monotonic()
+        ok = False
+        try:
+            yield
+            ok = True
+        finally:
+            elapsed = time.monotonic() - started
+            self.phases[name] = self.phases.get(name, 0.0) + elapsed
+            if self._timings is not None:
+                self._timings.observe(self.job_name, self.run_id, name, elapsed, ok=ok)
+
+    def finish(self, status: str, error: Optional[str] = None) -> None:
+        self.status = status
+        self.finished_at = time.time()
+        self.duration_seconds = time.monotonic() - self._started
+        self.error = error[:_MAX_ERROR_LENGTH] if error else None
+        if self._timings is not None:
+            self._timings.summarize(
+                self.job_name, self.run_id, status, self.duration_seconds, self.phases, self.queue_seconds
+            )
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "run_id": self.run_id,
+            "job_id": self.job_id,
+            "job_name": self.job_name,
+            "repo": self.repo,
+            "branch": self.branch,
+            "commit": self.commit_id,
+            "status": self.status,
+            "queued_at": self.queued_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "queue_seconds": self.queue_seconds,
+            "duration_seconds": self.duration_seconds,
+            "phases": dict(self.phases),
+            "exit_code": self.exit_code,
+            "log_path": self.log_path,
+            "error": self.error,
+        }
+
+
+class JobHistoryStore:
+    """実行履歴を SQLite に保存・検索する。"""
+
+    _SCHEMA = """
+        CREATE TABLE IF NOT EXISTS runs (
+            run_id TEXT PRIMARY KEY,
+            job_id TEXT,
+            job_name TEXT NOT NULL,
+            repo TEXT NOT NULL,
+            branch TEXT NOT NULL,
+            commit_id TEXT NOT NULL,
+            status TEXT NOT NULL,
+            queued_at REAL,
+            started_at REAL NOT NULL,
+            finished_at REAL,
+            queue_seconds REAL,
+            duration_seconds REAL,
+            phases TEXT NOT NULL,
+            exit_code INTEGER,
+            log_path TEXT,
+            error TEXT
+        );
+        CREATE INDEX IF NOT EXISTS idx_runs_started ON runs (started_at, run_id);
+        CREATE INDEX IF NOT EXISTS idx_runs_job_started ON runs (job_name, started_at);
+        CREATE INDEX IF NOT EXISTS idx_runs_branch_started ON runs (branch, started_at);
+        CREATE INDEX IF NOT EXISTS idx_runs_status_started ON runs (status, started_at);
+        CREATE INDEX IF NOT EXISTS idx_runs_commit ON runs (commit_id);
+    """
+
+    _COLUMNS = (
+        "run_id", "job_id", "job_name", "repo", "branch", "commit_id", "status", "queued_at",
+        "started_at", "finished_at", "queue_seconds", "duration_seconds", "phases", "exit_code",
+        "log_path", "error",
+    )
+
+    def __init__(
+        self,
+        path: str,
+        commit_interval: float = 1.0,
+        max_pending: int = 10000,
+        metrics: Optional[MetricsRegistry] = None,
+    ) -> None:
+        """
+        Args:
+            path: データベースファイルのパス
+            commit_interval: 書き込みをまとめる最大待ち時間 (秒)
+            max_pending: コミット待ちの記録の上限 (超えた分は古いものから捨てる)
+            metrics: 書き込み件数・時間を記録するメトリクス
+        """
+        self.path = os.path.abspath(path)
+        self._commit_interval = commit_interval
+        self._max_pending = max_pending
+        self._pending: List[RunRecord] = []
+        self._pending_cond = threading.Condition()
+        self._submitted = 0
+        self._committed = 0
+        self._stopped = False
+
+        metrics = metrics or MetricsRegistry()
+        self._written = metrics.counter("job_history_written_total")
+        self._dropped = metrics.counter("job_history_dropped_total")
+        self._commit_seconds = metrics.histogram("job_history_commit_seconds")
+
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(self._SCHEMA)
+        # 検索用の接続 (WAL のため書き込み中も読み出せる)
+        self._reader = sqlite3.connect(self.path, check_same_thread=False)
+        self._reader.row_factory = sqlite3.Row
+        self._reader_lock = threading.Lock()
+
+        self._writer = threading.Thread(target=self._writer_loop, name="JobHistoryWriter", daemon=True)
+        self._writer.start()
+
+    def record(self, run: RunRecord) -> None:
+        """実行の記録を書き込み待ちに追加する (コミットを待たない)。"""
+        with self._pending_cond:
+            if self._stopped:
+                return
+            self._pending.append(run)
+            self._submitted += 1
+            if len(self._pending) > self._max_pending:
+                del self._pending[0]
+                self._dropped.inc()
+            self._pending_cond.notify_all()
+
+    def flush(self) -> None:
+        """書き込み待ちの記録をコミットし終えるまで待機する。"""
+        with self._pending_cond:
+            target = self._submitted
+            while self._committed < target and not self._stopped:
+                self._pending_cond.wait()
+
+    def close(self) -> None:
+        """書き込み待ちの記録をコミットし、データベースを閉じる。"""
+        self.flush()
+        with self._pending_cond:
+            if self._stopped:
+                return
+            self._stopped = True
+            self._pending_cond.notify_all()
+        self._writer.join()
+        self._conn.close()
+        self._reader.close()
+
+    def get(self, run_id: str) -> Optional[Dict[str, Any]]:
+        rows = self._select("WHERE run_id = ?", [run_id], limit=1)
+        return rows[0] if rows else None
+
+    def query(
+        self,
+        job_name: Optional[str] = None,
+        branch: Optional[str] = None,
+        commit: Optional[str] = None,
+        status: Optional[str] = None,
+        since: Optional[float] = None,
+        until: Optional[float] = None,
+        limit: int = 50,
+        cursor: Optional[str] = None,
+    ) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """条件に合う実行を開始時刻の新しい順に返す。
+
+        Args:
+            commit: コミット ID (前方一致)
+            since, until: 開始時刻の範囲 (UNIX 時間、until は含まない)
+            limit: 返す件数 (最大 _MAX_PAGE_SIZE)
+            cursor: 前回の結果の next_cursor (続きを返す)
+
+        Returns:
+            (実行の一覧, 続きがある場合は次のカーソル)
+        """
+        conditions: List[str] = []
+        params: List[Any] = []
+        for column, value in (("job_name", job_name), ("branch", branch), ("status", status)):
+            if value is not None:
+                conditions.append(f"{column} = ?")
+                params.append(value)
+        if commit:
+            # 前方一致 (短縮したコミット ID) も索引を使えるよう範囲で指定する
+            conditions.append("commit_id >= ? AND commit_id < ?")
+            params.extend([commit, commit + "￿"])
+        if since is not None:
+            conditions.append("started_at >= ?")
+            params.append(since)
+        if until is not None:
+            conditions.append("started_at < ?")
+            params.append(until)
+        if cursor:
+            started_at, run_id = _parse_cursor(cursor)
+            conditions.append("(started_at < ? OR (started_at = ? AND run_id < ?))")
+            params.extend([started_at, started_at, run_id])
+
+        limit = max(1, min(limit, _MAX_PAGE_SIZE))
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        rows = self._select(where, params, limit=limit + 1)
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            last = rows[-1]
+            next_cursor = f"{last['started_at']!r}:{last['run_id']}"
+        return rows, next_cursor
+
+    # --- プライベートメソッド ---
+
+    def _select(self, where: str, params: List[Any], limit: int) -> List[Dict[str, Any]]:
+        sql = (
+            f"SELECT {', '.join(self._COLUMNS)} FROM runs {where}"
+            " ORDER BY started_at DESC, run_id DESC LIMIT ?"
+        )
+        with self._reader_lock:
+            rows = self._reader.execute(sql, [*params, limit]).fetchall()
+        return [_row_to_dict(row) for row in rows]
+
+    def _writer_loop(self) -> None:
+        while True:
+            with self._pending_cond:
+                while not self._pending and not self._stopped:
+                    self._pending_cond.wait()
+                if not self._pending and self._stopped:
+                    return
+            if self._commit_interval > 0:
+                # 後続の記録をまとめるため少し待つ
+                time.sleep(self._commit_interval)
+            with self._pending_cond:
+                runs, self._pending = self._pending, []
+                submitted = self._submitted
+            started = time.perf_counter()
+            try:
+                self._apply(runs)
+                self._written.inc(len(runs))
+            except sqlite3.Error as e:
+                logger.exception(f"実行履歴の書き込みに失敗しました: {e}")
+            self._commit_seconds.observe(time.perf_counter() - started)
+            with self._pending_cond:
+                self._committed = submitted
+                self._pending_cond.notify_all()
+
+    def _apply(self, runs: List[RunRecord]) -> None:
+        placeholders = ", ".join("?" for _ in self._COLUMNS)
+        self._conn.execute("BEGIN")
+        try:
+            self._conn.executemany(
+                f"INSERT OR REPLACE INTO runs ({', '.join(self._COLUMNS)}) VALUES ({placeholders})",
+                [
+                    (
+                        run.run_id, run.job_id, run.job_name, run.repo, run.branch, run.commit_id,
+                        run.status, run.queued_at, run.started_at, run.finished_at, run.queue_seconds,
+                        run.duration_seconds, json.dumps(run.phases), run.exit_code, run.log_path, run.error,
+                    )
+                    for run in runs
+                ],
+            )
+            self._conn.execute("COMMIT")
+        except BaseException:
+            self._conn.execute("ROLLBACK")
+            raise
+
+
+def _row_to_dict(row: sqlite3.Row) -> Dict[str, Any]:
+    result = dict(row)
+    result["commit"] = result.pop("commit_id")
+    result["phases"] = json.loads(result["phases"])
+    return result
+
+
+def _parse_cursor(cursor: str) -> Tuple[float, str]:
+    started_at, _, run_id = cursor.partition(":")
+    try:
+        return float(started_at), run_id
+    except ValueError:
+        raise ValueError(f"不正なカーソルです: {cursor}")
+
+
+def build_job_history(history_config: Optional[HistoryConfig], metrics: Optional[MetricsRegistry] = None) -> Optional[JobHistoryStore]:
+    """設定値から実行履歴のストアを生成する。無効な場合は None。"""
+    if history_config is None or not history_config.enabled:
+        return None
+    return JobHistoryStore(
+        history_config.path,
+        commit_interval=history_config.commit_interval,
+        max_pending=history_config.max_pending,
+        metrics=metrics,
+    )
@@ -0,0 +1,452 @@
+"""圧縮したジョブログの書き込みと、索引による部分的な読み出し。
+
+圧縮したジョブログ (``*.log.gz``) は独立した gzip メンバー (フレーム) を連結したもので、
+``gzip -dc`` 等でそのまま全体を展開できる。各フレームは frame_bytes バイト程度の出力を含み、
+できるだけ行の区切りで分ける。
+
+フレームを閉じるごとに、索引ファイル (``*.log.gz.idx``) にフレームの位置と含まれる行を 1 行の JSON で追記する。
+「N 行目から M 行」や末尾の読み出しでは、索引から該当するフレームだけを展開する。
+実行中のジョブの最後のフレームは索引に載っていないが、flush ごとに同期フラッシュしているため途中まで読み出せる。
+"""
+import bisect
+import json
+import mmap
+import os
+import re
+import zlib
+from typing import BinaryIO, Iterator, List, Optional
+
+COMPRESSED_SUFFIX = ".gz"
+"""圧縮したジョブログのファイル名の接尾辞 (``<job>_<timestamp>.log.gz``)。"""
+
+INDEX_SUFFIX = ".idx"
+"""索引ファイルの接尾辞 (``<job>_<timestamp>.log.gz.idx``)。"""
+
+LOG_NAME_PATTERN = re.compile(r"^(?P<job>.+)_\d{8}_\d{6}\.log(?:\.gz)?$")
+"""ShellJobExecutor が作成するジョブログのファイル名 (<ジョブ名>_<日時>.log[.gz])。"""
+
+DEFAULT_FRAME_BYTES = 256 * 1024
+"""1 フレームに含める出力の目安 (展開後のバイト数)。"""
+
+_GZIP_WBITS = 31
+"""zlib で gzip 形式 (ヘッダ・トレーラ付き) を扱うための wbits。"""
+
+
+class LogFrame:
+    """索引の 1 レコード。
+
+    Attributes:
+        offset: ファイル内のフレームの位置 (圧縮後のバイト)
+        length: フレームの長さ (圧縮後のバイト)
+        start: フレームの先頭の、出力全体での位置 (展開後のバイト)
+        size: フレームに含まれる出力のバイト数
+        first_line: フレームの先頭の行番号 (0 始まり。それまでの改行の数)
+        lines: フレームに含まれる改行の数
+        complete: フレームが改行で終わっているか (False の場合、次のフレームは行の途中から始まる)
+    """
+
+    def __init__(
+        self, offset: int, length: int, start: int, size: int, first_line: int, lines: int, complete: bool
+    ) -> None:
+        self.offset = offset
+        self.length = length
+        self.start = start
+        self.size = size
+        self.first_line = first_line
+        self.lines = lines
+        self.complete = complete
+
+    def to_json(self) -> str:
+        return json.dumps(self.__dict__, separators=(",", ":"))
+
+    @classmethod
+    def from_json(cls, line: str) -> "LogFrame":
+        return cls(**json.loads(line))
+
+
+class CompressedLogWriter:
+    """出力をフレーム単位で gzip 圧縮して書き込む。`LogPump` の書き込み先として使う。"""
+
+    def __init__(self, path: str, frame_bytes: int = DEFAULT_FRAME_BYTES, level: int = 6) -> None:
+        if frame_bytes < 1:
+            raise ValueError(f"frame_bytes は 1 以上を指定してください: {frame_bytes}")
+        self.path = path
+        self.frame_bytes = frame_bytes
+        self.level = level
+        self._file: BinaryIO = open(path, "wb")
+        self._index = open(path + INDEX_SUFFIX, "w", encoding="utf-8")
+        self._compressor: Optional["zlib._Compress"] = None
+        self._written = 0
+        # 書き込み中のフレーム
+        self._frame_offset = 0
+        self._frame_start = 0
+        self._frame_size = 0
+        self._frame_first_line = 0
+        self._frame_lines = 0
+        self._at_line_start = True
+
+    def write(self, data: bytes) -> int:
+        view = memoryview(data)
+        while view:
+            room = self.frame_bytes - self._frame_size
+            if len(view) <= room:
+                self._append(view)
+                break
+            # フレームに収まる範囲の最後の改行で区切る
+            cut = bytes(view[:room]).rfind(b"\n") + 1
+            if cut == 0:
+                if self._frame_size > 0:
+                    # 改行がない場合は、書き込み中のフレームを閉じて新しいフレームに入れ直す
+                    self._close_frame()
+                    continue
+                # 1 行がフレームより長い場合は行の途中で区切る
+                cut = room
+            self._append(view[:cut])
+            self._close_frame()
+            view = view[cut:]
+        if self._frame_size >= self.frame_bytes:
+            self._close_frame()
+        return len(data)
+
+    def flush(self) -> None:
+        """書き込み済みの出力を、フレームを閉じずに読み出せる状態にする (同期フラッシュ)。"""
+        if self._compressor is not None:
+            self._write_compressed(self._compressor.flush(zlib.Z_SYNC_FLUSH))
+        self._file.flush()
+
+    def close(self) -> None:
+        if self._file.closed:
+            return
+        if self._compressor is not None:
+            self._close_frame()
+        self._file.close()
+        self._index.close()
+
+    def __enter__(self) -> "CompressedLogWriter":
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        self.close()
+
+    # --- プライベートメソッド ---
+
+    def _append(self, data: memoryview) -> None:
+        if not data:
+            return
+        if self._compressor is None:
+            self._compressor = zlib.compressobj(self.level, zlib.DEFLATED, _GZIP_WBITS)
+            self._frame_offset = self._written
+        self._write_compressed(self._compressor.compress(data))
+        self._frame_size += len(data)
+        self._frame_lines += bytes(data).count(b"\n")
+        self._at_line_start = data[-1] == 0x0A
+
+    def _close_frame(self) -> None:
+        if self._compressor is None:
+            return
+        self._write_compressed(self._compressor.flush(zlib.Z_FINISH))
+        frame = LogFrame(
+            offset=self._frame_offset,
+            length=self._written - self._frame_offset,
+            start=self._frame_start,
+            size=self._frame_size,
+            first_line=self._frame_first_line,
+            lines=self._frame_lines,
+            complete=self._at_line_start,
+        )
+        self._index.write(frame.to_json() + "\n")
+        self._index.flush()
+        self._compressor = None
+        self._frame_start += self._frame_size
+        self._frame_first_line += self._frame_lines
+        self._frame_size = 0
+        self._frame_lines = 0
+
+    def _write_compressed(self, data: bytes) -> None:
+        if data:
+            self._file.write(data)
+            self._written += len(data)
+
+
+class CompressedLogReader:
+    """圧縮したジョブログを、索引を使って部分的に読み出す。
+
+    フレームの一覧は最初の読み出しで作り、以降は使い回す。書き込み中のログの続きは refresh で読み直す
+    (索引は前回の続きから読み、索引に載っていない末尾のフレームだけを展開し直す)。
+    read_bytes は保持している末尾より後ろを求められた場合に自動で読み直す。
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._indexed: List[LogFrame] = []
+        self._index_position = 0
+        self._frames: Optional[List[LogFrame]] = None
+        self._starts: List[int] = []
+        # 直前に展開したフレーム (チャンクの境界をまたぐ読み出しで同じフレームを展開し直さない)
+        self._cached_frame: Optional[LogFrame] = None
+        self._cached_data = b""
+
+    def frames(self) -> List[LogFrame]:
+        """索引に載っているフレームと、索引に載っていない末尾のフレーム (書き込み中等) を返す。"""
+        if self._frames is None:
+            self.refresh()
+        return self._frames
+
+    def refresh(self) -> List[LogFrame]:
+        """索引の追記分と末尾のフレームを読み直し、フレームの一覧を返す。"""
+        self._load_index()
+        frames = list(self._indexed)
+        end = frames[-1].offset + frames[-1].length if frames else 0
+        with open(self.path, "rb") as f:
+            f.seek(end)
+            trailing = f.read()
+        if trailing:
+            data = _decompress_members(trailing)
+            last = frames[-1] if frames else None
+            frames.append(
+                _TrailingFrame(
+                    data,
+                    offset=end,
+                    length=len(trailing),
+                    start=last.start + last.size if last else 0,
+                    first_line=last.first_line + last.lines if last else 0,
+                )
+            )
+        self._frames = frames
+        self._starts = [f.start for f in frames]
+        return frames
+
+    def line_count(self) -> int:
+        """行数 (最後の行が改行で終わっていない場合も 1 行と数える)。"""
+        frames = self.frames()
+        if not frames:
+            return 0
+        last = frames[-1]
+        return last.first_line + last.lines + (0 if last.complete or last.size == 0 else 1)
+
+    def read_lines(self, start: int, count: int) -> List[bytes]:
+        """start 行目 (0 始まり) から count 行を返す (改行を含む)。"""
+        if count <= 0:
+            return []
+        frames = self.frames()
+        if not frames:
+            return []
+        index = max(0, bisect.bisect_right([f.first_line for f in frames], start) - 1)
+        # 行の途中から始まるフレームの場合は、その行の先頭を含むフレームまで戻る
+        while index > 0 and not frames[index - 1].complete:
+            index -= 1
+        first_line = frames[index].first_line
+        needed = start - first_line + count
+        buffer = bytearray()
+        newlines = 0
+        for frame in frames[index:]:
+            data = self._frame_data(frame)
+            buffer += data
+            newlines += data.count(b"\n")
+            if newlines >= needed:
+                break
+        lines = _split_lines(bytes(buffer))
+        return lines[start - first_line:needed]
+
+    def tail(self, count: int) -> List[bytes]:
+        """末尾の count 行を返す (改行を含む)。"""
+        if count <= 0:
+            return []
+        frames = self.frames()
+        chunks: List[bytes] = []
+        newlines = 0
+        for position in range(len(frames) - 1, -1, -1):
+            data = self._frame_data(frames[position])
+            chunks.append(data)
+            newlines += data.count(b"\n")
+            # 行の先頭から始まるフレームまで読めば、末尾 count 行が揃う
+            starts_line = position == 0 or frames[position - 1].complete
+            if newlines > count and starts_line:
+                break
+        lines = _split_lines(b"".join(reversed(chunks)))
+        return lines[-count:]
+
+    def read_all(self) -> bytes:
+        return b"".join(self._frame_data(frame) for frame in self.frames())
+
+    def size(self) -> int:
+        """展開後の出力のバイト数。"""
+        frames = self.frames()
+        return frames[-1].start + frames[-1].size if frames else 0
+
+    def read_bytes(self, offset: int, length: int) -> bytes:
+        """展開後の出力の offset バイト目から length バイトを返す。範囲を含むフレームだけを展開する。"""
+        if length <= 0:
+            return b""
+        frames = self.frames()
+        if offset + length > self.size():
+            # 保持している末尾より後ろは、書き込み中であれば追記されている
+            frames = self.refresh()
+        index = bisect.bisect_right(self._starts, offset) - 1
+        if index < 0:
+            return b""
+        buffer = bytearray()
+        base = frames[index].start
+        for frame in frames[index:]:
+            if frame.start >= offset + length:
+                break
+            buffer += self._frame_data(frame)
+        return bytes(buffer[offset - base:offset - base + length])
+
+    # --- プライベートメソッド ---
+
+    def _load_index(self) -> None:
+        """索引の前回の続きから、完全に書き込まれたレコードを読み込む。"""
+        try:
+            with open(self.path + INDEX_SUFFIX, "rb") as f:
+                f.seek(self._index_position)
+                data = f.read()
+        except FileNotFoundError:
+            return
+        position = 0
+        while True:
+            newline = data.find(b"\n", position)
+            if newline < 0:
+                # 書き込み途中のレコードは次回に読む
+                break
+            try:
+                frame = LogFrame.from_json(data[position:newline].decode("utf-8"))
+            except (ValueError, TypeError):
+                # 壊れたレコード (書き込み途中で終了した等)。以降は末尾のフレームとして読む
+                break
+            self._indexed.append(frame)
+            position = newline + 1
+        self._index_position += position
+
+    def _frame_data(self, frame: LogFrame) -> bytes:
+        if isinstance(frame, _TrailingFrame):
+            return frame.data
+        if frame is self._cached_frame:
+            return self._cached_data
+        with open(self.path, "rb") as f:
+            f.seek(frame.offset)
+            compressed = f.read(frame.length)
+        data = zlib.decompress(compressed, _GZIP_WBITS)
+        self._cached_frame, self._cached_data = frame, data
+        return data
+
+
+class _TrailingFrame(LogFrame):
+    """索引に載っていない末尾のフレーム (展開済みのデータを持つ)。"""
+
+    def __init__(self, data: bytes, offset: int, length: int, start: int, first_line: int) -> None:
+        super().__init__(
+            offset=offset,
+            length=length,
+            start=start,
+            size=len(data),
+            first_line=first_line,
+            lines=data.count(b"\n"),
+            complete=data.endswith(b"\n"),
+        )
+        self.data = data
+
+
+def _split_lines(data: bytes) -> List[bytes]:
+    """改行 (b"\\n") だけで行に分ける。索引の行数と合わせるため、\\r では分けない。"""
+    lines = [line + b"\n" for line in data.split(b"\n")]
+    lines[-1] = lines[-1][:-1]
+    if not lines[-1]:
+        lines.pop()
+    return lines
+
+
+def _decompress_members(data: bytes) -> bytes:
+    """連結された gzip メンバーを展開する。最後のメンバーは途中まで (同期フラッシュした位置まで) でもよい。"""
+    output = bytearray()
+    while data:
+        decompressor = zlib.decompressobj(_GZIP_WBITS)
+        try:
+            output += decompressor.decompress(data)
+        except zlib.error:
+            break
+        if not decompressor.eof:
+            break
+        data = decompressor.unused_data
+    return bytes(output)
+
+
+def is_compressed_log(path: str) -> bool:
+    return path.endswith(COMPRESSED_SUFFIX)
+
+
+def resolve_job_log(log_dir: str, name: str) -> Optional[str]:
+    """job_log_dir 内のジョブログのファイル名をパスに変換する。ジョブログのファイル名でない・存在しない場合は None。"""
+    if LOG_NAME_PATTERN.match(name) is None or os.path.basename(name) != name:
+        return None
+    path = os.path.join(os.path.abspath(log_dir), name)
+    return path if os.path.isfile(path) else None
+
+
+def log_size(path: str) -> int:
+    """ジョブログの出力のバイト数 (圧縮している場合は展開後)。"""
+    if is_compressed_log(path):
+        return CompressedLogReader(path).size()
+    return os.path.getsize(path)
+
+
+class JobLogReader:
+    """1 つのジョブログを展開後の位置で繰り返し読み出す (SSE の配信等)。
+
+    圧縮したログは同じ CompressedLogReader を使い続けるため、読み出しごとに索引を読み直さない。
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._compressed = CompressedLogReader(path) if is_compressed_log(path) else None
+
+    def read_bytes(self, offset: int, length: int) -> bytes:
+        """出力の offset バイト目から最大 length バイトを返す。"""
+        if self._compressed is not None:
+            return self._compressed.read_bytes(offset, length)
+        if length <= 0:
+            return b""
+        with open(self.path, "rb") as f:
+            f.seek(offset)
+            return f.read(length)
+
+
+def read_log_bytes(path: str, offset: int, length: int) -> bytes:
+    """ジョブログの出力の offset バイト目から最大 length バイトを返す。"""
+    return b"".join(iter_log_bytes(path, offset, offset + length))
+
+
+def iter_log_bytes(path: str, start: int, end: int, chunk_size: int = 256 * 1024) -> Iterator[bytes]:
+    """ジョブログの出力の [start, end) を chunk_size ずつ返す。
+
+    圧縮していないログは mmap で必要な範囲だけを読み、圧縮したログは範囲を含むフレームだけを展開する。
+    """
+    if is_compressed_log(path):
+        reader = CompressedLogReader(path)
+        position = start
+        while position < end:
+            data = reader.read_bytes(position, min(chunk_size, end - position))
+            if not data:
+                return
+            yield data
+            position += len(data)
+        return
+
+    with open(path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        end = min(end, size)
+        if start >= end:
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            for position in range(start, end, chunk_size):
+                yield mapped[position:min(position + chunk_size, end)]
+
+
+def remove_job_log(path: str) -> None:
+    """ジョブログと (圧縮している場合は) 索引ファイルを削除する。"""
+    os.remove(path)
+    if is_compressed_log(path):
+        try:
+            os.remove(path + INDEX_SUFFIX)
+        except FileNotFoundError:
+            pass
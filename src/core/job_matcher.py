@@ -1,11 +1,191 @@
 import fnmatch
-from typing import Set, Dict, Any, List
+import re
+from functools import lru_cache
+from typing import Set, Dict, Any, Iterable, List, Optional, Pattern, Sequence, Tuple
 import logging
 
 logger = logging.getLogger(__name__)
 
 from .interfaces import IJobMatcher
 
+_GLOB_CHARS = "*?["
+
+
+def literal_directory(pattern: str) -> str:
+    """glob パターンのうち、ワイルドカードを含まない先頭のディレクトリ部分を返す。
+
+    例: ``docs/**/*.md`` → ``docs``、``src/app/main.py`` → ``src/app``、``*.md`` → ``""``
+    """
+    cut = len(pattern)
+    for ch in _GLOB_CHARS:
+        idx = pattern.find(ch)
+        if idx != -1:
+            cut = min(cut, idx)
+    return pattern[:cut].rpartition("/")[0]
+
+
+def sparse_directories(patterns: List[str]) -> Optional[List[str]]:
+    """パターン群をカバーするスパースチェックアウト (cone モード) 用のディレクトリ一覧を返す。
+
+    ルート直下のファイルは cone モードで常に展開されるため、ディレクトリを持たない
+    パターンでもルート直下のファイルだけを対象とするものは問題ない。
+    ただし ``*.md`` のように任意の階層にマッチしうるパターンが含まれる場合は
+    ディレクトリを絞り込めないため None (フルチェックアウト) を返す。
+    """
+    directories: Set[str] = set()
+    for pattern in patterns:
+        directory = literal_directory(pattern)
+        if not directory:
+            if any(ch in pattern for ch in _GLOB_CHARS):
+                return None
+            continue
+        directories.add(directory)
+    # 親ディレクトリに包含されるものは除く
+    return [
+        d for d in sorted(directories)
+        if not any(d.startswith(parent + "/") for parent in directories)
+    ]
+
+
+def translate_watch_pattern(pattern: str) -> str:
+    """watch_files の glob パターンを正規表現に変換する。
+
+    ``*`` / ``?`` / ``[seq]`` は従来の ``fnmatch`` と同じ意味を持つ (``*`` はディレクトリ区切りも含む)。
+    加えて ``**/`` は 0 個以上のディレクトリにマッチするため、``docs/**/*.md`` は ``docs/api.md`` にもマッチする。
+    """
+    parts: List[str] = []
+    i, n = 0, len(pattern)
+    while i < n:
+        if pattern.startswith("**/", i):
+            parts.append("(?:.*/)?")
+            i += 3
+            continue
+        ch = pattern[i]
+        i += 1
+        if ch == "*":
+            while i < n and pattern[i] == "*" and not pattern.startswith("**/", i):
+                i += 1
+            parts.append(".*")
+        elif ch == "?":
+            parts.append(".")
+        elif ch == "[":
+            j = i
+            if j < n and pattern[j] == "!":
+                j += 1
+            if j < n and pattern[j] == "]":
+                j += 1
+            j = pattern.find("]", j)
+            if j == -1:
+                parts.append("\\[")
+                continue
+            body = re.sub(r"([\[&~|])", r"\\\1", pattern[i:j].replace("\\", "\\\\"))
+            i = j + 1
+            if body.startswith("!"):
+                body = "^" + body[1:]
+            elif body.startswith("^"):
+                body = "\\" + body
+            parts.append(f"[{body}]")
+        else:
+            parts.append(re.escape(ch))
+    return "".join(parts)
+
+
+@lru_cache(maxsize=4096)
+def compile_watch_patterns(patterns: Tuple[str, ...]) -> Optional[Pattern[str]]:
+    """パターン群を 1 つの正規表現にまとめてコンパイルする。パターンが空の場合は None。"""
+    if not patterns:
+        return None
+    try:
+        return re.compile("|".join(f"(?:{translate_watch_pattern(p)})" for p in patterns), re.DOTALL)
+    except re.error:
+        return re.compile("|".join(f"(?:{_translate_checked(p)})" for p in patterns), re.DOTALL)
+
+
+def _translate_checked(pattern: str) -> str:
+    """変換結果が正規表現として不正な場合 (逆順の文字範囲など) は fnmatch の変換結果を使う。"""
+    translated = translate_watch_pattern(pattern)
+    try:
+        re.compile(translated)
+    except re.error:
+        return fnmatch.translate(pattern)
+    return translated
+
+
+class CompiledJobSet:
+    """複数ジョブの watch_files をまとめてコンパイルし、変更ファイル群に対して一括で判定する。
+
+    各パターンはワイルドカードより前のディレクトリ (リテラル接頭辞) で索引付けされ、
+    変更ファイルごとに祖先ディレクトリに対応するパターンだけを照合する。
+    ワイルドカードを含まないパターンはパスの完全一致で判定する。
+    接頭辞を持たないパターン (``*.md`` など) は全ファイルが対象となるが、
+    それらを合成した正規表現で事前に絞り込む。
+    このため判定コストは総ジョブ数ではなく、変更ファイルと接頭辞が重なるジョブ数に比例する。
+    """
+
+    def __init__(self, pattern_lists: Sequence[Sequence[str]]) -> None:
+        """
+        Args:
+            pattern_lists: ジョブごとの watch_files (ジョブの並び順を保持する)
+        """
+        self._size = len(pattern_lists)
+        self._exact: Dict[str, Set[int]] = {}
+        self._by_directory: Dict[str, List[Tuple[int, Pattern[str]]]] = {}
+        self._root: List[Tuple[int, Pattern[str]]] = []
+        root_patterns: List[str] = []
+
+        for index, patterns in enumerate(pattern_lists):
+            for pattern in patterns:
+                if not any(ch in pattern for ch in _GLOB_CHARS):
+                    self._exact.setdefault(pattern, set()).add(index)
+                    continue
+                entry = (index, compile_watch_patterns((pattern,)))
+                directory = literal_directory(pattern)
+                if directory:
+                    self._by_directory.setdefault(directory, []).append(entry)
+                else:
+                    self._root.append(entry)
+                    root_patterns.append(pattern)
+        self._root_any = compile_watch_patterns(tuple(root_patterns))
+
+    def __len__(self) -> int:
+        return self._size
+
+    def candidates(self, file: str) -> Set[int]:
+        """ファイルにマッチしうるジョブ (接頭辞が重なるもの) のインデックスを返す。"""
+        result = set(self._exact.get(file, ()))
+        for directory in _ancestor_directories(file):
+            result.update(index for index, _ in self._by_directory.get(directory, ()))
+        result.update(index for index, _ in self._root)
+        return result
+
+    def match(self, files: Iterable[str]) -> List[int]:
+        """いずれかのファイルにマッチしたジョブのインデックスを昇順で返す。"""
+        matched: Set[int] = set()
+        for file in files:
+            if len(matched) == self._size:
+                break
+            matched.update(self._exact.get(file, ()))
+            for directory in _ancestor_directories(file):
+                self._match_entries(self._by_directory.get(directory, ()), file, matched)
+            if self._root_any is not None and self._root_any.fullmatch(file):
+                self._match_entries(self._root, file, matched)
+        return sorted(matched)
+
+    @staticmethod
+    def _match_entries(entries: Iterable[Tuple[int, Pattern[str]]], file: str, matched: Set[int]) -> None:
+        for index, regex in entries:
+            if index not in matched and regex.fullmatch(file):
+                matched.add(index)
+
+
+def _ancestor_directories(path: str) -> Iterable[str]:
+    """``a/b/c.txt`` に対して ``a``, ``a/b`` を返す。"""
+    pos = path.find("/")
+    while pos != -1:
+        yield path[:pos]
+        pos = path.find("/", pos + 1)
+
+
 class JobMatcher(IJobMatcher):
     """ジョブの実行条件を判定するクラス"""
 
@@ -34,11 +214,7 @@ class JobMatcher(IJobMatcher):
         Returns:
             一つでもマッチすれば True
         """
-        if not patterns:
+        regex = compile_watch_patterns(tuple(patterns))
+        if regex is None:
             return False
-
-        for file in files:
-            for pattern in patterns:
-                if fnmatch.fnmatch(file, pattern):
-                    return True
-        return False
+        return any(regex.fullmatch(file) for file in files)
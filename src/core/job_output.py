@@ -0,0 +1,205 @@
+"""ジョブの出力の書き込みと保持。
+
+ジョブの出力は `LogPump` がパイプから読み込んでジョブログ (ファイル) にそのまま書き込み、
+メモリ上には末尾だけを `OutputTail` で保持する。
+例外・通知には末尾とログファイルのパスだけを渡し、出力全体を持ち回らない。
+"""
+import logging
+import threading
+import time
+from typing import TYPE_CHECKING, Any, BinaryIO, Callable, List, Optional
+
+if TYPE_CHECKING:
+    from .log_stream import LogBroadcast
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TAIL_LINES = 200
+"""保持する出力の末尾の行数 (既定値)。"""
+
+DEFAULT_TAIL_BYTES = 64 * 1024
+"""保持する出力の末尾のバイト数 (既定値)。"""
+
+DEFAULT_CHUNK_SIZE = 64 * 1024
+"""パイプから一度に読み込むバイト数。"""
+
+_MAX_MIRROR_LINE = 64 * 1024
+"""アプリケーションログへ転写する 1 行の最大バイト数 (改行のない出力を溜め続けないため)。"""
+
+
+class OutputTail:
+    """スクリプトの出力の末尾だけを保持するバッファ。
+
+    保持するのは最大 max_bytes バイト・max_lines 行まで。それより前の出力は捨てる
+    (ジョブログには全て残っている)。
+    """
+
+    def __init__(
+        self,
+        max_lines: int = DEFAULT_TAIL_LINES,
+        max_bytes: int = DEFAULT_TAIL_BYTES,
+        encoding: str = "utf-8",
+    ) -> None:
+        if max_lines < 1 or max_bytes < 1:
+            raise ValueError(f"max_lines, max_bytes は 1 以上を指定してください: {max_lines}, {max_bytes}")
+        self.max_lines = max_lines
+        self.max_bytes = max_bytes
+        self.encoding = encoding
+        self.total_bytes = 0
+        self._buffer = bytearray()
+
+    def append(self, data: bytes) -> None:
+        self.total_bytes += len(data)
+        self._buffer += data
+        # 追記ごとに先頭を詰めないよう、上限の 2 倍まで溜まってからまとめて切り詰める
+        if len(self._buffer) > 2 * self.max_bytes:
+            del self._buffer[:-self.max_bytes]
+
+    def text(self, max_lines: Optional[int] = None) -> str:
+        """保持している末尾を文字列で返す。
+
+        Args:
+            max_lines: 返す行数 (省略時は max_lines)
+        """
+        limit = self.max_lines if max_lines is None else min(max_lines, self.max_lines)
+        data = bytes(self._buffer[-self.max_bytes:])
+        lines = data.decode(self.encoding, errors="replace").splitlines(keepends=True)
+        if len(data) < self.total_bytes and len(lines) > 1:
+            # バイト数で切り詰めた位置は行の途中のため、先頭の不完全な行は返さない
+            lines = lines[1:]
+        return "".join(lines[-limit:])
+
+
+class LogPump:
+    """スクリプトの出力をジョブログに書き込む。
+
+    * パイプから chunk_size ずつ読み込み、バッファ付きのバイナリファイルにそのまま書き込む (デコードしない)
+    * flush はパイプを読み切ったとき (次の読み込みで出力を待つとき) と、出力が続く間は
+      flush_bytes バイトまたは flush_interval 秒ごとに行う。flush_on_idle が False の場合 (圧縮したジョブログ) は
+      パイプを読み切っても flush しない (1 行ずつの出力で同期フラッシュが続くと圧縮率が大きく下がるため)
+    * broadcast を指定した場合は、実行中の出力の閲覧者向けに同じ出力を追記する
+    * アプリケーションログへの転写は mirror_level でロガーが有効な場合のみ、sample_rate の割合の行だけ行う。
+      無効な場合は行への分割もデコードも行わない
+    """
+
+    def __init__(
+        self,
+        log_file: BinaryIO,
+        job_name: str,
+        tail: OutputTail,
+        mirror_level: Optional[int] = logging.DEBUG,
+        sample_rate: float = 1.0,
+        flush_interval: float = 1.0,
+        flush_bytes: int = 1024 * 1024,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+        clock: Callable[[], float] = time.monotonic,
+        broadcast: Optional["LogBroadcast"] = None,
+        flush_on_idle: bool = True,
+    ) -> None:
+        """
+        Args:
+            log_file: バイナリモードで開いたジョブログ
+            job_name: アプリケーションログに付けるジョブ名
+            tail: 出力の末尾を保持するバッファ
+            mirror_level: アプリケーションログへ転写するレベル (None の場合は転写しない)
+            sample_rate: 転写する行の割合 (0〜1)
+            broadcast: 実行中の出力を閲覧者に配信するバッファ
+            flush_on_idle: パイプを読み切ったとき (chunk_size に満たない読み込み) にも flush するか
+        """
+        self.job_name = job_name
+        self.chunk_size = chunk_size
+        self.total_bytes = 0
+        self._file = log_file
+        self._tail = tail
+        self._broadcast = broadcast
+        self._flush_interval = flush_interval
+        self._flush_bytes = flush_bytes
+        self._flush_on_idle = flush_on_idle
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._unflushed = 0
+        self._last_flush = clock()
+
+        self._mirror_level = mirror_level or logging.DEBUG
+        self._mirror = (
+            mirror_level is not None and sample_rate > 0 and logger.isEnabledFor(mirror_level)
+        )
+        self._sample_rate = sample_rate
+        self._sample_credit = 0.0
+        self._partial = b""
+
+    @property
+    def tail(self) -> OutputTail:
+        return self._tail
+
+    def pump(self, stream: Any) -> None:
+        """ストリームを終端まで読み込んで書き込む。"""
+        read = getattr(stream, "read1", None) or stream.read
+        while True:
+            chunk = read(self.chunk_size)
+            if not chunk:
+                break
+            self.feed(chunk)
+        self.finish()
+
+    def feed(self, chunk: bytes) -> None:
+        """読み込んだ出力を書き込む。chunk_size に満たない場合はパイプを読み切ったとみなす。"""
+        with self._lock:
+            self._file.write(chunk)
+            self.total_bytes += len(chunk)
+            self._unflushed += len(chunk)
+            self._tail.append(chunk)
+            if self._broadcast is not None:
+                self._broadcast.append(chunk)
+            now = self._clock()
+            if (
+                (self._flush_on_idle and len(chunk) < self.chunk_size)
+                or self._unflushed >= self._flush_bytes
+                or now - self._last_flush >= self._flush_interval
+            ):
+                self._flush(now)
+        if self._mirror:
+            self._mirror_lines(chunk)
+
+    def write_note(self, message: str) -> None:
+        """タイムアウト・取り消し等の通知をジョブログに追記する (他のスレッドから呼び出してよい)。"""
+        data = message.encode("utf-8")
+        with self._lock:
+            self._file.write(data)
+            if self._broadcast is not None:
+                self._broadcast.append(data)
+            self._flush(self._clock())
+
+    def finish(self) -> None:
+        """残りを書き込み、転写していない最後の行を転写する。"""
+        with self._lock:
+            self._flush(self._clock())
+        if self._mirror and self._partial:
+            self._emit_sampled([self._partial])
+            self._partial = b""
+
+    # --- プライベートメソッド ---
+
+    def _flush(self, now: float) -> None:
+        self._file.flush()
+        self._unflushed = 0
+        self._last_flush = now
+
+    def _mirror_lines(self, chunk: bytes) -> None:
+        lines = (self._partial + chunk).split(b"\n")
+        self._partial = lines.pop()
+        if len(self._partial) > _MAX_MIRROR_LINE:
+            lines.append(self._partial)
+            self._partial = b""
+        self._emit_sampled(lines)
+
+    def _emit_sampled(self, lines: List[bytes]) -> None:
+        for line in lines:
+            self._sample_credit += self._sample_rate
+            if self._sample_credit >= 1.0:
+                self._sample_credit -= 1.0
+                self._emit(line)
+
+    def _emit(self, line: bytes) -> None:
+        text = line.decode(self._tail.encoding, errors="replace").rstrip()
+        logger.log(self._mirror_level, f"[{self.job_name}] {text}")
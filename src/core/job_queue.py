@@ -0,0 +1,615 @@
+"""ジョブキューの実装。
+
+`JobService` はワーカーへのジョブの受け渡しを `JobQueue` 経由で行う。
+
+* ``InMemoryJobQueue``: プロセス内のみで保持する
+* ``SqliteJobQueue``: SQLite (WAL モード) に永続化し、再起動後もキューを復元する
+
+取り出し順は `FairShareScheduler` (優先度・エイジング・リポジトリ間のフェアシェア) が決め、
+`ResourcePool` を指定した場合はリソースの要求が空き容量に収まるジョブだけを取り出す。
+
+永続キューはディスパッチ用にメモリ上にも同じ内容を保持し、書き込みは専用スレッドが
+まとめて 1 トランザクションでコミットする (グループコミット)。
+"""
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from abc import ABC, abstractmethod
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+from .job_scheduler import FairShareScheduler
+from .resource_pool import ResourcePool, ResourceRequest
+from .vcs_utils import normalize_repo_url
+
+logger = logging.getLogger(__name__)
+
+JOB_STATE_QUEUED = "queued"
+JOB_STATE_RUNNING = "running"
+JOB_STATE_INTERRUPTED = "interrupted"
+
+RECOVERY_REQUEUE = "requeue"
+RECOVERY_FAIL = "fail"
+
+_MAX_RETRY_DELAY = 5.0
+"""永続化に失敗した書き込みを再試行するまでの最大待ち時間 (秒)。"""
+
+_MERGED_FILE_FIELDS = ("added", "modified", "removed")
+"""集約時に新旧の内容を結合するコミット情報のフィールド。"""
+
+
+class QueuedJob:
+    """キューに投入されたジョブ。"""
+
+    def __init__(
+        self,
+        job_config: Dict[str, Any],
+        commit_info: Dict[str, Any],
+        job_id: Optional[str] = None,
+        enqueued_at: Optional[float] = None,
+        attempts: int = 0,
+        coalesce_key: Optional[str] = None,
+        coalesced: int = 0,
+        priority: int = 0,
+        share_key: Optional[str] = None,
+        exclusive_key: Optional[str] = None,
+    ) -> None:
+        self.job_id = job_id or uuid.uuid4().hex
+        self.job_config = job_config
+        self.commit_info = commit_info
+        self.enqueued_at = enqueued_at if enqueued_at is not None else time.time()
+        # 投入時の単調時計 (永続キューから復元したジョブは None)
+        self._enqueued_monotonic = time.monotonic() if enqueued_at is None else None
+        # 実行が開始された回数 (クラッシュからの復旧時の再試行判定に使う)
+        self.attempts = attempts
+        # 同じキーの待機中ジョブは 1 件に集約される (None は集約しない)
+        self.coalesce_key = coalesce_key
+        # 集約により省略された実行の数
+        self.coalesced = coalesced
+        # 優先度 (大きいものから取り出す)
+        self.priority = priority
+        # フェアシェアの単位 (正規化したリポジトリURL)
+        self.share_key = share_key
+        # 同じキーのジョブは同時に 1 件だけ取り出される (ワークスペースを共有するジョブ等)。
+        # 取り出せないジョブは待機列に残り、後続の実行できるジョブが先に取り出される。
+        self.exclusive_key = exclusive_key
+        # キュー内での投入順 (永続キューが復元時の並び順に使う)
+        self.seq = 0
+
+    @property
+    def job_name(self) -> str:
+        return self.job_config.get("name", "unknown")
+
+    def waited(self) -> float:
+        """投入からの経過秒数。このプロセスで投入したジョブは単調時計で測る。"""
+        if self._enqueued_monotonic is not None:
+            return time.monotonic() - self._enqueued_monotonic
+        return max(0.0, time.time() - self.enqueued_at)
+
+    def absorb(self, newer: "QueuedJob") -> None:
+        """後から投入された同じキーのジョブを取り込む。
+
+        コミット情報は新しいものに置き換え、変更ファイルの一覧は新旧を結合する。
+        キュー内の位置 (投入順・優先度) は元のまま維持する。
+        """
+        merged = dict(newer.commit_info)
+        for field in _MERGED_FILE_FIELDS:
+            old_files = self.commit_info.get(field) or []
+            new_files = newer.commit_info.get(field) or []
+            if old_files or new_files:
+                merged[field] = list(dict.fromkeys([*old_files, *new_files]))
+        self.job_config = newer.job_config
+        self.commit_info = merged
+        self.coalesced += 1 + newer.coalesced
+
+    def __repr__(self) -> str:
+        return f"QueuedJob(job_id={self.job_id!r}, job_name={self.job_name!r})"
+
+
+class JobQueue(ABC):
+    """ワーカーにジョブを受け渡すキュー。"""
+
+    durable = False
+    """プロセス終了後もキューの内容が保持されるか。"""
+
+    @abstractmethod
+    def put(self, job: QueuedJob) -> bool:
+        """ジョブを末尾に追加する。
+
+        coalesce_key が同じジョブが待機中の場合は、そのジョブに取り込む。
+
+        Returns:
+            新しいエントリとして追加された場合は True、待機中のジョブに集約された場合は False
+        """
+
+    @abstractmethod
+    def get(self, timeout: Optional[float] = None) -> Optional[QueuedJob]:
+        """次に実行できるジョブを取り出す。
+
+        exclusive_key が同じジョブが取り出されて task_done されていない間は、そのジョブを飛ばす。
+        キューが閉じられて取り出すものがない場合、またはタイムアウトした場合は None を返す。
+        """
+
+    @abstractmethod
+    def task_done(self, job: QueuedJob) -> None:
+        """取り出したジョブの処理が完了したことを通知する。"""
+
+    @abstractmethod
+    def qsize(self) -> int:
+        """待機中のジョブ数を返す。"""
+
+    @abstractmethod
+    def join(self) -> None:
+        """投入された全ジョブの処理が完了するまで待機する。"""
+
+    @abstractmethod
+    def close(self, drain: bool = True) -> None:
+        """キューを閉じ、待機中の get を解除する。
+
+        Args:
+            drain: True の場合は残っているジョブを取り出し終えてから get が None を返す。
+                False の場合は直ちに None を返す (永続キューでは残りのジョブは次回起動時に復元される)。
+        """
+
+    def release(self) -> None:
+        """キューが使用するリソースを解放する。全ワーカーの停止後に呼び出す。"""
+
+    def snapshot(self) -> List[QueuedJob]:
+        """待機中のジョブを取り出される順に返す。"""
+        return []
+
+    def effective_priority(self, job: QueuedJob) -> int:
+        """エイジングを加えた現在の優先度。"""
+        return job.priority
+
+    @property
+    def resource_pool(self) -> Optional[ResourcePool]:
+        """取り出し時にリソースを割り当てるプール (None はリソースを考慮しない)。"""
+        return None
+
+    @property
+    def closed(self) -> bool:
+        """close が呼び出されたか。"""
+        return False
+
+    @property
+    def interrupted(self) -> List[QueuedJob]:
+        """前回のプロセス終了時に実行中で、再実行されなかったジョブ。"""
+        return []
+
+    def acknowledge_interrupted(self) -> None:
+        """中断されたジョブを通知し終えたことを記録し、以降は interrupted に含めない。"""
+
+
+class InMemoryJobQueue(JobQueue):
+    """プロセス内のみで保持するジョブキュー。"""
+
+    def __init__(
+        self,
+        scheduler: Optional[FairShareScheduler] = None,
+        resource_pool: Optional[ResourcePool] = None,
+    ) -> None:
+        self._items = scheduler or FairShareScheduler()
+        self._resource_pool = resource_pool
+        self._pending_by_key: Dict[str, QueuedJob] = {}
+        self._cond = threading.Condition()
+        self._unfinished = 0
+        self._closed = False
+        self._drain = True
+        self._seq = 0
+        # 取り出されて task_done されていないジョブの exclusive_key
+        self._claimed: Set[str] = set()
+
+    def put(self, job: QueuedJob) -> bool:
+        with self._cond:
+            existing = self._pending_by_key.get(job.coalesce_key) if job.coalesce_key else None
+            if existing is not None:
+                existing.absorb(job)
+                self._on_coalesced(existing)
+                return False
+            self._seq += 1
+            job.seq = self._seq
+            self._append(job)
+            self._on_added(job)
+            return True
+
+    def get(self, timeout: Optional[float] = None) -> Optional[QueuedJob]:
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while True:
+                if self._items and not (self._closed and not self._drain):
+                    job = self._items.pop(runnable=self._dispatch_filter())
+                    if job is not None:
+                        if job.coalesce_key and self._pending_by_key.get(job.coalesce_key) is job:
+                            del self._pending_by_key[job.coalesce_key]
+                        self._on_dispatch(job)
+                        return job
+                if self._closed and not (self._drain and self._items):
+                    return None
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return None
+                self._cond.wait(remaining)
+
+    def task_done(self, job: QueuedJob) -> None:
+        with self._cond:
+            self._on_release(job)
+            self._unfinished -= 1
+            self._cond.notify_all()
+
+    def qsize(self) -> int:
+        with self._cond:
+            return len(self._items)
+
+    def join(self) -> None:
+        with self._cond:
+            while self._unfinished > 0:
+                self._cond.wait()
+
+    def close(self, drain: bool = True) -> None:
+        with self._cond:
+            self._closed = True
+            self._drain = drain
+            self._cond.notify_all()
+
+    def snapshot(self) -> List[QueuedJob]:
+        with self._cond:
+            return self._items.ordered()
+
+    def effective_priority(self, job: QueuedJob) -> int:
+        return self._items.effective_priority(job)
+
+    @property
+    def resource_pool(self) -> Optional[ResourcePool]:
+        return self._resource_pool
+
+    @property
+    def closed(self) -> bool:
+        with self._cond:
+            return self._closed
+
+    def _append(self, job: QueuedJob) -> None:
+        """待機列の末尾に追加する (呼び出し元で _cond を保持すること)。"""
+        self._items.push(job)
+        if job.coalesce_key:
+            self._pending_by_key[job.coalesce_key] = job
+        self._unfinished += 1
+        self._cond.notify_all()
+
+    def _dispatch_filter(self) -> Callable[[QueuedJob], bool]:
+        """1 回の取り出しで、順番の早い順にジョブを今取り出せるか判定する関数を返す。
+
+        リソースが足りずに待つ最初のジョブの要求量は確保済みとして扱い、後続のジョブはその残りに
+        収まる場合だけ追い越せる。軽いジョブが空きを取り続けて重いジョブが実行されなくなることを防ぐ。
+        呼び出し元で _cond を保持すること。
+        """
+        pool = self._resource_pool
+        reserved: List[ResourceRequest] = []
+
+        def runnable(job: QueuedJob) -> bool:
+            if job.exclusive_key and job.exclusive_key in self._claimed:
+                return False
+            if pool is None:
+                return True
+            request = pool.request_for(job.job_config)
+            if pool.fits(request, reserved[0] if reserved else None):
+                return True
+            if not reserved and pool.tags_available(request):
+                reserved.append(request)
+            return False
+
+        return runnable
+
+    def _on_dispatch(self, job: QueuedJob) -> None:
+        """ジョブを取り出したときの処理 (呼び出し元で _cond を保持すること)。"""
+        if job.exclusive_key:
+            self._claimed.add(job.exclusive_key)
+        if self._resource_pool is not None:
+            self._resource_pool.allocate(job.job_id, job.job_name, self._resource_pool.request_for(job.job_config))
+
+    def _on_release(self, job: QueuedJob) -> None:
+        """取り出したジョブが完了したときの処理 (呼び出し元で _cond を保持すること)。"""
+        if job.exclusive_key:
+            self._claimed.discard(job.exclusive_key)
+        if self._resource_pool is not None:
+            self._resource_pool.release(job.job_id)
+
+    def _on_added(self, job: QueuedJob) -> None:
+        """新しいエントリが追加されたときのフック。"""
+
+    def _on_coalesced(self, job: QueuedJob) -> None:
+        """待機中のエントリに集約されたときのフック。"""
+
+
+class SqliteJobQueue(InMemoryJobQueue):
+    """SQLite に永続化するジョブキュー。
+
+    ディスパッチはメモリ上のキューで行い、状態の変更 (投入・実行開始・完了) は
+    書き込みスレッドがまとめてコミットする。起動時には未完了のジョブを復元し、
+    前回実行中だったジョブは recovery に従って再投入または中断扱いにする。
+    中断扱いのジョブは acknowledge_interrupted で通知済みになるまで残し、次回の起動時にも報告する。
+    """
+
+    durable = True
+
+    _SCHEMA = """
+        CREATE TABLE IF NOT EXISTS jobs (
+            job_id TEXT PRIMARY KEY,
+            seq INTEGER NOT NULL,
+            state TEXT NOT NULL,
+            job_config TEXT NOT NULL,
+            commit_info TEXT NOT NULL,
+            enqueued_at REAL NOT NULL,
+            attempts INTEGER NOT NULL DEFAULT 0,
+            coalesce_key TEXT,
+            coalesced INTEGER NOT NULL DEFAULT 0,
+            priority INTEGER NOT NULL DEFAULT 0,
+            share_key TEXT,
+            exclusive_key TEXT
+        );
+        CREATE INDEX IF NOT EXISTS idx_jobs_state_seq ON jobs (state, seq);
+    """
+
+    _ADDED_COLUMNS = (
+        ("coalesce_key", "TEXT"),
+        ("coalesced", "INTEGER NOT NULL DEFAULT 0"),
+        ("priority", "INTEGER NOT NULL DEFAULT 0"),
+        ("share_key", "TEXT"),
+        ("exclusive_key", "TEXT"),
+    )
+    """初版のスキーマ以降に追加された列。"""
+
+    def __init__(
+        self,
+        path: str,
+        commit_interval: float = 0.05,
+        recovery: str = RECOVERY_REQUEUE,
+        max_attempts: int = 3,
+        scheduler: Optional[FairShareScheduler] = None,
+        resource_pool: Optional[ResourcePool] = None,
+    ) -> None:
+        """
+        Args:
+            path: データベースファイルのパス
+            commit_interval: 書き込みをまとめる最大待ち時間 (秒)。
+                0 の場合、put はコミットの完了まで待機する。
+            recovery: 前回実行中だったジョブの扱い ("requeue": 再投入 / "fail": 中断として記録)
+            max_attempts: requeue 時に再投入する最大実行回数 (超えたものは中断扱い)
+            scheduler: 取り出し順を決めるスケジューラ
+            resource_pool: 取り出し時にリソースを割り当てるプール
+        """
+        super().__init__(scheduler, resource_pool)
+        if recovery not in (RECOVERY_REQUEUE, RECOVERY_FAIL):
+            raise ValueError(f"未知の復旧方法です: {recovery}")
+        self.path = os.path.abspath(path)
+        self._commit_interval = commit_interval
+        self._recovery = recovery
+        self._max_attempts = max_attempts
+        self._interrupted: List[QueuedJob] = []
+
+        self._pending: List[Tuple[str, QueuedJob]] = []
+        self._pending_cond = threading.Condition()
+        self._committed_batch = 0
+        self._submitted_batch = 0
+        self._writer_stopped = False
+
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(self._SCHEMA)
+        self._migrate()
+        self._restore()
+
+        self._writer = threading.Thread(target=self._writer_loop, name="JobQueueWriter", daemon=True)
+        self._writer.start()
+
+    @property
+    def interrupted(self) -> List[QueuedJob]:
+        return list(self._interrupted)
+
+    def acknowledge_interrupted(self) -> None:
+        with self._cond:
+            jobs, self._interrupted = self._interrupted, []
+        for job in jobs:
+            self._submit(("done", job))
+
+    def put(self, job: QueuedJob) -> bool:
+        with self._cond:
+            added = super().put(job)
+            batch = self._submitted_batch
+        if self._commit_interval <= 0:
+            self._wait_committed(batch)
+        return added
+
+    def get(self, timeout: Optional[float] = None) -> Optional[QueuedJob]:
+        job = super().get(timeout)
+        if job is not None:
+            job.attempts += 1
+            self._submit(("running", job))
+        return job
+
+    def task_done(self, job: QueuedJob) -> None:
+        self._submit(("done", job))
+        super().task_done(job)
+
+    def _on_added(self, job: QueuedJob) -> None:
+        self._submit(("put", job))
+
+    def _on_coalesced(self, job: QueuedJob) -> None:
+        self._submit(("put", job))
+
+    def flush(self) -> None:
+        """未コミットの書き込みをコミットし終えるまで待機する。"""
+        with self._pending_cond:
+            batch = self._submitted_batch
+        self._wait_committed(batch)
+
+    def release(self) -> None:
+        """未コミットの書き込みをコミットし、データベースを閉じる。
+
+        書き込みに失敗し続けている場合は再試行を打ち切り、コミットできなかった件数をログに出力する。
+        """
+        with self._pending_cond:
+            if self._writer_stopped:
+                return
+            self._writer_stopped = True
+            self._pending_cond.notify_all()
+        self._writer.join()
+        self._conn.close()
+
+    # --- プライベートメソッド ---
+
+    def _migrate(self) -> None:
+        """古いスキーマのデータベースに不足している列を追加する。"""
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(jobs)")}
+        for name, definition in self._ADDED_COLUMNS:
+            if name not in columns:
+                self._conn.execute(f"ALTER TABLE jobs ADD COLUMN {name} {definition}")
+
+    def _restore(self) -> None:
+        """未完了のジョブをメモリ上のキューに復元する。"""
+        rows = self._conn.execute(
+            "SELECT job_id, seq, state, job_config, commit_info, enqueued_at, attempts,"
+            " coalesce_key, coalesced, priority, share_key, exclusive_key"
+            " FROM jobs WHERE state IN (?, ?, ?) ORDER BY seq",
+            (JOB_STATE_QUEUED, JOB_STATE_RUNNING, JOB_STATE_INTERRUPTED),
+        ).fetchall()
+        max_seq = self._conn.execute("SELECT COALESCE(MAX(seq), 0) FROM jobs").fetchone()[0]
+        self._seq = max_seq
+
+        requeued = 0
+        self._conn.execute("BEGIN")
+        for (job_id, seq, state, job_config, commit_info, enqueued_at, attempts,
+             coalesce_key, coalesced, priority, share_key, exclusive_key) in rows:
+            job = QueuedJob(
+                json.loads(job_config), json.loads(commit_info), job_id, enqueued_at, attempts,
+                coalesce_key=coalesce_key, coalesced=coalesced, priority=priority, share_key=share_key,
+                exclusive_key=exclusive_key,
+            )
+            job.seq = seq
+            if state == JOB_STATE_INTERRUPTED:
+                # 前回の起動時に中断扱いにしたが、通知し終える前に終了したジョブ
+                self._interrupted.append(job)
+                continue
+            if state == JOB_STATE_RUNNING:
+                if self._recovery == RECOVERY_FAIL or attempts >= self._max_attempts:
+                    logger.warning(f"[{job.job_name}] 前回の終了時に実行中だったジョブを中断扱いにします (job_id={job_id})")
+                    self._conn.execute("UPDATE jobs SET state = ? WHERE job_id = ?", (JOB_STATE_INTERRUPTED, job_id))
+                    self._interrupted.append(job)
+                    continue
+                logger.warning(f"[{job.job_name}] 前回の終了時に実行中だったジョブを再投入します (job_id={job_id})")
+                self._conn.execute("UPDATE jobs SET state = ? WHERE job_id = ?", (JOB_STATE_QUEUED, job_id))
+                requeued += 1
+            with self._cond:
+                self._append(job)
+        self._conn.execute("COMMIT")
+        if self._items:
+            logger.info(f"永続キューから {len(self._items)} 件のジョブを復元しました (うち再投入: {requeued} 件)。")
+
+    def _submit(self, op: Tuple[str, QueuedJob]) -> int:
+        with self._pending_cond:
+            self._pending.append(op)
+            self._submitted_batch += 1
+            self._pending_cond.notify_all()
+            return self._submitted_batch
+
+    def _wait_committed(self, batch: int) -> None:
+        with self._pending_cond:
+            while self._committed_batch < batch and not self._writer_stopped:
+                self._pending_cond.wait()
+
+    def _writer_loop(self) -> None:
+        retry_delay = 0.0
+        while True:
+            with self._pending_cond:
+                while not self._pending and not self._writer_stopped:
+                    self._pending_cond.wait()
+                if not self._pending and self._writer_stopped:
+                    return
+                if retry_delay > 0 and not self._writer_stopped:
+                    self._pending_cond.wait(retry_delay)
+            if self._commit_interval > 0 and not retry_delay and not self._writer_stopped:
+                # 後続の書き込みをまとめるため少し待つ
+                time.sleep(self._commit_interval)
+            with self._pending_cond:
+                ops, self._pending = self._pending, []
+                batch = self._submitted_batch
+            try:
+                self._apply(ops)
+            except sqlite3.Error as e:
+                with self._pending_cond:
+                    if self._writer_stopped and retry_delay:
+                        logger.error(f"ジョブキューの永続化に失敗したため、{len(ops)} 件の書き込みを破棄して終了します: {e}")
+                        return
+                    # 後続の書き込みより先に適用されるよう、失敗した分を先頭に戻して再試行する
+                    self._pending[:0] = ops
+                retry_delay = min(max(retry_delay * 2, self._commit_interval, 0.05), _MAX_RETRY_DELAY)
+                logger.exception(f"ジョブキューの永続化に失敗しました。{retry_delay:.2f} 秒後に再試行します: {e}")
+                continue
+            retry_delay = 0.0
+            with self._pending_cond:
+                self._committed_batch = batch
+                self._pending_cond.notify_all()
+
+    def _apply(self, ops: List[Tuple[str, QueuedJob]]) -> None:
+        self._conn.execute("BEGIN")
+        try:
+            for kind, job in ops:
+                if kind == "put":
+                    self._conn.execute(
+                        "INSERT OR REPLACE INTO jobs"
+                        " (job_id, seq, state, job_config, commit_info, enqueued_at, attempts,"
+                        " coalesce_key, coalesced, priority, share_key, exclusive_key)"
+                        " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                        (
+                            job.job_id,
+                            job.seq,
+                            JOB_STATE_QUEUED,
+                            json.dumps(job.job_config, default=str),
+                            json.dumps(job.commit_info, default=str),
+                            job.enqueued_at,
+                            job.attempts,
+                            job.coalesce_key,
+                            job.coalesced,
+                            job.priority,
+                            job.share_key,
+                            job.exclusive_key,
+                        ),
+                    )
+                elif kind == "running":
+                    self._conn.execute(
+                        "UPDATE jobs SET state = ?, attempts = ? WHERE job_id = ?",
+                        (JOB_STATE_RUNNING, job.attempts, job.job_id),
+                    )
+                elif kind == "done":
+                    self._conn.execute("DELETE FROM jobs WHERE job_id = ?", (job.job_id,))
+            self._conn.execute("COMMIT")
+        except BaseException:
+            self._conn.execute("ROLLBACK")
+            raise
+
+
+def build_job_queue(queue_config: Any, resource_pool: Optional[ResourcePool] = None) -> JobQueue:
+    """設定値からジョブキューを生成する。"""
+    if queue_config is None:
+        return InMemoryJobQueue(resource_pool=resource_pool)
+    scheduler = FairShareScheduler(
+        aging_interval=queue_config.aging_interval,
+        weights={normalize_repo_url(url): weight for url, weight in queue_config.repo_weights.items()},
+    )
+    if queue_config.backend == "memory":
+        return InMemoryJobQueue(scheduler, resource_pool)
+    if queue_config.backend == "sqlite":
+        return SqliteJobQueue(
+            queue_config.path,
+            commit_interval=queue_config.commit_interval,
+            recovery=queue_config.recovery,
+            max_attempts=queue_config.max_attempts,
+            scheduler=scheduler,
+            resource_pool=resource_pool,
+        )
+    raise ValueError(f"未知のジョブキューです: {queue_config.backend}")
@@ -0,0 +1,97 @@
+"""ローカルジョブをリポジトリ・ブランチで振り分ける索引。
+
+config.yaml のジョブは `repo_url` と任意の `trigger_branches` を持つ。
+Webhook のリポジトリ・ブランチに対応するジョブだけをファイルマッチングの対象にすることで、
+無関係なリポジトリやブランチへのプッシュでジョブがクローン・実行されることを防ぐ。
+`target_branch` は生成物のプッシュ先 (専用ブランチであることが多い) のため、振り分けには使わない。
+"""
+import fnmatch
+import logging
+import threading
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from .config import JobConfig
+from .job_matcher import CompiledJobSet
+from .vcs_utils import normalize_repo_url
+
+logger = logging.getLogger(__name__)
+
+_GLOB_CHARS = "*?["
+
+_MAX_CACHED_JOB_SETS = 1024
+"""振り分け結果ごとにキャッシュする CompiledJobSet の上限。"""
+
+_RouteKey = Tuple[Optional[str], Optional[str]]
+
+
+class JobRouter:
+    """正規化したリポジトリURLとブランチからジョブを引く索引。
+
+    リポジトリURLが未指定のジョブは全リポジトリ、ブランチ条件のないジョブは全ブランチが対象となる。
+    ブランチ条件はリテラルなら辞書、glob なら同じリポジトリのジョブに対してのみ照合する。
+    """
+
+    def __init__(self, jobs: Sequence[JobConfig], default_repo_url: Optional[str] = None) -> None:
+        """
+        Args:
+            jobs: ローカルジョブの定義 (並び順を保持する)
+            default_repo_url: repo_url を省略したジョブが使うリポジトリURL (git.repo_url)
+        """
+        self._size = len(jobs)
+        self._exact: Dict[_RouteKey, List[int]] = {}
+        self._globs: Dict[Optional[str], List[Tuple[int, List[str]]]] = {}
+        self._watch_files = [job.watch_files for job in jobs]
+        self._job_sets: Dict[Tuple[int, ...], CompiledJobSet] = {}
+        self._lock = threading.Lock()
+
+        for index, job in enumerate(jobs):
+            repo_url = job.repo_url or default_repo_url
+            repo_key = normalize_repo_url(repo_url) if repo_url else None
+            branches = self._branch_patterns(job)
+            if branches is None:
+                self._exact.setdefault((repo_key, None), []).append(index)
+                continue
+            globs = [b for b in branches if any(ch in b for ch in _GLOB_CHARS)]
+            for branch in branches:
+                if branch not in globs:
+                    self._exact.setdefault((repo_key, branch), []).append(index)
+            if globs:
+                self._globs.setdefault(repo_key, []).append((index, globs))
+
+    def __len__(self) -> int:
+        return self._size
+
+    def route(self, repo_url: Optional[str], branch: Optional[str]) -> List[int]:
+        """リポジトリ・ブランチが一致するジョブのインデックスを昇順で返す。
+
+        リポジトリURLまたはブランチが不明な場合 (ペイロードに含まれない場合) は振り分けを行わない。
+        """
+        if not repo_url or not branch:
+            return list(range(self._size))
+
+        repo_key = normalize_repo_url(repo_url)
+        routed = set()
+        for key in ((repo_key, branch), (repo_key, None), (None, branch), (None, None)):
+            routed.update(self._exact.get(key, ()))
+        for key in (repo_key, None):
+            for index, globs in self._globs.get(key, ()):
+                if any(fnmatch.fnmatchcase(branch, pattern) for pattern in globs):
+                    routed.add(index)
+        return sorted(routed)
+
+    def job_set(self, indices: Sequence[int]) -> CompiledJobSet:
+        """振り分け後のジョブだけを対象とした CompiledJobSet を返す (振り分け結果ごとにキャッシュする)。"""
+        key = tuple(indices)
+        with self._lock:
+            job_set = self._job_sets.get(key)
+            if job_set is None:
+                if len(self._job_sets) >= _MAX_CACHED_JOB_SETS:
+                    self._job_sets.clear()
+                job_set = CompiledJobSet([self._watch_files[i] for i in key])
+                self._job_sets[key] = job_set
+            return job_set
+
+    @staticmethod
+    def _branch_patterns(job: JobConfig) -> Optional[List[str]]:
+        """ジョブをトリガーするブランチ条件。None は全ブランチ。"""
+        return list(job.trigger_branches) if job.trigger_branches else None
@@ -0,0 +1,153 @@
+"""待機中ジョブのディスパッチ順を決めるスケジューラ。
+
+`InMemoryJobQueue` (および `SqliteJobQueue`) は待機列としてこのスケジューラを使う。
+
+* 優先度: ジョブ設定の ``priority`` が大きいものから取り出す
+* エイジング: 待ち時間 ``aging_interval`` 秒ごとに実効優先度を 1 上げ、低優先度のジョブの飢餓を防ぐ
+* フェアシェア: 実効優先度が同じジョブはリポジトリ (share_key) ごとに重み付きで交互に取り出す
+  (リポジトリごとの仮想時刻が最も小さいものを選ぶ Start-time Fair Queueing)
+
+優先度・リポジトリが 1 種類だけの場合は従来の FIFO と同じ順序になる。
+"""
+from __future__ import annotations
+
+import heapq
+import time
+from collections import deque
+from typing import TYPE_CHECKING, Callable, Deque, Dict, Iterator, List, Optional, Tuple
+
+if TYPE_CHECKING:
+    from .job_queue import QueuedJob
+
+
+class FairShareScheduler:
+    """優先度・エイジング・リポジトリ間のフェアシェアで待機中ジョブを並べる。
+
+    スレッドセーフではない。呼び出し元 (ジョブキュー) のロック内で使用する。
+    """
+
+    def __init__(
+        self,
+        aging_interval: float = 300.0,
+        weights: Optional[Dict[str, float]] = None,
+    ) -> None:
+        """
+        Args:
+            aging_interval: 実効優先度を 1 上げる待ち時間 (秒)。0 の場合はエイジングしない。
+            weights: share_key ごとの重み (省略時は 1)。重み 2 のリポジトリは重み 1 の 2 倍取り出される。
+        """
+        if aging_interval < 0:
+            raise ValueError(f"aging_interval は 0 以上を指定してください: {aging_interval}")
+        for key, weight in (weights or {}).items():
+            if weight <= 0:
+                raise ValueError(f"重みは正の値を指定してください: {key}={weight}")
+        self.aging_interval = aging_interval
+        self._weights = dict(weights or {})
+        # share_key -> 優先度 -> 投入順の待機列
+        self._shares: Dict[str, Dict[int, Deque[QueuedJob]]] = {}
+        # share_key ごとの仮想時刻 (取り出すごとに 1/重み 進む)
+        self._vtime: Dict[str, float] = {}
+        self._global_vtime = 0.0
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def push(self, job: QueuedJob) -> None:
+        key = job.share_key or ""
+        levels = self._shares.get(key)
+        if levels is None:
+            levels = self._shares[key] = {}
+            # 待機列が空だった間の取り分は持ち越さない
+            self._vtime[key] = max(self._vtime.get(key, 0.0), self._global_vtime)
+        levels.setdefault(job.priority, deque()).append(job)
+        self._size += 1
+
+    def pop(
+        self,
+        now: Optional[float] = None,
+        runnable: Optional[Callable[[QueuedJob], bool]] = None,
+    ) -> Optional[QueuedJob]:
+        """次に実行するジョブを取り出す。
+
+        runnable を指定した場合、ジョブを順番の早い順に runnable に渡し、最初に True を返したものを取り出す。
+        False を返したジョブは待機列の同じ位置に残る。
+
+        Returns:
+            取り出したジョブ。空の場合、または実行できるジョブがない場合は None。
+        """
+        selected = self._select(time.time() if now is None else now, runnable)
+        if selected is None:
+            return None
+        key, level, index = selected
+        levels = self._shares[key]
+        job = levels[level][index]
+        del levels[level][index]
+        if not levels[level]:
+            del levels[level]
+            if not levels:
+                del self._shares[key]
+        start = self._vtime[key]
+        self._vtime[key] = start + 1.0 / self._weights.get(key, 1.0)
+        self._global_vtime = max(self._global_vtime, start)
+        self._size -= 1
+        return job
+
+    def ordered(self, now: Optional[float] = None) -> List[QueuedJob]:
+        """現時点のディスパッチ順に並べた待機中のジョブ (状態は変更しない)。"""
+        now = time.time() if now is None else now
+        simulated = self._copy()
+        result = []
+        while True:
+            job = simulated.pop(now)
+            if job is None:
+                return result
+            result.append(job)
+
+    def effective_priority(self, job: QueuedJob, now: Optional[float] = None) -> int:
+        """待ち時間によるエイジングを加えた優先度。"""
+        if self.aging_interval <= 0:
+            return job.priority
+        now = time.time() if now is None else now
+        waited = max(0.0, now - job.enqueued_at)
+        return job.priority + int(waited // self.aging_interval)
+
+    # --- プライベートメソッド ---
+
+    def _select(
+        self, now: float, runnable: Optional[Callable[[QueuedJob], bool]] = None
+    ) -> Optional[Tuple[str, int, int]]:
+        """取り出すジョブの位置 (share_key, 優先度, 待機列内の位置) を返す。"""
+        for _, key, level, index, job in self._candidates(now):
+            if runnable is None or runnable(job):
+                return key, level, index
+        return None
+
+    def _candidates(self, now: float) -> Iterator[Tuple[Tuple[int, float, int], str, int, int, QueuedJob]]:
+        """待機中のジョブを (実効優先度の降順, 仮想時刻, 投入順) で順に返す。
+
+        各待機列は投入順 (= 待ち時間の長い順) に並んでいるため、待機列ごとの並びを併合する。
+        """
+        streams = [
+            self._stream(key, level, self._vtime[key], items, now)
+            for key, levels in self._shares.items()
+            for level, items in levels.items()
+        ]
+        return heapq.merge(*streams, key=lambda candidate: candidate[0])
+
+    def _stream(
+        self, key: str, level: int, vtime: float, items: Deque[QueuedJob], now: float
+    ) -> Iterator[Tuple[Tuple[int, float, int], str, int, int, QueuedJob]]:
+        for index, job in enumerate(items):
+            yield (-self.effective_priority(job, now), vtime, job.seq), key, level, index, job
+
+    def _copy(self) -> "FairShareScheduler":
+        clone = FairShareScheduler(self.aging_interval, self._weights)
+        clone._shares = {
+            key: {level: deque(items) for level, items in levels.items()}
+            for key, levels in self._shares.items()
+        }
+        clone._vtime = dict(self._vtime)
+        clone._global_vtime = self._global_vtime
+        clone._size = self._size
+        return clone
@@ -1,21 +1,46 @@
-from typing import Dict, Any, Optional, Type, List, Tuple
+from typing import Dict, Any, Iterator, Optional, Type, List, Tuple
+import heapq
 import logging
+import time
 import uuid
-import queue
 import threading
+from contextlib import contextmanager, nullcontext
 
 from .config import Settings
 from .workspace_manager import WorkspaceManager
 from .vcs_handler import GitHandler
 from .job_executor import ShellJobExecutor
-from .interfaces import IJobService, IVcsHandler, IJobExecutor
-from .exceptions import ToyCIError, JobValidationError
+from .cancellation import CancellationToken
+from .interfaces import IJobService, IVcsHandler, IJobExecutor, CheckoutOptions
+from .job_matcher import sparse_directories
+from .mirror_store import MirrorStore
+from .job_queue import JobQueue, InMemoryJobQueue, QueuedJob
+from .resource_pool import ResourceRequest
+from .metrics import MetricsRegistry
+from .log_stream import LogStreamRegistry
+from .job_history import JobHistoryStore, RunRecord, RUN_STATUS_CANCELLED, RUN_STATUS_FAILED, RUN_STATUS_SUCCESS
+from .job_timing import (
+    JobTimings,
+    PHASE_CHECKOUT,
+    PHASE_CLEANUP_WORKSPACE,
+    PHASE_EXECUTE_SCRIPT,
+    PHASE_HANDLE_RESULT,
+    PHASE_LOCK_WAIT,
+    PHASE_PREPARE_WORKSPACE,
+    PHASE_SEND_NOTIFICATION,
+)
+from .autoscaler import ScalingSample, WorkerAutoscaler, read_available_memory_mb, read_load_per_cpu
+from .vcs_utils import normalize_repo_url
+from .exceptions import ToyCIError, JobValidationError, JobCancelledError, RepositoryError, ScriptExecutionError
 from .notifier import Notifier, NotificationEvent, build_notifier
 
 logger = logging.getLogger(__name__)
 
-_JOB_QUEUE_SENTINEL = None
-"""ワーカー停止を通知するセンチネル値。"""
+_DURATION_SMOOTHING = 0.3
+"""実行時間の指数移動平均で新しい実績に与える重み。"""
+
+_WORKER_POLL_SECONDS = 1.0
+"""自動調整時、空きワーカーが縮小の要求を確認する間隔 (秒)。"""
 
 
 class JobService(IJobService):
@@ -24,20 +49,47 @@ class JobService(IJobService):
         settings: Settings,
         workspace_manager: Optional[WorkspaceManager] = None,
         vcs_handler_cls: Type[IVcsHandler] = GitHandler,
-        job_executor_cls: Type[IJobExecutor] = ShellJobExecutor
+        job_executor_cls: Type[IJobExecutor] = ShellJobExecutor,
+        mirror_store: Optional[MirrorStore] = None,
+        job_queue: Optional[JobQueue] = None,
+        metrics: Optional[MetricsRegistry] = None,
+        log_streams: Optional[LogStreamRegistry] = None,
+        history: Optional[JobHistoryStore] = None,
     ):
         self.settings = settings
         self.workspace_manager = workspace_manager or WorkspaceManager()
         self.vcs_handler_cls = vcs_handler_cls
         self.job_executor_cls = job_executor_cls
+        self.mirror_store = mirror_store
+        self.log_streams = log_streams
+        self.history = history
 
         notifications_raw = (
             settings.notifications.model_dump() if settings.notifications else None
         )
         self._notifier: Notifier = build_notifier(notifications_raw)
 
-        self._job_queue: queue.Queue[Optional[Tuple[Dict[str, Any], Dict[str, Any]]]] = queue.Queue()
+        self._job_queue: JobQueue = job_queue or InMemoryJobQueue()
+        metrics = metrics or MetricsRegistry()
+        self._coalesced_runs = metrics.counter("job_runs_coalesced_total")
+        self._cancelled_runs = metrics.counter("job_runs_cancelled_total")
+        self._timings = JobTimings(metrics)
+        # 実行中のジョブ (キーごとのコミットと取り消しトークン)。cancel_superseded のジョブのみ登録する
+        self._active_runs: Dict[str, List[Tuple[str, CancellationToken]]] = {}
+        self._active_lock = threading.Lock()
+        # 待ち時間の推定に使う、ジョブ名ごとの実行時間の移動平均と実行中のジョブ
+        self._durations: Dict[str, float] = {}
+        self._running: Dict[str, Tuple[QueuedJob, float]] = {}
+        self._stats_lock = threading.Lock()
         self._workers: List[threading.Thread] = []
+        self._workers_lock = threading.Lock()
+        self._worker_seq = 0
+        # 縮小の要求により停止を待っているワーカー数
+        self._retiring = 0
+        self._autoscaler: Optional[WorkerAutoscaler] = (
+            WorkerAutoscaler(settings.autoscale, metrics) if settings.autoscale.enabled else None
+        )
+        self._notify_interrupted_jobs()
         self._start_workers()
 
     # ------------------------------------------------------------------
@@ -45,61 +97,347 @@ class JobService(IJobService):
     # ------------------------------------------------------------------
 
     def _start_workers(self) -> None:
-        max_workers = self.settings.max_concurrent_jobs
-        logger.info(f"ジョブワーカーを {max_workers} 個起動します。")
-        for i in range(max_workers):
-            t = threading.Thread(
-                target=self._worker_loop,
-                name=f"JobWorker-{i + 1}",
-                daemon=True,
+        if self._autoscaler is None:
+            max_workers = self.settings.max_concurrent_jobs
+            logger.info(f"ジョブワーカーを {max_workers} 個起動します。")
+        else:
+            max_workers = self._autoscaler.min_workers
+            logger.info(
+                f"ジョブワーカーを {max_workers} 個起動します。"
+                f" (自動調整: {max_workers}〜{self.settings.autoscale.max_workers} 個)"
             )
-            t.start()
-            self._workers.append(t)
+        with self._workers_lock:
+            for _ in range(max_workers):
+                self._spawn_worker()
+        if self._autoscaler is not None:
+            self._autoscaler.start(self._scaling_sample, self._resize_workers)
+
+    def _spawn_worker(self) -> None:
+        """ワーカースレッドを 1 つ起動する (呼び出し元で _workers_lock を保持すること)。"""
+        self._worker_seq += 1
+        t = threading.Thread(
+            target=self._worker_loop,
+            name=f"JobWorker-{self._worker_seq}",
+            daemon=True,
+        )
+        t.start()
+        self._workers.append(t)
+
+    def _worker_count(self) -> int:
+        with self._workers_lock:
+            return len(self._workers) - self._retiring
+
+    def _resize_workers(self, target: int) -> None:
+        """ワーカー数を target に合わせる。減らす場合、実行中のワーカーはジョブの完了後に停止する。"""
+        with self._workers_lock:
+            current = len(self._workers) - self._retiring
+            if target > current:
+                # 停止待ちのワーカーがいれば、新しく起動する代わりに停止を取り消す
+                revived = min(self._retiring, target - current)
+                self._retiring -= revived
+                for _ in range(target - current - revived):
+                    self._spawn_worker()
+            elif target < current:
+                self._retiring += current - target
+
+    def _retire_if_requested(self) -> bool:
+        """縮小の要求があれば現在のワーカーを一覧から外し、True を返す。"""
+        with self._workers_lock:
+            if self._retiring <= 0:
+                return False
+            self._retiring -= 1
+            self._workers.remove(threading.current_thread())
+            return True
+
+    def _scaling_sample(self) -> ScalingSample:
+        queued = self._job_queue.snapshot()
+        now = time.time()
+        average_wait = (
+            sum(max(0.0, now - job.enqueued_at) for job in queued) / len(queued) if queued else 0.0
+        )
+        with self._stats_lock:
+            busy = len(self._running)
+        return ScalingSample(
+            workers=self._worker_count(),
+            busy=busy,
+            queue_depth=len(queued),
+            average_wait=average_wait,
+            load_per_cpu=read_load_per_cpu(),
+            available_memory_mb=read_available_memory_mb(),
+        )
 
     def _worker_loop(self) -> None:
+        # 自動調整時は縮小の要求を確認できるよう、一定間隔で待機を解除する
+        poll = _WORKER_POLL_SECONDS if self._autoscaler is not None else None
         while True:
-            item = self._job_queue.get()
-            if item is _JOB_QUEUE_SENTINEL:
-                self._job_queue.task_done()
+            if poll is not None and self._retire_if_requested():
                 break
-            job_config, commit_info = item
+            job = self._job_queue.get(timeout=poll)
+            if job is None:
+                if poll is None or self._job_queue.closed:
+                    break
+                continue
+            if job.coalesced:
+                logger.info(f"[{job.job_name}] {job.coalesced} 件の実行を集約して最新のコミットで実行します。")
+            started = time.monotonic()
+            with self._stats_lock:
+                self._running[job.job_id] = (job, started)
             try:
-                self.run_job(job_config, commit_info)
+                self.run_job(job.job_config, job.commit_info, queued=job)
             finally:
-                self._job_queue.task_done()
+                self._record_duration(job, time.monotonic() - started)
+                self._job_queue.task_done(job)
+
+    def _record_duration(self, job: QueuedJob, elapsed: float) -> None:
+        with self._stats_lock:
+            self._running.pop(job.job_id, None)
+            previous = self._durations.get(job.job_name)
+            self._durations[job.job_name] = (
+                elapsed if previous is None else previous + _DURATION_SMOOTHING * (elapsed - previous)
+            )
+
+    def _notify_interrupted_jobs(self) -> None:
+        """前回のプロセス終了時に実行中だったジョブを失敗として通知する。"""
+        for job in self._job_queue.interrupted:
+            self._send_notification(
+                job_name=job.job_name,
+                commit_info=job.commit_info,
+                branch=str(job.job_config.get("target_branch", "")),
+                success=False,
+                error_message="プロセスの終了によりジョブが中断されました",
+            )
+        self._job_queue.acknowledge_interrupted()
 
     def submit_job(self, job_config: Dict[str, Any], commit_info: Dict[str, Any]) -> None:
-        """ジョブをキューに追加する。"""
+        """ジョブをキューに追加する。
+
+        集約が有効なジョブ (coalesce) は、同じジョブ・ブランチの実行が待機中であればそれに取り込む。
+        cancel_superseded が有効なジョブは、別のコミットで実行中の同じジョブ・ブランチの実行を取り消す。
+        """
         job_name = job_config.get("name", "unknown")
+        pool = self._job_queue.resource_pool
+        if pool is not None and pool.exceeds_capacity(ResourceRequest.from_job_config(job_config)):
+            logger.warning(f"[{job_name}] リソース要求がホストの容量を超えています。他のジョブがない時に単独で実行します。")
+        if job_config.get("cancel_superseded"):
+            self._cancel_superseded(job_config, commit_info)
+        added = self._job_queue.put(
+            QueuedJob(
+                job_config,
+                commit_info,
+                coalesce_key=self._coalesce_key(job_config),
+                priority=int(job_config.get("priority") or 0),
+                share_key=self._repo_key(job_config),
+                # ワークスペースはジョブ名ごとのため、実行中のジョブと同名のジョブは取り出さない
+                exclusive_key=str(job_name),
+            )
+        )
         queue_size = self._job_queue.qsize()
-        logger.info(
-            f"[{job_name}] ジョブをキューに追加しました。"
-            f" (待機中のジョブ数: {queue_size})"
+        if added:
+            logger.info(
+                f"[{job_name}] ジョブをキューに追加しました。"
+                f" (待機中のジョブ数: {queue_size})"
+            )
+        else:
+            self._coalesced_runs.inc()
+            logger.info(
+                f"[{job_name}] 待機中の同じジョブに集約しました。"
+                f" (待機中のジョブ数: {queue_size})"
+            )
+
+    def _coalesce_key(self, job_config: Dict[str, Any]) -> Optional[str]:
+        """集約が有効なジョブのキー (ジョブ名・リポジトリ・ブランチ)。"""
+        if not job_config.get("coalesce"):
+            return None
+        return self._run_key(job_config)
+
+    def _run_key(self, job_config: Dict[str, Any]) -> str:
+        """同じジョブ・リポジトリ・ブランチの実行を識別するキー。"""
+        return "\x00".join(
+            [str(job_config.get("name", "")), self._repo_key(job_config), str(job_config.get("target_branch", ""))]
         )
-        self._job_queue.put((job_config, commit_info))
+
+    def _repo_key(self, job_config: Dict[str, Any]) -> str:
+        """ジョブのリポジトリURL (正規化済み)。フェアシェアの単位にも使う。"""
+        repo_url = job_config.get("repo_url") or self.settings.git.repo_url or ""
+        return normalize_repo_url(str(repo_url))
+
+    def resource_status(self) -> Optional[Dict[str, Any]]:
+        """リソースの容量と実行中のジョブへの割り当て。リソース管理が無効な場合は None。"""
+        pool = self._job_queue.resource_pool
+        return pool.snapshot() if pool is not None else None
+
+    def queue_status(self) -> Dict[str, Any]:
+        """実行中・待機中のジョブと、待機中のジョブの順番・推定待ち時間を返す。
+
+        推定待ち時間はジョブ名ごとの過去の実行時間から、ワーカーが空く時刻を順に割り当てて求める。
+        実行時間の実績がないジョブを含む場合、それ以降の推定値は None になる。
+        """
+        queued = self._job_queue.snapshot()
+        now_wall = time.time()
+        now = time.monotonic()
+        with self._stats_lock:
+            durations = dict(self._durations)
+            running = list(self._running.values())
+
+        fallback = sum(durations.values()) / len(durations) if durations else None
+        workers = self._worker_count()
+
+        # 各ワーカーが空くまでの推定秒数 (None は不明)
+        free_at: List[float] = []
+        unknown = workers <= 0
+        for job, started in running:
+            estimate = durations.get(job.job_name, fallback)
+            if estimate is None:
+                unknown = True
+            else:
+                free_at.append(max(0.0, estimate - (now - started)))
+        free_at.extend([0.0] * max(0, workers - len(running)))
+        heapq.heapify(free_at)
+
+        queued_status = []
+        for position, job in enumerate(queued, start=1):
+            estimated_wait: Optional[float] = None
+            if not unknown and free_at:
+                start_in = heapq.heappop(free_at)
+                estimate = durations.get(job.job_name, fallback)
+                if estimate is None:
+                    unknown = True
+                else:
+                    estimated_wait = round(start_in, 1)
+                    heapq.heappush(free_at, start_in + estimate)
+            queued_status.append({
+                "position": position,
+                "job_id": job.job_id,
+                "job_name": job.job_name,
+                "repo": job.share_key,
+                "branch": job.job_config.get("target_branch"),
+                "commit": job.commit_info.get("id"),
+                "priority": job.priority,
+                "effective_priority": self._job_queue.effective_priority(job),
+                "waiting_seconds": round(max(0.0, now_wall - job.enqueued_at), 1),
+                "estimated_wait_seconds": estimated_wait,
+            })
+
+        return {
+            "workers": workers,
+            "running": [
+                {
+                    "job_id": job.job_id,
+                    "job_name": job.job_name,
+                    "repo": job.share_key,
+                    "commit": job.commit_info.get("id"),
+                    "elapsed_seconds": round(now - started, 1),
+                }
+                for job, started in running
+            ],
+            "queued": queued_status,
+        }
+
+    def _cancel_superseded(self, job_config: Dict[str, Any], commit_info: Dict[str, Any]) -> None:
+        """新しいコミットと異なるコミットで実行中の同じジョブを取り消す。"""
+        job_name = job_config.get("name", "unknown")
+        commit = str(commit_info.get("id", ""))
+        with self._active_lock:
+            runs = list(self._active_runs.get(self._run_key(job_config), ()))
+        for run_commit, token in runs:
+            if run_commit == commit:
+                continue
+            if token.cancel(f"新しいコミット {commit[:8]} が投入されたため"):
+                self._cancelled_runs.inc()
+                logger.info(f"[{job_name}] コミット {run_commit[:8]} の実行を取り消しました。(新しいコミット: {commit[:8]})")
+
+    def _register_run(self, key: str, commit_info: Dict[str, Any]) -> Tuple[str, CancellationToken]:
+        entry = (str(commit_info.get("id", "")), CancellationToken())
+        with self._active_lock:
+            self._active_runs.setdefault(key, []).append(entry)
+        return entry
+
+    def _unregister_run(self, key: str, entry: Tuple[str, CancellationToken]) -> None:
+        with self._active_lock:
+            runs = self._active_runs.get(key)
+            if runs is None:
+                return
+            runs.remove(entry)
+            if not runs:
+                del self._active_runs[key]
 
     def shutdown(self, wait: bool = True) -> None:
-        """ワーカースレッドを停止する。"""
+        """ワーカースレッドを停止する。
+
+        メモリ上のキューでは待機中のジョブを実行し終えてから停止する。
+        永続キューでは実行中のジョブの完了のみを待ち、待機中のジョブは次回起動時に復元される。
+        """
         logger.info("ジョブサービスをシャットダウンしています...")
-        for _ in self._workers:
-            self._job_queue.put(_JOB_QUEUE_SENTINEL)
+        if self._autoscaler is not None:
+            self._autoscaler.stop()
+        self._job_queue.close(drain=not self._job_queue.durable)
         if wait:
-            for w in self._workers:
+            with self._workers_lock:
+                workers = list(self._workers)
+            for w in workers:
                 w.join()
+            self._job_queue.release()
         logger.info("ジョブサービスのシャットダウンが完了しました。")
 
     # ------------------------------------------------------------------
     # Job execution
     # ------------------------------------------------------------------
 
-    def run_job(self, job_config: Dict[str, Any], commit_info: Dict[str, Any]) -> None:
+    def run_job(self, job_config: Dict[str, Any], commit_info: Dict[str, Any], queued: Optional[QueuedJob] = None) -> None:
         """
         CIジョブを実行する一連のフローを制御します。
 
         Args:
             job_config (Dict[str, Any]): ジョブの設定情報 (name, repo_url, target_branch, script)。
             commit_info (Dict[str, Any]): トリガーとなったコミット情報 (id, modified)。
+            queued (Optional[QueuedJob]): キューから取り出したジョブ (実行履歴に待ち時間を記録する)。
         """
+        plan = self._plan_job(job_config)
+        job_name = plan.job_name
+        run_key, run_entry = self._begin_run(job_config, commit_info)
+        cancel_token = run_entry[1] if run_entry is not None else None
+        record = self._new_record(plan, commit_info, queued)
+
+        error_message: Optional[str] = None
+        log_path: Optional[str] = None
+        output_tail: Optional[str] = None
+        success = False
+        cancelled = False
+        try:
+            with self._timed_workspace_lock(job_name, record):
+                if cancel_token is not None:
+                    cancel_token.raise_if_cancelled(job_name)
+                with record.phase(PHASE_PREPARE_WORKSPACE):
+                    work_dir = self._prepare_workspace(job_name, persistent=plan.persistent)
+                try:
+                    env = self._build_job_env(plan, commit_info, work_dir)
+                    with record.phase(PHASE_CHECKOUT):
+                        checkout_options = self._build_checkout_options(job_name, job_config, plan.repo_url, commit_info)
+                        vcs_handler = self._checkout_code(job_name, work_dir, plan.repo_url, plan.target_branch, checkout_options, reuse=plan.persistent)
+                    with vcs_handler:
+                        with record.phase(PHASE_EXECUTE_SCRIPT):
+                            record.log_path = self._execute_script(job_name, work_dir, plan.script, env, timeout_seconds=plan.timeout, venv=plan.venv, cancel_token=cancel_token)
+                        if cancel_token is not None:
+                            cancel_token.raise_if_cancelled(job_name)
+                        with record.phase(PHASE_HANDLE_RESULT):
+                            self._handle_result(job_name, vcs_handler, commit_info, plan.target_branch)
+                finally:
+                    if not plan.persistent:
+                        with record.phase(PHASE_CLEANUP_WORKSPACE):
+                            self._cleanup_workspace(job_name)
+
+            success = True
+
+        except Exception as e:
+            error_message, cancelled, log_path = self._describe_failure(job_name, e)
+            output_tail = self._failure_output(e)
+            if isinstance(e, ScriptExecutionError):
+                record.exit_code = e.return_code
+        finally:
+            self._finish_run(plan, commit_info, run_key, run_entry, success, error_message, cancelled, log_path, record, output_tail)
+
+    def _plan_job(self, job_config: Dict[str, Any]) -> "_JobPlan":
+        """ジョブ設定を検証し、実行に必要な値を解決する。"""
         job_name = job_config.get("name", "unknown_job")
 
         repo_url = job_config.get("repo_url") or self.settings.git.repo_url
@@ -112,70 +450,190 @@ class JobService(IJobService):
                 f" repo_url={repo_url}, target_branch={target_branch}, script={script}"
             )
 
-        repo_url_str: str = str(repo_url)
-        target_branch_str: str = str(target_branch)
-        script_str: str = str(script)
-
-        user_env: Dict[str, str] = job_config.get("env", {})
-        venv_path: Optional[str] = job_config.get("venv")
-
         job_timeout = job_config.get("timeout")
-        effective_timeout = job_timeout if job_timeout is not None else self.settings.default_timeout
-
-        error_message: Optional[str] = None
-        success = False
-        try:
-            with self.workspace_manager.workspace_lock(job_name):
-                work_dir = self._prepare_workspace(job_name)
-                try:
-                    ci_env = self._build_ci_env(
-                        job_name=job_name,
-                        commit_info=commit_info,
-                        repo_url=repo_url_str,
-                        branch=target_branch_str,
-                        workspace=work_dir,
-                    )
-                    env = {**user_env, **ci_env}
-
-                    with self._checkout_code(job_name, work_dir, repo_url_str, target_branch_str) as vcs_handler:
-                        self._execute_script(job_name, work_dir, script_str, env, timeout_seconds=effective_timeout, venv=venv_path)
-                        self._handle_result(job_name, vcs_handler, commit_info, target_branch_str)
-                finally:
-                    self._cleanup_workspace(job_name)
-
-            success = True
+        return _JobPlan(
+            job_name=job_name,
+            repo_url=str(repo_url),
+            target_branch=str(target_branch),
+            script=str(script),
+            env=job_config.get("env", {}),
+            venv=job_config.get("venv"),
+            timeout=job_timeout if job_timeout is not None else self.settings.default_timeout,
+            persistent=job_config.get("workspace_mode") == "persistent",
+        )
 
-        except ToyCIError as e:
-            error_message = str(e)
-            logger.exception(f"[{job_name}] ジョブが失敗しました: {e}")
-        except Exception as e:
-            error_message = str(e)
-            logger.exception(f"[{job_name}] 予期しないエラーが発生しました: {e}")
-        finally:
+    def _begin_run(
+        self, job_config: Dict[str, Any], commit_info: Dict[str, Any]
+    ) -> Tuple[Optional[str], Optional[Tuple[str, CancellationToken]]]:
+        """cancel_superseded のジョブを実行中として登録し、(キー, 登録内容) を返す。"""
+        if not job_config.get("cancel_superseded"):
+            return None, None
+        run_key = self._run_key(job_config)
+        return run_key, self._register_run(run_key, commit_info)
+
+    def _describe_failure(self, job_name: str, error: Exception) -> Tuple[str, bool, Optional[str]]:
+        """ジョブの失敗をログに出力し、(通知するエラーメッセージ, 取り消しかどうか, ジョブログのパス) を返す。"""
+        if isinstance(error, JobCancelledError):
+            error_message = error.reason or str(error)
+            logger.info(f"[{job_name}] ジョブは取り消されました: {error_message}")
+            return error_message, True, None
+        if isinstance(error, ToyCIError):
+            logger.exception(f"[{job_name}] ジョブが失敗しました: {error}")
+        else:
+            logger.exception(f"[{job_name}] 予期しないエラーが発生しました: {error}")
+        log_path = error.log_path if isinstance(error, ScriptExecutionError) else None
+        return str(error), False, log_path
+
+    def _failure_output(self, error: Exception) -> Optional[str]:
+        """通知に載せる、失敗したスクリプトの出力の末尾 (notify_tail_lines 行)。"""
+        lines = self.settings.job_output.notify_tail_lines
+        if not isinstance(error, ScriptExecutionError) or not error.stdout or lines <= 0:
+            return None
+        return "".join(error.stdout.splitlines(keepends=True)[-lines:])
+
+    def _finish_run(
+        self,
+        plan: "_JobPlan",
+        commit_info: Dict[str, Any],
+        run_key: Optional[str],
+        run_entry: Optional[Tuple[str, CancellationToken]],
+        success: bool,
+        error_message: Optional[str],
+        cancelled: bool,
+        log_path: Optional[str] = None,
+        record: Optional[RunRecord] = None,
+        output_tail: Optional[str] = None,
+    ) -> None:
+        if run_entry is not None:
+            self._unregister_run(run_key, run_entry)
+        with record.phase(PHASE_SEND_NOTIFICATION) if record is not None else nullcontext():
             self._send_notification(
-                job_name=job_name,
+                job_name=plan.job_name,
                 commit_info=commit_info,
-                branch=target_branch_str,
+                branch=plan.target_branch,
                 success=success,
                 error_message=error_message,
+                cancelled=cancelled,
+                log_path=log_path,
+                output_tail=output_tail,
             )
+        if record is not None:
+            self._record_history(record, success, error_message, cancelled, log_path)
+
+    def _new_record(self, plan: "_JobPlan", commit_info: Dict[str, Any], queued: Optional[QueuedJob]) -> RunRecord:
+        return RunRecord(
+            job_name=plan.job_name,
+            repo=normalize_repo_url(plan.repo_url),
+            branch=plan.target_branch,
+            commit_id=str(commit_info.get("id", "")),
+            job_id=queued.job_id if queued is not None else None,
+            queued_at=queued.enqueued_at if queued is not None else None,
+            queue_seconds=queued.waited() if queued is not None else None,
+            timings=self._timings,
+        )
+
+    @contextmanager
+    def _timed_workspace_lock(self, job_name: str, record: RunRecord) -> Iterator[None]:
+        """ワークスペースの排他ロックを取得し、取得までの待ち時間を lock_wait として記録する。"""
+        lock = self.workspace_manager.workspace_lock(job_name)
+        with record.phase(PHASE_LOCK_WAIT):
+            lock.__enter__()
+        try:
+            yield
+        finally:
+            lock.__exit__(None, None, None)
 
-    def _prepare_workspace(self, job_name: str) -> str:
+    def _record_history(
+        self,
+        record: RunRecord,
+        success: bool,
+        error_message: Optional[str],
+        cancelled: bool,
+        log_path: Optional[str],
+    ) -> None:
+        """実行の結果を記録し、実行履歴に書き込みを依頼する (コミットは待たない)。"""
+        if success:
+            status = RUN_STATUS_SUCCESS
+            record.exit_code = 0
+        else:
+            status = RUN_STATUS_CANCELLED if cancelled else RUN_STATUS_FAILED
+        if log_path is not None:
+            record.log_path = log_path
+        record.finish(status, error_message)
+        if self.history is not None:
+            self.history.record(record)
+
+    def _build_job_env(self, plan: "_JobPlan", commit_info: Dict[str, Any], work_dir: str) -> Dict[str, str]:
+        """ユーザー定義の環境変数に CI メタデータ環境変数を重ねる (CI 側が優先)。"""
+        ci_env = self._build_ci_env(
+            job_name=plan.job_name,
+            commit_info=commit_info,
+            repo_url=plan.repo_url,
+            branch=plan.target_branch,
+            workspace=work_dir,
+        )
+        return {**plan.env, **ci_env}
+
+    def _prepare_workspace(self, job_name: str, persistent: bool = False) -> str:
         logger.info(f"[{job_name}] ワークスペースを準備中...")
         try:
+            if persistent:
+                return self.workspace_manager.get_workspace(job_name)
             return self.workspace_manager.prepare_workspace(job_name)
         except Exception as e:
             logger.exception(f"[{job_name}] ワークスペースの準備に失敗しました: {e}")
             raise
 
-    def _checkout_code(self, job_name: str, work_dir: str, repo_url: str, target_branch: str) -> IVcsHandler:
+    def _build_checkout_options(self, job_name: str, job_config: Dict[str, Any], repo_url: str, commit_info: Dict[str, Any]) -> CheckoutOptions:
+        commit = commit_info.get("id") or None
+        return CheckoutOptions(
+            reference=self._prepare_mirror(job_name, repo_url, commit, job_config.get("target_branch")),
+            depth=job_config.get("clone_depth"),
+            single_branch=bool(job_config.get("single_branch", False)),
+            commit=commit,
+            sparse_paths=self._resolve_sparse_paths(job_name, job_config),
+        )
+
+    def _resolve_sparse_paths(self, job_name: str, job_config: Dict[str, Any]) -> Optional[List[str]]:
+        """watch_files と sparse_paths からスパースチェックアウトの範囲を求める。"""
+        if not job_config.get("sparse_checkout"):
+            return None
+        patterns = list(job_config.get("watch_files", [])) + list(job_config.get("sparse_paths", []))
+        directories = sparse_directories(patterns)
+        if directories is None:
+            logger.info(f"[{job_name}] 監視パターンからディレクトリを絞り込めないため、作業ツリー全体をチェックアウトします")
+        return directories
+
+    def _checkout_code(self, job_name: str, work_dir: str, repo_url: str, target_branch: str, options: Optional[CheckoutOptions] = None, reuse: bool = False) -> IVcsHandler:
         access_token = self.settings.git.access_token
+        options = options or CheckoutOptions()
 
         vcs_handler = self.vcs_handler_cls(work_dir)
+        if reuse:
+            logger.info(f"[{job_name}] 既存ワークスペースを更新中: {repo_url} ({target_branch})")
+            try:
+                vcs_handler.update_repository(repo_url, target_branch, access_token, options=options)
+                return vcs_handler
+            except RepositoryError as e:
+                logger.warning(f"[{job_name}] ワークスペースを再利用できません。クローンし直します: {e}")
+                vcs_handler.close()
+                work_dir = self.workspace_manager.prepare_workspace(job_name)
+                vcs_handler = self.vcs_handler_cls(work_dir)
+
         logger.info(f"[{job_name}] リポジトリを準備中: {repo_url} ({target_branch})")
-        vcs_handler.prepare_repository(repo_url, target_branch, access_token)
+        vcs_handler.prepare_repository(repo_url, target_branch, access_token, options=options)
         return vcs_handler
 
+    def _prepare_mirror(self, job_name: str, repo_url: str, commit: Optional[str], branch: Optional[str] = None) -> Optional[str]:
+        """ミラーを最新化してパスを返す。ミラー未使用または失敗時は None (リモートから直接クローン)。"""
+        if self.mirror_store is None:
+            return None
+        try:
+            return self.mirror_store.ensure_mirror(repo_url, commit=commit, branch=branch)
+        except Exception as e:
+            logger.warning(f"[{job_name}] ミラーを利用できません。リモートから直接取得します: {e}")
+            return None
+
     def _build_ci_env(
         self,
         job_name: str,
@@ -193,10 +651,18 @@ class JobService(IJobService):
             "CI_WORKSPACE": workspace,
         }
 
-    def _execute_script(self, job_name: str, work_dir: str, script: str, env: Optional[Dict[str, str]] = None, timeout_seconds: Optional[int] = None, venv: Optional[str] = None) -> None:
+    def _execute_script(self, job_name: str, work_dir: str, script: str, env: Optional[Dict[str, str]] = None, timeout_seconds: Optional[int] = None, venv: Optional[str] = None, cancel_token: Optional[CancellationToken] = None) -> Optional[str]:
+        """スクリプトを実行し、ジョブログのパスを返す (executor がパスを公開していない場合は None)。"""
         logger.info(f"[{job_name}] スクリプトを実行中: {script}")
-        executor = self.job_executor_cls(self.settings.job_log_dir)
-        executor.execute(script, work_dir, job_name=job_name, env=env, timeout_seconds=timeout_seconds, venv=venv)
+        executor = self._create_executor()
+        executor.execute(script, work_dir, job_name=job_name, env=env, timeout_seconds=timeout_seconds, venv=venv, cancel_token=cancel_token)
+        log_path = getattr(executor, "log_path", None)
+        return log_path if isinstance(log_path, str) else None
+
+    def _create_executor(self) -> IJobExecutor:
+        return self.job_executor_cls(
+            self.settings.job_log_dir, output_config=self.settings.job_output, log_streams=self.log_streams
+        )
 
     def _handle_result(self, job_name: str, vcs_handler: IVcsHandler, commit_info: Dict[str, Any], target_branch: str) -> None:
         if vcs_handler.has_changes():
@@ -220,16 +686,46 @@ class JobService(IJobService):
         branch: str,
         success: bool,
         error_message: Optional[str] = None,
+        cancelled: bool = False,
+        log_path: Optional[str] = None,
+        output_tail: Optional[str] = None,
     ) -> None:
         event = NotificationEvent(
             job_name=job_name,
             success=success,
+            cancelled=cancelled,
             branch=branch,
             commit_hash=str(commit_info.get("id", "")),
             commit_message=commit_info.get("message"),
             error_message=error_message,
+            log_path=log_path,
+            output_tail=output_tail,
         )
         try:
             self._notifier.notify(event)
         except Exception as e:
             logger.warning(f"[{job_name}] 通知の送信中にエラーが発生しました: {e}")
+
+
+class _JobPlan:
+    """ジョブ設定から解決した、1 回の実行に必要な値。"""
+
+    def __init__(
+        self,
+        job_name: str,
+        repo_url: str,
+        target_branch: str,
+        script: str,
+        env: Dict[str, str],
+        venv: Optional[str],
+        timeout: Optional[int],
+        persistent: bool,
+    ) -> None:
+        self.job_name = job_name
+        self.repo_url = repo_url
+        self.target_branch = target_branch
+        self.script = script
+        self.env = env
+        self.venv = venv
+        self.timeout = timeout
+        self.persistent = persistent
@@ -0,0 +1,108 @@
+"""ジョブの実行フェーズごとの所要時間の計測。
+
+`JobService.run_job` は各フェーズ (ワークスペースのロック待ち・準備・チェックアウト・スクリプト実行・
+結果の処理・後片付け・通知) と、キューへの投入から取り出しまでの待ち時間を単調時計で計測する。
+計測値は `JobTimings` がジョブごと・フェーズごとのヒストグラム
+(``job_phase_seconds{job="<ジョブ名>",phase="<フェーズ>"}``) に集計し、構造化イベントとしてログに出力する。
+
+* フェーズごとのイベント (``job_phase``): DEBUG レベル
+* 実行ごとのまとめ (``job_timing``): INFO レベル
+
+イベントはログレコードの ``event`` 属性 (辞書) にも設定するため、構造化ログのハンドラーでそのまま扱える。
+"""
+import json
+import logging
+import threading
+from typing import Any, Dict, Optional, Tuple
+
+from .metrics import Histogram, MetricsRegistry
+
+logger = logging.getLogger(__name__)
+
+PHASE_QUEUE_WAIT = "queue_wait"
+PHASE_LOCK_WAIT = "lock_wait"
+PHASE_PREPARE_WORKSPACE = "prepare_workspace"
+PHASE_CHECKOUT = "checkout"
+PHASE_EXECUTE_SCRIPT = "execute_script"
+PHASE_HANDLE_RESULT = "handle_result"
+PHASE_CLEANUP_WORKSPACE = "cleanup_workspace"
+PHASE_SEND_NOTIFICATION = "send_notification"
+
+PHASES = (
+    PHASE_QUEUE_WAIT,
+    PHASE_LOCK_WAIT,
+    PHASE_PREPARE_WORKSPACE,
+    PHASE_CHECKOUT,
+    PHASE_EXECUTE_SCRIPT,
+    PHASE_HANDLE_RESULT,
+    PHASE_CLEANUP_WORKSPACE,
+    PHASE_SEND_NOTIFICATION,
+)
+"""計測するフェーズ (実行の順)。"""
+
+
+def phase_metric_name(job_name: str, phase: str) -> str:
+    """ジョブ・フェーズごとのヒストグラムの名前。"""
+    return f'job_phase_seconds{{job="{job_name}",phase="{phase}"}}'
+
+
+class JobTimings:
+    """フェーズごとの所要時間をジョブ別のヒストグラムに集計し、構造化イベントとして出力する。"""
+
+    def __init__(self, metrics: Optional[MetricsRegistry] = None) -> None:
+        self._metrics = metrics or MetricsRegistry()
+        # レジストリのロックを毎回取らないよう、取得したヒストグラムを保持する
+        self._histograms: Dict[Tuple[str, str], Histogram] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, job_name: str, run_id: str, phase: str, seconds: float, ok: bool = True) -> None:
+        """1 フェーズの所要時間を記録する。"""
+        self._histogram(job_name, phase).observe(seconds)
+        if logger.isEnabledFor(logging.DEBUG):
+            _emit(logging.DEBUG, {
+                "event": "job_phase",
+                "job": job_name,
+                "run_id": run_id,
+                "phase": phase,
+                "seconds": round(seconds, 6),
+                "ok": ok,
+            })
+
+    def summarize(
+        self,
+        job_name: str,
+        run_id: str,
+        status: Optional[str],
+        duration: Optional[float],
+        phases: Dict[str, float],
+        queue_seconds: Optional[float] = None,
+    ) -> None:
+        """実行全体の所要時間・キューの待ち時間・フェーズごとの内訳を 1 イベントとして出力する。"""
+        if not logger.isEnabledFor(logging.INFO):
+            return
+        _emit(logging.INFO, {
+            "event": "job_timing",
+            "job": job_name,
+            "run_id": run_id,
+            "status": status,
+            "seconds": round(duration, 6) if duration is not None else None,
+            "queue_seconds": round(queue_seconds, 6) if queue_seconds is not None else None,
+            "phases": {phase: round(seconds, 6) for phase, seconds in phases.items()},
+        })
+
+    # --- プライベートメソッド ---
+
+    def _histogram(self, job_name: str, phase: str) -> Histogram:
+        key = (job_name, phase)
+        histogram = self._histograms.get(key)
+        if histogram is None:
+            with self._lock:
+                histogram = self._histograms.get(key)
+                if histogram is None:
+                    histogram = self._metrics.histogram(phase_metric_name(job_name, phase))
+                    self._histograms[key] = histogram
+        return histogram
+
+
+def _emit(level: int, event: Dict[str, Any]) -> None:
+    logger.log(level, json.dumps(event, ensure_ascii=False), extra={"event": event})
@@ -2,7 +2,8 @@ import logging
 from typing import Dict, List, Any, Optional
 
 from .interfaces import WebhookProvider, IJobMatcher, IJobService
-from .job_matcher import JobMatcher
+from .job_matcher import JobMatcher, CompiledJobSet
+from .job_router import JobRouter
 from .config import Settings
 from .repo_ci_config_loader import RepoCIConfigLoader
 
@@ -29,6 +30,8 @@ class JobTriggerService:
         self._repo_config_loader = repo_config_loader or RepoCIConfigLoader(
             access_token=settings.git.access_token
         )
+        # ローカルジョブはリポジトリ・ブランチで振り分けてからファイルマッチングを行う
+        self._router = JobRouter(settings.jobs, default_repo_url=settings.git.repo_url)
 
     def process_webhook_event(self, provider: WebhookProvider, payload: Dict[str, Any]) -> List[str]:
         """
@@ -55,24 +58,20 @@ class JobTriggerService:
 
         triggered_jobs = []
         payload_meta = provider.get_payload_meta(payload)
+        repo_info = provider.extract_repo_info(payload)
 
         # ローカル config.yaml に定義されたジョブを処理
-        for job_config in self.settings.jobs:
+        for job_config in self._matching_local_jobs(repo_info, changed_files):
             job_dict = job_config.model_dump()
             job_name = job_config.name
-
-            if self.job_matcher.match(job_dict, changed_files):
-                logger.info(f"変更によりジョブ '{job_name}' がトリガーされました。")
-                try:
-                    self.job_service.submit_job(job_dict, payload_meta)
-                    triggered_jobs.append(job_name)
-                except Exception as e:
-                    logger.error(f"ジョブ '{job_name}' のキュー追加に失敗しました: {e}")
-            else:
-                logger.debug(f"ジョブ '{job_name}' はスキップされました (一致するファイルなし)。")
+            logger.info(f"変更によりジョブ '{job_name}' がトリガーされました。")
+            try:
+                self.job_service.submit_job(job_dict, payload_meta)
+                triggered_jobs.append(job_name)
+            except Exception as e:
+                logger.error(f"ジョブ '{job_name}' のキュー追加に失敗しました: {e}")
 
         # トリガーリポジトリ内の .toyci.yaml に定義されたジョブを処理
-        repo_info = provider.extract_repo_info(payload)
         if repo_info:
             self._process_repo_ci_jobs(repo_info, changed_files, payload_meta, triggered_jobs)
 
@@ -88,30 +87,57 @@ class JobTriggerService:
         """リポジトリ内の .toyci.yaml からジョブを読み込み、マッチするものをキューに追加する。"""
         repo_url = repo_info["repo_url"]
         branch = repo_info["branch"]
+        commit = repo_info.get("commit")
 
-        repo_settings = self._repo_config_loader.load_from_repo(repo_url, branch)
+        repo_settings = self._repo_config_loader.load_from_repo(repo_url, branch, commit)
         if not repo_settings:
             return
 
-        for repo_job in repo_settings.jobs:
+        compiled = None
+        if self._uses_compiled_matcher():
+            # パターン単位のコンパイル結果はキャッシュされるため、同じ設定の再構築は安価
+            compiled = CompiledJobSet([job.watch_files for job in repo_settings.jobs])
+
+        for repo_job in self._matching_jobs(repo_settings.jobs, changed_files, compiled):
             job_dict = repo_job.model_dump()
             # repo_url / target_branch を Webhook ペイロードの情報で補完
             job_dict["repo_url"] = repo_url
             job_dict["target_branch"] = branch
 
             job_name = repo_job.name
-            if self.job_matcher.match(job_dict, changed_files):
-                logger.info(
-                    f"リポジトリ CI 設定によりジョブ '{job_name}' がトリガーされました。"
-                )
-                try:
-                    self.job_service.submit_job(job_dict, payload_meta)
-                    triggered_jobs.append(job_name)
-                except Exception as e:
-                    logger.error(
-                        f"リポジトリ CI ジョブ '{job_name}' のキュー追加に失敗しました: {e}"
-                    )
-            else:
-                logger.debug(
-                    f"リポジトリ CI ジョブ '{job_name}' はスキップされました (一致するファイルなし)。"
+            logger.info(
+                f"リポジトリ CI 設定によりジョブ '{job_name}' がトリガーされました。"
+            )
+            try:
+                self.job_service.submit_job(job_dict, payload_meta)
+                triggered_jobs.append(job_name)
+            except Exception as e:
+                logger.error(
+                    f"リポジトリ CI ジョブ '{job_name}' のキュー追加に失敗しました: {e}"
                 )
+
+    def _matching_local_jobs(self, repo_info: Optional[Dict[str, str]], changed_files: set) -> list:
+        """リポジトリ・ブランチで振り分けたローカルジョブのうち、変更ファイルにマッチするものを返す。"""
+        repo_url = repo_info.get("repo_url") if repo_info else None
+        branch = repo_info.get("branch") if repo_info else None
+        indices = self._router.route(repo_url, branch)
+        logger.debug(
+            f"{len(self._router)} ジョブ中 {len(indices)} ジョブがリポジトリ・ブランチの条件に一致しました"
+            f" ({repo_url}@{branch})。"
+        )
+        jobs = [self.settings.jobs[i] for i in indices]
+        compiled = self._router.job_set(indices) if self._uses_compiled_matcher() else None
+        return self._matching_jobs(jobs, changed_files, compiled)
+
+    def _uses_compiled_matcher(self) -> bool:
+        """一括判定が利用できるか (独自のマッチャーが注入された場合はジョブごとに判定する)。"""
+        return type(self.job_matcher) is JobMatcher
+
+    def _matching_jobs(self, jobs: list, changed_files: set, compiled: Optional[CompiledJobSet]) -> list:
+        """変更ファイルにマッチするジョブを定義順に返す。"""
+        if compiled is not None:
+            matched = [jobs[i] for i in compiled.match(changed_files)]
+        else:
+            matched = [job for job in jobs if self.job_matcher.match(job.model_dump(), changed_files)]
+        logger.debug(f"{len(jobs)} ジョブ中 {len(matched)} ジョブが変更ファイルにマッチしました。")
+        return matched
@@ -0,0 +1,246 @@
+"""ジョブログの保持期間・容量による削除。
+
+`LogRetentionService` はジョブログ (job_log_dir) の一覧をメモリ上に持ち、
+interval 秒ごとにディレクトリを scan_batch エントリずつ走査して一覧を更新する。
+ディレクトリの mtime が前回の走査から変わっていない場合 (ファイルの追加・削除がない場合) は走査せず、
+書き込み中の可能性がある各ジョブの最新のログだけを stat し直す。
+
+一覧に対して「ジョブごとに直近 keep_last 件」「最大日数」「全体の容量」を適用し、古いものから削除する。
+直近 _ACTIVE_SECONDS 秒以内に更新されたログは書き込み中とみなして削除しない。
+"""
+import logging
+import os
+import threading
+import time
+from typing import Callable, Dict, Iterator, List, Optional, Set
+
+from .config import LogRetentionConfig
+from .job_log import INDEX_SUFFIX, LOG_NAME_PATTERN, is_compressed_log, remove_job_log
+from .metrics import MetricsRegistry
+
+logger = logging.getLogger(__name__)
+
+_ACTIVE_SECONDS = 300.0
+"""この秒数以内に更新されたジョブログは書き込み中とみなして削除しない。"""
+
+
+class LogFile:
+    """一覧上のジョブログ。size は索引ファイルを含む。"""
+
+    def __init__(self, path: str, job_name: str, size: int, mtime: float) -> None:
+        self.path = path
+        self.job_name = job_name
+        self.size = size
+        self.mtime = mtime
+
+
+class LogRetentionService:
+    """ジョブログの一覧を少しずつ走査して保ち、保持の条件を超えたログをバックグラウンドで削除する。"""
+
+    def __init__(
+        self,
+        log_dir: str,
+        config: LogRetentionConfig,
+        metrics: Optional[MetricsRegistry] = None,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        """
+        Args:
+            log_dir: ジョブログのディレクトリ (job_log_dir)
+            config: 保持の条件
+            metrics: 削除したバイト数・走査時間を記録するメトリクス
+            clock: 現在時刻 (UNIX 時間) を返す関数
+        """
+        self.log_dir = os.path.abspath(log_dir)
+        self.config = config
+        self._clock = clock
+        self._files: Dict[str, LogFile] = {}
+        # 走査中のディレクトリと、走査で見つかったパス
+        self._scanner: Optional[Iterator[os.DirEntry]] = None
+        self._seen: Set[str] = set()
+        self._pass_mtime: Optional[int] = None
+        # 最後に走査を終えた時点のディレクトリの mtime
+        self._dir_mtime: Optional[int] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+        metrics = metrics or MetricsRegistry()
+        self._deleted_bytes = metrics.counter("job_log_retention_deleted_bytes_total")
+        self._deleted_files = metrics.counter("job_log_retention_deleted_files_total")
+        self._scan_seconds = metrics.histogram("job_log_retention_scan_seconds")
+        self._total_bytes = metrics.gauge("job_log_bytes")
+        self._total_files = metrics.gauge("job_log_files")
+
+    def start(self) -> None:
+        """削除を行うスレッドを起動する。"""
+        logger.info(
+            f"ジョブログの保持: {self.log_dir} (直近 {self.config.keep_last} 件, "
+            f"最大 {self.config.max_age_days} 日, 上限 {self.config.max_total_mb} MB)"
+        )
+        self._thread = threading.Thread(target=self._run, name="LogRetention", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        self._close_scanner()
+
+    def tick(self) -> int:
+        """走査を 1 段進め、条件を超えたジョブログを削除する。削除したバイト数を返す。"""
+        started = time.perf_counter()
+        self._scan_step()
+        self._scan_seconds.observe(time.perf_counter() - started)
+
+        deleted = self._enforce(self._clock())
+        self._total_bytes.set(sum(f.size for f in self._files.values()))
+        self._total_files.set(len(self._files))
+        return deleted
+
+    def files(self) -> List[LogFile]:
+        """一覧上のジョブログを古い順に返す。"""
+        return sorted(self._files.values(), key=lambda f: f.mtime)
+
+    # --- プライベートメソッド ---
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.config.interval):
+            try:
+                self.tick()
+            except Exception as e:
+                logger.exception(f"ジョブログの削除中にエラーが発生しました: {e}")
+
+    def _scan_step(self) -> None:
+        if self._scanner is None:
+            mtime = self._stat_dir()
+            if mtime is None:
+                self._files.clear()
+                return
+            if mtime == self._dir_mtime:
+                self._refresh_latest()
+                return
+            self._scanner = os.scandir(self.log_dir)
+            self._seen = set()
+            self._pass_mtime = mtime
+
+        for _ in range(self.config.scan_batch):
+            entry = next(self._scanner, None)
+            if entry is None:
+                self._finish_pass()
+                return
+            match = LOG_NAME_PATTERN.match(entry.name)
+            if match is None:
+                continue
+            log = self._stat_log(entry.path, match.group("job"))
+            if log is not None:
+                self._files[log.path] = log
+                self._seen.add(log.path)
+
+    def _finish_pass(self) -> None:
+        self._close_scanner()
+        # 走査中に見つからなかったログは外部で削除されている
+        for path in [p for p in self._files if p not in self._seen]:
+            del self._files[path]
+        self._seen = set()
+        self._dir_mtime = self._pass_mtime
+
+    def _close_scanner(self) -> None:
+        if self._scanner is not None:
+            self._scanner.close()
+            self._scanner = None
+
+    def _refresh_latest(self) -> None:
+        """各ジョブの最新のログ (書き込み中の可能性がある) のサイズ・mtime を更新する。"""
+        latest: Dict[str, LogFile] = {}
+        for log in self._files.values():
+            current = latest.get(log.job_name)
+            if current is None or log.mtime > current.mtime:
+                latest[log.job_name] = log
+        for log in latest.values():
+            updated = self._stat_log(log.path, log.job_name)
+            if updated is None:
+                del self._files[log.path]
+            else:
+                self._files[log.path] = updated
+
+    def _stat_dir(self) -> Optional[int]:
+        try:
+            return os.stat(self.log_dir).st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+    def _stat_log(self, path: str, job_name: str) -> Optional[LogFile]:
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return None
+        size = stat.st_size
+        if is_compressed_log(path):
+            try:
+                size += os.stat(path + INDEX_SUFFIX).st_size
+            except FileNotFoundError:
+                pass
+        return LogFile(path, job_name, size, stat.st_mtime)
+
+    def _select(self, now: float) -> List[LogFile]:
+        """削除するジョブログを古い順に返す。"""
+        config = self.config
+        files = self.files()
+        active_since = now - _ACTIVE_SECONDS
+        selected: Dict[str, LogFile] = {}
+
+        if config.max_age_days is not None:
+            cutoff = now - config.max_age_days * 86400
+            for log in files:
+                if log.mtime < cutoff:
+                    selected[log.path] = log
+
+        if config.keep_last is not None:
+            by_job: Dict[str, List[LogFile]] = {}
+            for log in files:
+                by_job.setdefault(log.job_name, []).append(log)
+            for logs in by_job.values():
+                for log in logs[:-config.keep_last]:
+                    selected[log.path] = log
+
+        if config.max_total_mb is not None:
+            budget = config.max_total_mb * 1024 * 1024
+            total = sum(log.size for log in files if log.path not in selected)
+            for log in files:
+                if total <= budget:
+                    break
+                if log.path in selected or log.mtime >= active_since:
+                    continue
+                selected[log.path] = log
+                total -= log.size
+
+        return [log for log in files if log.path in selected and log.mtime < active_since]
+
+    def _enforce(self, now: float) -> int:
+        victims = self._select(now)
+        if not victims:
+            return 0
+        deleted_bytes = 0
+        deleted_files = 0
+        for log in victims:
+            try:
+                remove_job_log(log.path)
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                logger.warning(f"ジョブログを削除できませんでした: {log.path}: {e}")
+                continue
+            else:
+                deleted_bytes += log.size
+                deleted_files += 1
+            del self._files[log.path]
+
+        if deleted_files:
+            # 削除の間に作成されたログを見逃さないよう、次回は走査し直す
+            self._dir_mtime = None
+            self._deleted_bytes.inc(deleted_bytes)
+            self._deleted_files.inc(deleted_files)
+            logger.info(
+                f"ジョブログを {deleted_files} 件削除しました ({deleted_bytes / (1024 * 1024):.1f} MB)"
+            )
+        return deleted_bytes
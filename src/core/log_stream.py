@@ -0,0 +1,229 @@
+"""実行中のジョブの出力の配信。
+
+`LogPump` はジョブログへの書き込みと同時に、出力を `LogBroadcast` (メモリ上のバッファ) に追記する。
+閲覧者はバッファを共有して読むため、閲覧者が増えてもディスクの読み込みは増えない。
+バッファには直近 buffer_bytes バイト程度だけを保持し、それより前の位置から読む場合と、
+実行を終えたジョブのログはディスク (ジョブログ) から読む。
+
+位置は出力の先頭からのバイト数で、Server-Sent Events のイベント ID として送るため、
+クライアントは Last-Event-ID (または offset) で途中から再開できる。
+"""
+import asyncio
+import codecs
+import json
+import locale
+import logging
+import os
+import threading
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+
+from .job_log import JobLogReader
+from .metrics import MetricsRegistry
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BUFFER_BYTES = 1024 * 1024
+"""LogBroadcast がメモリ上に保持する出力のバイト数 (既定値)。"""
+
+_EVENT_BYTES = 64 * 1024
+"""1 イベントで送る出力の最大バイト数。"""
+
+_KEEPALIVE_SECONDS = 15.0
+"""出力がない間、接続を維持するためにコメントを送る間隔。"""
+
+
+class LogBroadcast:
+    """1 回の実行の出力を複数の閲覧者に配信するバッファ。
+
+    append・close はジョブを実行するスレッド (またはイベントループ) から、
+    read・wait は閲覧者のイベントループから呼び出す。
+    """
+
+    def __init__(self, name: str, job_name: str, log_path: str, buffer_bytes: int = DEFAULT_BUFFER_BYTES) -> None:
+        self.name = name
+        self.job_name = job_name
+        self.log_path = log_path
+        self.buffer_bytes = buffer_bytes
+        self._buffer = bytearray()
+        # バッファの先頭と末尾の位置
+        self._start = 0
+        self._end = 0
+        self._closed = False
+        self._lock = threading.Lock()
+        self._waiters: List[Tuple[asyncio.AbstractEventLoop, "asyncio.Future[None]"]] = []
+
+    @property
+    def end(self) -> int:
+        return self._end
+
+    @property
+    def closed(self) -> bool:
+        return self._closed
+
+    def append(self, data: bytes) -> None:
+        with self._lock:
+            self._buffer += data
+            self._end += len(data)
+            # 追記ごとに先頭を詰めないよう、上限の 2 倍まで溜まってからまとめて切り詰める
+            if len(self._buffer) > 2 * self.buffer_bytes:
+                drop = len(self._buffer) - self.buffer_bytes
+                del self._buffer[:drop]
+                self._start += drop
+            waiters, self._waiters = self._waiters, []
+        _wake(waiters)
+
+    def close(self) -> None:
+        """出力の終わりを通知する。"""
+        with self._lock:
+            self._closed = True
+            waiters, self._waiters = self._waiters, []
+        _wake(waiters)
+
+    def read(self, offset: int, max_bytes: int) -> Optional[bytes]:
+        """offset から最大 max_bytes バイトを返す。offset がバッファに残っていない場合は None。"""
+        with self._lock:
+            if offset < self._start:
+                return None
+            index = offset - self._start
+            return bytes(self._buffer[index:index + max_bytes])
+
+    async def wait(self, offset: int, timeout: Optional[float] = None) -> bool:
+        """offset より後の出力が追記されるか、出力が終わるまで待つ。タイムアウトした場合は False。"""
+        loop = asyncio.get_running_loop()
+        future: "asyncio.Future[None]" = loop.create_future()
+        waiter = (loop, future)
+        with self._lock:
+            if self._end > offset or self._closed:
+                return True
+            self._waiters.append(waiter)
+        try:
+            await asyncio.wait_for(future, timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+        finally:
+            with self._lock:
+                if waiter in self._waiters:
+                    self._waiters.remove(waiter)
+
+
+def _wake(waiters: List[Tuple[asyncio.AbstractEventLoop, "asyncio.Future[None]"]]) -> None:
+    for loop, future in waiters:
+        try:
+            loop.call_soon_threadsafe(_resolve, future)
+        except RuntimeError:
+            # 閲覧者のイベントループが終了している
+            pass
+
+
+def _resolve(future: "asyncio.Future[None]") -> None:
+    if not future.done():
+        future.set_result(None)
+
+
+class LogStreamRegistry:
+    """実行中のジョブの LogBroadcast をジョブログのファイル名で管理する。"""
+
+    def __init__(
+        self,
+        buffer_bytes: int = DEFAULT_BUFFER_BYTES,
+        metrics: Optional[MetricsRegistry] = None,
+        encoding: Optional[str] = None,
+    ) -> None:
+        """
+        Args:
+            buffer_bytes: 実行ごとにメモリ上に保持する出力のバイト数
+            metrics: 閲覧者数を記録するメトリクス
+            encoding: 出力を文字列として配信する際のエンコーディング (省略時はロケールのエンコーディング)
+        """
+        self.buffer_bytes = buffer_bytes
+        self.encoding = encoding or locale.getpreferredencoding(False)
+        self._streams: Dict[str, LogBroadcast] = {}
+        self._lock = threading.Lock()
+        metrics = metrics or MetricsRegistry()
+        self._viewers = metrics.gauge("log_stream_viewers")
+        self._live = metrics.gauge("log_streams_live")
+
+    def open(self, log_path: str, job_name: str) -> LogBroadcast:
+        """実行の開始時に、ジョブログに対応する LogBroadcast を登録する。"""
+        broadcast = LogBroadcast(os.path.basename(log_path), job_name, log_path, self.buffer_bytes)
+        with self._lock:
+            self._streams[broadcast.name] = broadcast
+            self._live.set(len(self._streams))
+        return broadcast
+
+    def close(self, broadcast: LogBroadcast) -> None:
+        """実行の終了時に出力の終わりを通知して登録を外す。以降、新しい閲覧者はディスクから読む。"""
+        broadcast.close()
+        with self._lock:
+            if self._streams.get(broadcast.name) is broadcast:
+                del self._streams[broadcast.name]
+            self._live.set(len(self._streams))
+
+    def get(self, name: str) -> Optional[LogBroadcast]:
+        with self._lock:
+            return self._streams.get(name)
+
+    def find_job(self, job_name: str) -> Optional[LogBroadcast]:
+        """ジョブの実行中の LogBroadcast を返す (複数ある場合は最後に開始したもの)。"""
+        with self._lock:
+            matches = [b for b in self._streams.values() if b.job_name == job_name]
+        return matches[-1] if matches else None
+
+    async def stream(
+        self,
+        name: str,
+        log_path: str,
+        offset: int = 0,
+        keepalive: float = _KEEPALIVE_SECONDS,
+    ) -> AsyncIterator[str]:
+        """ジョブログの offset バイト目以降を Server-Sent Events として返す。
+
+        * ``event: output``: data は出力 (JSON 文字列)、id は送った出力の末尾の位置
+        * ``event: end``: 出力の終わり。data は ``{"offset": 末尾の位置}``
+
+        実行中の場合は出力の終わりまで、実行を終えている場合はジョブログの末尾まで送る。
+        """
+        decoder = codecs.getincrementaldecoder(self.encoding)(errors="replace")
+        reader = JobLogReader(log_path)
+        broadcast = self.get(name)
+        self._viewers.inc()
+        try:
+            while True:
+                data = broadcast.read(offset, _EVENT_BYTES) if broadcast is not None else None
+                if data is None:
+                    # 実行を終えている、またはバッファより前の位置はディスクから読む
+                    data = await asyncio.to_thread(reader.read_bytes, offset, _EVENT_BYTES)
+                    if not data:
+                        if broadcast is None:
+                            break
+                        # バッファより前でまだ flush されていない位置 (出力が一度に大量に書かれた直後)
+                        await asyncio.sleep(0.1)
+                        continue
+                if data:
+                    offset += len(data)
+                    text = decoder.decode(data)
+                    # 文字の途中で区切った分は次のイベントで送るため、イベント ID に含めない
+                    pending = len(decoder.getstate()[0])
+                    yield _event("output", text, event_id=offset - pending)
+                    continue
+                if broadcast.closed and offset >= broadcast.end:
+                    break
+                if not await broadcast.wait(offset, keepalive):
+                    yield ": keepalive\n\n"
+            tail = decoder.decode(b"", final=True)
+            if tail:
+                yield _event("output", tail, event_id=offset)
+            yield _event("end", {"offset": offset})
+        finally:
+            self._viewers.dec()
+
+
+def _event(event: str, data: object, event_id: Optional[int] = None) -> str:
+    """Server-Sent Events の 1 イベント。data は改行を含まないよう JSON にする。"""
+    lines = []
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    lines.append(f"event: {event}")
+    lines.append(f"data: {json.dumps(data, ensure_ascii=False)}")
+    return "\n".join(lines) + "\n\n"
@@ -0,0 +1,168 @@
+"""アプリケーション内メトリクスの簡易レジストリ。
+
+外部ライブラリに依存せず、カウンター・ゲージ・ヒストグラムをスレッドセーフに集計する。
+集計結果は `MetricsRegistry.snapshot()` で辞書として取得でき、API から公開される。
+"""
+from __future__ import annotations
+
+import bisect
+import threading
+from typing import Any, Dict, Optional, Sequence, Tuple
+
+DEFAULT_LATENCY_BUCKETS: Tuple[float, ...] = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1,
+    0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0, 1800.0,
+)
+"""秒単位のレイテンシ計測に使う既定のバケット境界。"""
+
+
+class Counter:
+    """単調増加するカウンター。"""
+
+    def __init__(self) -> None:
+        self._value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0) -> None:
+        with self._lock:
+            self._value += amount
+
+    @property
+    def value(self) -> float:
+        return self._value
+
+
+class Gauge:
+    """任意に増減する現在値。"""
+
+    def __init__(self) -> None:
+        self._value = 0.0
+        self._lock = threading.Lock()
+
+    def set(self, value: float) -> None:
+        with self._lock:
+            self._value = value
+
+    def inc(self, amount: float = 1.0) -> None:
+        with self._lock:
+            self._value += amount
+
+    def dec(self, amount: float = 1.0) -> None:
+        with self._lock:
+            self._value -= amount
+
+    @property
+    def value(self) -> float:
+        return self._value
+
+
+class Histogram:
+    """固定バケットのヒストグラム。
+
+    観測値は保持せず、バケットごとの件数と合計・最小・最大のみを保持するため
+    メモリ使用量は観測回数に依存しない。
+    """
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_LATENCY_BUCKETS) -> None:
+        self._bounds = tuple(sorted(buckets))
+        self._counts = [0] * (len(self._bounds) + 1)
+        self._count = 0
+        self._sum = 0.0
+        self._min: Optional[float] = None
+        self._max: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        index = bisect.bisect_left(self._bounds, value)
+        with self._lock:
+            self._counts[index] += 1
+            self._count += 1
+            self._sum += value
+            if self._min is None or value < self._min:
+                self._min = value
+            if self._max is None or value > self._max:
+                self._max = value
+
+    @property
+    def count(self) -> int:
+        return self._count
+
+    def quantile(self, q: float) -> Optional[float]:
+        """バケット境界から分位点の近似値（上限値）を返す。"""
+        with self._lock:
+            if self._count == 0:
+                return None
+            rank = q * self._count
+            cumulative = 0
+            for bound, count in zip(self._bounds, self._counts):
+                cumulative += count
+                if cumulative >= rank:
+                    return min(bound, self._max) if self._max is not None else bound
+            return self._max
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            count = self._count
+            total = self._sum
+            buckets = {
+                str(bound): c for bound, c in zip(self._bounds, self._counts)
+            }
+            buckets["+Inf"] = self._counts[-1]
+            minimum, maximum = self._min, self._max
+        return {
+            "count": count,
+            "sum": total,
+            "avg": total / count if count else None,
+            "min": minimum,
+            "max": maximum,
+            "p50": self.quantile(0.5),
+            "p95": self.quantile(0.95),
+            "p99": self.quantile(0.99),
+            "buckets": buckets,
+        }
+
+
+class MetricsRegistry:
+    """名前付きメトリクスを一元管理するレジストリ。
+
+    同じ名前で取得した場合は同一インスタンスを返すため、
+    呼び出し側はメトリクスを事前登録せずに `counter()` 等で都度取得してよい。
+    """
+
+    def __init__(self) -> None:
+        self._counters: Dict[str, Counter] = {}
+        self._gauges: Dict[str, Gauge] = {}
+        self._histograms: Dict[str, Histogram] = {}
+        self._lock = threading.Lock()
+
+    def counter(self, name: str) -> Counter:
+        with self._lock:
+            if name not in self._counters:
+                self._counters[name] = Counter()
+            return self._counters[name]
+
+    def gauge(self, name: str) -> Gauge:
+        with self._lock:
+            if name not in self._gauges:
+                self._gauges[name] = Gauge()
+            return self._gauges[name]
+
+    def histogram(
+        self, name: str, buckets: Sequence[float] = DEFAULT_LATENCY_BUCKETS
+    ) -> Histogram:
+        with self._lock:
+            if name not in self._histograms:
+                self._histograms[name] = Histogram(buckets)
+            return self._histograms[name]
+
+    def snapshot(self) -> Dict[str, Any]:
+        """全メトリクスの現在値を辞書で返す。"""
+        with self._lock:
+            counters = dict(self._counters)
+            gauges = dict(self._gauges)
+            histograms = dict(self._histograms)
+        return {
+            "counters": {name: c.value for name, c in sorted(counters.items())},
+            "gauges": {name: g.value for name, g in sorted(gauges.items())},
+            "histograms": {name: h.snapshot() for name, h in sorted(histograms.items())},
+        }
@@ -0,0 +1,161 @@
+"""リポジトリURLごとのローカルミラー管理。
+
+リポジトリごとに 1 つの bare ミラーを保持し、Webhook イベントごとに 1 回だけリモートから fetch する。
+各ジョブのワークスペースや CI 設定の読み込みはミラーからローカルに取得するため、
+同じプッシュに対するリモートからの転送は 1 回で済む。
+
+ワークスペースは alternates でミラーのオブジェクトを参照するため、
+ミラー側では到達不能オブジェクトの prune を無効化している。
+アクセストークンは fetch のたびに URL に付けて渡し、ミラーの remote.origin.url には保存しない。
+"""
+import hashlib
+import logging
+import os
+import re
+import shutil
+import threading
+import time
+from typing import Dict, Optional
+
+from git import Repo
+from git.exc import GitCommandError, InvalidGitRepositoryError, NoSuchPathError
+
+from .exceptions import RepositoryError
+from .metrics import MetricsRegistry
+from .vcs_utils import inject_auth_token, mask_auth_token, normalize_repo_url
+from .workspace_manager import WorkspaceManager
+
+logger = logging.getLogger(__name__)
+
+_MIRROR_FETCH_REFSPECS = ("+refs/heads/*:refs/heads/*", "+refs/tags/*:refs/tags/*")
+"""ミラーが追従する ref。プルリクエスト等の ref は取得しない。"""
+
+
+class MirrorStore:
+    """リポジトリURLごとの bare ミラーを管理する。"""
+
+    def __init__(
+        self,
+        base_dir: str = "./mirrors",
+        access_token: Optional[str] = None,
+        metrics: Optional[MetricsRegistry] = None,
+    ) -> None:
+        self.base_dir = os.path.abspath(base_dir)
+        self.access_token = access_token
+        self._locks: Dict[str, threading.Lock] = {}
+        self._locks_guard = threading.Lock()
+
+        metrics = metrics or MetricsRegistry()
+        self._fetches = metrics.counter("mirror_fetch_total")
+        self._skipped = metrics.counter("mirror_fetch_skipped_total")
+        self._fetch_seconds = metrics.histogram("mirror_fetch_seconds")
+
+    def mirror_path(self, repo_url: str) -> str:
+        """リポジトリURLに対応するミラーのパスを返す。"""
+        normalized = normalize_repo_url(repo_url)
+        readable = re.sub(r"[^A-Za-z0-9._-]+", "_", normalized).strip("_")[-80:]
+        digest = hashlib.sha1(normalized.encode("utf-8")).hexdigest()[:10]
+        return os.path.join(self.base_dir, f"{readable}-{digest}.git")
+
+    def ensure_mirror(self, repo_url: str, commit: Optional[str] = None, branch: Optional[str] = None) -> str:
+        """ミラーを最新化してパスを返す。
+
+        commit が指定され、既にミラーに存在する場合は fetch を省略する。
+        branch も指定された場合は、ミラーのそのブランチが commit を指しているときだけ省略する
+        (既存のコミットのプッシュや fast-forward マージでは、コミットがあってもブランチが古いままのため)。
+        同じリポジトリへの同時呼び出しは直列化されるため、同一イベントに対する fetch は 1 回になる。
+
+        Raises:
+            RepositoryError: ミラーの作成または更新に失敗した場合
+        """
+        path = self.mirror_path(repo_url)
+        with self._get_lock(path):
+            try:
+                repo = self._open_mirror(path)
+                if repo is None:
+                    self._create_mirror(repo_url, path)
+                    return path
+                try:
+                    if commit and self._is_up_to_date(repo, commit, branch):
+                        self._skipped.inc()
+                        logger.debug(f"ミラーにコミット {commit} が存在するため fetch を省略します: {path}")
+                        return path
+                    self._fetch(repo, repo_url, path)
+                finally:
+                    repo.close()
+            except GitCommandError as e:
+                token = self.access_token or ""
+                raise RepositoryError(
+                    f"ミラーの更新に失敗しました ({mask_auth_token(repo_url, token)}): {mask_auth_token(str(e), token)}"
+                ) from e
+        return path
+
+    # --- プライベートメソッド ---
+
+    def _get_lock(self, path: str) -> threading.Lock:
+        with self._locks_guard:
+            if path not in self._locks:
+                self._locks[path] = threading.Lock()
+            return self._locks[path]
+
+    def _open_mirror(self, path: str) -> Optional[Repo]:
+        """既存ミラーを開く。存在しない・壊れている場合は None (壊れたものは削除する)。"""
+        if not os.path.exists(path):
+            return None
+        try:
+            return Repo(path)
+        except (InvalidGitRepositoryError, NoSuchPathError):
+            logger.warning(f"ミラーが壊れているため作り直します: {path}")
+            shutil.rmtree(path, onexc=WorkspaceManager.remove_readonly)
+            return None
+
+    def _create_mirror(self, repo_url: str, path: str) -> None:
+        """一時ディレクトリに bare クローンを作成し、完成後にリネームする。"""
+        os.makedirs(self.base_dir, exist_ok=True)
+        tmp_path = f"{path}.tmp-{os.getpid()}-{threading.get_ident()}"
+        if os.path.exists(tmp_path):
+            shutil.rmtree(tmp_path, onexc=WorkspaceManager.remove_readonly)
+
+        logger.info(f"ミラーを作成しています: {mask_auth_token(repo_url, self.access_token or '')} -> {path}")
+        started = time.monotonic()
+        auth_url = inject_auth_token(repo_url, self.access_token or "")
+        repo = Repo.clone_from(auth_url, tmp_path, bare=True)
+        try:
+            # トークンをミラーの設定に残さない
+            repo.git.remote("set-url", "origin", repo_url)
+            with repo.config_writer() as cw:
+                # ワークスペースが alternates で参照するオブジェクトを消さない
+                cw.set_value("gc", "auto", "0")
+                cw.set_value("gc", "pruneExpire", "never")
+            repo.git.config("--unset-all", "remote.origin.fetch", with_exceptions=False)
+            for refspec in _MIRROR_FETCH_REFSPECS:
+                repo.git.config("--add", "remote.origin.fetch", refspec)
+        finally:
+            repo.close()
+        os.replace(tmp_path, path)
+        self._fetches.inc()
+        self._fetch_seconds.observe(time.monotonic() - started)
+
+    def _fetch(self, repo: Repo, repo_url: str, path: str) -> None:
+        logger.info(f"ミラーを更新しています: {path}")
+        started = time.monotonic()
+        # 以前のバージョンで保存されたトークン付きの URL を置き換える
+        repo.git.remote("set-url", "origin", repo_url)
+        auth_url = inject_auth_token(repo_url, self.access_token or "")
+        repo.git.fetch("--prune", auth_url, *_MIRROR_FETCH_REFSPECS)
+        self._fetches.inc()
+        self._fetch_seconds.observe(time.monotonic() - started)
+
+    def _is_up_to_date(self, repo: Repo, commit: str, branch: Optional[str]) -> bool:
+        if branch is None:
+            return self._has_commit(repo, commit)
+        tip = repo.git.rev_parse("--verify", "--quiet", f"refs/heads/{branch}^{{commit}}", with_exceptions=False)
+        return bool(tip) and tip.lower().startswith(commit.lower())
+
+    def _has_commit(self, repo: Repo, commit: str) -> bool:
+        try:
+            repo.git.cat_file("-e", f"{commit}^{{commit}}")
+            return True
+        except GitCommandError:
+            return False
+
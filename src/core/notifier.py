@@ -1,6 +1,6 @@
 """通知機能モジュール。
 
-ジョブの成功・失敗イベントを外部サービス（Discord等）に通知する。
+ジョブの成功・失敗・取り消しイベントを外部サービス（Discord等）に通知する。
 """
 from __future__ import annotations
 
@@ -12,9 +12,16 @@ import json
 
 logger = logging.getLogger(__name__)
 
+_DISCORD_OUTPUT_MAX_CHARS = 1500
+"""Discord の通知に載せる出力の末尾の最大文字数 (embed の description は 4096 文字まで)。"""
+
 
 class NotificationEvent:
-    """通知イベントのデータクラス。"""
+    """通知イベントのデータクラス。
+
+    cancelled が True の場合、ジョブは失敗ではなく取り消し (新しいコミットによる置き換え等) として扱う。
+    失敗時はスクリプトの出力の末尾 (output_tail) とジョブログのパス (log_path) を渡す。
+    """
 
     def __init__(
         self,
@@ -24,6 +31,9 @@ class NotificationEvent:
         commit_hash: str,
         commit_message: Optional[str] = None,
         error_message: Optional[str] = None,
+        cancelled: bool = False,
+        log_path: Optional[str] = None,
+        output_tail: Optional[str] = None,
     ) -> None:
         self.job_name = job_name
         self.success = success
@@ -31,6 +41,9 @@ class NotificationEvent:
         self.commit_hash = commit_hash
         self.commit_message = commit_message
         self.error_message = error_message
+        self.cancelled = cancelled
+        self.log_path = log_path
+        self.output_tail = output_tail
 
 
 class Notifier(ABC):
@@ -40,7 +53,9 @@ class Notifier(ABC):
     def notify(self, event: NotificationEvent) -> None:
         """通知を送信する。"""
 
-    def _should_notify(self, event: NotificationEvent, on_success: bool, on_failure: bool) -> bool:
+    def _should_notify(self, event: NotificationEvent, on_success: bool, on_failure: bool, on_cancelled: bool = True) -> bool:
+        if event.cancelled:
+            return on_cancelled
         if event.success:
             return on_success
         return on_failure
@@ -54,22 +69,27 @@ class DiscordNotifier(Notifier):
         webhook_url: str,
         on_success: bool = True,
         on_failure: bool = True,
+        on_cancelled: bool = True,
     ) -> None:
         self._webhook_url = webhook_url
         self._on_success = on_success
         self._on_failure = on_failure
+        self._on_cancelled = on_cancelled
 
     def notify(self, event: NotificationEvent) -> None:
-        if not self._should_notify(event, self._on_success, self._on_failure):
+        if not self._should_notify(event, self._on_success, self._on_failure, self._on_cancelled):
             return
 
         payload = self._build_payload(event)
         self._post(payload)
 
     def _build_payload(self, event: NotificationEvent) -> Dict[str, Any]:
-        status_emoji = "✅" if event.success else "❌"
-        status_label = "Success" if event.success else "Failure"
-        color = 0x2ECC71 if event.success else 0xE74C3C  # green / red
+        if event.cancelled:
+            status_emoji, status_label, color = "⏹️", "Cancelled", 0x95A5A6  # gray
+        elif event.success:
+            status_emoji, status_label, color = "✅", "Success", 0x2ECC71  # green
+        else:
+            status_emoji, status_label, color = "❌", "Failure", 0xE74C3C  # red
 
         short_hash = event.commit_hash[:8] if event.commit_hash else "unknown"
         description_lines = [
@@ -78,8 +98,15 @@ class DiscordNotifier(Notifier):
         ]
         if event.commit_message:
             description_lines.append(f"**Message:** {event.commit_message}")
-        if not event.success and event.error_message:
+        if event.cancelled and event.error_message:
+            description_lines.append(f"**Reason:** {event.error_message}")
+        elif not event.success and event.error_message:
             description_lines.append(f"**Error:** {event.error_message}")
+        if event.log_path:
+            description_lines.append(f"**Log:** `{event.log_path}`")
+        if not event.success and not event.cancelled and event.output_tail:
+            output = event.output_tail[-_DISCORD_OUTPUT_MAX_CHARS:].replace("```", "`\u200b``")
+            description_lines.append(f"**Output:**\n```\n{output.rstrip()}\n```")
 
         embed = {
             "title": f"{status_emoji} [{event.job_name}] {status_label}",
@@ -145,6 +172,7 @@ def build_notifier(notifications_config: Optional[Dict[str, Any]]) -> Notifier:
                     webhook_url=webhook_url,
                     on_success=bool(discord_cfg.get("on_success", True)),
                     on_failure=bool(discord_cfg.get("on_failure", True)),
+                    on_cancelled=bool(discord_cfg.get("on_cancelled", True)),
                 )
             )
         else:
@@ -0,0 +1,152 @@
+"""リポジトリ CI 設定 (.toyci.yaml) の読み込み結果キャッシュ。
+
+(リポジトリURL, コミットSHA) をキーに `RepoCISettings` を LRU + TTL で保持する。
+設定ファイルが存在しない・解析に失敗したといった「設定なし」の結果も、
+短い TTL でネガティブキャッシュとして保持する。
+同一キーへの同時読み込みは 1 回のロードに集約される (single-flight)。
+"""
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Hashable, Optional, Union
+
+from .config import RepoCISettings
+from .metrics import MetricsRegistry
+
+logger = logging.getLogger(__name__)
+
+
+class Uncached:
+    """キャッシュせずに呼び出し元へ返す読み込み結果 (loader の戻り値として使う)。"""
+
+    def __init__(self, value: Optional[RepoCISettings]) -> None:
+        self.value = value
+
+
+class _CacheEntry:
+    """キャッシュされた読み込み結果。"""
+
+    def __init__(self, value: Optional[RepoCISettings], expires_at: float) -> None:
+        self.value = value
+        self.expires_at = expires_at
+
+
+class _InFlightLoad:
+    """実行中のロード。後続の呼び出しはこの完了を待つ。"""
+
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.value: Optional[RepoCISettings] = None
+        self.error: Optional[BaseException] = None
+
+
+class RepoCIConfigCache:
+    """`RepoCISettings` の LRU/TTL キャッシュ。"""
+
+    def __init__(
+        self,
+        max_entries: int = 256,
+        ttl_seconds: float = 3600.0,
+        negative_ttl_seconds: float = 300.0,
+        metrics: Optional[MetricsRegistry] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        """
+        Args:
+            max_entries: 保持する最大エントリ数 (超過時は最も古く使われたものから破棄)
+            ttl_seconds: 設定が読み込めた結果の有効期間
+            negative_ttl_seconds: 「設定なし」の結果の有効期間
+            metrics: メトリクスレジストリ (省略時は専用のレジストリを作成)
+            clock: 現在時刻を返す関数 (テスト用)
+        """
+        self._max_entries = max_entries
+        self._ttl = ttl_seconds
+        self._negative_ttl = negative_ttl_seconds
+        self._clock = clock
+        self._entries: "OrderedDict[Hashable, _CacheEntry]" = OrderedDict()
+        self._in_flight: Dict[Hashable, _InFlightLoad] = {}
+        self._lock = threading.Lock()
+
+        metrics = metrics or MetricsRegistry()
+        self._hits = metrics.counter("repo_ci_config_cache_hits_total")
+        self._misses = metrics.counter("repo_ci_config_cache_misses_total")
+        self._coalesced = metrics.counter("repo_ci_config_cache_coalesced_total")
+        self._evictions = metrics.counter("repo_ci_config_cache_evictions_total")
+        self._size = metrics.gauge("repo_ci_config_cache_entries")
+
+    def get_or_load(
+        self, key: Hashable, loader: Callable[[], Union[Optional[RepoCISettings], Uncached]]
+    ) -> Optional[RepoCISettings]:
+        """キャッシュから値を返す。なければ loader を呼び出して結果を保持する。
+
+        loader が例外を送出した場合はキャッシュせず、待機中の呼び出し元にも同じ例外を送出する。
+        loader が `Uncached` を返した場合は、その値を (待機中の呼び出し元にも) 返すがキャッシュしない。
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry.expires_at > self._clock():
+                    self._entries.move_to_end(key)
+                    self._hits.inc()
+                    return entry.value
+                del self._entries[key]
+
+            flight = self._in_flight.get(key)
+            is_leader = flight is None
+            if is_leader:
+                flight = _InFlightLoad()
+                self._in_flight[key] = flight
+            else:
+                self._coalesced.inc()
+
+        if not is_leader:
+            logger.debug(f"CI 設定の読み込みを実行中のロードに集約します: {key}")
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.value
+
+        self._misses.inc()
+        try:
+            value = loader()
+        except BaseException as e:
+            flight.error = e
+            raise
+        else:
+            if isinstance(value, Uncached):
+                flight.value = value.value
+                return value.value
+            flight.value = value
+            self._store(key, value)
+            return value
+        finally:
+            with self._lock:
+                self._in_flight.pop(key, None)
+            flight.done.set()
+
+    def invalidate(self, key: Optional[Hashable] = None) -> None:
+        """指定キー (省略時は全エントリ) を破棄する。"""
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+            self._size.set(len(self._entries))
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _store(self, key: Hashable, value: Optional[RepoCISettings]) -> None:
+        ttl = self._ttl if value is not None else self._negative_ttl
+        if ttl <= 0:
+            return
+        with self._lock:
+            self._entries[key] = _CacheEntry(value, self._clock() + ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._max_entries:
+                self._entries.popitem(last=False)
+                self._evictions.inc()
+            self._size.set(len(self._entries))
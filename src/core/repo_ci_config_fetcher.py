@@ -0,0 +1,181 @@
+"""リポジトリから CI 設定ファイルの内容だけを取り出す取得戦略。
+
+`RepoCIConfigLoader` は設定ファイルの「内容」だけを必要とするため、
+作業ツリー全体を展開する必要はない。取得方法は設定で選択できる。
+
+* ``clone``: 従来通りリポジトリ全体をクローンしてファイルを読む
+* ``partial``: 空のリポジトリに対象コミットだけを深さ 1・blob なしで fetch し、
+  ``git show`` で設定ファイルの blob のみを遅延取得する
+* ``mirror``: ローカルミラーを最新化し、ミラーから ``git show`` で読み出す
+"""
+
+import logging
+import os
+import tempfile
+from abc import ABC, abstractmethod
+from typing import Optional
+
+from git import Repo
+from git.exc import GitCommandError
+
+from .mirror_store import MirrorStore
+from .vcs_handler import GitHandler
+from .vcs_utils import inject_auth_token
+
+logger = logging.getLogger(__name__)
+
+
+class FetchedFile:
+    """取得したファイルの内容と、実際に読み出したコミット。
+
+    Attributes:
+        content: ファイルの内容 (ファイルが存在しない場合は None)
+        revision: 読み出したコミットの SHA。指定したコミットを取得できずブランチ先頭を読んだ場合は
+            指定と異なる値になる (不明な場合は None)
+    """
+
+    def __init__(self, content: Optional[str], revision: Optional[str]) -> None:
+        self.content = content
+        self.revision = revision
+
+
+class RepoCIConfigFetcher(ABC):
+    """リポジトリ内の 1 ファイルの内容を取得する戦略の基底クラス。"""
+
+    @abstractmethod
+    def fetch_file(
+        self,
+        repo_url: str,
+        branch: str,
+        path: str,
+        commit: Optional[str] = None,
+        access_token: Optional[str] = None,
+    ) -> FetchedFile:
+        """ファイルの内容と、読み出したコミットを返す。
+
+        commit を取得できない場合はブランチ先頭から読むため、revision が commit と異なることがある。
+
+        Raises:
+            Exception: Git 操作に失敗した場合 (一時的なエラーとして扱われる)
+        """
+
+
+class CloneConfigFetcher(RepoCIConfigFetcher):
+    """リポジトリ全体を一時ディレクトリにクローンしてファイルを読む。"""
+
+    def fetch_file(
+        self,
+        repo_url: str,
+        branch: str,
+        path: str,
+        commit: Optional[str] = None,
+        access_token: Optional[str] = None,
+    ) -> FetchedFile:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            handler = GitHandler(tmp_dir)
+            try:
+                handler.prepare_repository(repo_url, branch, access_token)
+                # クローンは常にブランチ先頭を読む
+                revision = handler.repo.head.commit.hexsha
+                file_path = os.path.join(tmp_dir, path)
+                if not os.path.exists(file_path):
+                    return FetchedFile(None, revision)
+                with open(file_path, "r", encoding="utf-8") as f:
+                    return FetchedFile(f.read(), revision)
+            finally:
+                handler.close()
+
+
+class PartialFetchConfigFetcher(RepoCIConfigFetcher):
+    """対象コミットのツリーだけを取得し、設定ファイルの blob のみを読み出す。
+
+    ``--depth=1 --filter=blob:none`` で fetch するため、履歴や他のファイルの内容は転送されない。
+    サーバーがフィルタに対応していない場合も git はフィルタを無視して深さ 1 で取得するため動作する。
+    """
+
+    def fetch_file(
+        self,
+        repo_url: str,
+        branch: str,
+        path: str,
+        commit: Optional[str] = None,
+        access_token: Optional[str] = None,
+    ) -> FetchedFile:
+        auth_url = inject_auth_token(repo_url, access_token or "")
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            repo = Repo.init(tmp_dir)
+            try:
+                repo.create_remote("origin", auth_url)
+                self._fetch_tip(repo, branch, commit)
+                revision = repo.git.rev_parse("FETCH_HEAD")
+                listing = repo.git.ls_tree("FETCH_HEAD", "--", path)
+                if not listing:
+                    return FetchedFile(None, revision)
+                return FetchedFile(repo.git.show(f"FETCH_HEAD:{path}"), revision)
+            finally:
+                repo.close()
+
+    def _fetch_tip(self, repo: Repo, branch: str, commit: Optional[str]) -> None:
+        """コミット SHA を優先して fetch し、サーバーが許可しない場合はブランチ先頭を取得する。"""
+        if commit:
+            try:
+                repo.git.fetch("--depth=1", "--filter=blob:none", "origin", commit)
+                return
+            except GitCommandError as e:
+                logger.debug(
+                    f"コミット {commit} を直接取得できませんでした。ブランチ {branch} を取得します: {e}"
+                )
+        repo.git.fetch("--depth=1", "--filter=blob:none", "origin", f"refs/heads/{branch}")
+
+
+class MirrorConfigFetcher(RepoCIConfigFetcher):
+    """ローカルミラーからファイルを読み出す。
+
+    ミラーの fetch はコミット単位で 1 回に抑えられるため、後続のジョブのクローンもミラーから行われる。
+    """
+
+    def __init__(self, mirror_store: MirrorStore) -> None:
+        self.mirror_store = mirror_store
+
+    def fetch_file(
+        self,
+        repo_url: str,
+        branch: str,
+        path: str,
+        commit: Optional[str] = None,
+        access_token: Optional[str] = None,
+    ) -> FetchedFile:
+        mirror_path = self.mirror_store.ensure_mirror(repo_url, commit=commit)
+        repo = Repo(mirror_path)
+        try:
+            rev = self._resolve_revision(repo, branch, commit)
+            revision = repo.git.rev_parse(f"{rev}^{{commit}}")
+            listing = repo.git.ls_tree(rev, "--", path)
+            if not listing:
+                return FetchedFile(None, revision)
+            return FetchedFile(repo.git.show(f"{rev}:{path}"), revision)
+        finally:
+            repo.close()
+
+    def _resolve_revision(self, repo: Repo, branch: str, commit: Optional[str]) -> str:
+        """コミットがミラーに存在すればそれを、なければブランチ先頭を返す。"""
+        if commit:
+            try:
+                repo.git.cat_file("-e", f"{commit}^{{commit}}")
+                return commit
+            except GitCommandError:
+                logger.debug(f"ミラーにコミット {commit} がありません。ブランチ {branch} を使用します。")
+        return f"refs/heads/{branch}"
+
+
+def build_config_fetcher(strategy: str, mirror_store: Optional[MirrorStore] = None) -> RepoCIConfigFetcher:
+    """設定値から取得戦略を生成する。"""
+    if strategy == "clone":
+        return CloneConfigFetcher()
+    if strategy == "partial":
+        return PartialFetchConfigFetcher()
+    if strategy == "mirror":
+        if mirror_store is None:
+            raise ValueError("mirror 戦略にはミラーストアが必要です")
+        return MirrorConfigFetcher(mirror_store)
+    raise ValueError(f"未知の CI 設定取得戦略です: {strategy}")
@@ -2,13 +2,14 @@
 
 import logging
 import os
-import tempfile
-from typing import Optional
+from typing import Optional, Tuple, Union
 
 import yaml
 
 from .config import RepoCISettings
-from .vcs_handler import GitHandler
+from .repo_ci_config_cache import RepoCIConfigCache, Uncached
+from .repo_ci_config_fetcher import RepoCIConfigFetcher, CloneConfigFetcher
+from .vcs_utils import normalize_repo_url
 
 logger = logging.getLogger(__name__)
 
@@ -16,30 +17,71 @@ REPO_CI_CONFIG_FILE = ".toyci.yaml"
 
 
 class RepoCIConfigLoader:
-    """リポジトリをシャロークローンして .toyci.yaml を読み込む。"""
+    """リポジトリから .toyci.yaml を取得して読み込む。"""
 
-    def __init__(self, access_token: Optional[str] = None):
+    def __init__(
+        self,
+        access_token: Optional[str] = None,
+        cache: Optional[RepoCIConfigCache] = None,
+        fetcher: Optional[RepoCIConfigFetcher] = None,
+    ):
+        """
+        Args:
+            access_token: リポジトリへのアクセストークン
+            cache: 読み込み結果のキャッシュ (省略時はキャッシュしない)
+            fetcher: 設定ファイルの取得戦略 (省略時はリポジトリ全体をクローンする)
+        """
         self.access_token = access_token
+        self._cache = cache
+        self._fetcher = fetcher or CloneConfigFetcher()
 
-    def load_from_repo(self, repo_url: str, branch: str) -> Optional[RepoCISettings]:
-        """リポジトリをクローンし、CI 設定ファイルを読み込んで返す。
+    def load_from_repo(
+        self, repo_url: str, branch: str, commit: Optional[str] = None
+    ) -> Optional[RepoCISettings]:
+        """リポジトリから CI 設定ファイルを取得し、読み込んで返す。
 
-        クローンは一時ディレクトリに行い、読み込み後に自動削除される。
+        取得方法は fetcher によって決まり、一時ディレクトリは読み込み後に自動削除される。
         設定ファイルが存在しない場合や読み込みに失敗した場合は None を返す。
+        commit が指定され、キャッシュが有効な場合は (リポジトリ, コミット) 単位で結果を再利用する。
+        commit を取得できずブランチ先頭を読んだ場合は、別のコミットの設定のためキャッシュしない。
+        """
+        try:
+            if self._cache is not None and commit:
+                key = (normalize_repo_url(repo_url), commit)
+                return self._cache.get_or_load(key, lambda: self._load_commit(repo_url, branch, commit))
+            return self._fetch_settings(repo_url, branch, commit)[0]
+        except Exception as e:
+            logger.warning(
+                f"リポジトリからの CI 設定読み込みに失敗しました"
+                f" ({repo_url}@{branch}): {e}"
+            )
+            return None
+
+    def _load_commit(self, repo_url: str, branch: str, commit: str) -> Union[Optional[RepoCISettings], Uncached]:
+        """キャッシュのロード関数。読み出したコミットが commit と異なる場合は `Uncached` で返す。"""
+        settings, revision = self._fetch_settings(repo_url, branch, commit)
+        if not _same_commit(revision, commit):
+            logger.debug(
+                f"コミット {commit} の代わりに {revision} の CI 設定を読み込んだため、キャッシュしません"
+                f" ({repo_url}@{branch})"
+            )
+            return Uncached(settings)
+        return settings
+
+    def _fetch_settings(
+        self, repo_url: str, branch: str, commit: Optional[str] = None
+    ) -> Tuple[Optional[RepoCISettings], Optional[str]]:
+        """リポジトリから設定ファイルを取得して読み込み、(設定, 読み出したコミット) を返す。
+
+        Git 操作の失敗は一時的なものとして例外を送出し、キャッシュ対象にしない。
         """
-        with tempfile.TemporaryDirectory() as tmp_dir:
-            handler = GitHandler(tmp_dir)
-            try:
-                handler.prepare_repository(repo_url, branch, self.access_token)
-                return self.load_from_path(tmp_dir)
-            except Exception as e:
-                logger.warning(
-                    f"リポジトリからの CI 設定読み込みに失敗しました"
-                    f" ({repo_url}@{branch}): {e}"
-                )
-                return None
-            finally:
-                handler.close()
+        fetched = self._fetcher.fetch_file(
+            repo_url, branch, REPO_CI_CONFIG_FILE, commit=commit, access_token=self.access_token
+        )
+        if fetched.content is None:
+            logger.debug(f"リポジトリに CI 設定ファイルがありません: {repo_url}@{branch}")
+            return None, fetched.revision
+        return self.load_from_text(fetched.content, source=f"{repo_url}@{branch}"), fetched.revision
 
     def load_from_path(self, repo_path: str) -> Optional[RepoCISettings]:
         """クローン済みディレクトリから .toyci.yaml を読み込んで返す。"""
@@ -50,7 +92,16 @@ class RepoCIConfigLoader:
 
         try:
             with open(config_path, "r", encoding="utf-8") as f:
-                data = yaml.safe_load(f) or {}
+                content = f.read()
+        except (OSError, UnicodeDecodeError) as e:
+            logger.warning(f"CI 設定ファイルの読み込みに失敗しました ({config_path}): {e}")
+            return None
+        return self.load_from_text(content, source=config_path)
+
+    def load_from_text(self, content: str, source: str = REPO_CI_CONFIG_FILE) -> Optional[RepoCISettings]:
+        """.toyci.yaml の内容を解析して返す。解析に失敗した場合は None を返す。"""
+        try:
+            data = yaml.safe_load(content) or {}
             settings = RepoCISettings(**data)
             logger.info(
                 f"リポジトリの CI 設定を読み込みました: {REPO_CI_CONFIG_FILE}"
@@ -58,5 +109,10 @@ class RepoCIConfigLoader:
             )
             return settings
         except Exception as e:
-            logger.warning(f"CI 設定ファイルの解析に失敗しました ({config_path}): {e}")
+            logger.warning(f"CI 設定ファイルの解析に失敗しました ({source}): {e}")
             return None
+
+
+def _same_commit(revision: Optional[str], commit: str) -> bool:
+    """読み出したコミット (完全な SHA) が指定のコミット (省略形を含む) と一致するか。"""
+    return revision is not None and revision.lower().startswith(commit.lower())
@@ -0,0 +1,148 @@
+"""ホストのリソース (CPU スロット・メモリ・排他タグ) の割り当て。
+
+ジョブは設定の ``resources`` で必要な CPU スロット数・メモリ量・排他タグを宣言する。
+ジョブキューは要求が空き容量に収まるジョブだけを取り出すため、軽いジョブは重いジョブと並行して実行され、
+重いジョブは容量が空くまでキューで待機する。
+"""
+import os
+import threading
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+
+class ResourceRequest:
+    """1 ジョブが実行中に占有するリソース。
+
+    Attributes:
+        cpu: CPU スロット数
+        memory_mb: メモリ量 (MB)
+        tags: 排他タグ。同じタグを持つジョブの同時実行数はタグごとの上限 (既定 1) までに制限される。
+    """
+
+    def __init__(self, cpu: int = 1, memory_mb: int = 0, tags: Iterable[str] = ()) -> None:
+        self.cpu = cpu
+        self.memory_mb = memory_mb
+        self.tags: Tuple[str, ...] = tuple(dict.fromkeys(tags))
+
+    @classmethod
+    def from_job_config(cls, job_config: Dict[str, Any]) -> "ResourceRequest":
+        resources = job_config.get("resources") or {}
+        return cls(
+            cpu=int(resources.get("cpu", 1)),
+            memory_mb=int(resources.get("memory_mb", 0)),
+            tags=resources.get("tags") or (),
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"cpu": self.cpu, "memory_mb": self.memory_mb, "tags": list(self.tags)}
+
+
+class ResourcePool:
+    """ホストのリソース容量と実行中のジョブへの割り当てを管理する。"""
+
+    def __init__(
+        self,
+        cpu_slots: int,
+        memory_mb: Optional[int] = None,
+        tag_limits: Optional[Dict[str, int]] = None,
+    ) -> None:
+        """
+        Args:
+            cpu_slots: CPU スロットの総数
+            memory_mb: メモリの総量 (MB)。None の場合はメモリを制限しない。
+            tag_limits: タグごとの同時実行数の上限 (省略したタグは 1)
+        """
+        if cpu_slots < 1:
+            raise ValueError(f"cpu_slots は 1 以上を指定してください: {cpu_slots}")
+        self.cpu_slots = cpu_slots
+        self.memory_mb = memory_mb
+        self._tag_limits = dict(tag_limits or {})
+        self._lock = threading.Lock()
+        self._allocations: Dict[str, Tuple[str, ResourceRequest]] = {}
+        self._cpu_used = 0
+        self._memory_used = 0
+        self._tags_used: Dict[str, int] = {}
+
+    def exceeds_capacity(self, request: ResourceRequest) -> bool:
+        return request.cpu > self.cpu_slots or (self.memory_mb is not None and request.memory_mb > self.memory_mb)
+
+    def request_for(self, job_config: Dict[str, Any]) -> ResourceRequest:
+        """ジョブ設定の要求を返す。容量を超える要求は容量に切り詰める (他のジョブがない時に単独で実行される)。"""
+        request = ResourceRequest.from_job_config(job_config)
+        if self.exceeds_capacity(request):
+            request = ResourceRequest(
+                cpu=min(request.cpu, self.cpu_slots),
+                memory_mb=request.memory_mb if self.memory_mb is None else min(request.memory_mb, self.memory_mb),
+                tags=request.tags,
+            )
+        return request
+
+    def fits(self, request: ResourceRequest, reserved: Optional[ResourceRequest] = None) -> bool:
+        """要求が空き容量に収まるか。reserved は先に実行を待っているジョブのために確保しておく量。"""
+        with self._lock:
+            return self._tags_available(request) and self._capacity_available(request, reserved)
+
+    def tags_available(self, request: ResourceRequest) -> bool:
+        """要求の排他タグが全て空いているか。"""
+        with self._lock:
+            return self._tags_available(request)
+
+    def allocate(self, job_id: str, job_name: str, request: ResourceRequest) -> None:
+        with self._lock:
+            self._allocations[job_id] = (job_name, request)
+            self._cpu_used += request.cpu
+            self._memory_used += request.memory_mb
+            for tag in request.tags:
+                self._tags_used[tag] = self._tags_used.get(tag, 0) + 1
+
+    def release(self, job_id: str) -> None:
+        with self._lock:
+            allocation = self._allocations.pop(job_id, None)
+            if allocation is None:
+                return
+            request = allocation[1]
+            self._cpu_used -= request.cpu
+            self._memory_used -= request.memory_mb
+            for tag in request.tags:
+                remaining = self._tags_used.get(tag, 0) - 1
+                if remaining > 0:
+                    self._tags_used[tag] = remaining
+                else:
+                    self._tags_used.pop(tag, None)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """容量・使用量・ジョブごとの割り当て。"""
+        with self._lock:
+            return {
+                "capacity": {"cpu": self.cpu_slots, "memory_mb": self.memory_mb, "tag_limits": dict(self._tag_limits)},
+                "allocated": {"cpu": self._cpu_used, "memory_mb": self._memory_used, "tags": dict(self._tags_used)},
+                "jobs": [
+                    {"job_id": job_id, "job_name": job_name, **request.to_dict()}
+                    for job_id, (job_name, request) in self._allocations.items()
+                ],
+            }
+
+    # --- プライベートメソッド ---
+
+    def _tags_available(self, request: ResourceRequest) -> bool:
+        return all(self._tags_used.get(tag, 0) < self._tag_limits.get(tag, 1) for tag in request.tags)
+
+    def _capacity_available(self, request: ResourceRequest, reserved: Optional[ResourceRequest]) -> bool:
+        reserved_cpu = reserved.cpu if reserved else 0
+        if self._cpu_used + reserved_cpu + request.cpu > self.cpu_slots:
+            return False
+        if self.memory_mb is not None:
+            reserved_memory = reserved.memory_mb if reserved else 0
+            if self._memory_used + reserved_memory + request.memory_mb > self.memory_mb:
+                return False
+        return True
+
+
+def build_resource_pool(resources_config: Any) -> Optional[ResourcePool]:
+    """設定値からリソースプールを生成する。設定がない場合は None (同時実行数のみで制御する)。"""
+    if resources_config is None:
+        return None
+    return ResourcePool(
+        cpu_slots=resources_config.cpu_slots or os.cpu_count() or 1,
+        memory_mb=resources_config.memory_mb,
+        tag_limits=resources_config.tag_limits,
+    )
@@ -1,11 +1,12 @@
 import logging
-from typing import Optional
+from typing import List, Optional
 
 from git import Repo
+from git.exc import GitCommandError, InvalidGitRepositoryError, NoSuchPathError
 
-from .interfaces import IVcsHandler
-from .vcs_utils import inject_auth_token, mask_auth_token
-from .exceptions import RepositoryNotInitializedError
+from .interfaces import IVcsHandler, CheckoutOptions
+from .vcs_utils import inject_auth_token, mask_auth_token, normalize_repo_url
+from .exceptions import RepositoryError, RepositoryNotInitializedError
 
 logger = logging.getLogger(__name__)
 
@@ -17,12 +18,66 @@ class GitHandler(IVcsHandler):
         self.access_token: Optional[str] = None
         self.original_url: Optional[str] = None
 
-    def prepare_repository(self, url: str, branch: str, access_token: Optional[str] = None) -> None:
+    def prepare_repository(self, url: str, branch: str, access_token: Optional[str] = None, options: Optional[CheckoutOptions] = None) -> None:
         """リポジトリをクローンし、指定ブランチをチェックアウトする。"""
+        options = options or CheckoutOptions()
         self._store_credentials(url, access_token)
-        self._clone_repository(url, access_token)
+        if options.reference:
+            self._clone_from_reference(url, options.reference, sparse=options.sparse_paths is not None)
+        else:
+            self._clone_repository(url, access_token, branch=branch, options=options)
+        self._apply_sparse_checkout(options.sparse_paths)
         self._set_authenticated_remote_url()
-        self._checkout_branch(branch)
+        # ミラーからのクローンは全ブランチを取得済みのため、リモートへの fetch は不要
+        self._checkout_branch(branch, fetch=not options.reference)
+        self._checkout_commit(branch, options)
+
+    def update_repository(self, url: str, branch: str, access_token: Optional[str] = None, options: Optional[CheckoutOptions] = None) -> None:
+        """既存のクローンを再利用し、リモートの最新状態に揃える。
+
+        fetch → 対象ブランチへの hard reset → トリガーコミットのチェックアウト (prepare_repository と同じ扱い)
+        → 未追跡ファイルの削除を行う。
+        .gitignore で無視されたファイル (ビルドキャッシュ等) は保持する。
+
+        Raises:
+            RepositoryError: ワークスペースが有効なクローンでない、または更新に失敗した場合
+        """
+        options = options or CheckoutOptions()
+        self._store_credentials(url, access_token)
+        try:
+            self.repo = Repo(self.workspace_path)
+        except (InvalidGitRepositoryError, NoSuchPathError) as e:
+            raise RepositoryError(f"再利用可能なリポジトリがありません: {self.workspace_path}") from e
+
+        try:
+            origin = self.repo.remote(name='origin')
+            current_url = self.repo.git.config("--get", "remote.origin.url")
+            if normalize_repo_url(current_url) != normalize_repo_url(url):
+                raise RepositoryError(
+                    f"ワークスペースのリモートが一致しません: {mask_auth_token(current_url, access_token or '')}"
+                )
+            self._set_authenticated_remote_url()
+
+            logger.info(f"{self.workspace_path} の既存クローンを更新しています...")
+            if options.reference:
+                # ミラーは最新化済みのため、リモートではなくミラーからローカルに取得する
+                self.repo.git.fetch("--prune", options.reference, "+refs/heads/*:refs/remotes/origin/*")
+            elif options.depth:
+                origin.fetch(prune=True, depth=options.depth)
+            else:
+                origin.fetch(prune=True)
+            start_point = self._resolve_remote_start_point(branch)
+            self.repo.git.checkout("-f", "-B", branch, start_point)
+            self.repo.git.reset("--hard", start_point)
+            self._checkout_commit(branch, options)
+            self._apply_sparse_checkout(options.sparse_paths)
+            self.repo.git.clean("-ffd")
+        except (GitCommandError, ValueError) as e:
+            self.close()
+            raise RepositoryError(f"既存クローンの更新に失敗しました: {e}") from e
+        except RepositoryError:
+            self.close()
+            raise
 
     def has_changes(self) -> bool:
         """変更があるか確認する。"""
@@ -31,12 +86,26 @@ class GitHandler(IVcsHandler):
         return self.repo.is_dirty(untracked_files=True)
 
     def commit_and_push(self, message: str, branch: str) -> None:
-        """変更をコミットしてプッシュする。"""
+        """変更をコミットしてプッシュする。
+
+        Raises:
+            RepositoryError: トリガーコミットをデタッチ状態でチェックアウトしている
+                (ブランチがトリガーコミットより後に進んでいる) 場合
+        """
         if not self.repo:
             raise RepositoryNotInitializedError("リポジトリが初期化されていません")
+        if self.repo.head.is_detached:
+            raise RepositoryError(
+                f"ブランチ {branch} がトリガーコミット {self.repo.head.commit.hexsha} より後に進んでいるため、"
+                "変更をプッシュできません"
+            )
 
         logger.info("変更が検出されました。コミット中...")
-        self.repo.git.add(A=True)
+        if self._is_sparse():
+            # スパース範囲外に生成されたファイルもコミット対象にする
+            self.repo.git.add(A=True, sparse=True)
+        else:
+            self.repo.git.add(A=True)
 
         full_message = f"[skip ci] {message}"
         self.repo.index.commit(full_message)
@@ -61,8 +130,12 @@ class GitHandler(IVcsHandler):
         self.access_token = access_token
         self.original_url = url
 
-    def _clone_repository(self, url: str, access_token: Optional[str]) -> None:
-        """リポジトリをクローンする。"""
+    def _clone_repository(self, url: str, access_token: Optional[str], branch: Optional[str] = None, options: Optional[CheckoutOptions] = None) -> None:
+        """リポジトリをクローンする。
+
+        深さやシングルブランチが指定された場合は対象ブランチのみを浅く取得する。
+        対象ブランチがリモートに存在しない場合はデフォルトブランチを取得する。
+        """
         token_str = access_token if access_token else ""
         auth_url = inject_auth_token(url, token_str)
 
@@ -72,7 +145,111 @@ class GitHandler(IVcsHandler):
         else:
             logger.info(f"{url} を {self.workspace_path} にクローンしています...")
 
-        self.repo = Repo.clone_from(auth_url, self.workspace_path)
+        clone_kwargs = self._build_clone_kwargs(options or CheckoutOptions())
+        if clone_kwargs and branch:
+            try:
+                self.repo = Repo.clone_from(auth_url, self.workspace_path, branch=branch, **clone_kwargs)
+                return
+            except GitCommandError as e:
+                logger.info(f"ブランチ {branch} を直接クローンできませんでした。デフォルトブランチを取得します: {e.status}")
+
+        self.repo = Repo.clone_from(auth_url, self.workspace_path, **clone_kwargs)
+
+    def _build_clone_kwargs(self, options: CheckoutOptions) -> dict:
+        """クローン時の追加オプションを組み立てる。"""
+        kwargs: dict = {}
+        if options.depth:
+            kwargs["depth"] = options.depth
+            # --depth は暗黙に --single-branch となるため、明示されていなければ全ブランチを浅く取得する
+            if not options.single_branch:
+                kwargs["no_single_branch"] = True
+        if options.single_branch:
+            kwargs["single_branch"] = True
+        if options.sparse_paths is not None:
+            # blob はスパース範囲に含まれるものだけが遅延取得される
+            kwargs["filter"] = "blob:none"
+            kwargs["sparse"] = True
+        return kwargs
+
+    def _checkout_commit(self, branch: str, options: CheckoutOptions) -> None:
+        """トリガーコミットがブランチの履歴にあり、ブランチ先頭でなければ、そのコミットをデタッチ状態でチェックアウトする。
+
+        ブランチ自体はリモートの先頭のまま残す (この状態で変更をプッシュしようとすると commit_and_push がエラーにする)。
+        トリガーコミットがブランチの履歴にない (生成物を置く別ブランチ等) 場合や、取得できない場合はブランチ先頭で実行する。
+        """
+        commit = options.commit
+        if not commit or self.repo.head.commit.hexsha.startswith(commit.lower()):
+            return
+        if not self._has_commit(commit) and not self._fetch_commit(commit, options):
+            logger.warning(f"コミット {commit} を取得できませんでした。{branch} の先頭で実行します")
+            return
+        if not self._is_ancestor_of_head(commit):
+            logger.info(f"コミット {commit} は {branch} の履歴にないため、{branch} の先頭で実行します")
+            return
+        logger.info(f"{branch} はコミット {commit} より後に進んでいるため、{commit} をデタッチ状態でチェックアウトします")
+        self.repo.git.checkout("--detach", commit)
+
+    def _fetch_commit(self, commit: str, options: CheckoutOptions) -> bool:
+        """履歴に含まれないトリガーコミットを (ミラーを使う場合はミラーから) 取得する。"""
+        args = [f"--depth={options.depth}"] if options.depth and not options.reference else []
+        try:
+            logger.info(f"コミット {commit} を追加で取得しています...")
+            self.repo.git.fetch(*args, options.reference or "origin", commit)
+        except GitCommandError as e:
+            logger.debug(f"コミット {commit} の取得に失敗しました: {e.status}")
+            return False
+        return True
+
+    def _is_ancestor_of_head(self, commit: str) -> bool:
+        if self._merge_base_is_ancestor(commit):
+            return True
+        if self.repo.git.rev_parse("--is-shallow-repository") != "true":
+            return False
+        # シャロークローンは履歴が途中までのため、トリガーコミットの日時まで履歴を深くして確かめ直す
+        committed = int(self.repo.git.show("-s", "--format=%ct", commit))
+        try:
+            self.repo.git.fetch(f"--shallow-since={committed - 1}", "origin")
+        except GitCommandError as e:
+            logger.debug(f"履歴を深くできませんでした: {e.status}")
+            return False
+        return self._merge_base_is_ancestor(commit)
+
+    def _merge_base_is_ancestor(self, commit: str) -> bool:
+        try:
+            self.repo.git.merge_base("--is-ancestor", commit, "HEAD")
+        except GitCommandError:
+            return False
+        return True
+
+    def _has_commit(self, commit: str) -> bool:
+        try:
+            self.repo.git.cat_file("-e", f"{commit}^{{commit}}")
+        except GitCommandError:
+            return False
+        return True
+
+    def _clone_from_reference(self, url: str, reference: str, sparse: bool = False) -> None:
+        """ローカルミラーから alternates 付きでクローンし、origin を本来のURLに向け直す。"""
+        logger.info(f"ミラー {reference} から {self.workspace_path} にクローンしています...")
+        if sparse:
+            self.repo = Repo.clone_from(reference, self.workspace_path, shared=True, sparse=True)
+        else:
+            self.repo = Repo.clone_from(reference, self.workspace_path, shared=True)
+        self.repo.remote(name='origin').set_url(url)
+
+    def _apply_sparse_checkout(self, sparse_paths: Optional[List[str]]) -> None:
+        """スパースチェックアウトの範囲を設定する。None の場合は作業ツリー全体を展開する。"""
+        if sparse_paths is not None:
+            logger.info(f"スパースチェックアウトを設定しています: {', '.join(sparse_paths) or '(ルートのみ)'}")
+            self.repo.git.sparse_checkout("set", "--cone", "--", *sparse_paths)
+        elif self._is_sparse():
+            logger.info("スパースチェックアウトを解除しています...")
+            self.repo.git.sparse_checkout("disable")
+
+    def _is_sparse(self) -> bool:
+        # sparse-checkout の設定は worktree 単位の設定ファイルに書かれるため git config で読む
+        value = self.repo.git.config("--get", "--bool", "core.sparseCheckout", with_exceptions=False)
+        return value == "true"
 
     def _set_authenticated_remote_url(self) -> None:
         """認証トークン付きURLをリモートoriginに設定する。"""
@@ -82,13 +259,23 @@ class GitHandler(IVcsHandler):
             origin.set_url(auth_url)
             logger.debug("Remote URLを認証付きURLに設定しました")
 
-    def _checkout_branch(self, branch: str) -> None:
+    def _resolve_remote_start_point(self, branch: str) -> str:
+        """ブランチのリモート追跡ref。リモートに存在しない場合はデフォルトブランチを返す。"""
+        remote_refs = {ref.name for ref in self.repo.remotes.origin.refs}
+        if f"origin/{branch}" in remote_refs:
+            return f"origin/{branch}"
+        if "origin/HEAD" in remote_refs:
+            return "origin/HEAD"
+        raise RepositoryError(f"ブランチ {branch} の基点となるリモートrefが見つかりません")
+
+    def _checkout_branch(self, branch: str, fetch: bool = True) -> None:
         """指定ブランチをチェックアウトする。"""
         if branch in self.repo.heads:
             self.repo.heads[branch].checkout()
         else:
             origin = self.repo.remotes.origin
-            origin.fetch()
+            if fetch:
+                origin.fetch()
             remote_refs = [ref.name for ref in origin.refs]
             remote_branch_name = f"origin/{branch}"
 
@@ -43,3 +43,38 @@ def mask_auth_token(url: str, access_token: str) -> str:
     if not access_token:
         return url
     return url.replace(access_token, "*****")
+
+def normalize_repo_url(url: str) -> str:
+    """
+    リポジトリURLを比較・キャッシュキー用に正規化します。
+
+    認証情報・スキーム・末尾の ``.git`` や ``/`` を取り除き、ホスト名を小文字化します。
+    SSH形式 (``git@host:owner/repo.git``) も ``host/owner/repo`` に揃えます。
+
+    Args:
+        url (str): 元のリポジトリURL
+
+    Returns:
+        str: 正規化されたURL (例: ``github.com/owner/repo``)
+    """
+    url = url.strip()
+    parsed = urlparse(url)
+    if parsed.scheme and parsed.netloc:
+        host = (parsed.hostname or "").lower()
+        if parsed.port and parsed.scheme in ("http", "https"):
+            host += f":{parsed.port}"
+        path = parsed.path
+    elif "@" in url and ":" in url.split("@", 1)[1]:
+        # scp形式: git@github.com:owner/repo.git
+        host_part, path = url.split("@", 1)[1].split(":", 1)
+        host = host_part.lower()
+    else:
+        # ローカルパスなど
+        host = ""
+        path = parsed.path or url
+
+    path = path.rstrip("/")
+    if path.endswith(".git"):
+        path = path[: -len(".git")]
+    path = path.strip("/") if host else path
+    return f"{host}/{path}" if host else path
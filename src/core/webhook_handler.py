@@ -38,11 +38,15 @@ class GitHubProvider(WebhookProvider):
         return commits[-1] if commits else {}
 
     def extract_repo_info(self, payload: Dict[str, Any]) -> Dict[str, str] | None:
-        """GitHub ペイロードからリポジトリ URL とブランチを抽出する。"""
+        """GitHub ペイロードからリポジトリ URL・ブランチ・先頭コミット SHA を抽出する。"""
         repo = payload.get("repository", {})
         clone_url = repo.get("clone_url") or repo.get("html_url")
         ref = payload.get("ref", "")
         branch = ref.removeprefix("refs/heads/") if ref else ""
         if not clone_url or not branch:
             return None
-        return {"repo_url": clone_url, "branch": branch}
+        repo_info = {"repo_url": clone_url, "branch": branch}
+        commit = payload.get("after") or (payload.get("head_commit") or {}).get("id")
+        if commit:
+            repo_info["commit"] = commit
+        return repo_info
@@ -0,0 +1,198 @@
+"""Webhook イベントの非同期受付モジュール。
+
+API は生のイベントをキューに積んで即座に応答し、トリガー判定（CI 設定の読み込みや
+ジョブのマッチング）は専用のワーカースレッドで実行する。
+"""
+from __future__ import annotations
+
+import logging
+import queue
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+from .exceptions import IngestionQueueFullError
+from .interfaces import WebhookProvider
+from .job_trigger import JobTriggerService
+from .metrics import MetricsRegistry
+
+logger = logging.getLogger(__name__)
+
+_INGESTION_QUEUE_SENTINEL = None
+"""ワーカー停止を通知するセンチネル値。"""
+
+EVENT_STATUS_QUEUED = "queued"
+EVENT_STATUS_PROCESSING = "processing"
+EVENT_STATUS_DONE = "done"
+EVENT_STATUS_FAILED = "failed"
+
+
+class WebhookEvent:
+    """受付済み Webhook イベント。"""
+
+    def __init__(
+        self,
+        event_id: str,
+        provider: WebhookProvider,
+        payload: Dict[str, Any],
+        received_at: float,
+    ) -> None:
+        self.event_id = event_id
+        self.provider = provider
+        self.payload = payload
+        self.received_at = received_at
+        self.status = EVENT_STATUS_QUEUED
+        self.triggered_jobs: List[str] = []
+        self.error_message: Optional[str] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "event_id": self.event_id,
+            "provider": self.provider.get_provider_id(),
+            "status": self.status,
+            "triggered_jobs": list(self.triggered_jobs),
+            "error": self.error_message,
+        }
+
+
+class WebhookIngestionService:
+    """Webhook イベントをキューイングし、専用ワーカーでトリガー判定を行うサービス。"""
+
+    def __init__(
+        self,
+        trigger_service: JobTriggerService,
+        workers: int = 1,
+        max_pending: int = 1000,
+        history_size: int = 1000,
+        metrics: Optional[MetricsRegistry] = None,
+    ) -> None:
+        """
+        Args:
+            trigger_service: トリガー判定を行うサービス
+            workers: トリガー判定を行うワーカースレッド数
+            max_pending: 処理待ちイベントの上限 (超過時は受付を拒否する)
+            history_size: 状態を問い合わせ可能な直近イベント数
+            metrics: メトリクスレジストリ (省略時は専用のレジストリを作成)
+        """
+        self.trigger_service = trigger_service
+        self._history_size = history_size
+        self._metrics = metrics or MetricsRegistry()
+        self._queue: queue.Queue[Optional[WebhookEvent]] = queue.Queue(maxsize=max_pending)
+        self._events: "OrderedDict[str, WebhookEvent]" = OrderedDict()
+        self._events_lock = threading.Lock()
+        self._workers: List[threading.Thread] = []
+
+        self._backlog = self._metrics.gauge("webhook_ingestion_backlog")
+        self._accepted = self._metrics.counter("webhook_ingestion_accepted_total")
+        self._rejected = self._metrics.counter("webhook_ingestion_rejected_total")
+        self._failed = self._metrics.counter("webhook_ingestion_failed_total")
+        self._queue_wait = self._metrics.histogram("webhook_ingestion_queue_wait_seconds")
+        self._processing = self._metrics.histogram("webhook_ingestion_processing_seconds")
+
+        self._start_workers(workers)
+
+    # ------------------------------------------------------------------
+    # Worker management
+    # ------------------------------------------------------------------
+
+    def _start_workers(self, workers: int) -> None:
+        logger.info(f"Webhook 受付ワーカーを {workers} 個起動します。")
+        for i in range(workers):
+            t = threading.Thread(
+                target=self._worker_loop,
+                name=f"WebhookIngest-{i + 1}",
+                daemon=True,
+            )
+            t.start()
+            self._workers.append(t)
+
+    def _worker_loop(self) -> None:
+        while True:
+            event = self._queue.get()
+            if event is _INGESTION_QUEUE_SENTINEL:
+                self._queue.task_done()
+                break
+            try:
+                self._process_event(event)
+            finally:
+                self._backlog.set(self._queue.qsize())
+                self._queue.task_done()
+
+    def _process_event(self, event: WebhookEvent) -> None:
+        started = time.monotonic()
+        self._queue_wait.observe(started - event.received_at)
+        event.status = EVENT_STATUS_PROCESSING
+        try:
+            event.triggered_jobs = self.trigger_service.process_webhook_event(
+                event.provider, event.payload
+            )
+            event.status = EVENT_STATUS_DONE
+        except Exception as e:
+            event.status = EVENT_STATUS_FAILED
+            event.error_message = str(e)
+            self._failed.inc()
+            logger.exception(f"Webhook イベント {event.event_id} の処理でエラー: {e}")
+        finally:
+            self._processing.observe(time.monotonic() - started)
+            # ペイロードは処理後に不要となるため、履歴に残さず解放する
+            event.payload = {}
+
+    # ------------------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------------------
+
+    def submit(self, provider: WebhookProvider, payload: Dict[str, Any]) -> str:
+        """イベントをキューに追加し、イベント ID を返す。
+
+        Raises:
+            IngestionQueueFullError: 処理待ちイベントが上限に達している場合
+        """
+        event = WebhookEvent(
+            event_id=uuid.uuid4().hex,
+            provider=provider,
+            payload=payload,
+            received_at=time.monotonic(),
+        )
+        try:
+            self._queue.put_nowait(event)
+        except queue.Full:
+            self._rejected.inc()
+            raise IngestionQueueFullError(
+                f"Webhook 受付キューが上限 ({self._queue.maxsize}) に達しています。"
+            )
+        self._remember(event)
+        self._accepted.inc()
+        self._backlog.set(self._queue.qsize())
+        return event.event_id
+
+    def get_event(self, event_id: str) -> Optional[Dict[str, Any]]:
+        """イベントの処理状態を返す。履歴にない場合は None。"""
+        with self._events_lock:
+            event = self._events.get(event_id)
+        return event.to_dict() if event else None
+
+    def backlog(self) -> int:
+        """処理待ちのイベント数を返す。"""
+        return self._queue.qsize()
+
+    def join(self) -> None:
+        """キュー内のイベントがすべて処理されるまで待機する。"""
+        self._queue.join()
+
+    def shutdown(self, wait: bool = True) -> None:
+        """ワーカースレッドを停止する。"""
+        logger.info("Webhook 受付サービスをシャットダウンしています...")
+        for _ in self._workers:
+            self._queue.put(_INGESTION_QUEUE_SENTINEL)
+        if wait:
+            for w in self._workers:
+                w.join()
+        logger.info("Webhook 受付サービスのシャットダウンが完了しました。")
+
+    def _remember(self, event: WebhookEvent) -> None:
+        with self._events_lock:
+            self._events[event.event_id] = event
+            while len(self._events) > self._history_size:
+                self._events.popitem(last=False)
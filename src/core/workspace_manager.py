@@ -47,7 +47,8 @@ class WorkspaceManager:
             lock.release()
             logger.info(f"[{job_name}] ワークスペースロックを解放しました。")
 
-    def remove_readonly(self, func, path, _):
+    @staticmethod
+    def remove_readonly(func, path, _):
         """読み取り専用ファイルを削除するためのヘルパー関数"""
         os.chmod(path, stat.S_IWRITE)
         func(path)
@@ -65,6 +66,12 @@ class WorkspaceManager:
         os.makedirs(work_dir, exist_ok=True)
         return work_dir
 
+    def get_workspace(self, job_name: str) -> str:
+        """既存の内容を保持したままワークスペースのパスを返す (なければ作成)"""
+        work_dir = os.path.join(self.base_dir, job_name)
+        os.makedirs(work_dir, exist_ok=True)
+        return work_dir
+
     def cleanup_workspace(self, job_name: str):
         """ワークスペースを削除する"""
         work_dir = os.path.join(self.base_dir, job_name)
@@ -0,0 +1,136 @@
+"""AsyncShellJobExecutor / EventLoopThread のテスト。"""
+
+import asyncio
+import os
+import sys
+import threading
+import time
+
+import pytest
+
+from src.core.async_job_executor import AsyncShellJobExecutor, EventLoopThread
+from src.core.cancellation import CancellationToken
+from src.core.exceptions import ScriptExecutionError, JobTimeoutError, JobCancelledError
+
+pytestmark = pytest.mark.skipif(sys.platform == "win32", reason="POSIX のシェルスクリプトを使用する")
+
+
+class TestAsyncShellJobExecutor:
+    def test_出力がログファイルに書き込まれる(self, tmp_path):
+        executor = AsyncShellJobExecutor(job_log_dir=str(tmp_path / "logs"))
+
+        executor.execute("echo line1; echo line2", str(tmp_path), job_name="async_job")
+
+        logs = list((tmp_path / "logs").iterdir())
+        assert len(logs) == 1
+        assert "async_job" in logs[0].name
+        assert logs[0].read_text(encoding="utf-8") == "line1\nline2\n"
+
+    def test_スクリプト失敗時にScriptExecutionErrorが発生する(self, tmp_path):
+        executor = AsyncShellJobExecutor(job_log_dir=str(tmp_path))
+
+        with pytest.raises(ScriptExecutionError) as exc_info:
+            executor.execute("echo some output; exit 3", str(tmp_path), job_name="failing_job")
+
+        assert exc_info.value.return_code == 3
+        assert "some output" in exc_info.value.stdout
+
+    def test_envとcwdがスクリプトに渡される(self, tmp_path):
+        executor = AsyncShellJobExecutor(job_log_dir=str(tmp_path / "logs"))
+
+        executor.execute('echo "$CI_TEST_VALUE" > out.txt', str(tmp_path), job_name="env_job", env={"CI_TEST_VALUE": "hello"})
+
+        assert (tmp_path / "out.txt").read_text() == "hello\n"
+
+    def test_上限を超える長い行も読み込める(self, tmp_path):
+        executor = AsyncShellJobExecutor(job_log_dir=str(tmp_path / "logs"))
+        script = f"{sys.executable} -c \"print('x' * 200000); print('done'); raise SystemExit(1)\""
+
+        with pytest.raises(ScriptExecutionError) as exc_info:
+            executor.execute(script, str(tmp_path), job_name="long_line")
+
+        # 例外には末尾のみ、ログファイルには全体が残る
+        assert exc_info.value.stdout == "done\n"
+        log_text = open(exc_info.value.log_path, encoding="utf-8").read()
+        assert log_text == "x" * 200000 + "\ndone\n"
+
+    def test_タイムアウト時にJobTimeoutErrorが発生する(self, tmp_path):
+        executor = AsyncShellJobExecutor(job_log_dir=str(tmp_path / "logs"))
+
+        started = time.monotonic()
+        with pytest.raises(JobTimeoutError) as exc_info:
+            executor.execute("echo started; sleep 30", str(tmp_path), job_name="slow_job", timeout_seconds=1)
+
+        assert time.monotonic() - started < 10
+        assert exc_info.value.timeout_seconds == 1
+        assert "started" in exc_info.value.stdout
+
+    def test_取り消しでシェルの子プロセスごと終了する(self, tmp_path):
+        executor = AsyncShellJobExecutor(job_log_dir=str(tmp_path / "logs"))
+        token = CancellationToken()
+        pid_file = tmp_path / "child.pid"
+        script = f"sleep 30 & echo $! > {pid_file}; wait"
+
+        canceller = threading.Timer(0.5, token.cancel, args=("newer commit",))
+        canceller.start()
+        with pytest.raises(JobCancelledError) as exc_info:
+            executor.execute(script, str(tmp_path), job_name="cancel_job", cancel_token=token)
+        canceller.join()
+
+        assert exc_info.value.reason == "newer commit"
+        child_pid = int(pid_file.read_text().strip())
+        deadline = time.monotonic() + 5
+        while _pid_alive(child_pid) and time.monotonic() < deadline:
+            time.sleep(0.05)
+        assert not _pid_alive(child_pid)
+
+    def test_1つのイベントループで複数のジョブを並行して実行する(self, tmp_path):
+        executor = AsyncShellJobExecutor(job_log_dir=str(tmp_path / "logs"))
+        loop_thread = EventLoopThread()
+        loop_thread.start()
+        try:
+            threads_before = threading.active_count()
+            started = time.monotonic()
+            futures = [
+                loop_thread.submit(executor.run("sleep 1", str(tmp_path), job_name=f"job{i}"))
+                for i in range(20)
+            ]
+            for future in futures:
+                future.result(timeout=30)
+
+            assert time.monotonic() - started < 10
+            # ジョブごとのスレッドは作られない
+            assert threading.active_count() <= threads_before + 1
+        finally:
+            loop_thread.stop()
+
+
+class TestEventLoopThread:
+    def test_他のスレッドからコルーチンを実行できる(self):
+        loop_thread = EventLoopThread()
+        loop_thread.start()
+        try:
+            async def _current_thread():
+                await asyncio.sleep(0)
+                return threading.current_thread().name
+
+            assert loop_thread.submit(_current_thread()).result(timeout=5) == "EventLoop"
+        finally:
+            loop_thread.stop()
+
+    def test_起動前はloopにアクセスできない(self):
+        with pytest.raises(RuntimeError):
+            EventLoopThread().loop
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    # 終了済みでも親が回収するまではゾンビとして残る
+    try:
+        with open(f"/proc/{pid}/stat", encoding="utf-8") as f:
+            return f.read().split()[2] != "Z"
+    except OSError:
+        return True
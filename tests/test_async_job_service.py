@@ -0,0 +1,155 @@
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from unittest.mock import MagicMock
+
+import pytest
+
+from src.core.async_job_executor import AsyncShellJobExecutor
+from src.core.async_job_service import AsyncJobService
+from src.core.config import Settings, GitConfig, RunnerConfig
+from src.core.exceptions import JobValidationError
+from src.core.job_executor import ShellJobExecutor
+from src.core.job_timing import PHASES, phase_metric_name
+from src.core.metrics import MetricsRegistry
+from src.core.vcs_handler import GitHandler
+from src.core.workspace_manager import WorkspaceManager
+
+
+@pytest.fixture
+def mock_settings(tmp_path):
+    return Settings(
+        git=GitConfig(access_token="test_token", repo_url="https://github.com/example/default.git"),
+        runner=RunnerConfig(mode="asyncio", blocking_threads=2),
+        job_log_dir=str(tmp_path / "logs"),
+    )
+
+
+@pytest.fixture
+def mock_workspace_manager(tmp_path):
+    wm = MagicMock(spec=WorkspaceManager)
+    wm.prepare_workspace.return_value = str(tmp_path)
+
+    @contextmanager
+    def _noop_lock(job_name):
+        yield
+    wm.workspace_lock.side_effect = _noop_lock
+    return wm
+
+
+@pytest.fixture
+def mock_vcs_handler():
+    handler = MagicMock(spec=GitHandler)
+    handler.has_changes.return_value = False
+    return handler
+
+
+@pytest.fixture
+def mock_vcs_handler_cls(mock_vcs_handler):
+    cls = MagicMock()
+    cls.return_value = mock_vcs_handler
+    return cls
+
+
+def _job(name, script="echo hello"):
+    return {
+        "name": name,
+        "repo_url": "https://github.com/example/repo.git",
+        "target_branch": "main",
+        "script": script,
+    }
+
+
+def test_async_job_service_run_job_success(mock_settings, mock_workspace_manager, mock_vcs_handler_cls, mock_vcs_handler):
+    executor = MagicMock(spec=ShellJobExecutor)
+    service = AsyncJobService(
+        settings=mock_settings,
+        workspace_manager=mock_workspace_manager,
+        vcs_handler_cls=mock_vcs_handler_cls,
+        job_executor_cls=MagicMock(return_value=executor),
+    )
+
+    service.run_job(_job("test_job"), {"id": "123", "modified": []})
+
+    mock_workspace_manager.workspace_lock.assert_called_once_with("test_job")
+    mock_vcs_handler.prepare_repository.assert_called_once()
+    # 同期の IJobExecutor もスレッドプール経由で実行できる
+    executor.execute.assert_called_once()
+    assert executor.execute.call_args[1]["env"]["CI_COMMIT_HASH"] == "123"
+    mock_vcs_handler.close.assert_called_once()
+    mock_workspace_manager.cleanup_workspace.assert_called_once_with("test_job")
+
+    service.shutdown()
+
+
+def test_async_job_service_validation_error(mock_settings):
+    service = AsyncJobService(settings=mock_settings, workspace_manager=MagicMock(spec=WorkspaceManager))
+
+    with pytest.raises(JobValidationError):
+        service.run_job({"name": "bad_job"}, {"id": "123"})
+
+    service.shutdown()
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="POSIX のシェルスクリプトを使用する")
+@pytest.mark.skipif(sys.version_info < (3, 12), reason="子プロセスの待機にスレッドを使わない pidfd の監視は Python 3.12 以降")
+def test_async_job_service_runs_many_jobs_without_a_thread_per_job(mock_settings, mock_workspace_manager, mock_vcs_handler_cls):
+    mock_settings.max_concurrent_jobs = 30
+    notified = []
+    service = AsyncJobService(
+        settings=mock_settings,
+        workspace_manager=mock_workspace_manager,
+        vcs_handler_cls=mock_vcs_handler_cls,
+        job_executor_cls=AsyncShellJobExecutor,
+    )
+    service._send_notification = lambda **kwargs: notified.append(kwargs)
+    threads_before = threading.active_count()
+
+    started = time.monotonic()
+    for i in range(30):
+        service.submit_job(_job(f"job{i}", script="sleep 1"), {"id": str(i)})
+    time.sleep(0.5)
+    threads_during_run = threading.active_count()
+    service.shutdown()
+
+    assert time.monotonic() - started < 10
+    assert len(notified) == 30
+    assert all(n["success"] for n in notified)
+    # 30 件が並行して実行中でも、増えるのはブロッキング処理用のスレッドのみ
+    assert threads_during_run <= threads_before + mock_settings.runner.blocking_threads
+
+
+def test_async_job_service_resizes_concurrency_limit(mock_settings, mock_workspace_manager, mock_vcs_handler_cls):
+    service = AsyncJobService(
+        settings=mock_settings,
+        workspace_manager=mock_workspace_manager,
+        vcs_handler_cls=mock_vcs_handler_cls,
+        job_executor_cls=MagicMock(),
+    )
+    assert service._worker_count() == 1
+
+    service._resize_workers(50)
+
+    assert service._worker_count() == 50
+    service.shutdown()
+
+
+def test_async_job_service_records_phase_timings_per_job(mock_settings, mock_workspace_manager, mock_vcs_handler_cls):
+    metrics = MetricsRegistry()
+    service = AsyncJobService(
+        settings=mock_settings,
+        workspace_manager=mock_workspace_manager,
+        vcs_handler_cls=mock_vcs_handler_cls,
+        job_executor_cls=MagicMock(return_value=MagicMock(spec=ShellJobExecutor)),
+        metrics=metrics,
+    )
+
+    service.submit_job(_job("timed_job"), {"id": "123", "modified": []})
+    service._job_queue.join()
+
+    histograms = metrics.snapshot()["histograms"]
+    for phase in PHASES:
+        assert histograms[phase_metric_name("timed_job", phase)]["count"] == 1
+
+    service.shutdown()
@@ -0,0 +1,75 @@
+"""WorkerAutoscaler のテスト。"""
+
+import pytest
+
+from src.core.autoscaler import ScalingSample, WorkerAutoscaler
+from src.core.config import AutoscaleConfig
+from src.core.metrics import MetricsRegistry
+
+
+def _sample(workers, busy=0, queue_depth=0, average_wait=0.0, load=None, memory=None):
+    return ScalingSample(workers, busy, queue_depth, average_wait, load_per_cpu=load, available_memory_mb=memory)
+
+
+@pytest.fixture
+def autoscaler():
+    return WorkerAutoscaler(
+        AutoscaleConfig(
+            enabled=True, min_workers=1, max_workers=8, target_wait_seconds=10,
+            max_load_per_cpu=1.0, min_available_memory_mb=512, idle_seconds=60, cooldown_seconds=30,
+        )
+    )
+
+
+class TestWorkerAutoscaler:
+    def test_全ワーカーが実行中で待ち時間が長い場合は倍増する(self, autoscaler):
+        target, reason = autoscaler.decide(_sample(2, busy=2, queue_depth=10, average_wait=30), now=0)
+        assert target == 4
+        assert "待機中のジョブ 10 件" in reason
+
+    def test_増やす数は待機中のジョブ数と最大ワーカー数まで(self, autoscaler):
+        assert autoscaler.decide(_sample(4, busy=4, queue_depth=1, average_wait=30), now=0)[0] == 5
+        assert autoscaler.decide(_sample(7, busy=7, queue_depth=50, average_wait=30), now=0)[0] == 8
+        assert autoscaler.decide(_sample(8, busy=8, queue_depth=50, average_wait=30), now=0)[0] == 8
+
+    def test_待ち時間が短い場合や空きワーカーがある場合は増やさない(self, autoscaler):
+        assert autoscaler.decide(_sample(2, busy=2, queue_depth=5, average_wait=3), now=0) == (2, None)
+        # 空きワーカーがあるのに待機中のジョブがある = 排他・リソース待ち
+        assert autoscaler.decide(_sample(2, busy=1, queue_depth=5, average_wait=30), now=0) == (2, None)
+
+    def test_ホストの負荷が高い場合は増やさずに減らす(self, autoscaler):
+        target, reason = autoscaler.decide(_sample(4, busy=4, queue_depth=10, average_wait=30, load=1.5), now=0)
+        assert target == 3
+        assert "負荷" in reason
+        # 前回の変更から cooldown_seconds が経つまでは減らさない
+        assert autoscaler.decide(_sample(3, busy=3, load=1.5), now=10) == (3, None)
+        assert autoscaler.decide(_sample(3, busy=3, load=1.5), now=31)[0] == 2
+
+    def test_空きメモリが少ない場合は減らす(self, autoscaler):
+        target, reason = autoscaler.decide(_sample(3, busy=3, memory=100), now=0)
+        assert target == 2
+        assert "メモリ" in reason
+
+    def test_最小ワーカー数より減らさない(self, autoscaler):
+        assert autoscaler.decide(_sample(1, busy=1, load=5.0), now=0) == (1, None)
+
+    def test_空きワーカーが続いた場合に減らす(self, autoscaler):
+        assert autoscaler.decide(_sample(3, busy=1), now=0) == (3, None)
+        assert autoscaler.decide(_sample(3, busy=1), now=30) == (3, None)
+        assert autoscaler.decide(_sample(3, busy=1), now=61)[0] == 2
+
+    def test_tickでメトリクスと変更が記録される(self):
+        metrics = MetricsRegistry()
+        autoscaler = WorkerAutoscaler(AutoscaleConfig(enabled=True, min_workers=1, max_workers=4), metrics)
+        resized = []
+        autoscaler.tick(_sample(1, busy=1, queue_depth=3, average_wait=60, load=0.2, memory=4096), resized.append)
+
+        assert resized == [2]
+        snapshot = metrics.snapshot()
+        assert snapshot["counters"]["job_workers_scale_up_total"] == 1
+        assert snapshot["gauges"]["job_workers"] == 2
+        assert snapshot["gauges"]["host_load_per_cpu"] == 0.2
+
+    def test_min_workersがmax_workersより大きい場合はValueError(self):
+        with pytest.raises(ValueError):
+            WorkerAutoscaler(AutoscaleConfig(enabled=True, min_workers=5, max_workers=2))
@@ -5,9 +5,12 @@ from unittest.mock import patch
 import pytest
 
 from src.core.container import Container, get_container
-from src.core.config import Settings
+from src.core.config import Settings, RunnerConfig, LogRetentionConfig, HistoryConfig
+from src.core.async_job_service import AsyncJobService
 from src.core.interfaces import IJobService
 from src.core.job_trigger import JobTriggerService
+from src.core.log_retention import LogRetentionService
+from src.core.job_history import JobHistoryStore
 
 
 class TestContainer:
@@ -47,6 +50,14 @@ class TestContainer:
         service = container.job_service
         assert isinstance(service, IJobService)
 
+    @patch.object(Settings, "load")
+    def test_runnerがasyncioならAsyncJobServiceを返す(self, mock_load):
+        mock_load.return_value = Settings(runner=RunnerConfig(mode="asyncio"))
+        container = Container.get_instance()
+        service = container.job_service
+        assert isinstance(service, AsyncJobService)
+        service.shutdown()
+
     @patch.object(Settings, "load")
     def test_job_trigger_serviceプロパティがJobTriggerServiceを返す(self, mock_load):
         mock_load.return_value = Settings()
@@ -54,6 +65,34 @@ class TestContainer:
         trigger = container.job_trigger_service
         assert isinstance(trigger, JobTriggerService)
 
+    @patch.object(Settings, "load")
+    def test_log_retentionが有効な場合のみLogRetentionServiceを起動する(self, mock_load, tmp_path):
+        mock_load.return_value = Settings()
+        assert Container.get_instance().log_retention_service is None
+
+        Container._instance = None
+        mock_load.return_value = Settings(
+            job_log_dir=str(tmp_path), log_retention=LogRetentionConfig(enabled=True, keep_last=10)
+        )
+        container = Container.get_instance()
+        service = container.log_retention_service
+        assert isinstance(service, LogRetentionService)
+        assert container.log_retention_service is service
+        container.shutdown()
+
+    @patch.object(Settings, "load")
+    def test_historyが有効な場合のみJobHistoryStoreをジョブサービスに渡す(self, mock_load, tmp_path):
+        mock_load.return_value = Settings()
+        assert Container.get_instance().job_history is None
+
+        Container._instance = None
+        mock_load.return_value = Settings(history=HistoryConfig(enabled=True, path=str(tmp_path / "history.db")))
+        container = Container.get_instance()
+        store = container.job_history
+        assert isinstance(store, JobHistoryStore)
+        assert container.job_service.history is store
+        container.shutdown()
+
     def test_get_container関数がContainerインスタンスを返す(self):
         with patch.object(Settings, "load", return_value=Settings()):
             container = get_container()
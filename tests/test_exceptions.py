@@ -6,6 +6,7 @@ from src.core.exceptions import (
     ToyCIError,
     ScriptExecutionError,
     JobTimeoutError,
+    JobCancelledError,
     RepositoryError,
     RepositoryNotInitializedError,
     WorkspaceError,
@@ -23,6 +24,7 @@ class TestExceptionHierarchy:
         [
             ScriptExecutionError,
             JobTimeoutError,
+            JobCancelledError,
             RepositoryError,
             RepositoryNotInitializedError,
             WorkspaceError,
@@ -71,6 +73,7 @@ class TestScriptExecutionError:
         assert exc.stdout == ""
         assert exc.stderr == ""
         assert exc.return_code == -1
+        assert exc.log_path is None
 
     def test_カスタム属性値(self):
         exc = ScriptExecutionError(
@@ -78,11 +81,13 @@ class TestScriptExecutionError:
             stdout="output",
             stderr="error output",
             return_code=1,
+            log_path="log/jobs/job.log",
         )
         assert str(exc) == "エラー"
         assert exc.stdout == "output"
         assert exc.stderr == "error output"
         assert exc.return_code == 1
+        assert exc.log_path == "log/jobs/job.log"
 
     def test_メッセージがstrで取得できる(self):
         exc = ScriptExecutionError("テストメッセージ")
@@ -1,14 +1,21 @@
 """ShellJobExecutorのテスト。"""
 
+import io
 import os
 import subprocess
 import sys
+import threading
+import time
 from unittest.mock import patch, MagicMock, mock_open
 
 import pytest
 
 from src.core.job_executor import ShellJobExecutor
-from src.core.exceptions import ScriptExecutionError, JobTimeoutError
+from src.core.job_log import INDEX_SUFFIX, CompressedLogReader
+from src.core.log_stream import LogStreamRegistry
+from src.core.cancellation import CancellationToken
+from src.core.config import JobOutputConfig
+from src.core.exceptions import ScriptExecutionError, JobTimeoutError, JobCancelledError
 
 
 class TestShellJobExecutor:
@@ -20,7 +27,7 @@ class TestShellJobExecutor:
     def _make_mock_process(self, stdout_lines, returncode):
         """Popenモックプロセスを生成するヘルパー"""
         mock_process = MagicMock()
-        mock_process.stdout = iter(stdout_lines)
+        mock_process.stdout = io.BytesIO("".join(stdout_lines).encode())
         mock_process.wait.return_value = returncode
         mock_process.returncode = returncode
         mock_process.poll.return_value = returncode
@@ -42,8 +49,8 @@ class TestShellJobExecutor:
         assert call_kwargs["cwd"] == "/tmp"
         assert call_kwargs["stdout"] == subprocess.PIPE
         assert call_kwargs["stderr"] == subprocess.STDOUT
-        assert call_kwargs["text"] is True
-        assert call_kwargs["bufsize"] == 1
+        # 出力はデコードせずにバイト列のまま読み込む
+        assert "text" not in call_kwargs
 
     @patch("src.core.job_executor.subprocess.Popen")
     @patch("builtins.open", new_callable=mock_open)
@@ -76,7 +83,7 @@ class TestShellJobExecutor:
     @patch("src.core.job_executor.subprocess.Popen")
     @patch("builtins.open", new_callable=mock_open)
     @patch("src.core.job_executor.os.makedirs")
-    def test_出力が行ごとにログファイルに書き込まれる(
+    def test_出力がまとめてログファイルに書き込まれる(
         self, mock_makedirs, mock_file_open, mock_popen
     ):
         mock_popen.return_value = self._make_mock_process(
@@ -85,14 +92,14 @@ class TestShellJobExecutor:
 
         self.executor.execute("echo test", "/tmp", job_name="stream_job")
 
+        assert mock_file_open.call_args[0][1] == "wb"
         handle = mock_file_open()
-        assert handle.write.call_count == 3
-        assert handle.flush.call_count == 3
+        handle.write.assert_called_once_with(b"line1\nline2\nline3\n")
 
     @patch("src.core.job_executor.subprocess.Popen")
     @patch("builtins.open", new_callable=mock_open)
     @patch("src.core.job_executor.os.makedirs")
-    def test_ScriptExecutionErrorのメッセージに出力が含まれる(
+    def test_ScriptExecutionErrorのメッセージは出力ではなくログを参照する(
         self, mock_makedirs, mock_file_open, mock_popen
     ):
         mock_popen.return_value = self._make_mock_process(
@@ -103,9 +110,33 @@ class TestShellJobExecutor:
             self.executor.execute("bad_script", "/tmp", job_name="error_job")
 
         message = str(exc_info.value)
-        assert "output text" in message
+        assert "output text" not in message
+        assert exc_info.value.log_path == mock_file_open.call_args[0][0]
+        assert exc_info.value.log_path in message
         assert exc_info.value.return_code == 2
 
+    @patch("src.core.job_executor.subprocess.Popen")
+    @patch("builtins.open", new_callable=mock_open)
+    @patch("src.core.job_executor.os.makedirs")
+    def test_例外には出力の末尾だけが含まれる(
+        self, mock_makedirs, mock_file_open, mock_popen
+    ):
+        executor = ShellJobExecutor(
+            job_log_dir="/tmp/test_log_jobs",
+            output_config=JobOutputConfig(tail_lines=3, tail_bytes=1024),
+        )
+        mock_popen.return_value = self._make_mock_process(
+            [f"line{i}\n" for i in range(1000)], returncode=1
+        )
+
+        with pytest.raises(ScriptExecutionError) as exc_info:
+            executor.execute("chatty", "/tmp", job_name="chatty_job")
+
+        assert exc_info.value.stdout == "line997\nline998\nline999\n"
+        # ログファイルには全ての行が書き込まれている
+        written = b"".join(c[0][0] for c in mock_file_open().write.call_args_list)
+        assert written.count(b"\n") == 1000
+
     @patch("src.core.job_executor.subprocess.Popen")
     @patch("builtins.open", new_callable=mock_open)
     @patch("src.core.job_executor.os.makedirs")
@@ -225,7 +256,7 @@ class TestShellJobExecutorVenv:
 
     def _make_mock_process(self, stdout_lines, returncode):
         mock_process = MagicMock()
-        mock_process.stdout = iter(stdout_lines)
+        mock_process.stdout = io.BytesIO("".join(stdout_lines).encode())
         mock_process.wait.return_value = returncode
         mock_process.returncode = returncode
         mock_process.poll.return_value = returncode
@@ -301,3 +332,93 @@ class TestShellJobExecutorVenv:
         call_kwargs = mock_popen.call_args[1]
         process_env = call_kwargs["env"]
         assert process_env["PATH"] == "/custom/bin"
+
+
+class TestShellJobExecutorCompression:
+    """ジョブログの圧縮のテスト。"""
+
+    def test_gzip指定時は圧縮したログと索引に書き込む(self, tmp_path):
+        executor = ShellJobExecutor(
+            job_log_dir=str(tmp_path / "logs"),
+            output_config=JobOutputConfig(compression="gzip", frame_bytes=1024),
+        )
+        script = f'"{sys.executable}" -c "print(chr(10).join(str(i) for i in range(1000))); raise SystemExit(1)"'
+
+        with pytest.raises(ScriptExecutionError) as exc_info:
+            executor.execute(script, str(tmp_path), job_name="gz_job")
+
+        log_path = exc_info.value.log_path
+        assert log_path.endswith(".log.gz")
+        assert os.path.exists(log_path + INDEX_SUFFIX)
+        reader = CompressedLogReader(log_path)
+        assert reader.read_lines(500, 2) == [b"500\n", b"501\n"]
+        assert reader.tail(1) == [b"999\n"]
+
+
+class TestShellJobExecutorLogStream:
+    """実行中の出力の配信のテスト。"""
+
+    def test_出力を配信し終了時に登録を外す(self, tmp_path):
+        registry = LogStreamRegistry()
+        opened = []
+        original_open = registry.open
+        registry.open = lambda path, job_name: opened.append(original_open(path, job_name)) or opened[-1]
+        executor = ShellJobExecutor(job_log_dir=str(tmp_path / "logs"), log_streams=registry)
+
+        executor.execute(f'"{sys.executable}" -c "print(\'hello\')"', str(tmp_path), job_name="stream_job")
+
+        broadcast = opened[0]
+        assert broadcast.job_name == "stream_job"
+        assert broadcast.read(0, 100).strip() == b"hello"
+        assert broadcast.closed
+        assert registry.find_job("stream_job") is None
+
+
+class TestShellJobExecutorCancellation:
+    """取り消しトークンによるプロセスツリー停止のテスト。"""
+
+    def test_取り消し済みのトークンではスクリプトを起動しない(self, tmp_path):
+        executor = ShellJobExecutor(job_log_dir=str(tmp_path))
+        token = CancellationToken()
+        token.cancel("superseded")
+
+        with patch("src.core.job_executor.subprocess.Popen") as mock_popen:
+            with pytest.raises(JobCancelledError) as exc_info:
+                executor.execute("echo test", str(tmp_path), job_name="cancel_job", cancel_token=token)
+
+        mock_popen.assert_not_called()
+        assert exc_info.value.reason == "superseded"
+
+    @pytest.mark.skipif(sys.platform == "win32", reason="POSIX のプロセスグループを使用する")
+    def test_取り消しでシェルの子プロセスごと終了する(self, tmp_path):
+        executor = ShellJobExecutor(job_log_dir=str(tmp_path / "logs"))
+        token = CancellationToken()
+        pid_file = tmp_path / "child.pid"
+        script = f"sleep 30 & echo $! > {pid_file}; wait"
+
+        canceller = threading.Timer(0.5, token.cancel, args=("newer commit",))
+        canceller.start()
+        started = time.monotonic()
+        with pytest.raises(JobCancelledError):
+            executor.execute(script, str(tmp_path), job_name="cancel_job", cancel_token=token)
+        canceller.join()
+
+        assert time.monotonic() - started < 10
+        child_pid = int(pid_file.read_text().strip())
+        deadline = time.monotonic() + 5
+        while _pid_alive(child_pid) and time.monotonic() < deadline:
+            time.sleep(0.05)
+        assert not _pid_alive(child_pid)
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    # 終了済みでも親が回収するまではゾンビとして残る
+    try:
+        with open(f"/proc/{pid}/stat", encoding="utf-8") as f:
+            return f.read().split()[2] != "Z"
+    except OSError:
+        return True
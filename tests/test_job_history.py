@@ -0,0 +1,138 @@
+"""JobHistoryStore のテスト。"""
+
+import sqlite3
+
+import pytest
+
+from src.core.job_history import JobHistoryStore, RunRecord
+from src.core.metrics import MetricsRegistry
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    return str(tmp_path / "history.db")
+
+
+def _run(job="build", branch="main", commit="abc123", status="success", started_at=1000.0, run_id=None, queued_at=None):
+    record = RunRecord(job, "https://github.com/example/repo", branch, commit, queued_at=queued_at, started_at=started_at, run_id=run_id)
+    record.finish(status)
+    return record
+
+
+class TestRunRecord:
+    def test_待ち時間は投入から開始までの秒数(self):
+        assert _run(queued_at=990.0, started_at=1000.0).queue_seconds == 10.0
+        assert _run().queue_seconds is None
+
+    def test_フェーズの時間は失敗した場合も記録する(self):
+        record = _run()
+        with pytest.raises(RuntimeError):
+            with record.phase("checkout"):
+                raise RuntimeError("clone failed")
+        assert record.phases["checkout"] >= 0
+
+    def test_長いエラーメッセージは切り詰める(self):
+        record = _run()
+        record.finish("failed", "x" * 10000)
+        assert len(record.error) == 2000
+
+
+class TestJobHistoryStore:
+    def test_記録した実行を取得できる(self, db_path):
+        store = JobHistoryStore(db_path, commit_interval=0)
+        record = _run(queued_at=995.0)
+        record.phases["execute_script"] = 1.5
+        record.exit_code = 0
+        record.log_path = "log/jobs/build_20260101_000000.log"
+        store.record(record)
+        store.flush()
+
+        run = store.get(record.run_id)
+        assert run["job_name"] == "build"
+        assert run["commit"] == "abc123"
+        assert run["queue_seconds"] == 5.0
+        assert run["phases"] == {"execute_script": 1.5}
+        assert run["log_path"] == "log/jobs/build_20260101_000000.log"
+        assert store.get("missing") is None
+        store.close()
+
+    def test_条件で絞り込み新しい順に返す(self, db_path):
+        store = JobHistoryStore(db_path, commit_interval=0)
+        store.record(_run(job="build", started_at=1.0))
+        store.record(_run(job="test", started_at=2.0, status="failed"))
+        store.record(_run(job="build", started_at=3.0, branch="dev", commit="def456"))
+        store.flush()
+
+        assert [r["started_at"] for r in store.query()[0]] == [3.0, 2.0, 1.0]
+        assert [r["started_at"] for r in store.query(job_name="build")[0]] == [3.0, 1.0]
+        assert [r["started_at"] for r in store.query(branch="dev")[0]] == [3.0]
+        assert [r["started_at"] for r in store.query(status="failed")[0]] == [2.0]
+        assert [r["started_at"] for r in store.query(commit="def")[0]] == [3.0]
+        assert [r["started_at"] for r in store.query(since=2.0, until=3.0)[0]] == [2.0]
+        store.close()
+
+    def test_カーソルで続きを取得する(self, db_path):
+        store = JobHistoryStore(db_path, commit_interval=0)
+        # 同じ開始時刻の実行も重複・欠落なく返す
+        for i in range(5):
+            store.record(_run(started_at=float(i // 2), run_id=f"run{i}"))
+        store.flush()
+
+        seen = []
+        cursor = None
+        while True:
+            runs, cursor = store.query(limit=2, cursor=cursor)
+            seen.extend(r["run_id"] for r in runs)
+            if cursor is None:
+                break
+        assert seen == ["run4", "run3", "run2", "run1", "run0"]
+        store.close()
+
+    def test_不正なカーソルはValueError(self, db_path):
+        store = JobHistoryStore(db_path, commit_interval=0)
+        with pytest.raises(ValueError):
+            store.query(cursor="invalid")
+        store.close()
+
+    def test_まとめて書き込む(self, db_path):
+        metrics = MetricsRegistry()
+        store = JobHistoryStore(db_path, commit_interval=0.2, metrics=metrics)
+        for i in range(10):
+            store.record(_run(started_at=float(i)))
+        store.flush()
+
+        snapshot = metrics.snapshot()
+        assert snapshot["counters"]["job_history_written_total"] == 10
+        assert snapshot["histograms"]["job_history_commit_seconds"]["count"] == 1
+        store.close()
+
+    def test_上限を超えた記録は古いものから捨てる(self, db_path):
+        metrics = MetricsRegistry()
+        store = JobHistoryStore(db_path, commit_interval=0.2, max_pending=3, metrics=metrics)
+        for i in range(5):
+            store.record(_run(started_at=float(i)))
+        store.flush()
+
+        assert [r["started_at"] for r in store.query()[0]] == [4.0, 3.0, 2.0]
+        assert metrics.snapshot()["counters"]["job_history_dropped_total"] == 2
+        store.close()
+
+    def test_閉じる前の記録は書き込まれる(self, db_path):
+        store = JobHistoryStore(db_path, commit_interval=5)
+        store.record(_run(run_id="last"))
+        store.close()
+
+        conn = sqlite3.connect(db_path)
+        assert conn.execute("SELECT run_id FROM runs").fetchall() == [("last",)]
+        conn.close()
+
+    def test_検索に索引を使う(self, db_path):
+        store = JobHistoryStore(db_path, commit_interval=0)
+        conn = sqlite3.connect(db_path)
+        for column in ("job_name", "branch", "status"):
+            plan = conn.execute(
+                f"EXPLAIN QUERY PLAN SELECT * FROM runs WHERE {column} = ? ORDER BY started_at DESC", ("x",)
+            ).fetchall()
+            assert "USING INDEX" in plan[0][-1]
+        conn.close()
+        store.close()
@@ -0,0 +1,203 @@
+"""CompressedLogWriter / CompressedLogReader のテスト。"""
+
+import gzip
+import json
+import zlib
+
+import pytest
+
+from src.core.job_log import (
+    INDEX_SUFFIX,
+    CompressedLogReader,
+    CompressedLogWriter,
+    JobLogReader,
+    iter_log_bytes,
+    log_size,
+    read_log_bytes,
+    resolve_job_log,
+)
+
+
+def _write(path, chunks, frame_bytes=1024):
+    with CompressedLogWriter(str(path), frame_bytes=frame_bytes) as writer:
+        for chunk in chunks:
+            writer.write(chunk)
+            writer.flush()
+    return str(path)
+
+
+def _lines(n):
+    return [f"line {i:05d} {'x' * (i % 50)}\n".encode() for i in range(n)]
+
+
+class TestCompressedLogWriter:
+    def test_gzipとしてそのまま展開できる(self, tmp_path):
+        lines = _lines(2000)
+        path = _write(tmp_path / "job.log.gz", lines)
+
+        with gzip.open(path, "rb") as f:
+            assert f.read() == b"".join(lines)
+
+    def test_フレームは行の区切りで分かれ索引に記録される(self, tmp_path):
+        lines = _lines(2000)
+        path = _write(tmp_path / "job.log.gz", lines)
+
+        with open(path + INDEX_SUFFIX, encoding="utf-8") as f:
+            records = [json.loads(line) for line in f]
+        assert len(records) > 10
+        assert all(r["complete"] for r in records)
+        assert all(r["size"] <= 1024 for r in records)
+        assert sum(r["lines"] for r in records) == 2000
+        for prev, cur in zip(records, records[1:]):
+            assert cur["offset"] == prev["offset"] + prev["length"]
+            assert cur["first_line"] == prev["first_line"] + prev["lines"]
+
+    def test_繰り返しの多い出力は小さく圧縮される(self, tmp_path):
+        lines = [f"PASSED tests/test_module.py::test_case_{i % 100}\n".encode() for i in range(20000)]
+        path = _write(tmp_path / "job.log.gz", [b"".join(lines)], frame_bytes=256 * 1024)
+
+        size = len(b"".join(lines))
+        with open(path, "rb") as f:
+            compressed = len(f.read())
+        assert compressed * 5 < size
+
+    def test_フレームより長い行は途中で分かれる(self, tmp_path):
+        long_line = b"y" * 5000 + b"\n"
+        path = _write(tmp_path / "job.log.gz", [b"head\n", long_line, b"last\n"])
+
+        reader = CompressedLogReader(path)
+        assert reader.read_lines(1, 2) == [long_line, b"last\n"]
+        assert reader.tail(2) == [long_line, b"last\n"]
+        assert any(not frame.complete for frame in reader.frames())
+
+    def test_frame_bytesが不正な場合はValueError(self, tmp_path):
+        with pytest.raises(ValueError):
+            CompressedLogWriter(str(tmp_path / "job.log.gz"), frame_bytes=0)
+
+
+class TestCompressedLogReader:
+    def test_指定した範囲の行だけを返す(self, tmp_path):
+        lines = _lines(2000)
+        path = _write(tmp_path / "job.log.gz", lines)
+        reader = CompressedLogReader(path)
+
+        assert reader.read_lines(0, 3) == lines[0:3]
+        assert reader.read_lines(1234, 100) == lines[1234:1334]
+        assert reader.read_lines(1990, 100) == lines[1990:]
+        assert reader.read_lines(5000, 10) == []
+        assert reader.line_count() == 2000
+
+    def test_範囲の行を含むフレームだけを展開する(self, tmp_path, monkeypatch):
+        path = _write(tmp_path / "job.log.gz", _lines(2000))
+        reader = CompressedLogReader(path)
+        expanded = []
+        original = reader._frame_data
+        monkeypatch.setattr(reader, "_frame_data", lambda frame: expanded.append(frame) or original(frame))
+
+        reader.read_lines(1000, 5)
+
+        assert 1 <= len(expanded) <= 2
+
+    def test_末尾の行を返す(self, tmp_path):
+        lines = _lines(2000)
+        path = _write(tmp_path / "job.log.gz", lines)
+
+        assert CompressedLogReader(path).tail(50) == lines[-50:]
+        assert CompressedLogReader(path).tail(5000) == lines
+
+    def test_書き込み中のフレームも途中まで読める(self, tmp_path):
+        path = str(tmp_path / "job.log.gz")
+        lines = _lines(100)
+        writer = CompressedLogWriter(path, frame_bytes=1024)
+        for line in lines:
+            writer.write(line)
+        writer.write(b"partial")
+        writer.flush()
+
+        reader = CompressedLogReader(path)
+        assert reader.tail(2) == [lines[-1], b"partial"]
+        assert reader.read_lines(98, 5) == lines[98:] + [b"partial"]
+        assert reader.line_count() == 101
+        assert reader.read_all() == b"".join(lines) + b"partial"
+        writer.close()
+
+    def test_索引がない場合は全体を末尾のフレームとして読む(self, tmp_path):
+        lines = _lines(500)
+        path = _write(tmp_path / "job.log.gz", lines)
+        (tmp_path / ("job.log.gz" + INDEX_SUFFIX)).unlink()
+
+        assert CompressedLogReader(path).read_lines(10, 2) == lines[10:12]
+
+    def test_復帰文字では行を分けない(self, tmp_path):
+        lines = [b"progress 10%\rprogress 100%\n", b"done\n"]
+        path = _write(tmp_path / "job.log.gz", lines)
+
+        assert CompressedLogReader(path).read_lines(1, 1) == [b"done\n"]
+        assert CompressedLogReader(path).tail(2) == lines
+
+
+class TestReadLogBytes:
+    def test_圧縮していないログはmmapで範囲を読む(self, tmp_path):
+        path = tmp_path / "job_20260101_000000.log"
+        path.write_bytes(b"0123456789" * 100)
+
+        assert read_log_bytes(str(path), 995, 100) == b"56789"
+        assert b"".join(iter_log_bytes(str(path), 10, 35, chunk_size=10)) == (b"0123456789" * 4)[10:35]
+        assert read_log_bytes(str(path), 2000, 10) == b""
+        assert log_size(str(path)) == 1000
+
+    def test_空のログも読める(self, tmp_path):
+        path = tmp_path / "job_20260101_000000.log"
+        path.write_bytes(b"")
+
+        assert read_log_bytes(str(path), 0, 10) == b""
+
+    def test_圧縮したログは展開後の位置で範囲を読む(self, tmp_path):
+        lines = _lines(2000)
+        data = b"".join(lines)
+        path = _write(tmp_path / "job_20260101_000000.log.gz", lines)
+
+        assert log_size(path) == len(data)
+        assert read_log_bytes(path, 50000, 3000) == data[50000:53000]
+        assert b"".join(iter_log_bytes(path, 0, len(data), chunk_size=7000)) == data
+
+    def test_範囲の読み出しは索引を一度だけ読み各フレームを一度だけ展開する(self, tmp_path, monkeypatch):
+        lines = _lines(5000)
+        data = b"".join(lines)
+        path = _write(tmp_path / "job_20260101_000000.log.gz", lines)
+        frame_count = len(CompressedLogReader(path).frames())
+        loads = []
+        decompressed = []
+        load_index = CompressedLogReader._load_index
+        decompress = zlib.decompress
+        monkeypatch.setattr(CompressedLogReader, "_load_index", lambda self: loads.append(1) or load_index(self))
+        monkeypatch.setattr(zlib, "decompress", lambda *args: decompressed.append(1) or decompress(*args))
+
+        # チャンクはフレームより小さいため、同じフレームを何度も読む
+        assert b"".join(iter_log_bytes(path, 0, len(data), chunk_size=300)) == data
+        assert len(loads) == 1
+        assert len(decompressed) == frame_count
+
+    def test_同じリーダーで書き込み中のログの続きを読める(self, tmp_path):
+        path = str(tmp_path / "job_20260101_000000.log.gz")
+        writer = CompressedLogWriter(path, frame_bytes=1024)
+        first = b"".join(_lines(100))
+        writer.write(first)
+        writer.flush()
+        reader = JobLogReader(path)
+        assert reader.read_bytes(0, len(first) + 100) == first
+
+        second = b"".join(_lines(300)[100:])
+        writer.write(second)
+        writer.flush()
+        assert reader.read_bytes(len(first), len(second) + 100) == second
+        writer.close()
+        assert reader.read_bytes(len(first) + len(second), 100) == b""
+
+    def test_ジョブログのファイル名だけをパスに変換する(self, tmp_path):
+        (tmp_path / "job_20260101_000000.log").write_bytes(b"x")
+
+        assert resolve_job_log(str(tmp_path), "job_20260101_000000.log") == str(tmp_path / "job_20260101_000000.log")
+        assert resolve_job_log(str(tmp_path), "job_20260101_000001.log") is None
+        assert resolve_job_log(str(tmp_path), "../job_20260101_000000.log") is None
+        assert resolve_job_log(str(tmp_path), "config.yaml") is None
@@ -1,5 +1,11 @@
 import pytest
-from src.core.job_matcher import JobMatcher
+from src.core.job_matcher import (
+    CompiledJobSet,
+    JobMatcher,
+    compile_watch_patterns,
+    literal_directory,
+    sparse_directories,
+)
 
 def test_match_files_empty_patterns():
     matcher = JobMatcher()
@@ -24,3 +30,67 @@ def test_match_job_config_no_match():
     job_config = {"watch_files": ["tests/*.py"]}
     changed_files = {"src/main.py", "readme.md"}
     assert matcher.match(job_config, changed_files) is False
+
+@pytest.mark.parametrize("pattern, expected", [
+    ("docs/**/*.md", "docs"),
+    ("src/app/main.py", "src/app"),
+    ("src/*/test_*.py", "src"),
+    ("*.md", ""),
+    ("README.md", ""),
+])
+def test_literal_directory(pattern, expected):
+    assert literal_directory(pattern) == expected
+
+def test_sparse_directories_merges_nested_directories():
+    patterns = ["docs/**", "docs/api/*.md", "tools/build.sh", "README.md"]
+    assert sparse_directories(patterns) == ["docs", "tools"]
+
+def test_sparse_directories_returns_none_for_root_wildcard():
+    assert sparse_directories(["docs/**", "*.md"]) is None
+
+@pytest.mark.parametrize("pattern, path, expected", [
+    ("docs/**/*.md", "docs/api.md", True),
+    ("docs/**/*.md", "docs/guide/intro.md", True),
+    ("docs/**/*.md", "mydocs/api.md", False),
+    ("**/*.py", "main.py", True),
+    ("src/**", "src/a/b/c.txt", True),
+    ("src/*.py", "src/main.py", True),
+    ("file[0-9].txt", "file5.txt", True),
+    ("file[!0-9].txt", "file5.txt", False),
+    ("test?.py", "test1.py", True),
+    ("a+b(c).txt", "a+b(c).txt", True),
+])
+def test_compile_watch_patterns(pattern, path, expected):
+    assert bool(compile_watch_patterns((pattern,)).fullmatch(path)) is expected
+
+def test_compile_watch_patterns_is_superset_of_fnmatch():
+    import fnmatch
+    patterns = ["*.py", "src/*", "a/**/b", "[]a]*", "x[!/]y", "*/*/*.md", "[b-a]x"]
+    paths = ["main.py", "src/a/b.py", "a/b", "a/x/b", "]abc", "xzy", "a/b/c.md", "ax"]
+    for pattern in patterns:
+        regex = compile_watch_patterns((pattern,))
+        for path in paths:
+            if fnmatch.fnmatchcase(path, pattern):
+                assert regex.fullmatch(path), (pattern, path)
+
+def test_compiled_job_set_returns_matching_job_indices():
+    job_set = CompiledJobSet([["docs/**"], [], ["src/*.py", "setup.py"], ["web/**"]])
+    assert job_set.match({"setup.py", "docs/a.md", "other.txt"}) == [0, 2]
+    assert job_set.match({"other.txt"}) == []
+    assert len(job_set) == 4
+
+def test_compiled_job_set_without_patterns():
+    assert CompiledJobSet([[], []]).match({"a.py"}) == []
+
+def test_compiled_job_set_candidates_are_limited_to_overlapping_prefixes():
+    job_set = CompiledJobSet([["docs/**/*.md"], ["services/api/**"], ["services/web/*.ts"], ["*.toml"], ["Makefile"]])
+    assert job_set.candidates("services/api/main.py") == {1, 3}
+    assert job_set.candidates("docs/guide/intro.md") == {0, 3}
+    assert job_set.candidates("Makefile") == {3, 4}
+
+def test_compiled_job_set_matches_same_as_per_job_matching():
+    jobs = [["docs/**/*.md", "mkdocs.yml"], ["src/*.py"], ["**/*.toml"], ["src/app/[a-c]*.py"]]
+    files = {"docs/api.md", "src/app/b.py", "pyproject.toml", "tests/test_a.py"}
+    matcher = JobMatcher()
+    expected = [i for i, patterns in enumerate(jobs) if matcher.match_files(patterns, files)]
+    assert CompiledJobSet(jobs).match(files) == expected == [0, 1, 2, 3]
@@ -0,0 +1,168 @@
+"""OutputTail / LogPump のテスト。"""
+
+import io
+import logging
+import os
+from unittest.mock import MagicMock
+
+import pytest
+
+from src.core.job_log import CompressedLogReader, CompressedLogWriter
+from src.core.job_output import LogPump, OutputTail
+
+
+class TestOutputTail:
+    def test_上限に収まる出力はそのまま返す(self):
+        tail = OutputTail(max_lines=10, max_bytes=1024)
+        tail.append(b"line1\n")
+        tail.append(b"line2\n")
+
+        assert tail.text() == "line1\nline2\n"
+        assert tail.total_bytes == 12
+
+    def test_行数の上限を超えた古い行は返さない(self):
+        tail = OutputTail(max_lines=2, max_bytes=1024)
+        for i in range(5):
+            tail.append(f"line{i}\n".encode())
+
+        assert tail.text() == "line3\nline4\n"
+        assert tail.text(max_lines=1) == "line4\n"
+
+    def test_バイト数の上限を超えた分は捨てて先頭の不完全な行も返さない(self):
+        tail = OutputTail(max_lines=100, max_bytes=16)
+        for i in range(1000):
+            tail.append(f"line{i:04d}\n".encode())
+
+        assert tail.text() == "line0999\n"
+        assert tail.total_bytes == 9000
+        # 保持するのは上限の 2 倍まで
+        assert len(tail._buffer) <= 32
+
+    def test_行の途中で分かれた追記もつながる(self):
+        tail = OutputTail(max_lines=10, max_bytes=1024)
+        tail.append("日本".encode()[:4])
+        tail.append("日本".encode()[4:] + b"\n")
+
+        assert tail.text() == "日本\n"
+
+    def test_不正な上限はエラー(self):
+        with pytest.raises(ValueError):
+            OutputTail(max_lines=0)
+
+
+class _FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestLogPump:
+    def _pump(self, log_file, **kwargs):
+        kwargs.setdefault("mirror_level", None)
+        return LogPump(log_file, "pump_job", OutputTail(max_lines=10, max_bytes=1024), **kwargs)
+
+    def test_ストリームを終端まで書き込んで末尾を保持する(self):
+        log_file = io.BytesIO()
+        pump = self._pump(log_file, chunk_size=4)
+
+        pump.pump(io.BytesIO(b"line1\nline2\n"))
+
+        assert log_file.getvalue() == b"line1\nline2\n"
+        assert pump.total_bytes == 12
+        assert pump.tail.text() == "line1\nline2\n"
+
+    def test_出力が続く間はflush_bytesごとにflushする(self):
+        log_file = MagicMock()
+        clock = _FakeClock()
+        pump = self._pump(log_file, chunk_size=4, flush_bytes=12, flush_interval=60, clock=clock)
+
+        for _ in range(5):
+            pump.feed(b"abcd")
+
+        assert log_file.flush.call_count == 1
+
+    def test_出力が続く間はflush_intervalごとにflushする(self):
+        log_file = MagicMock()
+        clock = _FakeClock()
+        pump = self._pump(log_file, chunk_size=4, flush_bytes=1024, flush_interval=1.0, clock=clock)
+
+        pump.feed(b"abcd")
+        clock.now = 0.5
+        pump.feed(b"abcd")
+        assert log_file.flush.call_count == 0
+        clock.now = 1.5
+        pump.feed(b"abcd")
+        assert log_file.flush.call_count == 1
+
+    def test_パイプを読み切った時点でflushする(self):
+        log_file = MagicMock()
+        pump = self._pump(log_file, chunk_size=4, flush_bytes=1024, flush_interval=60, clock=_FakeClock())
+
+        pump.feed(b"ab")
+
+        log_file.flush.assert_called_once()
+
+    def test_flush_on_idleが無効な場合はパイプを読み切ってもflushしない(self):
+        log_file = MagicMock()
+        clock = _FakeClock()
+        pump = self._pump(log_file, chunk_size=4, flush_bytes=1024, flush_interval=1.0, clock=clock, flush_on_idle=False)
+
+        pump.feed(b"ab")
+        assert log_file.flush.call_count == 0
+        clock.now = 1.5
+        pump.feed(b"ab")
+        assert log_file.flush.call_count == 1
+
+    def test_1行ずつの出力でも圧縮率が下がらない(self, tmp_path):
+        path = str(tmp_path / "job.log.gz")
+        writer = CompressedLogWriter(path)
+        clock = _FakeClock()
+        pump = self._pump(writer, clock=clock, flush_on_idle=False)
+        raw = 0
+        for i in range(20000):
+            # pytest の出力のような行が 1 行ずつパイプから読まれる
+            line = f"tests/test_module_{i % 40}.py::TestSuite::test_case_{i} PASSED{' ' * (i % 7)}[{i % 100:3d}%]\n".encode()
+            pump.feed(line)
+            raw += len(line)
+            clock.now += 0.001
+        pump.finish()
+        writer.close()
+
+        assert raw / os.path.getsize(path) >= 5
+        assert b"".join(CompressedLogReader(path).read_lines(19999, 1)).startswith(b"tests/test_module_39.py")
+
+    def test_転写が無効な場合はアプリケーションログに出力しない(self, caplog):
+        caplog.set_level(logging.INFO, logger="src.core.job_output")
+        pump = self._pump(io.BytesIO(), mirror_level=logging.DEBUG)
+
+        pump.pump(io.BytesIO(b"line1\nline2\n"))
+
+        assert not caplog.records
+
+    def test_指定した割合の行をアプリケーションログに転写する(self, caplog):
+        caplog.set_level(logging.INFO, logger="src.core.job_output")
+        pump = self._pump(io.BytesIO(), mirror_level=logging.INFO, sample_rate=0.5, chunk_size=5)
+
+        pump.pump(io.BytesIO(b"".join(f"line{i}\n".encode() for i in range(10)) + b"last"))
+
+        messages = [r.getMessage() for r in caplog.records]
+        assert messages == ["[pump_job] line1", "[pump_job] line3", "[pump_job] line5", "[pump_job] line7", "[pump_job] line9"]
+
+    def test_最後の改行のない行も転写する(self, caplog):
+        caplog.set_level(logging.INFO, logger="src.core.job_output")
+        pump = self._pump(io.BytesIO(), mirror_level=logging.INFO)
+
+        pump.pump(io.BytesIO(b"line1\nlast"))
+
+        assert [r.getMessage() for r in caplog.records] == ["[pump_job] line1", "[pump_job] last"]
+
+    def test_write_noteは即座に書き込まれる(self):
+        log_file = MagicMock()
+        pump = self._pump(log_file)
+
+        pump.write_note("タイムアウト\n")
+
+        log_file.write.assert_called_once_with("タイムアウト\n".encode("utf-8"))
+        log_file.flush.assert_called_once()
@@ -0,0 +1,308 @@
+"""JobQueue のテスト。"""
+
+import sqlite3
+import threading
+
+import pytest
+
+from src.core.job_queue import InMemoryJobQueue, QueuedJob, SqliteJobQueue
+
+
+def _job(name, commit="abc", modified=None, coalesce_key=None):
+    return QueuedJob(
+        {"name": name, "target_branch": "main"},
+        {"id": commit, "modified": modified or []},
+        coalesce_key=coalesce_key,
+    )
+
+
+class TestInMemoryJobQueue:
+    def test_投入順に取り出される(self):
+        q = InMemoryJobQueue()
+        q.put(_job("a"))
+        q.put(_job("b"))
+        assert q.qsize() == 2
+        assert q.get().job_name == "a"
+        assert q.get().job_name == "b"
+
+    def test_タイムアウト時はNoneが返る(self):
+        assert InMemoryJobQueue().get(timeout=0.01) is None
+
+    def test_drainで閉じると残りを取り出してからNoneが返る(self):
+        q = InMemoryJobQueue()
+        q.put(_job("a"))
+        q.close(drain=True)
+        assert q.get().job_name == "a"
+        assert q.get() is None
+
+    def test_drainせずに閉じると直ちにNoneが返る(self):
+        q = InMemoryJobQueue()
+        q.put(_job("a"))
+        q.close(drain=False)
+        assert q.get() is None
+
+    def test_closeで待機中のgetが解除される(self):
+        q = InMemoryJobQueue()
+        result = []
+        t = threading.Thread(target=lambda: result.append(q.get()))
+        t.start()
+        q.close()
+        t.join(timeout=1)
+        assert result == [None]
+
+    def test_joinは全ジョブの完了まで待機する(self):
+        q = InMemoryJobQueue()
+        q.put(_job("a"))
+
+        def worker():
+            job = q.get()
+            q.task_done(job)
+
+        t = threading.Thread(target=worker)
+        t.start()
+        q.join()
+        t.join()
+        assert q.qsize() == 0
+
+
+class TestCoalescing:
+    def test_同じキーの待機中ジョブに集約される(self):
+        q = InMemoryJobQueue()
+        assert q.put(_job("a", "c1", ["x.py"], coalesce_key="a@main")) is True
+        assert q.put(_job("b", "c2")) is True
+        assert q.put(_job("a", "c3", ["y.py", "x.py"], coalesce_key="a@main")) is False
+
+        assert q.qsize() == 2
+        job = q.get()
+        assert job.job_name == "a"
+        assert job.commit_info["id"] == "c3"
+        assert job.commit_info["modified"] == ["x.py", "y.py"]
+        assert job.coalesced == 1
+
+    def test_実行中のジョブには集約されない(self):
+        q = InMemoryJobQueue()
+        q.put(_job("a", "c1", coalesce_key="a@main"))
+        running = q.get()
+        assert q.put(_job("a", "c2", coalesce_key="a@main")) is True
+        assert running.commit_info["id"] == "c1"
+        assert q.get().commit_info["id"] == "c2"
+
+    def test_キーがないジョブは集約されない(self):
+        q = InMemoryJobQueue()
+        q.put(_job("a", "c1"))
+        q.put(_job("a", "c2"))
+        assert q.qsize() == 2
+
+    def test_集約結果が永続化される(self, tmp_path):
+        db_path = str(tmp_path / "jobs.db")
+        q = SqliteJobQueue(db_path)
+        q.put(_job("a", "c1", ["x.py"], coalesce_key="a@main"))
+        q.put(_job("b", "c2"))
+        q.put(_job("a", "c3", ["y.py"], coalesce_key="a@main"))
+        q.release()
+
+        restored = SqliteJobQueue(db_path)
+        job = restored.get(timeout=0)
+        assert (job.job_name, job.commit_info["id"], job.coalesced) == ("a", "c3", 1)
+        assert job.commit_info["modified"] == ["x.py", "y.py"]
+        # 復元後も待機中のジョブへの集約が継続される
+        restored.put(_job("b", "c4", coalesce_key=None))
+        assert restored.qsize() == 2
+        restored.release()
+
+
+class TestExclusiveKey:
+    def _exclusive(self, name, commit="abc"):
+        return QueuedJob({"name": name}, {"id": commit}, exclusive_key=name)
+
+    def test_同じキーのジョブが実行中なら後続の実行できるジョブが取り出される(self):
+        q = InMemoryJobQueue()
+        q.put(self._exclusive("a", "c1"))
+        q.put(self._exclusive("a", "c2"))
+        q.put(self._exclusive("b"))
+        running = q.get(timeout=0)
+        assert q.get(timeout=0).job_name == "b"
+        # a の 2 件目は 1 件目の完了まで取り出されない
+        assert q.get(timeout=0) is None
+        assert q.qsize() == 1
+        q.task_done(running)
+        assert q.get(timeout=0).commit_info["id"] == "c2"
+
+    def test_完了通知で待機中のgetが再開される(self):
+        q = InMemoryJobQueue()
+        q.put(self._exclusive("a", "c1"))
+        q.put(self._exclusive("a", "c2"))
+        running = q.get(timeout=0)
+        result = []
+        t = threading.Thread(target=lambda: result.append(q.get(timeout=5)))
+        t.start()
+        q.task_done(running)
+        t.join(timeout=5)
+        assert result[0].commit_info["id"] == "c2"
+
+    def test_drainで閉じても実行できるまで待ってから取り出す(self):
+        q = InMemoryJobQueue()
+        q.put(self._exclusive("a", "c1"))
+        q.put(self._exclusive("a", "c2"))
+        running = q.get(timeout=0)
+        q.close(drain=True)
+        assert q.get(timeout=0.01) is None
+        q.task_done(running)
+        assert q.get().commit_info["id"] == "c2"
+        assert q.get() is None
+
+    def test_exclusive_keyが永続化される(self, tmp_path):
+        db_path = str(tmp_path / "jobs.db")
+        q = SqliteJobQueue(db_path)
+        q.put(self._exclusive("a", "c1"))
+        q.put(self._exclusive("a", "c2"))
+        q.release()
+
+        restored = SqliteJobQueue(db_path)
+        restored.get(timeout=0)
+        assert restored.get(timeout=0) is None
+        restored.release()
+
+
+class TestSqliteJobQueue:
+    @pytest.fixture
+    def db_path(self, tmp_path):
+        return str(tmp_path / "queue" / "jobs.db")
+
+    def test_再起動後に待機中のジョブが復元される(self, db_path):
+        q = SqliteJobQueue(db_path)
+        q.put(_job("a", "c1"))
+        q.put(_job("b", "c2"))
+        q.close(drain=False)
+        q.release()
+
+        restored = SqliteJobQueue(db_path)
+        first = restored.get(timeout=0)
+        second = restored.get(timeout=0)
+        assert (first.job_name, first.commit_info["id"]) == ("a", "c1")
+        assert second.job_name == "b"
+        assert restored.interrupted == []
+        restored.release()
+
+    def test_優先度とリポジトリが復元後の順序に反映される(self, db_path):
+        q = SqliteJobQueue(db_path)
+        for name, repo, priority in [("a1", "A", 0), ("a2", "A", 0), ("b1", "B", 0), ("urgent", "A", 5)]:
+            q.put(QueuedJob({"name": name}, {"id": name}, priority=priority, share_key=repo))
+        q.release()
+
+        restored = SqliteJobQueue(db_path)
+        assert [job.job_name for job in restored.snapshot()] == ["urgent", "b1", "a1", "a2"]
+        assert restored.get(timeout=0).priority == 5
+        restored.release()
+
+    def test_完了したジョブは復元されない(self, db_path):
+        q = SqliteJobQueue(db_path, commit_interval=0)
+        q.put(_job("a"))
+        q.task_done(q.get())
+        q.release()
+
+        restored = SqliteJobQueue(db_path)
+        assert restored.qsize() == 0
+        restored.release()
+
+    def test_実行中だったジョブは再投入される(self, db_path):
+        q = SqliteJobQueue(db_path)
+        q.put(_job("a"))
+        q.get()
+        # task_done を呼ばずに終了 (クラッシュ相当)
+        q.release()
+
+        restored = SqliteJobQueue(db_path)
+        job = restored.get(timeout=0)
+        assert job.job_name == "a"
+        assert job.attempts == 2
+        restored.release()
+
+    def test_最大実行回数を超えたジョブは中断扱いになる(self, db_path):
+        q = SqliteJobQueue(db_path, max_attempts=1)
+        q.put(_job("a"))
+        q.get()
+        q.release()
+
+        restored = SqliteJobQueue(db_path, max_attempts=1)
+        assert restored.qsize() == 0
+        assert [job.job_name for job in restored.interrupted] == ["a"]
+        restored.acknowledge_interrupted()
+        assert restored.interrupted == []
+        restored.release()
+
+        # 通知済みの中断扱いのジョブは次回以降は復元されない
+        again = SqliteJobQueue(db_path, max_attempts=1)
+        assert again.qsize() == 0
+        assert again.interrupted == []
+        again.release()
+
+        conn = sqlite3.connect(db_path)
+        assert conn.execute("SELECT COUNT(*) FROM jobs").fetchone()[0] == 0
+        conn.close()
+
+    def test_通知前に終了した中断扱いのジョブは次回も報告される(self, db_path):
+        q = SqliteJobQueue(db_path, max_attempts=1)
+        q.put(_job("a"))
+        q.get()
+        q.release()
+
+        SqliteJobQueue(db_path, max_attempts=1).release()
+
+        again = SqliteJobQueue(db_path, max_attempts=1)
+        assert again.qsize() == 0
+        assert [job.job_name for job in again.interrupted] == ["a"]
+        again.release()
+
+    def test_永続化に失敗した書き込みは再試行される(self, db_path):
+        q = SqliteJobQueue(db_path, commit_interval=0)
+        apply = q._apply
+        failures = []
+
+        def flaky_apply(ops):
+            if not failures:
+                failures.append(ops)
+                raise sqlite3.OperationalError("database is locked")
+            apply(ops)
+
+        q._apply = flaky_apply
+        q.put(_job("a"))
+        q.put(_job("b"))
+        q.release()
+
+        assert len(failures) == 1
+        restored = SqliteJobQueue(db_path)
+        assert [job.job_name for job in restored.snapshot()] == ["a", "b"]
+        restored.release()
+
+    def test_recoveryがfailの場合は実行中だったジョブを再投入しない(self, db_path):
+        q = SqliteJobQueue(db_path, recovery="fail")
+        q.put(_job("a"))
+        q.put(_job("b"))
+        q.get()
+        q.release()
+
+        restored = SqliteJobQueue(db_path, recovery="fail")
+        assert [job.job_name for job in restored.interrupted] == ["a"]
+        assert restored.get(timeout=0).job_name == "b"
+        restored.release()
+
+    def test_並行して投入されたジョブが全て永続化される(self, db_path):
+        q = SqliteJobQueue(db_path, commit_interval=0)
+        threads = [
+            threading.Thread(target=lambda i=i: [q.put(_job(f"job-{i}-{n}")) for n in range(50)])
+            for i in range(4)
+        ]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        q.release()
+
+        restored = SqliteJobQueue(db_path)
+        assert restored.qsize() == 200
+        restored.release()
+
+    def test_未知のrecoveryはValueError(self, db_path):
+        with pytest.raises(ValueError):
+            SqliteJobQueue(db_path, recovery="unknown")
@@ -0,0 +1,57 @@
+"""JobRouter のテスト。"""
+
+import pytest
+
+from src.core.config import JobConfig
+from src.core.job_router import JobRouter
+
+
+def _job(name, repo_url=None, trigger_branches=None):
+    return JobConfig(
+        name=name,
+        repo_url=repo_url,
+        target_branch="ci-output",
+        trigger_branches=trigger_branches,
+        script="make",
+        watch_files=["src/**"],
+    )
+
+
+@pytest.fixture
+def router():
+    return JobRouter(
+        [
+            _job("app-main", "https://github.com/example/app.git", trigger_branches=["main"]),
+            _job("app-release", "git@github.com:example/app.git", trigger_branches=["release/*"]),
+            _job("lib", "https://github.com/example/lib.git"),
+            _job("default-repo", None, trigger_branches=["develop"]),
+            _job("app-any-branch", "https://github.com/example/app"),
+        ],
+        default_repo_url="https://github.com/example/default.git",
+    )
+
+
+class TestJobRouter:
+    def test_リポジトリとブランチが一致するジョブのみ返る(self, router):
+        assert router.route("https://GitHub.com/example/app", "main") == [0, 4]
+
+    def test_ブランチのglob条件で振り分けられる(self, router):
+        assert router.route("https://github.com/example/app.git", "release/1.0") == [1, 4]
+
+    def test_trigger_branches省略時は全ブランチが対象になる(self, router):
+        assert router.route("https://github.com/example/lib.git", "feature/x") == [2]
+
+    def test_repo_url省略時はデフォルトリポジトリが使われる(self, router):
+        assert router.route("https://github.com/example/default.git", "develop") == [3]
+        assert router.route("https://github.com/example/default.git", "main") == []
+
+    def test_無関係なリポジトリではジョブが返らない(self, router):
+        assert router.route("https://github.com/example/other.git", "main") == []
+
+    def test_リポジトリ情報がない場合は全ジョブが返る(self, router):
+        assert router.route(None, None) == [0, 1, 2, 3, 4]
+
+    def test_振り分け結果ごとのCompiledJobSetがキャッシュされる(self, router):
+        indices = router.route("https://github.com/example/app.git", "main")
+        assert router.job_set(indices) is router.job_set(indices)
+        assert router.job_set(indices).match({"src/main.py"}) == [0, 1]
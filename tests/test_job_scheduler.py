@@ -0,0 +1,104 @@
+"""FairShareScheduler のテスト。"""
+
+import itertools
+
+import pytest
+
+from src.core.job_queue import QueuedJob
+from src.core.job_scheduler import FairShareScheduler
+
+_NOW = 1_000_000.0
+_seq = itertools.count(1)
+
+
+def _job(name, repo="repo", priority=0, enqueued_at=_NOW):
+    job = QueuedJob({"name": name}, {"id": name}, enqueued_at=enqueued_at, priority=priority, share_key=repo)
+    job.seq = next(_seq)
+    return job
+
+
+def _drain(scheduler, now=_NOW):
+    names = []
+    while True:
+        job = scheduler.pop(now)
+        if job is None:
+            return names
+        names.append(job.job_name)
+
+
+class TestFairShareScheduler:
+    def test_同じ優先度と同じリポジトリでは投入順に取り出される(self):
+        s = FairShareScheduler()
+        for name in ("a", "b", "c"):
+            s.push(_job(name))
+        assert _drain(s) == ["a", "b", "c"]
+        assert len(s) == 0
+
+    def test_優先度の高いジョブが先に取り出される(self):
+        s = FairShareScheduler()
+        s.push(_job("low"))
+        s.push(_job("high", priority=5))
+        s.push(_job("mid", priority=1))
+        assert _drain(s) == ["high", "mid", "low"]
+
+    def test_リポジトリ間で交互に取り出される(self):
+        s = FairShareScheduler()
+        for i in range(3):
+            s.push(_job(f"a{i}", repo="A"))
+        s.push(_job("b0", repo="B"))
+        s.push(_job("b1", repo="B"))
+        assert _drain(s) == ["a0", "b0", "a1", "b1", "a2"]
+
+    def test_重みに応じて取り出される(self):
+        s = FairShareScheduler(weights={"A": 2})
+        for i in range(4):
+            s.push(_job(f"a{i}", repo="A"))
+            s.push(_job(f"b{i}", repo="B"))
+        assert _drain(s)[:6] == ["a0", "b0", "a1", "b1", "a2", "a3"]
+
+    def test_後から来たリポジトリは過去の取り分を持ち越さない(self):
+        s = FairShareScheduler()
+        for i in range(4):
+            s.push(_job(f"a{i}", repo="A"))
+        assert [s.pop(_NOW).job_name for _ in range(3)] == ["a0", "a1", "a2"]
+        s.push(_job("b0", repo="B"))
+        s.push(_job("b1", repo="B"))
+        # B は直近に取り出された A のジョブの仮想時刻から始まり、A の残りと交互になる
+        assert _drain(s) == ["b0", "a3", "b1"]
+
+    def test_エイジングにより低優先度のジョブが追いつく(self):
+        s = FairShareScheduler(aging_interval=60)
+        s.push(_job("old_low", enqueued_at=_NOW - 130))
+        s.push(_job("new_high", priority=2))
+        assert s.effective_priority(s.ordered(_NOW)[0], _NOW) == 2
+        assert _drain(s) == ["old_low", "new_high"]
+
+    def test_エイジング無効時は優先度のみで並ぶ(self):
+        s = FairShareScheduler(aging_interval=0)
+        s.push(_job("old_low", enqueued_at=_NOW - 10_000))
+        s.push(_job("new_high", priority=1))
+        assert _drain(s) == ["new_high", "old_low"]
+
+    def test_orderedは状態を変更しない(self):
+        s = FairShareScheduler()
+        s.push(_job("a0", repo="A"))
+        s.push(_job("a1", repo="A"))
+        s.push(_job("b0", repo="B"))
+        ordered = [job.job_name for job in s.ordered(_NOW)]
+        assert ordered == ["a0", "b0", "a1"]
+        assert len(s) == 3
+        assert _drain(s) == ordered
+
+    @pytest.mark.parametrize("kwargs", [{"aging_interval": -1}, {"weights": {"A": 0}}])
+    def test_不正な設定はValueError(self, kwargs):
+        with pytest.raises(ValueError):
+            FairShareScheduler(**kwargs)
+
+    def test_実行できないジョブは追い越される(self):
+        s = FairShareScheduler()
+        s.push(_job("busy", priority=1))
+        s.push(_job("free"))
+        job = s.pop(_NOW, runnable=lambda j: j.job_name != "busy")
+        assert job.job_name == "free"
+        assert s.pop(_NOW, runnable=lambda j: False) is None
+        assert _drain(s) == ["busy"]
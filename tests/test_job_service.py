@@ -6,7 +6,11 @@ from src.core.vcs_handler import GitHandler
 from src.core.job_executor import ShellJobExecutor
 from src.core.workspace_manager import WorkspaceManager
 from src.core.config import Settings, GitConfig
-from src.core.exceptions import JobValidationError
+from src.core.exceptions import JobValidationError, ScriptExecutionError
+from src.core.job_history import JobHistoryStore
+from src.core.job_timing import PHASES, phase_metric_name
+from src.core.metrics import MetricsRegistry
+from src.core.notifier import DiscordNotifier
 
 
 @pytest.fixture
@@ -273,3 +277,534 @@ def test_job_service_submit_job_queues_and_executes(mock_settings, mock_workspac
     mock_job_executor.execute.assert_called_once()
 
     service.shutdown()
+
+
+def test_job_service_persistent_workspace_is_reused(mock_settings, mock_workspace_manager, mock_vcs_handler_cls, mock_job_executor_cls, mock_vcs_handler):
+    """persistent モードではワークスペースを削除せず既存クローンを更新すること"""
+    mock_workspace_manager.get_workspace.return_value = "/tmp/test_workspace"
+    service = JobService(
+        settings=mock_settings,
+        workspace_manager=mock_workspace_manager,
+        vcs_handler_cls=mock_vcs_handler_cls,
+        job_executor_cls=mock_job_executor_cls
+    )
+
+    job_info = {
+        "name": "persistent_job",
+        "repo_url": "https://github.com/example/repo.git",
+        "target_branch": "main",
+        "script": "echo 'hello'",
+        "workspace_mode": "persistent",
+    }
+    service.run_job(job_info, {"id": "123", "modified": []})
+
+    mock_workspace_manager.get_workspace.assert_called_once_with("persistent_job")
+    mock_workspace_manager.prepare_workspace.assert_not_called()
+    mock_vcs_handler.update_repository.assert_called_once()
+    mock_vcs_handler.prepare_repository.assert_not_called()
+    mock_workspace_manager.cleanup_workspace.assert_not_called()
+
+    service.shutdown()
+
+
+def test_job_service_persistent_workspace_falls_back_to_fresh_clone(mock_settings, mock_workspace_manager, mock_vcs_handler_cls, mock_job_executor_cls, mock_vcs_handler, mock_job_executor):
+    """既存クローンが壊れている場合はワークスペースを作り直してクローンすること"""
+    from src.core.exceptions import RepositoryError
+
+    mock_workspace_manager.get_workspace.return_value = "/tmp/test_workspace"
+    mock_vcs_handler.update_repository.side_effect = RepositoryError("corrupt")
+    service = JobService(
+        settings=mock_settings,
+        workspace_manager=mock_workspace_manager,
+        vcs_handler_cls=mock_vcs_handler_cls,
+        job_executor_cls=mock_job_executor_cls
+    )
+
+    job_info = {
+        "name": "persistent_job",
+        "repo_url": "https://github.com/example/repo.git",
+        "target_branch": "main",
+        "script": "echo 'hello'",
+        "workspace_mode": "persistent",
+    }
+    service.run_job(job_info, {"id": "123", "modified": []})
+
+    mock_workspace_manager.prepare_workspace.assert_called_once_with("persistent_job")
+    mock_vcs_handler.prepare_repository.assert_called_once()
+    mock_job_executor.execute.assert_called_once()
+    mock_workspace_manager.cleanup_workspace.assert_not_called()
+
+    service.shutdown()
+
+
+def test_job_service_clones_from_mirror_when_available(mock_settings, mock_workspace_manager, mock_vcs_handler_cls, mock_job_executor_cls, mock_vcs_handler):
+    """ミラーが有効な場合はミラーのパスを reference として渡すこと"""
+    from src.core.mirror_store import MirrorStore
+
+    mirror_store = MagicMock(spec=MirrorStore)
+    mirror_store.ensure_mirror.return_value = "/tmp/mirrors/repo.git"
+    service = JobService(
+        settings=mock_settings,
+        workspace_manager=mock_workspace_manager,
+        vcs_handler_cls=mock_vcs_handler_cls,
+        job_executor_cls=mock_job_executor_cls,
+        mirror_store=mirror_store,
+    )
+
+    job_info = {
+        "name": "mirror_job",
+        "repo_url": "https://github.com/example/repo.git",
+        "target_branch": "main",
+        "script": "echo 'hello'",
+    }
+    service.run_job(job_info, {"id": "abc", "modified": []})
+
+    mirror_store.ensure_mirror.assert_called_once_with("https://github.com/example/repo.git", commit="abc", branch="main")
+    options = mock_vcs_handler.prepare_repository.call_args[1]["options"]
+    assert options.reference == "/tmp/mirrors/repo.git"
+
+    service.shutdown()
+
+
+def test_job_service_falls_back_to_remote_when_mirror_fails(mock_settings, mock_workspace_manager, mock_vcs_handler_cls, mock_job_executor_cls, mock_vcs_handler, mock_job_executor):
+    """ミラーの更新に失敗してもリモートから直接クローンしてジョブを続行すること"""
+    from src.core.mirror_store import MirrorStore
+    from src.core.exceptions import RepositoryError
+
+    mirror_store = MagicMock(spec=MirrorStore)
+    mirror_store.ensure_mirror.side_effect = RepositoryError("fetch failed")
+    service = JobService(
+        settings=mock_settings,
+        workspace_manager=mock_workspace_manager,
+        vcs_handler_cls=mock_vcs_handler_cls,
+        job_executor_cls=mock_job_executor_cls,
+        mirror_store=mirror_store,
+    )
+
+    job_info = {
+        "name": "mirror_job",
+        "repo_url": "https://github.com/example/repo.git",
+        "target_branch": "main",
+        "script": "echo 'hello'",
+    }
+    service.run_job(job_info, {"id": "abc", "modified": []})
+
+    options = mock_vcs_handler.prepare_repository.call_args[1]["options"]
+    assert options.reference is None
+    mock_job_executor.execute.assert_called_once()
+
+    service.shutdown()
+
+
+def test_job_service_passes_shallow_clone_options(mock_settings, mock_workspace_manager, mock_vcs_handler_cls, mock_job_executor_cls, mock_vcs_handler):
+    """clone_depth / single_branch がチェックアウトオプションとして渡されること"""
+    service = JobService(
+        settings=mock_settings,
+        workspace_manager=mock_workspace_manager,
+        vcs_handler_cls=mock_vcs_handler_cls,
+        job_executor_cls=mock_job_executor_cls,
+    )
+
+    job_info = {
+        "name": "shallow_job",
+        "repo_url": "https://github.com/example/repo.git",
+        "target_branch": "main",
+        "script": "echo 'hello'",
+        "clone_depth": 1,
+        "single_branch": True,
+    }
+    service.run_job(job_info, {"id": "abc", "modified": []})
+
+    options = mock_vcs_handler.prepare_repository.call_args[1]["options"]
+    assert options.depth == 1
+    assert options.single_branch is True
+    assert options.commit == "abc"
+
+    service.shutdown()
+
+
+def test_job_service_derives_sparse_paths_from_watch_files(mock_settings, mock_workspace_manager, mock_vcs_handler_cls, mock_job_executor_cls, mock_vcs_handler):
+    """sparse_checkout が有効な場合は watch_files のディレクトリに絞り込むこと"""
+    service = JobService(
+        settings=mock_settings,
+        workspace_manager=mock_workspace_manager,
+        vcs_handler_cls=mock_vcs_handler_cls,
+        job_executor_cls=mock_job_executor_cls,
+    )
+
+    job_info = {
+        "name": "docs_job",
+        "repo_url": "https://github.com/example/repo.git",
+        "target_branch": "main",
+        "script": "make docs",
+        "watch_files": ["docs/**/*.md"],
+        "sparse_checkout": True,
+        "sparse_paths": ["tools/"],
+    }
+    service.run_job(job_info, {"id": "abc", "modified": []})
+
+    options = mock_vcs_handler.prepare_repository.call_args[1]["options"]
+    assert options.sparse_paths == ["docs", "tools"]
+
+    service.shutdown()
+
+
+def test_job_service_restores_jobs_from_durable_queue(mock_settings, mock_workspace_manager, mock_vcs_handler_cls, mock_job_executor_cls, mock_job_executor, tmp_path):
+    """永続キューに残っていたジョブが起動時に実行され、中断されたジョブは失敗として通知されること"""
+    from src.core.job_queue import SqliteJobQueue, QueuedJob
+
+    db_path = str(tmp_path / "jobs.db")
+    job_info = {
+        "name": "durable_job",
+        "repo_url": "https://github.com/example/repo.git",
+        "target_branch": "main",
+        "script": "echo 'hello'",
+    }
+    previous = SqliteJobQueue(db_path, max_attempts=1)
+    previous.put(QueuedJob(dict(job_info, name="crashed_job"), {"id": "c1", "modified": []}))
+    previous.get()  # 実行中のままプロセスが終了した状態
+    previous.put(QueuedJob(job_info, {"id": "c2", "modified": []}))
+    previous.release()
+
+    notifier = MagicMock()
+    with patch("src.core.job_service.build_notifier", return_value=notifier):
+        service = JobService(
+            settings=mock_settings,
+            workspace_manager=mock_workspace_manager,
+            vcs_handler_cls=mock_vcs_handler_cls,
+            job_executor_cls=mock_job_executor_cls,
+            job_queue=SqliteJobQueue(db_path, max_attempts=1),
+        )
+    service._job_queue.join()
+
+    mock_job_executor.execute.assert_called_once()
+    events = [c[0][0] for c in notifier.notify.call_args_list]
+    interrupted = [e for e in events if e.job_name == "crashed_job"]
+    assert len(interrupted) == 1 and interrupted[0].success is False
+
+    service.shutdown()
+
+    # 通知済みの中断されたジョブは次回の起動時には報告されない
+    restarted = SqliteJobQueue(db_path, max_attempts=1)
+    assert restarted.interrupted == []
+    restarted.release()
+
+
+def test_job_service_coalesces_queued_runs(mock_settings, mock_workspace_manager, mock_vcs_handler_cls, mock_job_executor_cls):
+    """coalesce が有効なジョブは待機中の実行に集約され、集約数がメトリクスに記録されること"""
+    from src.core.job_queue import InMemoryJobQueue
+    from src.core.metrics import MetricsRegistry
+
+    metrics = MetricsRegistry()
+    job_queue = InMemoryJobQueue()
+    # ワーカーを起動せず、キューに溜まった状態を作る
+    mock_settings.max_concurrent_jobs = 0
+    service = JobService(
+        settings=mock_settings,
+        workspace_manager=mock_workspace_manager,
+        vcs_handler_cls=mock_vcs_handler_cls,
+        job_executor_cls=mock_job_executor_cls,
+        job_queue=job_queue,
+        metrics=metrics,
+    )
+
+    job_info = {
+        "name": "coalesce_job",
+        "repo_url": "https://github.com/example/repo.git",
+        "target_branch": "main",
+        "script": "echo 'hello'",
+        "coalesce": True,
+    }
+    for i in range(5):
+        service.submit_job(job_info, {"id": f"c{i}", "modified": [f"f{i}.py"]})
+    service.submit_job(dict(job_info, coalesce=False), {"id": "other", "modified": []})
+
+    assert job_queue.qsize() == 2
+    job = job_queue.get(timeout=0)
+    assert job.commit_info["id"] == "c4"
+    assert job.commit_info["modified"] == [f"f{i}.py" for i in range(5)]
+    assert metrics.snapshot()["counters"]["job_runs_coalesced_total"] == 4
+
+
+def test_job_service_cancels_superseded_running_job(mock_settings, mock_workspace_manager, mock_vcs_handler_cls, mock_vcs_handler, mock_job_executor_cls, mock_job_executor):
+    """cancel_superseded が有効なジョブは、新しいコミットの投入で実行中の古い実行が取り消されること"""
+    import threading
+    from src.core.metrics import MetricsRegistry
+
+    started = threading.Event()
+
+    def _blocking_execute(*args, cancel_token=None, **kwargs):
+        started.set()
+        cancelled = threading.Event()
+        cancel_token.add_callback(lambda reason: cancelled.set())
+        assert cancelled.wait(timeout=5)
+        cancel_token.raise_if_cancelled(kwargs["job_name"])
+
+    mock_job_executor.execute.side_effect = _blocking_execute
+    metrics = MetricsRegistry()
+    mock_settings.max_concurrent_jobs = 0
+    service = JobService(
+        settings=mock_settings,
+        workspace_manager=mock_workspace_manager,
+        vcs_handler_cls=mock_vcs_handler_cls,
+        job_executor_cls=mock_job_executor_cls,
+        metrics=metrics,
+    )
+    service._notifier = MagicMock()
+
+    job_info = {
+        "name": "cancel_job",
+        "repo_url": "https://github.com/example/repo.git",
+        "target_branch": "main",
+        "script": "sleep 60",
+        "cancel_superseded": True,
+    }
+    runner = threading.Thread(target=service.run_job, args=(job_info, {"id": "old", "modified": []}))
+    runner.start()
+    assert started.wait(timeout=5)
+
+    # 同じコミットの再投入では取り消さない
+    service.submit_job(job_info, {"id": "old", "modified": []})
+    assert metrics.snapshot()["counters"]["job_runs_cancelled_total"] == 0
+
+    service.submit_job(job_info, {"id": "new", "modified": []})
+    runner.join(timeout=5)
+
+    assert not runner.is_alive()
+    mock_vcs_handler.commit_and_push.assert_not_called()
+    event = service._notifier.notify.call_args[0][0]
+    assert event.cancelled is True and event.success is False
+    assert metrics.snapshot()["counters"]["job_runs_cancelled_total"] == 1
+    assert service._active_runs == {}
+
+    service.shutdown()
+
+
+def test_job_service_queue_status_orders_by_priority_and_estimates_wait(mock_settings, mock_workspace_manager, mock_vcs_handler_cls, mock_job_executor_cls):
+    """待機中のジョブが優先度・フェアシェア順に並び、実行時間の実績から待ち時間が推定されること"""
+    mock_settings.max_concurrent_jobs = 0
+    service = JobService(
+        settings=mock_settings,
+        workspace_manager=mock_workspace_manager,
+        vcs_handler_cls=mock_vcs_handler_cls,
+        job_executor_cls=mock_job_executor_cls,
+    )
+    base = {"target_branch": "main", "script": "make"}
+    for name, repo in [("heavy", "https://github.com/example/a.git")] * 2 + [("lint", "https://github.com/example/b.git")]:
+        service.submit_job(dict(base, name=name, repo_url=repo), {"id": "c1"})
+    service.submit_job(dict(base, name="urgent", priority=10), {"id": "c2"})
+
+    # ワーカー 1 個で実行する想定で推定する
+    service._worker_count = lambda: 1
+    service._durations.update({"heavy": 100.0, "lint": 10.0, "urgent": 5.0})
+    status = service.queue_status()
+
+    queued = status["queued"]
+    assert [q["job_name"] for q in queued] == ["urgent", "heavy", "lint", "heavy"]
+    assert [q["position"] for q in queued] == [1, 2, 3, 4]
+    assert queued[0]["repo"] == "github.com/example/default"
+    assert [q["estimated_wait_seconds"] for q in queued] == [0.0, 5.0, 105.0, 115.0]
+    assert status["running"] == []
+
+    service.shutdown(wait=False)
+
+
+def test_job_service_dispatches_other_jobs_while_workspace_is_busy(mock_settings, mock_workspace_manager, mock_vcs_handler_cls, mock_job_executor_cls, mock_job_executor):
+    """同名のジョブが実行中の間、空いたワーカーは後続の別のジョブを実行すること"""
+    import threading
+
+    release = threading.Event()
+    a_started = threading.Event()
+    b_started = threading.Event()
+    started = []
+
+    def _execute(script, cwd, job_name=None, **kwargs):
+        started.append(job_name)
+        if job_name == "a":
+            a_started.set()
+        if job_name == "b":
+            b_started.set()
+        if job_name == "a" and len(started) == 1:
+            assert release.wait(timeout=5)
+
+    mock_job_executor.execute.side_effect = _execute
+    mock_settings.max_concurrent_jobs = 2
+    service = JobService(
+        settings=mock_settings,
+        workspace_manager=mock_workspace_manager,
+        vcs_handler_cls=mock_vcs_handler_cls,
+        job_executor_cls=mock_job_executor_cls,
+    )
+    base = {"target_branch": "main", "script": "make"}
+    service.submit_job(dict(base, name="a"), {"id": "c1"})
+    service.submit_job(dict(base, name="a"), {"id": "c2"})
+    # 最初の a が実行を開始してから b を投入する (開始順をワーカーのスケジューリングに依存させない)
+    assert a_started.wait(timeout=5)
+    service.submit_job(dict(base, name="b"), {"id": "c3"})
+
+    assert b_started.wait(timeout=5)
+    assert started == ["a", "b"]
+    release.set()
+    service._job_queue.join()
+    assert started == ["a", "b", "a"]
+
+    service.shutdown()
+
+
+def test_job_service_resizes_worker_pool(mock_settings, mock_workspace_manager, mock_vcs_handler_cls, mock_job_executor_cls):
+    """自動調整が有効な場合、min_workers で起動し、要求に応じてワーカーが増減すること"""
+    import time
+    from src.core.config import AutoscaleConfig
+
+    mock_settings.autoscale = AutoscaleConfig(enabled=True, min_workers=1, max_workers=4, interval=3600)
+    service = JobService(
+        settings=mock_settings,
+        workspace_manager=mock_workspace_manager,
+        vcs_handler_cls=mock_vcs_handler_cls,
+        job_executor_cls=mock_job_executor_cls,
+    )
+    assert service._worker_count() == 1
+
+    service._resize_workers(3)
+    assert service._worker_count() == 3
+    assert len(service._workers) == 3
+
+    service._resize_workers(1)
+    assert service._worker_count() == 1
+    deadline = time.monotonic() + 5
+    while len(service._workers) > 1 and time.monotonic() < deadline:
+        time.sleep(0.05)
+    assert len(service._workers) == 1
+
+    # 停止したワーカーの後も投入したジョブは実行される
+    service.submit_job({"name": "job", "target_branch": "main", "script": "make"}, {"id": "c1"})
+    service._job_queue.join()
+    assert service.queue_status()["workers"] == 1
+
+    service.shutdown()
+
+
+def test_job_service_notifies_output_tail_and_log_path(mock_settings, mock_workspace_manager, mock_vcs_handler_cls, mock_job_executor_cls, mock_job_executor):
+    """失敗したスクリプトの出力の末尾 (notify_tail_lines 行) とジョブログのパスが通知に載ること"""
+    mock_settings.job_output.tail_lines = 50
+    mock_settings.job_output.notify_tail_lines = 2
+    mock_job_executor.execute.side_effect = ScriptExecutionError(
+        "[test_job] スクリプトが失敗しました (終了コード: 1) ログ: log/jobs/test_job.log",
+        stdout="step 1\nstep 2\nAssertionError: expected 1\n",
+        return_code=1,
+        log_path="log/jobs/test_job.log",
+    )
+    service = JobService(
+        settings=mock_settings,
+        workspace_manager=mock_workspace_manager,
+        vcs_handler_cls=mock_vcs_handler_cls,
+        job_executor_cls=mock_job_executor_cls,
+    )
+    service._notifier = MagicMock()
+
+    service.run_job(
+        {"name": "test_job", "repo_url": "https://github.com/example/repo.git", "target_branch": "main", "script": "exit 1"},
+        {"id": "123"},
+    )
+
+    assert mock_job_executor_cls.call_args[1]["output_config"].tail_lines == 50
+    event = service._notifier.notify.call_args[0][0]
+    assert not event.success
+    assert event.log_path == "log/jobs/test_job.log"
+    assert event.output_tail == "step 2\nAssertionError: expected 1\n"
+    assert "step 2" not in event.error_message
+
+    description = DiscordNotifier("https://example.invalid/webhook")._build_payload(event)["embeds"][0]["description"]
+    assert "**Output:**\n```\nstep 2\nAssertionError: expected 1\n```" in description
+    assert "**Log:** `log/jobs/test_job.log`" in description
+
+    service.shutdown()
+
+
+def test_job_service_records_queued_run_in_history(mock_settings, mock_workspace_manager, mock_vcs_handler_cls, mock_job_executor_cls, mock_job_executor, tmp_path):
+    """キューを経由した実行が待ち時間・フェーズごとの時間・ジョブログとともに履歴に残ること"""
+    mock_job_executor.log_path = "log/jobs/queued_job.log"
+    history = JobHistoryStore(str(tmp_path / "history.db"), commit_interval=0)
+    service = JobService(
+        settings=mock_settings,
+        workspace_manager=mock_workspace_manager,
+        vcs_handler_cls=mock_vcs_handler_cls,
+        job_executor_cls=mock_job_executor_cls,
+        history=history,
+    )
+
+    service.submit_job(
+        {"name": "queued_job", "repo_url": "https://github.com/example/repo.git", "target_branch": "main", "script": "true"},
+        {"id": "abc123"},
+    )
+    service._job_queue.join()
+    history.flush()
+
+    runs, _ = history.query(job_name="queued_job")
+    assert len(runs) == 1
+    run = runs[0]
+    assert run["status"] == "success"
+    assert run["exit_code"] == 0
+    assert run["commit"] == "abc123"
+    assert run["branch"] == "main"
+    assert run["job_id"] is not None
+    assert run["queue_seconds"] >= 0
+    assert run["log_path"] == "log/jobs/queued_job.log"
+    assert set(run["phases"]) == set(PHASES) - {"queue_wait"}
+
+    service.shutdown()
+    history.close()
+
+
+def test_job_service_records_failed_run_in_history(mock_settings, mock_workspace_manager, mock_vcs_handler_cls, mock_job_executor_cls, mock_job_executor, tmp_path):
+    """失敗した実行の終了コードとジョブログが履歴に残ること"""
+    mock_job_executor.execute.side_effect = ScriptExecutionError(
+        "[test_job] スクリプトが失敗しました (終了コード: 2)", return_code=2, log_path="log/jobs/test_job.log",
+    )
+    history = JobHistoryStore(str(tmp_path / "history.db"), commit_interval=0)
+    service = JobService(
+        settings=mock_settings,
+        workspace_manager=mock_workspace_manager,
+        vcs_handler_cls=mock_vcs_handler_cls,
+        job_executor_cls=mock_job_executor_cls,
+        history=history,
+    )
+
+    service.run_job(
+        {"name": "test_job", "repo_url": "https://github.com/example/repo.git", "target_branch": "main", "script": "exit 2"},
+        {"id": "123"},
+    )
+    history.flush()
+
+    run = history.query(status="failed")[0][0]
+    assert run["exit_code"] == 2
+    assert run["log_path"] == "log/jobs/test_job.log"
+    assert run["queue_seconds"] is None
+    assert "終了コード: 2" in run["error"]
+
+    service.shutdown()
+    history.close()
+
+
+def test_job_service_records_phase_timings_per_job(mock_settings, mock_workspace_manager, mock_vcs_handler_cls, mock_job_executor_cls, mock_job_executor):
+    """キューの待ち時間と各フェーズの所要時間がジョブごとのヒストグラムに集計されること"""
+    metrics = MetricsRegistry()
+    service = JobService(
+        settings=mock_settings,
+        workspace_manager=mock_workspace_manager,
+        vcs_handler_cls=mock_vcs_handler_cls,
+        job_executor_cls=mock_job_executor_cls,
+        metrics=metrics,
+    )
+
+    service.submit_job(
+        {"name": "timed_job", "repo_url": "https://github.com/example/repo.git", "target_branch": "main", "script": "true"},
+        {"id": "abc123"},
+    )
+    service._job_queue.join()
+
+    histograms = metrics.snapshot()["histograms"]
+    for phase in PHASES:
+        assert histograms[phase_metric_name("timed_job", phase)]["count"] == 1
+
+    service.shutdown()
@@ -0,0 +1,81 @@
+"""JobTimings / RunRecord のフェーズ計測のテスト。"""
+
+import json
+import logging
+
+import pytest
+
+from src.core.job_history import RunRecord
+from src.core.job_queue import QueuedJob
+from src.core.job_timing import JobTimings, phase_metric_name
+from src.core.metrics import MetricsRegistry
+
+
+def _record(timings, queue_seconds=None):
+    return RunRecord("build", "github.com/example/repo", "main", "abc123", queue_seconds=queue_seconds, timings=timings)
+
+
+class TestJobTimings:
+    def test_フェーズの時間をジョブごとのヒストグラムに集計する(self):
+        metrics = MetricsRegistry()
+        timings = JobTimings(metrics)
+        timings.observe("build", "run1", "checkout", 0.5)
+        timings.observe("build", "run2", "checkout", 1.5)
+        timings.observe("test", "run3", "checkout", 2.0)
+
+        histograms = metrics.snapshot()["histograms"]
+        assert histograms[phase_metric_name("build", "checkout")]["count"] == 2
+        assert histograms[phase_metric_name("build", "checkout")]["sum"] == 2.0
+        assert histograms[phase_metric_name("test", "checkout")]["count"] == 1
+
+    def test_フェーズごとのイベントをDEBUGで出力する(self, caplog):
+        timings = JobTimings()
+        with caplog.at_level(logging.DEBUG, logger="src.core.job_timing"):
+            timings.observe("build", "run1", "checkout", 0.25, ok=False)
+
+        event = caplog.records[-1].event
+        assert event == {"event": "job_phase", "job": "build", "run_id": "run1", "phase": "checkout", "seconds": 0.25, "ok": False}
+        assert json.loads(caplog.records[-1].getMessage()) == event
+
+    def test_INFOではフェーズごとのイベントを出力しない(self, caplog):
+        timings = JobTimings()
+        with caplog.at_level(logging.INFO, logger="src.core.job_timing"):
+            timings.observe("build", "run1", "checkout", 0.25)
+        assert caplog.records == []
+
+
+class TestRunRecordPhases:
+    def test_フェーズと待ち時間を集計し終了時にまとめを出力する(self, caplog):
+        metrics = MetricsRegistry()
+        record = _record(JobTimings(metrics), queue_seconds=3.0)
+        with record.phase("execute_script"):
+            pass
+        with pytest.raises(RuntimeError):
+            with record.phase("handle_result"):
+                raise RuntimeError("push failed")
+
+        with caplog.at_level(logging.INFO, logger="src.core.job_timing"):
+            record.finish("failed", "push failed")
+
+        histograms = metrics.snapshot()["histograms"]
+        assert histograms[phase_metric_name("build", "queue_wait")]["sum"] == 3.0
+        assert histograms[phase_metric_name("build", "execute_script")]["count"] == 1
+        assert histograms[phase_metric_name("build", "handle_result")]["count"] == 1
+        summary = caplog.records[-1].event
+        assert summary["event"] == "job_timing"
+        assert summary["status"] == "failed"
+        assert summary["queue_seconds"] == 3.0
+        assert set(summary["phases"]) == {"execute_script", "handle_result"}
+
+
+class TestQueuedJobWaited:
+    def test_投入したジョブは単調時計で待ち時間を測る(self, monkeypatch):
+        job = QueuedJob({"name": "build"}, {"id": "abc"})
+        # 壁時計が戻っても待ち時間は負にならない
+        monkeypatch.setattr("src.core.job_queue.time.time", lambda: 0.0)
+        assert job.waited() >= 0
+
+    def test_復元したジョブは投入時刻から測る(self, monkeypatch):
+        job = QueuedJob({"name": "build"}, {"id": "abc"}, enqueued_at=100.0)
+        monkeypatch.setattr("src.core.job_queue.time.time", lambda: 130.0)
+        assert job.waited() == 30.0
@@ -8,6 +8,9 @@ from src.core.job_trigger import JobTriggerService
 from src.core.config import Settings, GitConfig, JobConfig, RepoCISettings, RepoJobConfig
 from src.core.interfaces import WebhookProvider, IJobService, IJobMatcher
 from src.core.repo_ci_config_loader import RepoCIConfigLoader
+from src.core.job_matcher import JobMatcher
+from src.core.job_service import JobService
+from src.core.workspace_manager import WorkspaceManager
 
 
 @pytest.fixture
@@ -170,6 +173,34 @@ class TestJobTriggerServiceRepoCIConfig:
         assert job_dict["repo_url"] == repo_info["repo_url"]
         assert job_dict["target_branch"] == repo_info["branch"]
 
+    def test_リポジトリCI設定の優先度で他のリポジトリのジョブを追い越せない(self, mock_job_matcher, provider_with_repo):
+        settings = Settings(
+            git=GitConfig(repo_url="https://github.com/example/default.git"), max_concurrent_jobs=0
+        )
+        job_service = JobService(settings, workspace_manager=MagicMock(spec=WorkspaceManager))
+        # 別リポジトリのジョブが先に待機している
+        job_service.submit_job(
+            {"name": "other", "repo_url": "https://github.com/example/other.git", "target_branch": "main", "script": "make"},
+            {"id": "c0"},
+        )
+        loader = MagicMock(spec=RepoCIConfigLoader)
+        loader.load_from_repo.return_value = RepoCISettings.model_validate(
+            {"jobs": [{"name": "greedy", "script": "make", "watch_files": ["src/*.py"], "priority": 1000000}]}
+        )
+        service = JobTriggerService(
+            settings=settings,
+            job_service=job_service,
+            job_matcher=mock_job_matcher,
+            repo_config_loader=loader,
+        )
+
+        assert service.process_webhook_event(provider_with_repo, {}) == ["greedy"]
+
+        queued = job_service.queue_status()["queued"]
+        assert [q["job_name"] for q in queued] == ["other", "greedy"]
+        assert queued[1]["priority"] == 0
+        job_service.shutdown(wait=False)
+
     def test_リポジトリCI設定がない場合はローカルジョブのみ実行される(
         self,
         mock_settings,
@@ -215,3 +246,79 @@ class TestJobTriggerServiceRepoCIConfig:
 
         assert result == ["test_job"]
         assert mock_job_service.submit_job.call_count == 1
+
+
+class TestJobTriggerServiceCompiledMatcher:
+    """標準マッチャー使用時 (コンパイル済みパターンによる一括判定) のテスト。"""
+
+    @pytest.fixture
+    def settings(self):
+        def job(name, watch_files):
+            return JobConfig(
+                name=name,
+                repo_url="https://github.com/example/repo.git",
+                target_branch="ci-output",
+                trigger_branches=["main"],
+                script="echo hello",
+                watch_files=watch_files,
+            )
+
+        return Settings(
+            git=GitConfig(access_token="test_token", repo_url="https://github.com/example/default.git"),
+            jobs=[
+                job("docs", ["docs/**/*.md"]),
+                job("backend", ["src/*.py"]),
+                job("frontend", ["web/**"]),
+            ],
+        )
+
+    def test_マッチしたジョブのみ定義順にトリガーされる(
+        self, settings, mock_job_service, mock_provider, mock_repo_config_loader
+    ):
+        mock_provider.extract_changed_files.return_value = {"web/app.ts", "docs/index.md", "README.md"}
+        service = JobTriggerService(
+            settings=settings,
+            job_service=mock_job_service,
+            job_matcher=JobMatcher(),
+            repo_config_loader=mock_repo_config_loader,
+        )
+        result = service.process_webhook_event(mock_provider, {})
+
+        assert result == ["docs", "frontend"]
+        assert [c[0][0]["name"] for c in mock_job_service.submit_job.call_args_list] == ["docs", "frontend"]
+
+    def test_別リポジトリへのプッシュではローカルジョブがトリガーされない(
+        self, settings, mock_job_service, mock_provider, mock_repo_config_loader
+    ):
+        mock_provider.extract_changed_files.return_value = {"docs/index.md"}
+        mock_provider.extract_repo_info.return_value = {
+            "repo_url": "https://github.com/example/other.git",
+            "branch": "main",
+        }
+        service = JobTriggerService(
+            settings=settings,
+            job_service=mock_job_service,
+            job_matcher=JobMatcher(),
+            repo_config_loader=mock_repo_config_loader,
+        )
+        assert service.process_webhook_event(mock_provider, {}) == []
+        mock_job_service.submit_job.assert_not_called()
+
+    def test_対象ブランチ以外へのプッシュではローカルジョブがトリガーされない(
+        self, settings, mock_job_service, mock_provider, mock_repo_config_loader
+    ):
+        mock_provider.extract_changed_files.return_value = {"docs/index.md"}
+        mock_provider.extract_repo_info.return_value = {
+            "repo_url": "git@github.com:example/repo.git",
+            "branch": "feature/x",
+        }
+        service = JobTriggerService(
+            settings=settings,
+            job_service=mock_job_service,
+            job_matcher=JobMatcher(),
+            repo_config_loader=mock_repo_config_loader,
+        )
+        assert service.process_webhook_event(mock_provider, {}) == []
+
+        mock_provider.extract_repo_info.return_value["branch"] = "main"
+        assert service.process_webhook_event(mock_provider, {}) == ["docs"]
@@ -0,0 +1,186 @@
+"""LogRetentionService のテスト。"""
+
+import os
+
+import pytest
+
+from src.core.config import LogRetentionConfig
+from src.core.job_log import INDEX_SUFFIX, remove_job_log
+from src.core.log_retention import LogRetentionService
+from src.core.metrics import MetricsRegistry
+
+NOW = 1_800_000_000.0
+DAY = 86400
+
+
+def _log(log_dir, job, index, size=100, age=DAY, suffix=".log"):
+    """index 番目の実行のログを作成する (index が大きいほど新しい)。"""
+    path = log_dir / f"{job}_20260101_{index:06d}{suffix}"
+    path.write_bytes(b"x" * size)
+    mtime = NOW - age + index
+    os.utime(path, (mtime, mtime))
+    return path
+
+
+def _service(log_dir, metrics=None, **config):
+    return LogRetentionService(
+        str(log_dir), LogRetentionConfig(enabled=True, **config), metrics=metrics, clock=lambda: NOW
+    )
+
+
+def _run_until_scanned(service, ticks=10):
+    for _ in range(ticks):
+        service.tick()
+
+
+@pytest.fixture
+def log_dir(tmp_path):
+    path = tmp_path / "logs"
+    path.mkdir()
+    return path
+
+
+class TestLogRetentionService:
+    def test_ジョブごとに直近keep_last件を残す(self, log_dir):
+        a = [_log(log_dir, "build", i) for i in range(5)]
+        b = [_log(log_dir, "test", i) for i in range(2)]
+        service = _service(log_dir, keep_last=2)
+
+        service.tick()
+
+        assert [p.exists() for p in a] == [False, False, False, True, True]
+        assert all(p.exists() for p in b)
+
+    def test_最大日数を過ぎたログを削除する(self, log_dir):
+        old = _log(log_dir, "build", 0, age=10 * DAY)
+        new = _log(log_dir, "build", 1, age=1 * DAY)
+        service = _service(log_dir, max_age_days=7)
+
+        service.tick()
+
+        assert not old.exists()
+        assert new.exists()
+
+    def test_容量を超えた分を古いものから削除する(self, log_dir):
+        logs = [_log(log_dir, f"job{i % 3}", i, size=1024 * 1024) for i in range(6)]
+        service = _service(log_dir, max_total_mb=2.5)
+
+        deleted = service.tick()
+
+        assert [p.exists() for p in logs] == [False, False, False, False, True, True]
+        assert deleted == 4 * 1024 * 1024
+
+    def test_書き込み中のログは削除しない(self, log_dir):
+        active = _log(log_dir, "build", 0, size=1024 * 1024, age=10)
+        service = _service(log_dir, max_total_mb=0.5)
+
+        service.tick()
+
+        assert active.exists()
+
+    def test_圧縮したログは索引ファイルごと削除し容量にも含める(self, log_dir):
+        old = _log(log_dir, "build", 0, suffix=".log.gz")
+        index = log_dir / (old.name + INDEX_SUFFIX)
+        index.write_bytes(b"i" * 50)
+        _log(log_dir, "build", 1, suffix=".log.gz")
+        metrics = MetricsRegistry()
+        service = _service(log_dir, metrics=metrics, keep_last=1)
+
+        service.tick()
+
+        assert not old.exists()
+        assert not index.exists()
+        snapshot = metrics.snapshot()
+        assert snapshot["counters"]["job_log_retention_deleted_bytes_total"] == 150
+        assert snapshot["counters"]["job_log_retention_deleted_files_total"] == 1
+        assert snapshot["histograms"]["job_log_retention_scan_seconds"]["count"] == 1
+        assert snapshot["gauges"]["job_log_files"] == 1
+
+    def test_ジョブログ以外のファイルは対象外(self, log_dir):
+        other = log_dir / "notes.txt"
+        other.write_text("keep")
+        os.utime(other, (NOW - 100 * DAY, NOW - 100 * DAY))
+        service = _service(log_dir, max_age_days=1)
+
+        service.tick()
+
+        assert other.exists()
+        assert service.files() == []
+
+    def test_走査はscan_batchエントリずつ進む(self, log_dir):
+        for i in range(10):
+            _log(log_dir, "build", i)
+        service = _service(log_dir, scan_batch=4)
+
+        service.tick()
+        assert len(service.files()) == 4
+        _run_until_scanned(service, ticks=2)
+        assert len(service.files()) == 10
+
+    def test_ディレクトリに変更がなければ走査しない(self, log_dir, monkeypatch):
+        _log(log_dir, "build", 0)
+        service = _service(log_dir)
+        service.tick()
+        scans = []
+        original = os.scandir
+        monkeypatch.setattr("src.core.log_retention.os.scandir", lambda path: scans.append(path) or original(path))
+
+        service.tick()
+        assert scans == []
+
+        _log(log_dir, "build", 1)
+        os.utime(log_dir, ns=(0, os.stat(log_dir).st_mtime_ns + 1_000_000_000))
+        service.tick()
+        assert len(scans) == 1
+        assert len(service.files()) == 2
+
+    def test_削除中に作成されたログも次の走査で一覧に入る(self, log_dir, monkeypatch):
+        for i in range(3):
+            _log(log_dir, "build", i)
+        service = _service(log_dir, keep_last=1)
+        original = remove_job_log
+
+        def remove_and_create(path):
+            original(path)
+            # 削除の間に別のジョブのログが作成される
+            if not (log_dir / "test_20260101_000000.log").exists():
+                _log(log_dir, "test", 0)
+
+        monkeypatch.setattr("src.core.log_retention.remove_job_log", remove_and_create)
+        service.tick()
+        assert [os.path.basename(f.path) for f in service.files()] == ["build_20260101_000002.log"]
+
+        service.tick()
+        assert sorted(os.path.basename(f.path) for f in service.files()) == [
+            "build_20260101_000002.log",
+            "test_20260101_000000.log",
+        ]
+
+    def test_外部で削除されたログは次の走査で一覧から外れる(self, log_dir):
+        first = _log(log_dir, "build", 0)
+        _log(log_dir, "build", 1)
+        service = _service(log_dir)
+        service.tick()
+
+        first.unlink()
+        os.utime(log_dir, ns=(0, os.stat(log_dir).st_mtime_ns + 1_000_000_000))
+        service.tick()
+
+        assert [os.path.basename(f.path) for f in service.files()] == ["build_20260101_000001.log"]
+
+    def test_最新のログのサイズは走査しなくても更新される(self, log_dir):
+        latest = _log(log_dir, "build", 0, size=10)
+        service = _service(log_dir)
+        service.tick()
+
+        with open(latest, "ab") as f:
+            f.write(b"y" * 90)
+        os.utime(latest, (NOW - 1, NOW - 1))
+        service.tick()
+
+        assert service.files()[0].size == 100
+
+    def test_ディレクトリがなくてもエラーにならない(self, tmp_path):
+        service = _service(tmp_path / "missing", keep_last=1)
+
+        assert service.tick() == 0
@@ -0,0 +1,141 @@
+"""LogBroadcast / LogStreamRegistry のテスト。"""
+
+import asyncio
+import json
+import threading
+import time
+
+from src.core.log_stream import LogBroadcast, LogStreamRegistry
+from src.core.metrics import MetricsRegistry
+
+
+def _collect(registry, name, path, offset=0, keepalive=5.0):
+    async def _run():
+        return [event async for event in registry.stream(name, path, offset=offset, keepalive=keepalive)]
+    return asyncio.run(_run())
+
+
+def _output(events):
+    """output イベントの data をつなげた文字列と、最後のイベント ID。"""
+    text = ""
+    last_id = None
+    for event in events:
+        fields = dict(line.split(": ", 1) for line in event.strip().split("\n") if not line.startswith(":"))
+        if fields.get("event") == "output":
+            text += json.loads(fields["data"])
+            last_id = int(fields["id"])
+    return text, last_id
+
+
+class TestLogBroadcast:
+    def test_位置を指定して読める(self):
+        broadcast = LogBroadcast("job.log", "job", "/tmp/job.log")
+        broadcast.append(b"hello ")
+        broadcast.append(b"world\n")
+
+        assert broadcast.read(0, 100) == b"hello world\n"
+        assert broadcast.read(6, 3) == b"wor"
+        assert broadcast.read(12, 100) == b""
+        assert broadcast.end == 12
+
+    def test_保持する範囲より前の位置はNoneを返す(self):
+        broadcast = LogBroadcast("job.log", "job", "/tmp/job.log", buffer_bytes=10)
+        for _ in range(5):
+            broadcast.append(b"0123456789")
+
+        assert broadcast.read(0, 10) is None
+        assert broadcast.read(40, 10) == b"0123456789"
+
+    def test_追記されるまで待つ(self):
+        broadcast = LogBroadcast("job.log", "job", "/tmp/job.log")
+
+        async def _run():
+            waiter = asyncio.ensure_future(broadcast.wait(0, timeout=5))
+            await asyncio.sleep(0.05)
+            assert not waiter.done()
+            threading.Thread(target=broadcast.append, args=(b"x",)).start()
+            return await waiter
+
+        assert asyncio.run(_run()) is True
+
+    def test_タイムアウトした場合はFalse(self):
+        broadcast = LogBroadcast("job.log", "job", "/tmp/job.log")
+
+        assert asyncio.run(broadcast.wait(0, timeout=0.05)) is False
+        assert broadcast._waiters == []
+
+
+class TestLogStreamRegistry:
+    def test_実行中の出力を終わりまで配信する(self, tmp_path):
+        metrics = MetricsRegistry()
+        registry = LogStreamRegistry(metrics=metrics, encoding="utf-8")
+        path = str(tmp_path / "job_20260101_000000.log")
+        broadcast = registry.open(path, "job")
+
+        def _produce():
+            for i in range(3):
+                time.sleep(0.05)
+                broadcast.append(f"line {i}\n".encode())
+            registry.close(broadcast)
+
+        threading.Thread(target=_produce).start()
+        events = _collect(registry, broadcast.name, path)
+
+        assert _output(events) == ("line 0\nline 1\nline 2\n", 21)
+        assert json.loads(events[-1].split("data: ")[1]) == {"offset": 21}
+        assert registry.get(broadcast.name) is None
+        assert metrics.snapshot()["gauges"]["log_stream_viewers"] == 0
+
+    def test_終了したログはディスクから途中の位置から配信する(self, tmp_path):
+        registry = LogStreamRegistry(encoding="utf-8")
+        path = tmp_path / "job_20260101_000000.log"
+        path.write_bytes(b"first\nsecond\n")
+
+        events = _collect(registry, path.name, str(path), offset=6)
+
+        assert _output(events) == ("second\n", 13)
+
+    def test_保持する範囲より前の位置はディスクから読む(self, tmp_path):
+        registry = LogStreamRegistry(buffer_bytes=4, encoding="utf-8")
+        path = tmp_path / "job_20260101_000000.log"
+        data = b"".join(f"{i}\n".encode() for i in range(10))
+        path.write_bytes(data)
+        broadcast = registry.open(str(path), "job")
+        broadcast.append(data)
+        broadcast.close()
+
+        events = _collect(registry, broadcast.name, str(path))
+
+        assert _output(events)[0] == data.decode()
+
+    def test_文字の途中で区切られた場合はイベントIDに含めない(self, tmp_path):
+        registry = LogStreamRegistry(encoding="utf-8")
+        path = str(tmp_path / "job_20260101_000000.log")
+        broadcast = registry.open(path, "job")
+        encoded = "日本語\n".encode("utf-8")
+        broadcast.append(encoded[:4])
+
+        async def _first_event():
+            stream = registry.stream(broadcast.name, path)
+            event = await stream.__anext__()
+            await stream.aclose()
+            return event
+
+        assert _output([asyncio.run(_first_event())]) == ("日", 3)
+
+    def test_出力がない間はキープアライブを送る(self, tmp_path):
+        registry = LogStreamRegistry(encoding="utf-8")
+        path = str(tmp_path / "job_20260101_000000.log")
+        broadcast = registry.open(path, "job")
+        threading.Timer(0.3, registry.close, args=(broadcast,)).start()
+
+        events = _collect(registry, broadcast.name, path, keepalive=0.1)
+
+        assert ": keepalive\n\n" in events
+
+    def test_ジョブ名で実行中の配信を探す(self, tmp_path):
+        registry = LogStreamRegistry()
+        broadcast = registry.open(str(tmp_path / "build_20260101_000000.log"), "build")
+
+        assert registry.find_job("build") is broadcast
+        assert registry.find_job("test") is None
@@ -0,0 +1,44 @@
+"""MetricsRegistry のテスト。"""
+
+from src.core.metrics import MetricsRegistry, Histogram
+
+
+class TestMetricsRegistry:
+    def test_同名のメトリクスは同一インスタンスが返る(self):
+        registry = MetricsRegistry()
+        assert registry.counter("a") is registry.counter("a")
+        assert registry.gauge("b") is registry.gauge("b")
+        assert registry.histogram("c") is registry.histogram("c")
+
+    def test_snapshotに現在値が含まれる(self):
+        registry = MetricsRegistry()
+        registry.counter("requests").inc()
+        registry.counter("requests").inc(2)
+        registry.gauge("backlog").set(5)
+        registry.histogram("latency").observe(0.2)
+
+        snapshot = registry.snapshot()
+
+        assert snapshot["counters"]["requests"] == 3
+        assert snapshot["gauges"]["backlog"] == 5
+        assert snapshot["histograms"]["latency"]["count"] == 1
+
+
+class TestHistogram:
+    def test_観測値が集計される(self):
+        histogram = Histogram(buckets=[1.0, 2.0, 5.0])
+        for value in (0.5, 1.5, 1.5, 4.0):
+            histogram.observe(value)
+
+        snapshot = histogram.snapshot()
+
+        assert snapshot["count"] == 4
+        assert snapshot["sum"] == 7.5
+        assert snapshot["min"] == 0.5
+        assert snapshot["max"] == 4.0
+        assert snapshot["buckets"]["1.0"] == 1
+        assert snapshot["buckets"]["2.0"] == 2
+        assert snapshot["p50"] == 2.0
+
+    def test_観測なしの場合の分位点はNone(self):
+        assert Histogram().quantile(0.5) is None
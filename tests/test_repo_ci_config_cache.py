@@ -0,0 +1,136 @@
+"""RepoCIConfigCache のテスト。"""
+
+import threading
+import time
+
+import pytest
+
+from src.core.config import RepoCISettings, RepoJobConfig
+from src.core.metrics import MetricsRegistry
+from src.core.repo_ci_config_cache import RepoCIConfigCache, Uncached
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def settings():
+    return RepoCISettings(jobs=[RepoJobConfig(name="build", script="make")])
+
+
+class TestRepoCIConfigCache:
+    def test_同じキーの2回目はloaderが呼ばれない(self, settings):
+        cache = RepoCIConfigCache()
+        calls = []
+
+        def loader():
+            calls.append(1)
+            return settings
+
+        assert cache.get_or_load(("repo", "sha1"), loader) is settings
+        assert cache.get_or_load(("repo", "sha1"), loader) is settings
+        assert len(calls) == 1
+
+    def test_TTL経過後は再読み込みされる(self, settings):
+        clock = FakeClock()
+        cache = RepoCIConfigCache(ttl_seconds=10, clock=clock)
+        calls = []
+
+        def loader():
+            calls.append(1)
+            return settings
+
+        cache.get_or_load("key", loader)
+        clock.now = 11
+        cache.get_or_load("key", loader)
+        assert len(calls) == 2
+
+    def test_設定なしの結果はネガティブTTLで保持される(self):
+        clock = FakeClock()
+        cache = RepoCIConfigCache(ttl_seconds=100, negative_ttl_seconds=5, clock=clock)
+        calls = []
+
+        def loader():
+            calls.append(1)
+            return None
+
+        assert cache.get_or_load("key", loader) is None
+        clock.now = 4
+        assert cache.get_or_load("key", loader) is None
+        assert len(calls) == 1
+        clock.now = 6
+        cache.get_or_load("key", loader)
+        assert len(calls) == 2
+
+    def test_上限を超えると最も古く使われたエントリが破棄される(self, settings):
+        cache = RepoCIConfigCache(max_entries=2)
+        cache.get_or_load("a", lambda: settings)
+        cache.get_or_load("b", lambda: settings)
+        cache.get_or_load("a", lambda: settings)  # a を最近使用に更新
+        cache.get_or_load("c", lambda: settings)
+
+        calls = []
+        cache.get_or_load("a", lambda: calls.append("a") or settings)
+        cache.get_or_load("b", lambda: calls.append("b") or settings)
+        assert calls == ["b"]
+
+    def test_loaderの例外はキャッシュされない(self, settings):
+        cache = RepoCIConfigCache()
+
+        def failing():
+            raise RuntimeError("clone failed")
+
+        with pytest.raises(RuntimeError):
+            cache.get_or_load("key", failing)
+        assert cache.get_or_load("key", lambda: settings) is settings
+
+    def test_Uncachedで返した値はキャッシュされない(self, settings):
+        cache = RepoCIConfigCache()
+        calls = []
+
+        def loader():
+            calls.append(1)
+            return Uncached(settings)
+
+        assert cache.get_or_load("key", loader) is settings
+        assert cache.get_or_load("key", loader) is settings
+        assert len(calls) == 2
+        assert len(cache) == 0
+
+    def test_同時読み込みは1回のロードに集約される(self, settings):
+        metrics = MetricsRegistry()
+        cache = RepoCIConfigCache(metrics=metrics)
+        release = threading.Event()
+        started = threading.Event()
+        calls = []
+
+        def slow_loader():
+            calls.append(1)
+            started.set()
+            release.wait(timeout=5)
+            return settings
+
+        results = []
+        leader = threading.Thread(target=lambda: results.append(cache.get_or_load("key", slow_loader)))
+        leader.start()
+        started.wait(timeout=5)
+        followers = [
+            threading.Thread(target=lambda: results.append(cache.get_or_load("key", slow_loader)))
+            for _ in range(3)
+        ]
+        for t in followers:
+            t.start()
+        # フォロワーが待機状態に入るまで待つ
+        while metrics.counter("repo_ci_config_cache_coalesced_total").value < 3:
+            time.sleep(0.001)
+        release.set()
+        for t in [leader, *followers]:
+            t.join(timeout=5)
+
+        assert len(calls) == 1
+        assert results == [settings] * 4
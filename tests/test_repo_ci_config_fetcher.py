@@ -0,0 +1,100 @@
+"""RepoCIConfigFetcher 実装のテスト (ローカルの bare リポジトリを使用)。"""
+
+import pytest
+from git import Repo
+
+from src.core.mirror_store import MirrorStore
+from src.core.repo_ci_config_fetcher import (
+    CloneConfigFetcher,
+    MirrorConfigFetcher,
+    PartialFetchConfigFetcher,
+    build_config_fetcher,
+)
+
+
+def _commit_file(repo: Repo, rel_path: str, content: str, message: str) -> str:
+    file_path = repo.working_tree_dir + "/" + rel_path
+    with open(file_path, "w", encoding="utf-8") as f:
+        f.write(content)
+    repo.index.add([rel_path])
+    return repo.index.commit(message).hexsha
+
+
+@pytest.fixture
+def bare_repo(tmp_path):
+    """設定ファイルを含む 2 コミットの bare リポジトリ。"""
+    src = Repo.init(tmp_path / "src", initial_branch="main")
+    with src.config_writer() as cw:
+        cw.set_value("user", "name", "test")
+        cw.set_value("user", "email", "test@example.com")
+    first = _commit_file(src, ".toyci.yaml", "jobs: []\n", "first")
+    second = _commit_file(src, ".toyci.yaml", "jobs:\n  - name: a\n    script: b\n", "second")
+
+    bare_path = tmp_path / "remote.git"
+    bare = src.clone(str(bare_path), bare=True)
+    with bare.config_writer() as cw:
+        cw.set_value("uploadpack", "allowFilter", "true")
+        cw.set_value("uploadpack", "allowAnySHA1InWant", "true")
+    return {"url": bare_path.as_uri(), "first": first, "second": second}
+
+
+@pytest.mark.parametrize("fetcher_cls", [CloneConfigFetcher, PartialFetchConfigFetcher])
+class TestConfigFetchers:
+    def test_ブランチ先頭の設定ファイルが取得できる(self, fetcher_cls, bare_repo):
+        fetched = fetcher_cls().fetch_file(bare_repo["url"], "main", ".toyci.yaml")
+        assert "name: a" in fetched.content
+        assert fetched.revision == bare_repo["second"]
+
+    def test_存在しないファイルはNoneが返る(self, fetcher_cls, bare_repo):
+        fetched = fetcher_cls().fetch_file(bare_repo["url"], "main", "missing.yaml")
+        assert fetched.content is None
+        assert fetched.revision == bare_repo["second"]
+
+
+class TestPartialFetchConfigFetcher:
+    def test_コミット指定時はそのコミットの内容が返る(self, bare_repo):
+        fetcher = PartialFetchConfigFetcher()
+        fetched = fetcher.fetch_file(
+            bare_repo["url"], "main", ".toyci.yaml", commit=bare_repo["first"]
+        )
+        assert fetched.content == "jobs: []"
+        assert fetched.revision == bare_repo["first"]
+
+    def test_存在しないコミットの場合はブランチ先頭にフォールバックする(self, bare_repo):
+        fetcher = PartialFetchConfigFetcher()
+        fetched = fetcher.fetch_file(
+            bare_repo["url"], "main", ".toyci.yaml", commit="0" * 40
+        )
+        assert "name: a" in fetched.content
+        # 読み出したのは指定と異なるコミット
+        assert fetched.revision == bare_repo["second"]
+
+
+class TestMirrorConfigFetcher:
+    def test_ミラー経由で指定コミットの内容が返る(self, bare_repo, tmp_path):
+        fetcher = MirrorConfigFetcher(MirrorStore(str(tmp_path / "mirrors")))
+        fetched = fetcher.fetch_file(
+            bare_repo["url"], "main", ".toyci.yaml", commit=bare_repo["first"]
+        )
+        assert fetched.content == "jobs: []"
+        assert fetched.revision == bare_repo["first"]
+
+    def test_存在しないファイルはNoneが返る(self, bare_repo, tmp_path):
+        fetcher = MirrorConfigFetcher(MirrorStore(str(tmp_path / "mirrors")))
+        assert fetcher.fetch_file(bare_repo["url"], "main", "missing.yaml").content is None
+
+
+class TestBuildConfigFetcher:
+    def test_戦略名に応じた実装が返る(self):
+        assert isinstance(build_config_fetcher("clone"), CloneConfigFetcher)
+        assert isinstance(build_config_fetcher("partial"), PartialFetchConfigFetcher)
+
+    def test_mirror戦略にはミラーストアが必要(self, tmp_path):
+        with pytest.raises(ValueError):
+            build_config_fetcher("mirror")
+        store = MirrorStore(str(tmp_path))
+        assert isinstance(build_config_fetcher("mirror", store), MirrorConfigFetcher)
+
+    def test_未知の戦略名はValueError(self):
+        with pytest.raises(ValueError):
+            build_config_fetcher("unknown")
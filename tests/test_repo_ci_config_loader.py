@@ -72,3 +72,72 @@ class TestRepoCIConfigLoaderLoadFromPath:
         result = loader.load_from_path(str(tmp_path))
         assert result is not None
         assert result.jobs == []
+
+
+class TestRepoCIConfigLoaderCache:
+    def test_コミット指定時はキャッシュ経由で読み込まれる(self, monkeypatch):
+        from src.core.config import RepoCISettings
+        from src.core.repo_ci_config_cache import RepoCIConfigCache
+
+        settings = RepoCISettings()
+        calls = []
+
+        def fake_fetch(self, repo_url, branch, commit=None):
+            calls.append((repo_url, branch))
+            return settings, "sha1" + "0" * 36
+
+        monkeypatch.setattr(RepoCIConfigLoader, "_fetch_settings", fake_fetch)
+        loader = RepoCIConfigLoader(cache=RepoCIConfigCache())
+
+        first = loader.load_from_repo("https://github.com/example/repo.git", "main", "sha1")
+        second = loader.load_from_repo("https://github.com/example/repo", "main", "sha1")
+
+        assert first is settings
+        assert second is settings
+        assert len(calls) == 1
+
+    def test_取得失敗時はNoneが返りキャッシュされない(self, monkeypatch):
+        from src.core.repo_ci_config_cache import RepoCIConfigCache
+
+        calls = []
+
+        def failing_fetch(self, repo_url, branch, commit=None):
+            calls.append(1)
+            raise RuntimeError("network error")
+
+        monkeypatch.setattr(RepoCIConfigLoader, "_fetch_settings", failing_fetch)
+        loader = RepoCIConfigLoader(cache=RepoCIConfigCache())
+
+        assert loader.load_from_repo("https://github.com/example/repo.git", "main", "sha1") is None
+        assert loader.load_from_repo("https://github.com/example/repo.git", "main", "sha1") is None
+        assert len(calls) == 2
+
+    def test_指定と異なるコミットを読んだ場合はキャッシュされない(self):
+        from unittest.mock import MagicMock
+        from src.core.repo_ci_config_cache import RepoCIConfigCache
+        from src.core.repo_ci_config_fetcher import FetchedFile, RepoCIConfigFetcher
+
+        fetcher = MagicMock(spec=RepoCIConfigFetcher)
+        # サーバーがコミットの取得を拒否し、ブランチ先頭 (別のコミット) を読んだ
+        fetcher.fetch_file.return_value = FetchedFile("jobs:\n  - name: tip\n    script: make\n", "f" * 40)
+        loader = RepoCIConfigLoader(cache=RepoCIConfigCache(), fetcher=fetcher)
+
+        first = loader.load_from_repo("https://github.com/example/repo.git", "main", "abc123")
+        second = loader.load_from_repo("https://github.com/example/repo.git", "main", "abc123")
+
+        assert first.jobs[0].name == "tip"
+        assert second.jobs[0].name == "tip"
+        assert fetcher.fetch_file.call_count == 2
+
+    def test_指定したコミットを読んだ場合は省略形でもキャッシュされる(self):
+        from unittest.mock import MagicMock
+        from src.core.repo_ci_config_cache import RepoCIConfigCache
+        from src.core.repo_ci_config_fetcher import FetchedFile, RepoCIConfigFetcher
+
+        fetcher = MagicMock(spec=RepoCIConfigFetcher)
+        fetcher.fetch_file.return_value = FetchedFile(None, "abc123" + "0" * 34)
+        loader = RepoCIConfigLoader(cache=RepoCIConfigCache(), fetcher=fetcher)
+
+        assert loader.load_from_repo("https://github.com/example/repo.git", "main", "ABC123") is None
+        assert loader.load_from_repo("https://github.com/example/repo.git", "main", "ABC123") is None
+        assert fetcher.fetch_file.call_count == 1
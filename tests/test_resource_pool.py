@@ -0,0 +1,88 @@
+"""ResourcePool とリソースを考慮したジョブキューのテスト。"""
+
+import pytest
+
+from src.core.job_queue import InMemoryJobQueue, QueuedJob
+from src.core.resource_pool import ResourcePool, ResourceRequest
+
+
+def _job(name, cpu=1, memory_mb=0, tags=()):
+    return QueuedJob(
+        {"name": name, "resources": {"cpu": cpu, "memory_mb": memory_mb, "tags": list(tags)}},
+        {"id": name},
+    )
+
+
+class TestResourcePool:
+    def test_割り当てと解放で使用量が変わる(self):
+        pool = ResourcePool(cpu_slots=4, memory_mb=1000)
+        request = ResourceRequest(cpu=3, memory_mb=600, tags=["io"])
+        assert pool.fits(request)
+        pool.allocate("j1", "build", request)
+        assert not pool.fits(ResourceRequest(cpu=2))
+        assert not pool.fits(ResourceRequest(cpu=1, memory_mb=500))
+        assert not pool.fits(ResourceRequest(cpu=1, tags=["io"]))
+        assert pool.fits(ResourceRequest(cpu=1, memory_mb=400))
+
+        snapshot = pool.snapshot()
+        assert snapshot["allocated"] == {"cpu": 3, "memory_mb": 600, "tags": {"io": 1}}
+        assert snapshot["jobs"] == [{"job_id": "j1", "job_name": "build", "cpu": 3, "memory_mb": 600, "tags": ["io"]}]
+
+        pool.release("j1")
+        assert pool.snapshot()["allocated"] == {"cpu": 0, "memory_mb": 0, "tags": {}}
+
+    def test_タグごとの上限を変更できる(self):
+        pool = ResourcePool(cpu_slots=8, tag_limits={"io": 2})
+        pool.allocate("j1", "a", ResourceRequest(tags=["io"]))
+        assert pool.fits(ResourceRequest(tags=["io"]))
+        pool.allocate("j2", "b", ResourceRequest(tags=["io"]))
+        assert not pool.fits(ResourceRequest(tags=["io"]))
+
+    def test_容量を超える要求は容量に切り詰められる(self):
+        pool = ResourcePool(cpu_slots=4, memory_mb=1000)
+        request = pool.request_for({"name": "huge", "resources": {"cpu": 16, "memory_mb": 5000}})
+        assert (request.cpu, request.memory_mb) == (4, 1000)
+        assert pool.exceeds_capacity(ResourceRequest(cpu=16))
+
+    def test_resources未指定のジョブはCPUスロット1つを使う(self):
+        request = ResourceRequest.from_job_config({"name": "lint"})
+        assert (request.cpu, request.memory_mb, request.tags) == (1, 0, ())
+
+    def test_cpu_slotsが0以下はValueError(self):
+        with pytest.raises(ValueError):
+            ResourcePool(cpu_slots=0)
+
+
+class TestResourceAwareQueue:
+    def test_重いジョブと並行して軽いジョブが詰め込まれる(self):
+        q = InMemoryJobQueue(resource_pool=ResourcePool(cpu_slots=8))
+        q.put(_job("heavy", cpu=6))
+        for i in range(3):
+            q.put(_job(f"light{i}"))
+        assert [q.get(timeout=0).job_name for _ in range(3)] == ["heavy", "light0", "light1"]
+        assert q.get(timeout=0) is None
+
+    def test_空きを待つジョブは後続の軽いジョブに追い越され続けない(self):
+        q = InMemoryJobQueue(resource_pool=ResourcePool(cpu_slots=4))
+        for i in range(3):
+            q.put(_job(f"light{i}"))
+        running = [q.get(timeout=0) for _ in range(3)]
+        q.put(_job("heavy", cpu=3))
+        q.put(_job("late"))
+        # heavy の分を確保するため、空いている 1 スロットにも late は入らない
+        assert q.get(timeout=0) is None
+        for job in running[:2]:
+            q.task_done(job)
+        assert q.get(timeout=0).job_name == "heavy"
+
+    def test_排他タグが使用中のジョブは追い越される(self):
+        q = InMemoryJobQueue(resource_pool=ResourcePool(cpu_slots=4))
+        q.put(_job("io1", tags=["heavy-io"]))
+        q.put(_job("io2", tags=["heavy-io"]))
+        q.put(_job("other"))
+        first = q.get(timeout=0)
+        assert q.get(timeout=0).job_name == "other"
+        assert q.get(timeout=0) is None
+        q.task_done(first)
+        assert q.get(timeout=0).job_name == "io2"
+        assert q.resource_pool.snapshot()["allocated"]["tags"] == {"heavy-io": 1}
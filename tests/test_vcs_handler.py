@@ -1,11 +1,13 @@
 """GitHandlerのテスト。"""
 
+import os
 from unittest.mock import patch, MagicMock
 
 import pytest
 
+from src.core.interfaces import CheckoutOptions
 from src.core.vcs_handler import GitHandler
-from src.core.exceptions import RepositoryNotInitializedError
+from src.core.exceptions import RepositoryError, RepositoryNotInitializedError
 
 
 class TestGitHandlerNotInitialized:
@@ -67,3 +69,294 @@ class TestGitHandlerClose:
         handler.repo = MagicMock()
         handler.close()
         assert handler.repo is None
+
+
+def _commit_file(repo, rel_path, content, message):
+    os.makedirs(os.path.dirname(f"{repo.working_tree_dir}/{rel_path}"), exist_ok=True)
+    with open(f"{repo.working_tree_dir}/{rel_path}", "w", encoding="utf-8") as f:
+        f.write(content)
+    repo.index.add([rel_path])
+    return repo.index.commit(message).hexsha
+
+
+@pytest.fixture
+def upstream(tmp_path):
+    """作業用リポジトリと、そこから作成した bare リモート。"""
+    from git import Repo
+
+    src = Repo.init(tmp_path / "src", initial_branch="main")
+    with src.config_writer() as cw:
+        cw.set_value("user", "name", "test")
+        cw.set_value("user", "email", "test@example.com")
+    _commit_file(src, ".gitignore", "cache/\n", "init")
+    bare_path = tmp_path / "remote.git"
+    src.clone(str(bare_path), bare=True)
+    src.create_remote("origin", str(bare_path))
+    return {"src": src, "url": bare_path.as_uri(), "path": str(bare_path)}
+
+
+class TestGitHandlerUpdateRepository:
+    """update_repository (ワークスペース再利用) のテスト。"""
+
+    def test_既存クローンがリモートの最新に揃えられる(self, upstream, tmp_path):
+        work = str(tmp_path / "work")
+        handler = GitHandler(work)
+        handler.prepare_repository(upstream["url"], "main")
+        handler.close()
+
+        # リモートを進め、ワークスペースを汚す
+        new_sha = _commit_file(upstream["src"], "a.txt", "new", "second")
+        upstream["src"].remote("origin").push("main")
+        with open(f"{work}/.gitignore", "w") as f:
+            f.write("modified")
+        with open(f"{work}/untracked.txt", "w") as f:
+            f.write("x")
+        os.makedirs(f"{work}/cache")
+        with open(f"{work}/cache/keep.bin", "w") as f:
+            f.write("cached")
+
+        handler = GitHandler(work)
+        handler.update_repository(upstream["url"], "main")
+
+        assert handler.repo.head.commit.hexsha == new_sha
+        assert handler.repo.active_branch.name == "main"
+        assert not handler.has_changes()
+        assert not os.path.exists(f"{work}/untracked.txt")
+        # 無視されたファイルはキャッシュとして保持される
+        assert os.path.exists(f"{work}/cache/keep.bin")
+        handler.close()
+
+    def test_リモートに存在しないブランチはデフォルトブランチから作成される(self, upstream, tmp_path):
+        work = str(tmp_path / "work")
+        handler = GitHandler(work)
+        handler.prepare_repository(upstream["url"], "main")
+        handler.close()
+
+        handler = GitHandler(work)
+        handler.update_repository(upstream["url"], "ci-output")
+        assert handler.repo.active_branch.name == "ci-output"
+        handler.close()
+
+    def test_トリガーコミットは新しくクローンした場合と同じく扱う(self, upstream, tmp_path):
+        work = str(tmp_path / "work")
+        handler = GitHandler(work)
+        handler.prepare_repository(upstream["url"], "main")
+        handler.close()
+
+        trigger = _commit_file(upstream["src"], "a.txt", "2", "second")
+        latest = _commit_file(upstream["src"], "a.txt", "3", "third")
+        upstream["src"].remote("origin").push("main")
+
+        # ブランチが進んでいればトリガーコミットをデタッチ状態でチェックアウトする
+        handler = GitHandler(work)
+        handler.update_repository(upstream["url"], "main", options=CheckoutOptions(commit=trigger))
+        assert handler.repo.head.is_detached
+        assert handler.repo.head.commit.hexsha == trigger
+        assert handler.repo.heads.main.commit.hexsha == latest
+        handler.close()
+
+        # 次の更新ではブランチに戻る
+        handler = GitHandler(work)
+        handler.update_repository(upstream["url"], "main", options=CheckoutOptions(commit=latest))
+        assert handler.repo.active_branch.name == "main"
+        assert handler.repo.head.commit.hexsha == latest
+        handler.close()
+
+    def test_リポジトリでないディレクトリではRepositoryErrorが発生する(self, tmp_path):
+        handler = GitHandler(str(tmp_path))
+        with pytest.raises(RepositoryError):
+            handler.update_repository("https://github.com/example/repo.git", "main")
+
+    def test_リモートURLが異なる場合はRepositoryErrorが発生する(self, upstream, tmp_path):
+        work = str(tmp_path / "work")
+        handler = GitHandler(work)
+        handler.prepare_repository(upstream["url"], "main")
+        handler.close()
+
+        handler = GitHandler(work)
+        with pytest.raises(RepositoryError):
+            handler.update_repository("https://github.com/example/other.git", "main")
+        assert handler.repo is None
+
+
+class TestGitHandlerShallowClone:
+    """シャロー・シングルブランチクローンのテスト。"""
+
+    def _push_commits(self, upstream, count):
+        shas = []
+        for i in range(count):
+            shas.append(_commit_file(upstream["src"], "a.txt", f"v{i}", f"commit {i}"))
+        upstream["src"].remote("origin").push("main")
+        return shas
+
+    def test_指定した深さの履歴のみ取得される(self, upstream, tmp_path):
+        self._push_commits(upstream, 3)
+        upstream["src"].git.push("origin", "main:other")
+
+        handler = GitHandler(str(tmp_path / "work"))
+        handler.prepare_repository(upstream["url"], "main", options=CheckoutOptions(depth=1, single_branch=True))
+
+        assert handler.repo.git.rev_parse("--is-shallow-repository") == "true"
+        assert len(list(handler.repo.iter_commits())) == 1
+        assert "origin/other" not in [ref.name for ref in handler.repo.remote("origin").refs]
+        handler.close()
+
+    def test_シャロークローンからプッシュできる(self, upstream, tmp_path):
+        self._push_commits(upstream, 2)
+
+        handler = GitHandler(str(tmp_path / "work"))
+        handler.prepare_repository(upstream["url"], "main", options=CheckoutOptions(depth=1, single_branch=True))
+        with open(tmp_path / "work" / "out.txt", "w") as f:
+            f.write("generated")
+        assert handler.has_changes()
+        handler.commit_and_push("generated", "main")
+        handler.close()
+
+        from git import Repo
+        remote = Repo(upstream["path"])
+        assert remote.heads.main.commit.message.strip().endswith("generated")
+        remote.close()
+
+    def test_リモートに存在しないブランチはデフォルトブランチから作成される(self, upstream, tmp_path):
+        handler = GitHandler(str(tmp_path / "work"))
+        handler.prepare_repository(upstream["url"], "ci-output", options=CheckoutOptions(depth=1, single_branch=True))
+        assert handler.repo.active_branch.name == "ci-output"
+        handler.close()
+
+    def test_履歴に含まれないトリガーコミットを取得してチェックアウトする(self, upstream, tmp_path):
+        shas = self._push_commits(upstream, 3)
+        from git import Repo
+        remote = Repo(upstream["path"])
+        with remote.config_writer() as cw:
+            cw.set_value("uploadpack", "allowAnySHA1InWant", "true")
+        remote.close()
+
+        handler = GitHandler(str(tmp_path / "work"))
+        handler.prepare_repository(
+            upstream["url"], "main", options=CheckoutOptions(depth=1, single_branch=True, commit=shas[0])
+        )
+        assert handler.repo.head.commit.hexsha == shas[0]
+        # ブランチはリモートの先頭のまま
+        assert handler.repo.head.is_detached
+        assert handler.repo.heads.main.commit.hexsha == shas[-1]
+        handler.close()
+
+    def test_取得できないトリガーコミットはブランチ先頭で実行する(self, upstream, tmp_path):
+        shas = self._push_commits(upstream, 2)
+
+        handler = GitHandler(str(tmp_path / "work"))
+        handler.prepare_repository(
+            upstream["url"], "main", options=CheckoutOptions(depth=1, single_branch=True, commit="0" * 40)
+        )
+        assert handler.repo.head.commit.hexsha == shas[-1]
+        handler.close()
+
+
+class TestGitHandlerTriggerCommit:
+    """トリガーコミットのチェックアウトのテスト (クローンの方式によらず同じ扱い)。"""
+
+    def _push_commits(self, upstream, count, branch="main"):
+        shas = [_commit_file(upstream["src"], "a.txt", f"{branch}{i}", f"{branch} {i}") for i in range(count)]
+        upstream["src"].remote("origin").push(branch)
+        return shas
+
+    @pytest.mark.parametrize("options", [{}, {"single_branch": True}, {"depth": 1}], ids=["full", "single_branch", "shallow"])
+    def test_ブランチ先頭のトリガーコミットはブランチをチェックアウトする(self, upstream, tmp_path, options):
+        shas = self._push_commits(upstream, 2)
+
+        handler = GitHandler(str(tmp_path / "work"))
+        handler.prepare_repository(upstream["url"], "main", options=CheckoutOptions(commit=shas[-1], **options))
+
+        assert handler.repo.active_branch.name == "main"
+        assert handler.repo.head.commit.hexsha == shas[-1]
+        handler.close()
+
+    @pytest.mark.parametrize("options", [{}, {"single_branch": True}], ids=["full", "single_branch"])
+    def test_ブランチが進んでいればトリガーコミットをデタッチ状態で実行しプッシュしない(self, upstream, tmp_path, options):
+        shas = self._push_commits(upstream, 3)
+
+        handler = GitHandler(str(tmp_path / "work"))
+        handler.prepare_repository(upstream["url"], "main", options=CheckoutOptions(commit=shas[0], **options))
+        assert handler.repo.head.is_detached
+        assert handler.repo.head.commit.hexsha == shas[0]
+
+        with open(tmp_path / "work" / "out.txt", "w") as f:
+            f.write("generated")
+        with pytest.raises(RepositoryError, match="プッシュできません"):
+            handler.commit_and_push("generated", "main")
+        handler.close()
+
+        from git import Repo
+        remote = Repo(upstream["path"])
+        assert remote.heads.main.commit.hexsha == shas[-1]
+        remote.close()
+
+    def test_ブランチの履歴にないトリガーコミットではブランチ先頭で実行する(self, upstream, tmp_path):
+        # 生成物を置く別ブランチ (トリガーは main へのプッシュ)
+        upstream["src"].git.checkout("-b", "ci-output")
+        output = self._push_commits(upstream, 1, branch="ci-output")
+        upstream["src"].git.checkout("main")
+        trigger = self._push_commits(upstream, 1)[-1]
+
+        handler = GitHandler(str(tmp_path / "work"))
+        handler.prepare_repository(upstream["url"], "ci-output", options=CheckoutOptions(commit=trigger))
+
+        assert handler.repo.active_branch.name == "ci-output"
+        assert handler.repo.head.commit.hexsha == output[-1]
+        handler.close()
+
+
+class TestGitHandlerSparseCheckout:
+    """スパースチェックアウトのテスト。"""
+
+    @pytest.fixture
+    def monorepo(self, upstream):
+        _commit_file(upstream["src"], "docs/index.md", "docs", "docs")
+        _commit_file(upstream["src"], "assets/big.bin", "x" * 1000, "assets")
+        upstream["src"].remote("origin").push("main")
+        from git import Repo
+        remote = Repo(upstream["path"])
+        with remote.config_writer() as cw:
+            cw.set_value("uploadpack", "allowFilter", "true")
+        remote.close()
+        return upstream
+
+    def test_指定したディレクトリのみ展開される(self, monorepo, tmp_path):
+        work = tmp_path / "work"
+        handler = GitHandler(str(work))
+        handler.prepare_repository(monorepo["url"], "main", options=CheckoutOptions(sparse_paths=["docs"]))
+
+        assert (work / "docs" / "index.md").exists()
+        assert (work / ".gitignore").exists()
+        assert not (work / "assets").exists()
+        assert not handler.has_changes()
+        handler.close()
+
+    def test_範囲外に生成されたファイルも検出してプッシュできる(self, monorepo, tmp_path):
+        work = tmp_path / "work"
+        handler = GitHandler(str(work))
+        handler.prepare_repository(monorepo["url"], "main", options=CheckoutOptions(sparse_paths=["docs"]))
+        os.makedirs(work / "site")
+        (work / "site" / "index.html").write_text("generated")
+
+        assert handler.has_changes()
+        handler.commit_and_push("build site", "main")
+        handler.close()
+
+        from git import Repo
+        remote = Repo(monorepo["path"])
+        tree = remote.heads.main.commit.tree
+        assert tree["site/index.html"] is not None
+        assert tree["assets/big.bin"] is not None
+        remote.close()
+
+    def test_再利用時にスパース設定を解除できる(self, monorepo, tmp_path):
+        work = tmp_path / "work"
+        handler = GitHandler(str(work))
+        handler.prepare_repository(monorepo["url"], "main", options=CheckoutOptions(sparse_paths=["docs"]))
+        handler.close()
+
+        handler = GitHandler(str(work))
+        handler.update_repository(monorepo["url"], "main")
+        assert (work / "assets" / "big.bin").exists()
+        handler.close()
@@ -2,7 +2,7 @@
 
 import pytest
 
-from src.core.vcs_utils import inject_auth_token, mask_auth_token
+from src.core.vcs_utils import inject_auth_token, mask_auth_token, normalize_repo_url
 
 
 class TestInjectAuthToken:
@@ -52,3 +52,25 @@ class TestMaskAuthToken:
         url = "https://github.com/example/repo.git"
         result = mask_auth_token(url, "nonexistent_token")
         assert result == url
+
+
+class TestNormalizeRepoUrl:
+    """normalize_repo_url のテスト。"""
+
+    @pytest.mark.parametrize("url", [
+        "https://github.com/Example/repo.git",
+        "https://GitHub.com/Example/repo",
+        "https://token@github.com/Example/repo.git/",
+        "git@github.com:Example/repo.git",
+        "ssh://git@github.com/Example/repo.git",
+    ])
+    def test_同一リポジトリの表記揺れが同じ値になる(self, url):
+        assert normalize_repo_url(url) == "github.com/Example/repo"
+
+    def test_ポート番号が保持される(self):
+        url = "https://git.example.com:8443/repo.git"
+        assert normalize_repo_url(url) == "git.example.com:8443/repo"
+
+    def test_ローカルパスは末尾の拡張子のみ除去される(self):
+        assert normalize_repo_url("/srv/git/repo.git") == "/srv/git/repo"
+        assert normalize_repo_url("file:///srv/git/repo.git") == "/srv/git/repo"
@@ -123,6 +123,24 @@ class TestGitHubProviderExtractRepoInfo:
         result = self.provider.extract_repo_info(payload)
         assert result["branch"] == "feature/my-branch"
 
+    def test_afterがある場合はcommitとして返る(self):
+        payload = {
+            "ref": "refs/heads/main",
+            "after": "abc123",
+            "repository": {"clone_url": "https://github.com/owner/repo.git"},
+        }
+        result = self.provider.extract_repo_info(payload)
+        assert result["commit"] == "abc123"
+
+    def test_afterがない場合はhead_commitのidが使われる(self):
+        payload = {
+            "ref": "refs/heads/main",
+            "head_commit": {"id": "def456"},
+            "repository": {"clone_url": "https://github.com/owner/repo.git"},
+        }
+        result = self.provider.extract_repo_info(payload)
+        assert result["commit"] == "def456"
+
 
 class TestGitHubProviderGetPayloadMeta:
     def setup_method(self):
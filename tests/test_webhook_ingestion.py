@@ -0,0 +1,110 @@
+"""WebhookIngestionService のテスト。"""
+
+import threading
+from unittest.mock import MagicMock
+
+import pytest
+
+from src.core.exceptions import IngestionQueueFullError
+from src.core.interfaces import WebhookProvider
+from src.core.job_trigger import JobTriggerService
+from src.core.metrics import MetricsRegistry
+from src.core.webhook_ingestion import (
+    WebhookIngestionService,
+    EVENT_STATUS_DONE,
+    EVENT_STATUS_FAILED,
+)
+
+
+@pytest.fixture
+def mock_provider():
+    provider = MagicMock(spec=WebhookProvider)
+    provider.get_provider_id.return_value = "github"
+    return provider
+
+
+@pytest.fixture
+def mock_trigger_service():
+    trigger = MagicMock(spec=JobTriggerService)
+    trigger.process_webhook_event.return_value = ["test_job"]
+    return trigger
+
+
+class TestWebhookIngestionService:
+    def test_submitがイベントIDを返し非同期にトリガー判定される(
+        self, mock_trigger_service, mock_provider
+    ):
+        service = WebhookIngestionService(mock_trigger_service)
+        payload = {"ref": "refs/heads/main"}
+
+        event_id = service.submit(mock_provider, payload)
+        service.join()
+
+        assert event_id
+        mock_trigger_service.process_webhook_event.assert_called_once_with(mock_provider, payload)
+        event = service.get_event(event_id)
+        assert event["status"] == EVENT_STATUS_DONE
+        assert event["triggered_jobs"] == ["test_job"]
+
+        service.shutdown()
+
+    def test_トリガー判定の例外がfailedとして記録される(
+        self, mock_trigger_service, mock_provider
+    ):
+        mock_trigger_service.process_webhook_event.side_effect = RuntimeError("boom")
+        metrics = MetricsRegistry()
+        service = WebhookIngestionService(mock_trigger_service, metrics=metrics)
+
+        event_id = service.submit(mock_provider, {})
+        service.join()
+
+        event = service.get_event(event_id)
+        assert event["status"] == EVENT_STATUS_FAILED
+        assert event["error"] == "boom"
+        assert metrics.counter("webhook_ingestion_failed_total").value == 1
+
+        service.shutdown()
+
+    def test_キューが上限に達するとIngestionQueueFullErrorが発生する(
+        self, mock_trigger_service, mock_provider
+    ):
+        release = threading.Event()
+        started = threading.Event()
+
+        def _block(provider, payload):
+            started.set()
+            release.wait(timeout=5)
+            return []
+
+        mock_trigger_service.process_webhook_event.side_effect = _block
+        service = WebhookIngestionService(mock_trigger_service, max_pending=1)
+
+        service.submit(mock_provider, {})  # ワーカーが処理中
+        started.wait(timeout=5)
+        service.submit(mock_provider, {})  # キューで待機
+        with pytest.raises(IngestionQueueFullError):
+            service.submit(mock_provider, {})
+
+        release.set()
+        service.join()
+        service.shutdown()
+
+    def test_履歴は上限件数までしか保持されない(
+        self, mock_trigger_service, mock_provider
+    ):
+        service = WebhookIngestionService(mock_trigger_service, history_size=2)
+
+        first = service.submit(mock_provider, {})
+        service.submit(mock_provider, {})
+        last = service.submit(mock_provider, {})
+        service.join()
+
+        assert service.get_event(first) is None
+        assert service.get_event(last) is not None
+
+        service.shutdown()
+
+    def test_未知のイベントIDはNoneを返す(self, mock_trigger_service):
+        service = WebhookIngestionService(mock_trigger_service)
+        assert service.get_event("unknown") is None
+        service.shutdown()
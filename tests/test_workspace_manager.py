@@ -71,3 +71,25 @@ class TestWorkspaceManagerCleanup:
 
         # 3回リトライされたこと
         assert mock_rmtree.call_count == 3
+
+
+class TestWorkspaceManagerGetWorkspace:
+    """get_workspace のテスト。"""
+
+    def test_既存の内容が保持される(self, tmp_path):
+        manager = WorkspaceManager(base_dir=str(tmp_path))
+        job_dir = os.path.join(str(tmp_path), "test_job")
+        os.makedirs(job_dir)
+        marker = os.path.join(job_dir, "marker.txt")
+        with open(marker, "w") as f:
+            f.write("test")
+
+        work_dir = manager.get_workspace("test_job")
+
+        assert work_dir == job_dir
+        assert os.path.exists(marker)
+
+    def test_存在しない場合は作成される(self, tmp_path):
+        manager = WorkspaceManager(base_dir=str(tmp_path))
+        work_dir = manager.get_workspace("new_job")
+        assert os.path.isdir(work_dir)